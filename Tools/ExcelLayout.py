@@ -20,6 +20,64 @@ TEXT_FONT_COLOR = Color(rgb="FFFFFF")         # White
 BORDER_COLOR = Color(rgb="000000")            # Black
 BACKGROUND_COLOR = Color(rgb="000000")        # Black
 
+# ────────────────────────────── SHEET HEADERS ─────────────────────────────────
+# The server reads most sheets by column name (ExcelSeedService); the Holding sheet's ticker columns by
+# index. scripts/reseed_copy.py addresses the in-memory fleet through these same headers.
+
+# Price lives on the Listings sheet (per-currency SeedPrice); not duplicated here.
+# §sector: real GICS-ish group (one of Config.SECTORS) — drives the BankEstimate per-sector re-rating.
+STOCKS_HEADER = ["StockId", "Ticker", "CompanyName", "Sector"]
+
+LISTINGS_HEADER = ["StockId", "Currency", "IsPrimary", "SeedPrice"]
+
+IDENTITY_HEADER = ["UserId", "Username", "FullName", "Email", "Birthdate", "IsAdmin"]
+
+PROFILE_HEADER = [
+    "UserId", "Seed", "DecisionIntervalSeconds", "TradeProb",
+    "UseMarketProb", "UseSlippageMarketProb",
+    "BuyBiasPrc", "MinTradeAmountPrc", "MaxTradeAmountPrc",
+    "PerPositionMaxPrc", "MinCashReservePrc", "MaxCashReservePrc",
+    "SlippageTolerancePrc", "MinLimitOffsetPrc", "MaxLimitOffsetPrc",
+    "AggressivenessPrc",
+    "MaxOpenOrders", "WatchlistCsv", "Strategy",
+    "ExtremeReactionRandomnessPrc",
+    "CashInjectionFrequencyPrc", "CashInjectionAmountPrc",
+    "HomeCurrency",
+    # §3.6 P6: per-bot advanced-order probabilities (must stay in the same order as
+    # Person.ToProfileList; the server reads them by column name in ExcelSeedService).
+    "StopProb", "TrailingProb", "ShortProb", "LongBracketProb", "ShortBracketProb",
+    # §P6 balancing: tiered-limit bands, protective-stop distance band, Far-order budget.
+    "MidLimitMinPrc", "MidLimitMaxPrc", "FarLimitMinPrc", "FarLimitMaxPrc",
+    "StopDistanceMinPrc", "StopDistanceMaxPrc", "FarBudgetPrc",
+    # §P6: per-bot take-profit band (promoted from the global Advanced:TpOffsetPrc config).
+    "TpOffsetMinPrc", "TpOffsetMaxPrc",
+    # Sentiment-dynamics §: per-bot lateness L for the slope-aware phase model.
+    "Lateness",
+    # Round 2 §0012 (extension E5): per-bot preference for round-trip vs flip when both are
+    # sizeable bracket entries. 0 = always flip; 1 = always round-trip; 0.5 = neutral.
+    "RoundtripBiasPrc",
+    # §3.7 arbitrage cohort params (0 for every non-Arbitrage bot; the server reads by name).
+    "MinArbitrageRatePrc", "MaxInventoryPerStock", "ConversionCadenceSeconds",
+]
+
+
+def holding_header(tickers) -> list:
+    """Holding sheet header with one column per ticker.
+    §3.7 "BalanceSecondary" is appended AFTER the ticker columns so the server's index-based
+    stock read (row[i+2]) is unaffected; it funds the NON-home currency (house + arbitrage cohort)."""
+    return ["UserId", "Balance"] + list(tickers) + ["BalanceSecondary"]
+
+
+def sheet_headers(tickers) -> Dict[str, list]:
+    """Header row of every AIUser sheet, keyed by sheet name."""
+    return {
+        "Stocks": STOCKS_HEADER,
+        "Listings": LISTINGS_HEADER,
+        "Identity": IDENTITY_HEADER,
+        "Profile": PROFILE_HEADER,
+        "Holding": holding_header(tickers),
+    }
+
 # ────────────────────────────── SHEET CREATION ────────────────────────────────
 
 def load_or_create_workbook(excel_path: str) -> Workbook:
@@ -45,16 +103,14 @@ def reset_or_create_sheet(wb: Workbook, name: str) -> Worksheet:
 def prepare_stocks_sheet(wb: Workbook) -> Worksheet:
     """Create/reset the Stocks sheet and write its header row."""
     ws = reset_or_create_sheet(wb, "Stocks")
-    # Price lives on the Listings sheet (per-currency SeedPrice); not duplicated here.
-    # §sector: real GICS-ish group (one of Config.SECTORS) — drives the BankEstimate per-sector re-rating.
-    ws.append(["StockId", "Ticker", "CompanyName", "Sector"])
+    ws.append(STOCKS_HEADER)
     return ws
 
 
 def prepare_identity_sheet(wb: Workbook) -> Worksheet:
     """Create/reset the Identity sheet and write its header row."""
     ws = reset_or_create_sheet(wb, "Identity")
-    ws.append(["UserId", "Username", "FullName", "Email", "Birthdate", "IsAdmin"])
+    ws.append(IDENTITY_HEADER)
     return ws
 
 
@@ -63,49 +119,21 @@ def prepare_holding_sheet(wb: Workbook, tickers) -> Worksheet:
     Includes dynamic ticker columns.
     """
     ws = reset_or_create_sheet(wb, "Holding")
-    # §3.7 "BalanceSecondary" is appended AFTER the ticker columns so the server's index-based
-    # stock read (row[i+2]) is unaffected; it funds the NON-home currency (house + arbitrage cohort).
-    ws.append(["UserId", "Balance"] + list(tickers) + ["BalanceSecondary"])
+    ws.append(holding_header(tickers))
     return ws
 
 
 def prepare_profile_sheet(wb: Workbook) -> Worksheet:
     """Create/reset the Profile sheet and write its header row."""
     ws = reset_or_create_sheet(wb, "Profile")
-    ws.append([
-        "UserId", "Seed", "DecisionIntervalSeconds", "TradeProb",
-        "UseMarketProb", "UseSlippageMarketProb",
-        "BuyBiasPrc", "MinTradeAmountPrc", "MaxTradeAmountPrc",
-        "PerPositionMaxPrc", "MinCashReservePrc", "MaxCashReservePrc",
-        "SlippageTolerancePrc", "MinLimitOffsetPrc", "MaxLimitOffsetPrc",
-        "AggressivenessPrc",
-        "MaxOpenOrders", "WatchlistCsv", "Strategy",
-        "ExtremeReactionRandomnessPrc",
-        "CashInjectionFrequencyPrc", "CashInjectionAmountPrc",
-        "HomeCurrency",
-        # §3.6 P6: per-bot advanced-order probabilities (must stay in the same order as
-        # Person.ToProfileList; the server reads them by column name in ExcelSeedService).
-        "StopProb", "TrailingProb", "ShortProb", "LongBracketProb", "ShortBracketProb",
-        # §P6 balancing: tiered-limit bands, protective-stop distance band, Far-order budget.
-        "MidLimitMinPrc", "MidLimitMaxPrc", "FarLimitMinPrc", "FarLimitMaxPrc",
-        "StopDistanceMinPrc", "StopDistanceMaxPrc", "FarBudgetPrc",
-        # §P6: per-bot take-profit band (promoted from the global Advanced:TpOffsetPrc config).
-        "TpOffsetMinPrc", "TpOffsetMaxPrc",
-        # Sentiment-dynamics §: per-bot lateness L for the slope-aware phase model.
-        "Lateness",
-        # Round 2 §0012 (extension E5): per-bot preference for round-trip vs flip when both are
-        # sizeable bracket entries. 0 = always flip; 1 = always round-trip; 0.5 = neutral.
-        "RoundtripBiasPrc",
-        # §3.7 arbitrage cohort params (0 for every non-Arbitrage bot; the server reads by name).
-        "MinArbitrageRatePrc", "MaxInventoryPerStock", "ConversionCadenceSeconds",
-    ])
+    ws.append(PROFILE_HEADER)
     return ws
 
 
 def prepare_listings_sheet(wb: Workbook) -> Worksheet:
     """Create/reset the Listings sheet. One row per (StockId, Currency)."""
     ws = reset_or_create_sheet(wb, "Listings")
-    ws.append(["StockId", "Currency", "IsPrimary", "SeedPrice"])
+    ws.append(LISTINGS_HEADER)
     return ws
 
 
@@ -36,33 +36,20 @@ FAST_GEN = bool(os.environ.get("KSE_FAST_GEN"))
 GENERATOR_SEED = 42
 
 
-def generate_aiuser_excel(excel_path: Path = EXCEL_PATH, num_people: int = NUM_PEOPLE) -> None:
+def build_fleet(num_people: int = NUM_PEOPLE) -> dict[str, list[list]]:
     """
-    Create/refresh the AIUser Excel with Identity, Preference, Holding and AIUserTable.
+    Generate every seed row — the data rows (no headers) of the Stocks, Listings, Identity, Profile and
+    Holding sheets, keyed by sheet name. Rows are in the same order, and RNG draws happen in the same
+    order, as they are written to the workbook, so the workbook and an in-memory consumer
+    (scripts/reseed_copy.py) see identical fleets.
     """
 
     if GENERATOR_SEED is not None:
         random.seed(GENERATOR_SEED)
         fake.seed_instance(GENERATOR_SEED)
 
-    # Load or create workbook
-    wb = load_or_create_workbook(str(excel_path))
-    print(f"✅ Loaded or created workbook at {excel_path}")
-
-    # Create/clear sheets and write header rows
-    sheets: dict[str, Worksheet] = {}
-    # Holding sheet uses ticker symbols as human-readable column headers.
-    tickers = [data["ticker"] for data in STOCKS.values()]
-
-    # index, expecting [Stocks, Listings, Identity, Profile, Holding].
-    sheets["Stocks"] = prepare_stocks_sheet(wb)
-    sheets["Listings"] = prepare_listings_sheet(wb)
-    sheets["Identity"] = prepare_identity_sheet(wb)
-    sheets["Profile"] = prepare_profile_sheet(wb)
-    sheets["Holding"] = prepare_holding_sheet(wb, tickers)
-
-    print("✅ Prepared all AIUser sheets.")
-
+    # Plain lists stand in for the worksheets: everything below only ever appends rows.
+    sheets: dict[str, list[list]] = {name: [] for name in ("Stocks", "Listings", "Identity", "Profile", "Holding")}
 
     # Append stock data
     for stock_id, data in STOCKS.items():
@@ -181,6 +168,35 @@ def generate_aiuser_excel(excel_path: Path = EXCEL_PATH, num_people: int = NUM_P
                              + [JUMP_AGGRESSOR_SEED_BALANCE_EUR])
     print(f"✅ Appended jump aggressor account (UserId {jump_id}, username 'jumpdesk').")
 
+    return sheets
+
+
+def generate_aiuser_excel(excel_path: Path = EXCEL_PATH, num_people: int = NUM_PEOPLE) -> None:
+    """
+    Create/refresh the AIUser Excel with Identity, Preference, Holding and AIUserTable.
+    """
+
+    # Load or create workbook
+    wb = load_or_create_workbook(str(excel_path))
+    print(f"✅ Loaded or created workbook at {excel_path}")
+
+    # Create/clear sheets and write header rows
+    sheets: dict[str, Worksheet] = {}
+    # Holding sheet uses ticker symbols as human-readable column headers.
+    tickers = [data["ticker"] for data in STOCKS.values()]
+
+    # index, expecting [Stocks, Listings, Identity, Profile, Holding].
+    sheets["Stocks"] = prepare_stocks_sheet(wb)
+    sheets["Listings"] = prepare_listings_sheet(wb)
+    sheets["Identity"] = prepare_identity_sheet(wb)
+    sheets["Profile"] = prepare_profile_sheet(wb)
+    sheets["Holding"] = prepare_holding_sheet(wb, tickers)
+
+    print("✅ Prepared all AIUser sheets.")
+
+    for name, rows in build_fleet(num_people).items():
+        for row in rows:
+            sheets[name].append(row)
 
     # Apply dark theme and autofit columns (skipped in fast mode — purely cosmetic, the slowest step).
     if FAST_GEN:
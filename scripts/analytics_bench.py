@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Scale benchmark for the soak analytics: each diagnostic over synthetic tapes of growing size.
+
+soak_scorecard, sector_corr, stock_liveness, r4_realism_score and cross_stock_diag only ever met
+45-minute soaks, and got quietly slower as prod runs grew. This loads a synth_tape.py tape for every
+(--trades x --stocks) cell into a bench DB (fixed --minutes, so the trade axis is the trade rate; the
+50-stock universe is 70 books, more stocks are tiled USD-only books), exports its candles with
+candle_export.py (the CSV sector_corr / cross_stock_diag read) and runs each script as its own
+process, recording per run:
+
+  wall     end-to-end seconds
+  cpu      user + sys of the script's process tree (the Python side, incl. the docker/psql client)
+  db       Postgres active_time for the bench DB over the run (pg_stat_database, PG14+)
+  rss      peak resident set of the script (os.wait4; psutil sampling on Windows if installed)
+
+Rows are appended to data/bench/analytics/history.csv with the git commit, and each is compared with
+the median wall of the last --baseline runs of the same (script, trades, stocks, minutes) from other
+commits; a slowdown beyond --tolerance is flagged REGRESS (exit 1 with --strict). Tape generation and
+loading are setup, not measured.
+
+Usage: py scripts/analytics_bench.py [--db kse_bench] [--trades 1e5,1e6,1e7] [--stocks 50,100,500]
+       [--minutes 240] [--only r4_realism_score,stock_liveness] [--tolerance 0.25] [--strict]
+"""
+import argparse, csv, os, statistics, subprocess, sys, time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(ROOT, "data", "bench", "analytics")
+HISTORY = os.path.join(OUT_DIR, "history.csv")
+FIELDS = ("ts", "commit", "script", "trades", "stocks", "books", "minutes", "wall_s", "cpu_s", "db_s", "rss_mb", "rc")
+ACTIVE_SQL = "SELECT active_time FROM pg_stat_database WHERE datname = current_database();"
+
+
+def scripts(db, minutes, work):
+    """name -> argv; candle_export first, it writes the CSV the two file-based diagnostics read."""
+    csv_path, store = os.path.join(work, "candles.csv"), os.path.join(work, "results.sqlite")
+    return {
+        "candle_export": ["candle_export.py", "--db", db, "--out", csv_path, "--store", store],
+        "soak_scorecard": ["soak_scorecard.py", "--db", db, "--note", "bench", "--store", store],
+        "r4_realism_score": ["r4_realism_score.py", "--db", db, "--window-min", str(minutes + 5)],
+        "stock_liveness": ["stock_liveness.py", "--db", db],
+        "sector_corr": ["sector_corr.py", "--csv", csv_path],
+        "cross_stock_diag": ["cross_stock_diag.py", "--csv", csv_path],
+    }
+
+
+def git(*a):
+    try:
+        return subprocess.run(["git", "-C", ROOT, *a], capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def active_ms(db):
+    try:
+        v = kse_db.rows(db, ACTIVE_SQL)
+        return float(v[0][0]) if v and v[0][0] else None
+    except kse_db.QueryError:
+        return None
+
+
+def measure(argv, timeout):
+    """Run one script -> (rc, wall, cpu, peak rss MB, stderr tail); cpu/rss None where unmeasurable."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, *argv], cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if hasattr(os, "wait4"):
+        # wait4 reports the child's own rusage (its waited-for children included), not the bench's
+        deadline = t0 + timeout
+        while True:
+            pid, status, ru = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() > deadline:
+                proc.kill()
+                pid, status, ru = os.wait4(proc.pid, 0)
+                break
+            time.sleep(0.02)
+        wall = time.perf_counter() - t0
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        err = proc.stderr.read()
+        rss = ru.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+        return proc.returncode, wall, ru.ru_utime + ru.ru_stime, rss, err
+    try:
+        import psutil
+        ps = psutil.Process(proc.pid)
+    except Exception:
+        ps = None
+    cpu = rss = None
+    while proc.poll() is None:
+        if ps is not None:
+            try:
+                ct, mi = ps.cpu_times(), ps.memory_info()
+                cpu = ct.user + ct.system
+                rss = max(rss or 0.0, getattr(mi, "peak_wset", mi.rss) / (1 << 20))
+            except psutil.Error:
+                pass
+        if time.perf_counter() - t0 > timeout:
+            proc.kill()
+        time.sleep(0.05)
+    return proc.returncode, time.perf_counter() - t0, cpu, rss, proc.stderr.read()
+
+
+def load(db, trades, stocks, minutes, work):
+    """synth_tape.py into the bench DB -> book count."""
+    subprocess.run([sys.executable, os.path.join(HERE, "synth_tape.py"), "--db", db, "--replace",
+                    "--trades", str(trades), "--stocks", str(stocks), "--minutes", str(minutes),
+                    "--out", work], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    kse_db._run(db, 'ANALYZE "Transactions";')
+    return int(kse_db.rows(db, 'SELECT count(DISTINCT ("StockId", "Currency")) FROM "Transactions";')[0][0])
+
+
+def read_history():
+    if not os.path.exists(HISTORY):
+        return []
+    with open(HISTORY, newline="", encoding="utf-8") as fh:
+        return list(csv.DictReader(fh))
+
+
+def baseline(history, row, commit, n):
+    """Median wall of the last n successful runs of the same cell from other commits."""
+    key = (row["script"], row["trades"], row["stocks"], row["minutes"])
+    walls = [float(h["wall_s"]) for h in history
+             if (h["script"], h["trades"], h["stocks"], h["minutes"]) == key and h["commit"] != commit and h["rc"] == "0"]
+    return statistics.median(walls[-n:]) if walls else None
+
+
+def fmt(v, spec, width):
+    return ("-" if v is None else format(v, spec)).rjust(width)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="kse_bench", help="scratch DB (an existing clone); its Transactions is replaced")
+    ap.add_argument("--trades", default="1e5,1e6,1e7")
+    ap.add_argument("--stocks", default="50,100,500")
+    ap.add_argument("--minutes", type=int, default=240, help="tape length for every cell")
+    ap.add_argument("--only", default="", help="comma list of scripts (candle_export always runs)")
+    ap.add_argument("--timeout", type=float, default=3600.0, help="per-script seconds")
+    ap.add_argument("--baseline", type=int, default=5, help="prior runs in the comparison median")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="flag wall > baseline x (1 + this)")
+    ap.add_argument("--strict", action="store_true", help="exit 1 on any regression or failed script")
+    args = ap.parse_args()
+
+    work = os.path.join(OUT_DIR, "work")
+    os.makedirs(work, exist_ok=True)
+    names = list(scripts(args.db, args.minutes, work))
+    only = [s for s in args.only.split(",") if s]
+    unknown = set(only) - set(names)
+    if unknown:
+        sys.exit(f"unknown script(s) {', '.join(sorted(unknown))}; choose from {', '.join(names)}")
+    names = [n for n in names if not only or n in only or n == "candle_export"]
+    commit = git("rev-parse", "--short", "HEAD") + ("-dirty" if git("status", "--porcelain", "--untracked-files=no") else "")
+    history = read_history()
+    new_file = not os.path.exists(HISTORY)
+    bad = 0
+
+    print(f"{'script':<18} {'trades':>9} {'stocks':>6} {'books':>5} {'wall':>8} {'cpu':>8} {'db':>8} "
+          f"{'rss MB':>7} {'base':>8} {'delta':>7}")
+    with open(HISTORY, "a", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=FIELDS)
+        if new_file:
+            w.writeheader()
+        for stocks in (int(s) for s in args.stocks.split(",")):
+            for trades in (int(float(t)) for t in args.trades.split(",")):
+                t0 = time.perf_counter()
+                try:
+                    books = load(args.db, trades, stocks, args.minutes, work)
+                except (subprocess.CalledProcessError, kse_db.QueryError) as ex:
+                    sys.exit(f"loading {trades:.0e} trades x {stocks} stocks failed: {ex}")
+                print(f"-- {trades:,} trades, {stocks} stocks ({books} books) loaded in {time.perf_counter() - t0:.0f}s")
+                argvs = scripts(args.db, args.minutes, work)
+                for name in names:
+                    argv = argvs[name]
+                    before = active_ms(args.db)
+                    rc, wall, cpu, rss, err = measure([os.path.join(HERE, argv[0]), *argv[1:]], args.timeout)
+                    after = active_ms(args.db)
+                    db_s = (after - before) / 1000 if before is not None and after is not None else None
+                    row = {"ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"), "commit": commit,
+                           "script": name, "trades": trades, "stocks": stocks, "books": books,
+                           "minutes": args.minutes, "wall_s": round(wall, 3),
+                           "cpu_s": None if cpu is None else round(cpu, 3),
+                           "db_s": None if db_s is None else round(db_s, 3),
+                           "rss_mb": None if rss is None else round(rss, 1), "rc": rc}
+                    w.writerow(row)
+                    fh.flush()
+                    row = {k: str(v) for k, v in row.items()}
+                    base = baseline(history, row, commit, args.baseline)
+                    delta = wall / base - 1 if base else None
+                    flag = ""
+                    if rc != 0:
+                        flag, bad = f"  FAILED rc={rc}: {err.strip().splitlines()[-1] if err.strip() else ''}", bad + 1
+                    elif delta is not None and delta > args.tolerance and wall - base > 1.0:
+                        flag, bad = "  REGRESS", bad + 1
+                    print(f"{name:<18} {trades:>9,} {stocks:>6} {books:>5} {wall:>8.2f} {fmt(cpu, '.2f', 8)} "
+                          f"{fmt(db_s, '.2f', 8)} {fmt(rss, '.0f', 7)} {fmt(base, '.2f', 8)} {fmt(delta, '+.0%', 7)}{flag}")
+    print(f"-> {HISTORY}")
+    if args.strict and bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""Level-2 order-book recorder: every book sampled on an interval, stored as keyframes + deltas.
+
+wall_diag.py looks at the open limit orders once. To see walls, depth and imbalance evolve over a soak
+this samples every (stock, currency) book each --interval seconds, either from the Orders table
+(--source db, the same GROUP BY wall_diag runs, per currency) or from the server's
+GET /api/order-book/{stockId}/{currency} (--source api, the engine's in-memory depth), and appends it
+under data/books/<name>/:
+
+  frames.bin   one frame per sample: a 17-byte header (kind, epoch ts, record count, payload length)
+               then the zlib'd records. Every record is one (stock, ccy, side, price tick) level with
+               its resting qty and order count. A keyframe (every --keyframe samples, and the first of
+               each run) holds the whole state; a delta holds only the levels that changed since the
+               previous sample, qty 0 meaning the level is gone. An idle book costs nothing.
+  index.bin    fixed 21-byte entries (ts, offset, length, kind) -> a reader bisects it for a
+               timestamp, seeks to the keyframe at or before it and applies at most --keyframe deltas.
+  meta.json    source, price tick and the keyframe interval.
+
+A killed recorder leaves at most a torn frame past the last index entry; the next run truncates it.
+
+  show     the books at --at (ISO or epoch; default the last sample), top --levels per side
+  metrics  wall_diag's top_level_share / hhi / round_share (averaged over the sides with at least
+           --min-levels levels) per sample, in one forward pass: per-side sums and sums of squares
+           are kept incrementally, so a sample costs the levels it changed, not the book size.
+           --step thins the output to one row per step seconds. Also written as metrics.csv.
+
+Usage: py scripts/book_recorder.py record [--db kse_soak] [--name kse_soak] [--source db|api]
+       [--interval 5] [--keyframe 60] [--duration 0]
+       py scripts/book_recorder.py show --name kse_soak [--at 2026-10-18T12:00:00] [--book 7:USD]
+       py scripts/book_recorder.py metrics --name kse_soak [--min-levels 50] [--step 300]
+"""
+import argparse, asyncio, bisect, csv, json, os, struct, sys, time, zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+from wall_diag import snap_unit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.path.join(ROOT, "data", "books")
+CCY = ("USD", "EUR", "GBP", "JPY", "CHF", "AUD")  # CurrencyType order
+SIDES = ("Buy", "Sell")
+KEY, DELTA = 0, 1
+HEADER = struct.Struct("<BdII")   # kind, ts, records, payload bytes
+ENTRY = struct.Struct("<dQIB")    # ts, offset, frame bytes, kind
+RECORD = struct.Struct("<iBBqqI")  # stock, ccy, side, price tick, qty, orders
+
+BOOK_SQL = '''
+SELECT "StockId", "Currency", "Side", "Price", sum("Quantity" - "AmountFilled"), count(*)
+FROM "Orders" WHERE "Status" = 'Open' AND "Entry" = 'Limit'
+GROUP BY "StockId", "Currency", "Side", "Price";'''
+LISTINGS_SQL = 'SELECT "StockId", "Currency" FROM "StockListings" ORDER BY "StockId", "Currency";'
+
+
+def encode(records):
+    return zlib.compress(b"".join(RECORD.pack(*r) for r in records), 6)
+
+
+def decode(payload):
+    return RECORD.iter_unpack(zlib.decompress(payload)) if payload else iter(())
+
+
+def diff(prev, cur):
+    """Level records turning `prev` into `cur`; both {(sid, ccy, side, tick): (qty, orders)}."""
+    out = [(*k, *v) for k, v in cur.items() if prev.get(k) != v]
+    out += [(*k, 0, 0) for k in prev.keys() - cur.keys()]
+    return out
+
+
+class Recording:
+    def __init__(self, name, root=OUT_DIR):
+        self.dir = os.path.join(root, name)
+        self.frames = os.path.join(self.dir, "frames.bin")
+        self.index_path = os.path.join(self.dir, "index.bin")
+        meta_path = os.path.join(self.dir, "meta.json")
+        self.meta = json.load(open(meta_path, encoding="utf-8")) if os.path.exists(meta_path) else {}
+        self.ts, self.offset, self.length, self.kind = [], [], [], []
+        if os.path.exists(self.index_path):
+            raw = open(self.index_path, "rb").read()
+            for ts, off, ln, kind in ENTRY.iter_unpack(raw[:len(raw) - len(raw) % ENTRY.size]):
+                self.ts.append(ts), self.offset.append(off), self.length.append(ln), self.kind.append(kind)
+
+    @property
+    def tick(self):
+        return self.meta.get("tick", 1e-4)
+
+    def open_for_append(self, meta):
+        """Start (or resume) writing; drops a torn tail left by a killed recorder."""
+        os.makedirs(self.dir, exist_ok=True)
+        if self.meta and self.meta.get("tick") != meta["tick"]:
+            sys.exit(f"{self.dir} was recorded with tick {self.meta['tick']}, not {meta['tick']}")
+        self.meta = {**self.meta, **meta}
+        with open(os.path.join(self.dir, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump(self.meta, fh, indent=1)
+        end = self.offset[-1] + self.length[-1] if self.ts else 0
+        for path, size in ((self.frames, end), (self.index_path, len(self.ts) * ENTRY.size)):
+            with open(path, "ab") as fh:
+                fh.truncate(size)
+        self._fh = open(self.frames, "ab")
+        self._ix = open(self.index_path, "ab")
+
+    def append(self, ts, kind, records):
+        payload = encode(records)
+        frame = HEADER.pack(kind, ts, len(records), len(payload)) + payload
+        off = self.offset[-1] + self.length[-1] if self.ts else 0
+        self._fh.write(frame)
+        self._fh.flush()
+        self._ix.write(ENTRY.pack(ts, off, len(frame), kind))  # index last: it's the commit point
+        self._ix.flush()
+        self.ts.append(ts), self.offset.append(off), self.length.append(len(frame)), self.kind.append(kind)
+        return len(frame)
+
+    def close(self):
+        self._fh.close()
+        self._ix.close()
+
+    def records(self, lo, hi):
+        """Yield (ts, kind, records) for frames lo..hi-1, read as one sequential span."""
+        if lo >= hi:
+            return
+        with open(self.frames, "rb") as fh:
+            fh.seek(self.offset[lo])
+            for i in range(lo, hi):
+                kind, ts, _, ln = HEADER.unpack(fh.read(HEADER.size))
+                yield ts, kind, decode(fh.read(ln))
+
+    def state_at(self, t):
+        """(frame ts, {(sid, ccy, side, tick): (qty, orders)}) as of the last sample at or before t."""
+        i = bisect.bisect_right(self.ts, t) - 1
+        if i < 0:
+            return None, {}
+        k = i
+        while self.kind[k] != KEY:
+            k -= 1
+        state = {}
+        for _, kind, recs in self.records(k, i + 1):
+            if kind == KEY:
+                state.clear()
+            for sid, ccy, side, tick, qty, n in recs:
+                if qty:
+                    state[(sid, ccy, side, tick)] = (qty, n)
+                else:
+                    state.pop((sid, ccy, side, tick), None)
+        return self.ts[i], state
+
+
+# --- sources ---------------------------------------------------------------------------------------
+
+def sample_db(db, tick):
+    state = {}
+    for sid, ccy, side, price, qty, n in kse_db.rows(db, BOOK_SQL):
+        q = int(float(qty or 0))
+        if q > 0 and ccy in CCY and side in SIDES:
+            state[(int(sid), CCY.index(ccy), SIDES.index(side), round(float(price) / tick))] = (q, int(n))
+    return state
+
+
+class ApiSource:
+    """Logged-in aiohttp session fetching every listed book concurrently each sample."""
+
+    def __init__(self, args, listings):
+        try:
+            import aiohttp
+        except ImportError:
+            sys.exit("book_recorder.py --source api needs aiohttp:  pip install aiohttp")
+        self.aiohttp, self.args, self.listings = aiohttp, args, listings
+        self.loop = asyncio.new_event_loop()
+        self.session = self.headers = None
+
+    async def _login(self):
+        a = self.args
+        self.session = self.aiohttp.ClientSession(timeout=self.aiohttp.ClientTimeout(total=a.timeout))
+        async with self.session.post(f"{a.base}/api/auth/login",
+                                     json={"Username": a.user, "Password": a.password}) as r:
+            if r.status != 200:
+                sys.exit(f"login failed: HTTP {r.status}")
+            self.headers = {"Authorization": f"Bearer {(await r.json())['token']}"}
+
+    async def _book(self, sem, sid, ccy):
+        async with sem:
+            async with self.session.get(f"{self.args.base}/api/order-book/{sid}/{ccy}", headers=self.headers) as r:
+                r.raise_for_status()
+                return sid, ccy, await r.json()
+
+    async def _sample(self, tick):
+        if self.session is None:
+            await self._login()
+        sem = asyncio.Semaphore(self.args.concurrency)
+        res = await asyncio.gather(*(self._book(sem, s, c) for s, c in self.listings), return_exceptions=True)
+        for r in res:  # let every request finish before raising, so none outlives the sample
+            if isinstance(r, BaseException):
+                raise r
+        state = {}
+        for sid, ccy, snap in res:
+            for side, levels in ((0, snap.get("bids") or []), (1, snap.get("asks") or [])):
+                for lv in levels:
+                    q = int(lv["quantity"])
+                    if q > 0:
+                        state[(sid, CCY.index(ccy), side, round(float(lv["price"]) / tick))] = (q, int(lv["orderCount"]))
+        return state
+
+    def sample(self, tick):
+        return self.loop.run_until_complete(self._sample(tick))
+
+    def close(self):
+        if self.session is not None:
+            self.loop.run_until_complete(self.session.close())
+        self.loop.close()
+
+
+# --- commands --------------------------------------------------------------------------------------
+
+def record(args):
+    rec = Recording(args.name or args.db)
+    rec.open_for_append({"db": args.db, "source": args.source, "tick": args.tick, "keyframe": args.keyframe})
+    if args.source == "api":
+        listings = [(int(s), c) for s, c in kse_db.rows(args.db, LISTINGS_SQL) if c in CCY]
+        src = ApiSource(args, listings)
+        sample = lambda: src.sample(args.tick)
+    else:
+        src = None
+        sample = lambda: sample_db(args.db, args.tick)
+    print(f"recording {args.source} books of {args.db} every {args.interval:g}s -> {rec.dir} "
+          f"({len(rec.ts)} frames already there; Ctrl-C to stop)", flush=True)
+    prev, since_key, t_end = None, 0, time.time() + args.duration if args.duration else None
+    written = 0
+    try:
+        while t_end is None or time.time() < t_end:
+            t0 = time.time()
+            try:
+                cur = sample()
+            except kse_db.QueryError as ex:
+                print(f"sample failed, retrying next interval: {ex}", flush=True)
+            except Exception as ex:  # HTTP / connection errors from the api source
+                print(f"sample failed, retrying next interval: {type(ex).__name__}: {ex}", flush=True)
+            else:
+                if prev is None or since_key >= args.keyframe - 1:
+                    kind, recs, since_key = KEY, [(*k, *v) for k, v in cur.items()], 0
+                else:
+                    kind, recs, since_key = DELTA, diff(prev, cur), since_key + 1
+                written += rec.append(t0, kind, recs)
+                prev = cur
+                if len(rec.ts) % args.report == 0:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {len(rec.ts)} frames, {len(cur):,} levels, "
+                          f"{written / 2 ** 20:.1f} MB this run", flush=True)
+            time.sleep(max(0.0, args.interval - (time.time() - t0)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rec.close()
+        if src is not None:
+            src.close()
+    print(f"{len(rec.ts)} frames in {rec.dir} ({written / 2 ** 20:.1f} MB written this run)")
+
+
+def parse_at(s):
+    if not s:
+        return float("inf")
+    try:
+        return float(s)
+    except ValueError:
+        dt = datetime.fromisoformat(s)
+        return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def show(args):
+    rec = Recording(args.name)
+    if not rec.ts:
+        sys.exit(f"no frames in {rec.dir}")
+    ts, state = rec.state_at(parse_at(args.at))
+    if ts is None:
+        sys.exit(f"nothing recorded before {args.at} (first frame {datetime.fromtimestamp(rec.ts[0], timezone.utc):%Y-%m-%d %H:%M:%S}Z)")
+    want = None
+    if args.book:
+        sid, _, ccy = args.book.partition(":")
+        want = (int(sid), CCY.index(ccy or "USD"))
+    books = defaultdict(lambda: ([], []))
+    for (sid, ccy, side, tick), (qty, n) in state.items():
+        if want is None or (sid, ccy) == want:
+            books[(sid, ccy)][side].append((tick * rec.tick, qty, n))
+    print(f"{rec.dir} @ {datetime.fromtimestamp(ts, timezone.utc):%Y-%m-%d %H:%M:%S}Z: "
+          f"{len(books)} book(s), {sum(len(b) + len(a) for b, a in books.values()):,} levels")
+    for (sid, ccy), (bids, asks) in sorted(books.items()):
+        bids.sort(reverse=True)
+        asks.sort()
+        bq, aq = sum(q for _, q, _ in bids), sum(q for _, q, _ in asks)
+        spread = f"{asks[0][0] - bids[0][0]:.4f}" if bids and asks else "-"
+        imb = f"{(bq - aq) / (bq + aq):+.3f}" if bq + aq else "-"
+        print(f"\nstock {sid} {CCY[ccy]}: bid qty {bq:,}  ask qty {aq:,}  spread {spread}  imbalance {imb}")
+        for i in range(min(args.levels, max(len(bids), len(asks)))):
+            b = f"{bids[i][2]:>5} {bids[i][1]:>10,} {bids[i][0]:>12.4f}" if i < len(bids) else " " * 29
+            a = f"{asks[i][0]:<12.4f} {asks[i][1]:>10,} {asks[i][2]:>5}" if i < len(asks) else ""
+            print(f"  {b} | {a}")
+
+
+def metrics(args):
+    """One forward pass -> rows (ts, sides measured, top_level_share, hhi, round_share)."""
+    rec = Recording(args.name)
+    if not rec.ts:
+        sys.exit(f"no frames in {rec.dir}")
+    tick = rec.tick
+    levels = defaultdict(dict)  # (sid, ccy, side) -> {tick: qty}
+    agg = defaultdict(lambda: [0, 0, 0])  # (sid, ccy, side) -> [sum qty, sum qty^2, qty on the round grid]
+    is_round = {}
+
+    def on_grid(t):
+        r = is_round.get(t)
+        if r is None:
+            price = t * tick
+            u = snap_unit(price)
+            r = is_round[t] = abs(price / u - round(price / u)) < 1e-6
+        return r
+
+    def put(side_key, t, qty):
+        lv, a = levels[side_key], agg[side_key]
+        old = lv.get(t, 0)
+        g = on_grid(t)
+        a[0] += qty - old
+        a[1] += qty * qty - old * old
+        if g:
+            a[2] += qty - old
+        if qty:
+            lv[t] = qty
+        else:
+            lv.pop(t, None)
+
+    out, top = [], {}
+    next_emit = float("-inf")
+    for ts, kind, recs in rec.records(0, len(rec.ts)):
+        if kind == KEY:
+            levels.clear(), agg.clear(), top.clear()
+        dirty = set()
+        for sid, ccy, side, t, qty, _ in recs:
+            put((sid, ccy, side), t, qty)
+            dirty.add((sid, ccy, side))
+        for k in dirty:  # max only moves on the sides a sample touched
+            top[k] = max(levels[k].values(), default=0)
+        if ts < next_emit:
+            continue
+        next_emit = ts + args.step if args.step else ts
+        tops = hhis = rounds = 0.0
+        n = 0
+        for k, lv in levels.items():
+            total, sq, rq = agg[k]
+            if total <= 0 or len(lv) < args.min_levels:
+                continue
+            tops += top[k] / total
+            hhis += sq / total ** 2
+            rounds += rq / total
+            n += 1
+        out.append((ts, n, tops / n if n else None, hhis / n if n else None, rounds / n if n else None))
+    return rec, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cmd", choices=["record", "show", "metrics"])
+    ap.add_argument("--db", default="kse_soak")
+    ap.add_argument("--name", default="", help="recording dir under data/books (default: --db)")
+    ap.add_argument("--source", default="db", choices=["db", "api"])
+    ap.add_argument("--interval", type=float, default=5.0, help="record: seconds between samples")
+    ap.add_argument("--keyframe", type=int, default=60, help="record: a full snapshot every N samples")
+    ap.add_argument("--duration", type=float, default=0.0, help="record: stop after N seconds (0 = until Ctrl-C)")
+    ap.add_argument("--tick", type=float, default=1e-4, help="record: price resolution of a level")
+    ap.add_argument("--report", type=int, default=60, help="record: progress line every N frames")
+    ap.add_argument("--base", default="http://localhost:5000")
+    ap.add_argument("--user", default="admin")
+    ap.add_argument("--password", default="hallo123")
+    ap.add_argument("--concurrency", type=int, default=16, help="api: book requests in flight")
+    ap.add_argument("--timeout", type=float, default=30.0, help="api: per-request seconds")
+    ap.add_argument("--at", default="", help="show: ISO time or epoch (default: last sample)")
+    ap.add_argument("--book", default="", help="show: only this stock[:CCY]")
+    ap.add_argument("--levels", type=int, default=10, help="show: price levels per side; metrics: rows printed")
+    ap.add_argument("--min-levels", type=int, default=50, help="metrics: skip sides with fewer price levels")
+    ap.add_argument("--step", type=float, default=0.0, help="metrics: at most one row per N seconds")
+    args = ap.parse_args()
+    args.name = args.name or args.db
+
+    if args.cmd == "record":
+        try:
+            record(args)
+        except kse_db.QueryError as ex:
+            sys.exit(str(ex))
+    elif args.cmd == "show":
+        show(args)
+    else:
+        rec, rows = metrics(args)
+        path = os.path.join(rec.dir, "metrics.csv")
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            w.writerow(["ts", "utc", "sides", "top_level_share", "hhi", "round_share"])
+            for ts, n, t, h, r in rows:
+                w.writerow([f"{ts:.3f}", datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"), n,
+                            *("" if v is None else f"{v:.5f}" for v in (t, h, r))])
+        print(f"{'utc':<20} {'sides':>5} {'top_share':>9} {'hhi':>8} {'round':>7}")
+        for ts, n, t, h, r in rows[-args.levels:]:  # the tail; the full series is in the csv
+            f = lambda v, s: "-".rjust(len(format(0.0, s))) if v is None else format(v, s)
+            print(f"{datetime.fromtimestamp(ts, timezone.utc):%Y-%m-%d %H:%M:%S}  {n:>5} {f(t, '9.3f')} {f(h, '8.4f')} {f(r, '7.3f')}")
+        print(f"{len(rows)} rows ({len(rec.ts)} frames) -> {path}")
+
+
+if __name__ == "__main__":
+    main()
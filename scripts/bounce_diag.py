@@ -1,11 +1,15 @@
 # Bid-ask bounce diagnostic: compare lag-1 autocorr of 1-min returns built on the CLOSE (last trade,
 # which alternates bid/ask -> bounce) vs VWAP (minute volume-weighted avg, which averages the bounce out).
 # If close-AC1 is strongly negative but VWAP-AC1 ~ 0, the negative return autocorr is microstructure
-# (bid-ask bounce), not genuine mean-reversion. Reads Transactions straight from a soak DB.
-import argparse, subprocess, sys
+# (bid-ask bounce), not genuine mean-reversion. Reads Transactions straight from a soak DB; the window
+# ends at the tape's last trade (== now while the soak runs), and the result is memoized by
+# kse_db.cached_rows until the DB's watermark moves. vol_signature.py runs the same comparison (plus mid
+# and realized vol) over a whole ladder of bucket sizes from the cached tape.
+import argparse, os, sys
 from collections import defaultdict
 
-PG = "kieshstockexchange-postgres-1"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
 
 def autocorr1(xs):
     n = len(xs)
@@ -25,21 +29,22 @@ def main():
 
     sql = (
         'SELECT t."StockId", '
-        f'floor(extract(epoch from t."Timestamp")/{args.bucket_sec}) AS b, '
+        'floor(extract(epoch from t."Timestamp")/:bucket) AS b, '
         '(array_agg(t."Price" ORDER BY t."Timestamp" DESC))[1] AS close, '
         'sum(t."Price"*t."Quantity")/NULLIF(sum(t."Quantity"),0) AS vwap '
         'FROM "Transactions" t '
-        f'WHERE extract(epoch from t."Timestamp") >= extract(epoch from now()) - {args.window_min*60:.0f} '
+        'WHERE t."Timestamp" >= to_timestamp(:since) '
         'GROUP BY t."StockId", b ORDER BY t."StockId", b;'
     )
-    out = subprocess.run(["docker", "exec", "-i", PG, "psql", "-U", "kse", "-d", args.db, "--csv", "-c", sql],
-                         capture_output=True, text=True)
-    if out.returncode != 0:
-        sys.exit(f"psql failed: {out.stderr.strip()}")
+    try:
+        wm = kse_db.watermark(args.db)
+        out = kse_db.cached_rows(args.db, sql, {"bucket": args.bucket_sec,
+                                                "since": f"{wm.tape_end - args.window_min * 60:.0f}"}, wm)
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
 
     closes, vwaps = defaultdict(list), defaultdict(list)
-    for ln in out.stdout.splitlines()[1:]:
-        p = ln.split(",")
+    for p in out:
         if len(p) < 4 or not p[2] or not p[3]:
             continue
         closes[int(p[0])].append(float(p[2]))
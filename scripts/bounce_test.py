@@ -1,7 +1,8 @@
 # Council bounce-vs-behavior test: recompute 1-min ret_acf(lag-1) on the SAME trades sampled 3 ways
 # (last-trade close / bounce-free mid close / VWAP). If mid/VWAP >> last-trade, the -0.35 is bid-ask
 # bounce (a sampling artifact); if all three stay ~-0.35, it's behavioral. Input CSV: stock_id,minute,
-# last_close,mid_close,vwap (per-stock per-minute, from the Transactions table).
+# last_close,mid_close,vwap (per-stock per-minute, from the Transactions table). For every bucket size at
+# once, straight from the tape, see vol_signature.py.
 import csv, sys, math
 from collections import defaultdict
 
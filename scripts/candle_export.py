@@ -5,17 +5,21 @@
 # Each file is self-describing: a '#'-commented metadata header records what produced it (git commit/branch,
 # the soak note, the Bots__* experiment overrides auto-captured from the environment) and session stats
 # (trades / volume / notional / stocks / time-span / candle count), so soaks are trivially comparable later.
-# Files are written to data/soaks/ by default.
+# Files are written to data/soaks/ by default. The same metadata + stats are recorded as a "candle_export" run
+# in the indexed results store (scripts/results_store.py, data/soaks/results.sqlite; --store to redirect).
 #
 # CSV body columns: stock_id,bucket_epoch,open,high,low,close,volume   (RAW per-bucket OHLC — open is the
 # first trade in the minute; the open=prev-close continuity is applied at DISPLAY time, so the CSV stays
 # ground-truth market data.)
 #
-# Usage: python scripts/candle_export.py --db kse_soak [--note "..."] [--label "..."] [--out path]
-import argparse, os, subprocess, sys
+# Usage: python scripts/candle_export.py --db kse_soak [--note "..."] [--label "..."] [--out path] [--store path]
+import argparse, subprocess, sys
 from datetime import datetime, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import results_store
+
 PG = "kieshstockexchange-postgres-1"
 ROOT = Path(__file__).resolve().parent.parent
 
@@ -32,17 +36,13 @@ def git(*args):
     except Exception:
         return "?"
 
-def experiment_env():
-    # The soak script sets $env:Bots__* before launching; those are inherited here. Capture them as the
-    # "what changed / what we tested" record. (Windows env names are case-insensitive; match loosely.)
-    return {k: v for k, v in sorted(os.environ.items()) if k.lower().startswith("bots__")}
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--db", default="kse_soak")
     ap.add_argument("--note", default="")
     ap.add_argument("--label", default="")
     ap.add_argument("--out", default="")
+    ap.add_argument("--store", default=results_store.STORE, help="results store to record the run in")
     ap.add_argument("--window-min", type=float, default=0.0, help="0 = all data in the DB")
     ap.add_argument("--close", choices=["last", "vwap"], default="last",
                     help="close source: last trade in bucket (default) or per-bucket VWAP")
@@ -88,7 +88,7 @@ def main():
         outp = ROOT / outp
     outp.parent.mkdir(parents=True, exist_ok=True)
 
-    env = experiment_env()
+    env = results_store.experiment_env()
     with open(outp, "w", encoding="utf-8", newline="") as f:
         f.write("# === KSE soak candle export ===\n")
         f.write(f"# exported_utc: {datetime.now(timezone.utc).isoformat()}\n")
@@ -114,6 +114,11 @@ def main():
         for ln in body:
             p = ln.split(",")
             f.write(f"{int(p[0])},{int(float(p[1]))},{p[2]},{p[3]},{p[4]},{p[5]},{int(float(p[6]))}\n")
+    results_store.record("candle_export", args.db,
+                         {"trades": trades, "volume": volume, "notional": notional, "stocks": stocks,
+                          "candles_1m": len(body), "span_min": span_min, "close_mode": args.close, "first_trade_utc": first_ts,
+                          "last_trade_utc": last_ts}, env, label=args.label, note=args.note, path=outp,
+                         commit=git("rev-parse", "--short", "HEAD"), store=args.store)
     print(f"wrote {outp}  ({len(body)} 1-min candles, {trades} trades, {stocks} stocks)")
 
 if __name__ == "__main__":
@@ -1,20 +1,23 @@
 # Render real candlestick charts from a soak DB so the market can be eyeballed (the ultimate
 # "is it realistic" test). Rebuilds 1m OHLC from Postgres Transactions (same source the server
 # builds candles from), one panel per stock, chosen across the Calm/Normal/Volatile/Meme classes.
+# The window ends at the tape's last trade, and the OHLC query is memoized per DB watermark
+# (kse_db.cached_rows), so re-plotting a stopped soak doesn't touch Postgres beyond the probe.
 #
 # Usage:
 #   python scripts/candle_plot.py [--db kse_soak] [--bucket-sec 60] [--window-min 20]
 #          [--stocks 1,12,33] [--out logs/candles.png] [--title "A1+A2"]
 
-import argparse, subprocess, sys
+import argparse, os, sys
 from collections import defaultdict
-from datetime import datetime, timezone
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 from pathlib import Path
 
-PG = "kieshstockexchange-postgres-1"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+
 ROOT = Path(__file__).resolve().parent.parent
 
 def avalanche(sid: int) -> int:
@@ -29,11 +32,11 @@ def stock_class(sid: int) -> str:
     b = avalanche(sid) % 100
     return "Calm" if b < 35 else "Normal" if b < 75 else "Volatile" if b < 93 else "Meme"
 
-def load(db, since, bucket):
-    # stockId -> list[(t_epoch, o,h,l,c, vol)] in bucket order
+def load(db, window_min, bucket):
+    # stockId -> list[(t_epoch, o,h,l,c, vol)] in bucket order, last window_min minutes of the tape
     sql = (
         'SELECT t."StockId", '
-        f'floor(extract(epoch from t."Timestamp")/{bucket})*{bucket} AS b, '
+        'floor(extract(epoch from t."Timestamp")/:bucket)*:bucket AS b, '
         '(array_agg(t."Price" ORDER BY t."Timestamp" ASC))[1]  AS o, '
         'max(t."Price") AS h, min(t."Price") AS l, '
         '(array_agg(t."Price" ORDER BY t."Timestamp" DESC))[1] AS c, '
@@ -41,16 +44,16 @@ def load(db, since, bucket):
         'FROM "Transactions" t '
         'JOIN "StockListings" sl ON sl."StockId"=t."StockId" '
         '  AND sl."Currency"=t."Currency" AND sl."IsPrimary"=true '
-        f'WHERE extract(epoch from t."Timestamp") >= {since:.0f} '
+        'WHERE t."Timestamp" >= to_timestamp(:since) '
         'GROUP BY t."StockId", b ORDER BY t."StockId", b;'
     )
-    out = subprocess.run(["docker", "exec", "-i", PG, "psql", "-U", "kse", "-d", db, "--csv", "-c", sql],
-                         capture_output=True, text=True)
-    if out.returncode != 0:
-        sys.exit(f"psql failed: {out.stderr.strip()}")
+    try:
+        wm = kse_db.watermark(db)
+        out = kse_db.cached_rows(db, sql, {"bucket": bucket, "since": f"{wm.tape_end - window_min * 60:.0f}"}, wm)
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
     s = defaultdict(list)
-    for ln in out.stdout.splitlines()[1:]:
-        p = ln.split(",")
+    for p in out:
         if len(p) < 7:
             continue
         s[int(p[0])].append((float(p[1]), float(p[2]), float(p[3]), float(p[4]), float(p[5]), float(p[6])))
@@ -148,8 +151,7 @@ def main():
         # Pipeline step 5: CSV (1-min) -> aggregate to target timeframe -> image.
         series = window_tail(aggregate(load_csv(args.csv), args.bucket_sec), args.window_min)
     else:
-        since = datetime.now(timezone.utc).timestamp() - args.window_min * 60
-        series = load(args.db, since, args.bucket_sec)
+        series = load(args.db, args.window_min, args.bucket_sec)
     series = {sid: bars for sid, bars in series.items() if bars}
     if not series:
         sys.exit("no candles in window")
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Read-path benchmark for GET /api/candles/by-stock-range — hot ring vs DB fallback.
+
+CandleService.GetHistoricalCandlesAsync serves a range from the per-key CandleRingBuffer (last 500
+buckets per (stock, currency, resolution)) when the ring covers `from`, and otherwise falls through
+to the Candles table — or, for a range that was never persisted, to a transaction replay that then
+persists the rebuilt candles. This drives concurrent range reads across resolutions, window sizes and
+books, deliberately mixing:
+    hot         window ends now and starts inside the ring's reach   (RAM)
+    cold_first  window entirely older than the ring, first touch     (DB, maybe replay + persist)
+    cold_repeat the same cold window requested again                 (DB), in a second wave issued
+                once every first touch has completed
+and reports throughput + p50/p95/p99/p99.9 per path and resolution. The path label is the INTENDED
+one, decided from the window's position vs the ring capacity; a ring that isn't warm yet for a
+non-default resolution shows up as a hot path with cold-like latency, so pass --join to make sure.
+
+Results are written as a per-commit JSON baseline (data/bench/candle-read/<commit>[-dirty].json) with
+the HDR histograms; --compare <baseline.json> prints p50/p99 deltas against an earlier one.
+
+Requires aiohttp (pip install aiohttp).
+
+Usage: py scripts/candle_read_bench.py [--books 1-20:USD,1-5:EUR] [--res 1m,5m,15m,1h]
+       [--windows 60,240,480] [--hot-share 0.5] [--concurrency 32] [--requests 4000] [--compare FILE]
+"""
+import argparse, asyncio, json, random, subprocess, sys, time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from hdr_hist import Histogram
+
+try:
+    import aiohttp
+except ImportError:
+    sys.exit("candle_read_bench.py needs aiohttp:  pip install aiohttp")
+
+ROOT = Path(__file__).resolve().parent.parent
+OUT_DIR = ROOT / "data" / "bench" / "candle-read"
+RING_CAPACITY = 500  # CandleService.RingCapacity
+RES = {"1s": 1, "5s": 5, "15s": 15, "1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "1d": 86400}
+CCY = {"USD": 0, "EUR": 1, "GBP": 2, "JPY": 3, "CHF": 4}
+
+
+def parse_books(s):
+    out = []
+    for part in s.split(","):
+        ids, _, ccy = part.partition(":")
+        lo, _, hi = ids.partition("-")
+        out.extend((sid, ccy or "USD") for sid in range(int(lo), int(hi or lo) + 1))
+    return out
+
+
+def timespan(sec):
+    return str(timedelta(seconds=sec)) if sec < 86400 else f"{sec // 86400}.{timedelta(seconds=sec % 86400)}"
+
+
+def iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def git(*a):
+    try:
+        return subprocess.run(["git", "-C", str(ROOT), *a], capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def plan(args, books, rng):
+    """The request list: (path, res label, window buckets, stock, ccy, from, to)."""
+    now = datetime.now(timezone.utc)
+    history = timedelta(hours=args.history_hours)
+    reqs, cold_pool = [], []
+    for _ in range(args.requests):
+        sid, ccy = rng.choice(books)
+        rl = rng.choice(args.res_list)
+        sec = RES[rl]
+        w = rng.choice(args.window_list)
+        span = timedelta(seconds=sec * w)
+        if rng.random() < args.hot_share:
+            if w > RING_CAPACITY - 2:
+                continue  # can't be served from the ring at all
+            reqs.append(("hot", rl, w, sid, ccy, now - span, now))
+            continue
+        ring_reach = timedelta(seconds=sec * RING_CAPACITY)
+        oldest_end = now - history + span
+        newest_end = now - ring_reach - timedelta(seconds=sec)
+        if newest_end <= oldest_end:
+            continue  # this resolution's ring reaches back past --history-hours
+        if cold_pool and rng.random() < args.repeat_share:
+            reqs.append(("cold_repeat",) + rng.choice(cold_pool)[1:])
+            continue
+        end = oldest_end + (newest_end - oldest_end) * rng.random()
+        r = ("cold_first", rl, w, sid, ccy, end - span, end)
+        cold_pool.append(r)
+        reqs.append(r)
+    return reqs
+
+
+async def join_candles(session, args, token, books):
+    """Open one hub connection and JoinCandles every (book, resolution) so each ring exists and warms."""
+    url = args.base.replace("http", "ws", 1) + f"/hubs/market?access_token={token}"
+    ws = await session.ws_connect(url)
+    await ws.send_str(json.dumps({"protocol": "json", "version": 1}) + "\x1e")
+    await ws.receive(timeout=10)
+    n = 0
+    for sid, ccy in books:
+        for rl in args.res_list:
+            n += 1
+            await ws.send_str(json.dumps({"type": 1, "invocationId": str(n), "target": "JoinCandles",
+                                          "arguments": [sid, CCY[ccy], RES[rl]]}) + "\x1e")
+    return ws
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    books = parse_books(args.books)
+    reqs = plan(args, books, rng)
+    hist = defaultdict(Histogram)
+    counts = defaultdict(lambda: {"ok": 0, "error": 0, "candles": 0})
+    conn = aiohttp.TCPConnector(limit=args.concurrency, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=conn, timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+        async with session.post(f"{args.base}/api/auth/login",
+                                json={"Username": args.user, "Password": args.password}) as r:
+            if r.status != 200:
+                sys.exit(f"login failed: HTTP {r.status}")
+            token = (await r.json())["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        hub = None
+        if args.join:
+            hub = await join_candles(session, args, token, books)
+            print(f"joined candles for {len(books)} books x {len(args.res_list)} resolutions; "
+                  f"waiting {args.join_wait:.0f}s for the rings to prime")
+            await asyncio.sleep(args.join_wait)
+
+        queue = asyncio.Queue()
+
+        async def worker():
+            while True:
+                try:
+                    path, rl, w, sid, ccy, frm, to = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                url = (f"{args.base}/api/candles/by-stock-range/{sid}/{ccy}"
+                       f"?resolution={timespan(RES[rl])}&from={iso(frm)}&to={iso(to)}&fillGaps={str(args.fill_gaps).lower()}")
+                key = (path, rl)
+                t = time.perf_counter()
+                try:
+                    async with session.get(url, headers=headers) as resp:
+                        body = await resp.read()
+                        ok = resp.status == 200
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    ok, body = False, b""
+                hist[key].record((time.perf_counter() - t) * 1e6)
+                if ok:
+                    counts[key]["ok"] += 1
+                    counts[key]["candles"] += body.count(b'"openTime"')
+                else:
+                    counts[key]["error"] += 1
+
+        # Two waves: with --concurrency workers a repeat queued behind its first touch could still run
+        # alongside it, so every first touch (and hot read) completes before any cold_repeat is issued.
+        t0 = time.perf_counter()
+        for wave in ([r for r in reqs if r[0] != "cold_repeat"], [r for r in reqs if r[0] == "cold_repeat"]):
+            for r in wave:
+                queue.put_nowait(r)
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - t0
+        if hub is not None:
+            await hub.close()
+    return hist, counts, wall, len(reqs)
+
+
+def summarise(hist, counts, wall):
+    rows = {}
+    by_path = defaultdict(Histogram)
+    for (path, rl), h in hist.items():
+        by_path[path].merge(h)
+        c = counts[(path, rl)]
+        n = c["ok"] + c["error"]
+        rows[f"{path}|{rl}"] = dict(h.summary(1000.0), rps=n / wall, error_pct=100.0 * c["error"] / max(1, n),
+                                    avg_candles=c["candles"] / max(1, c["ok"]))
+    for path, h in by_path.items():
+        n = h.total
+        rows[f"{path}|ALL"] = dict(h.summary(1000.0), rps=n / wall)
+    return rows
+
+
+def print_rows(rows, base=None):
+    print(f"{'path|res':<18}{'n':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'p99.9':>9}{'max':>9}{'cndl':>7}"
+          + ("   d_p50    d_p99" if base else "") + "   (ms)")
+    order = {"hot": 0, "cold_first": 1, "cold_repeat": 2}
+    for k in sorted(rows, key=lambda k: (order.get(k.split("|")[0], 9), k.endswith("ALL"), k)):
+        s = rows[k]
+        line = (f"{k:<18}{s['n']:>7}{s['rps']:>9.1f}{s['p50']:>9.2f}{s['p95']:>9.2f}{s['p99']:>9.2f}"
+                f"{s['p999']:>9.2f}{s['max']:>9.1f}{s.get('avg_candles', 0):>7.0f}")
+        if base and k in base:
+            b = base[k]
+            line += f"  {100 * (s['p50'] / b['p50'] - 1):+6.1f}%  {100 * (s['p99'] / b['p99'] - 1):+6.1f}%"
+        print(line)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:5000")
+    ap.add_argument("--user", default="admin")
+    ap.add_argument("--password", default="hallo123")
+    ap.add_argument("--books", default="1-20:USD")
+    ap.add_argument("--res", default="1m,5m,15m,1h", help=f"resolutions from {','.join(RES)}")
+    ap.add_argument("--windows", default="60,240,480", help="window sizes in buckets")
+    ap.add_argument("--history-hours", type=float, default=48.0, help="how far back cold windows may start")
+    ap.add_argument("--hot-share", type=float, default=0.5)
+    ap.add_argument("--repeat-share", type=float, default=0.3, help="share of cold reads that re-hit a prior window")
+    ap.add_argument("--requests", type=int, default=4000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--raw", dest="fill_gaps", action="store_false", help="fillGaps=false (default true)")
+    ap.add_argument("--join", action="store_true", help="JoinCandles every key first so all rings exist")
+    ap.add_argument("--join-wait", type=float, default=10.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="")
+    ap.add_argument("--compare", default="", help="earlier baseline JSON to diff against")
+    args = ap.parse_args()
+    args.base = args.base.rstrip("/")
+    args.res_list = args.res.split(",")
+    args.window_list = [int(x) for x in args.windows.split(",")]
+    bad = [r for r in args.res_list if r not in RES]
+    if bad:
+        sys.exit(f"unknown resolution(s): {bad}")
+
+    hist, counts, wall, n = asyncio.run(run(args))
+    rows = summarise(hist, counts, wall)
+    commit = git("rev-parse", "--short", "HEAD") or "nogit"
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    print(f"{n} requests in {wall:.1f}s ({n / wall:.0f} req/s) at concurrency {args.concurrency}; commit {commit}"
+          + (" (dirty)" if dirty else ""))
+    base = None
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text(encoding="utf-8"))["rows"]
+        print(f"deltas vs {args.compare}")
+    print_rows(rows, base)
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    out = Path(args.out) if args.out else OUT_DIR / f"{commit}{'-dirty' if dirty else ''}.json"
+    doc = {"commit": commit, "dirty": dirty, "ts": datetime.now(timezone.utc).isoformat(),
+           "params": {k: getattr(args, k) for k in ("base", "books", "res", "windows", "history_hours", "hot_share",
+                                                    "repeat_share", "requests", "concurrency", "fill_gaps", "join", "seed")},
+           "wall_s": wall, "rows": rows,
+           "hist_us": {f"{p}|{r}": h.to_dict() for (p, r), h in hist.items()}}
+    out.write_text(json.dumps(doc, indent=1), encoding="utf-8")
+    print(f"baseline -> {out}")
+
+
+if __name__ == "__main__":
+    main()
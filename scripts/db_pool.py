@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Pre-warmed clone pool of the soak template DB: a soak start becomes a rename instead of a copy.
+
+kse-balance-run.ps1, kse-balance-soak-p.ps1 (and through it r4_experiment.ps1) and soak_queue.py each
+terminated backends, dropped the soak DB and ran CREATE DATABASE <db> TEMPLATE <tmpl> at soak start, a
+multi-GB copy on the critical path. Here the copy happens ahead of time:
+
+  * fill     - keeps --keep spare clones of the template, named <tmpl>__spare<id> and marked with a
+               database comment holding the template's oid; spares of an older template (recreated
+               since, new oid) are dropped and replaced.
+  * claim    - hands a spare out as <db>: the previous <db> is renamed to <db>__done<ts> and a spare is
+               renamed to <db>. ALTER DATABASE ... RENAME is atomic and refuses a DB anyone is connected
+               to, so two claimers can't get the same spare. No spare ready -> the old synchronous clone.
+  * recycle  - each <db>__done<ts> DB is folded into the tape cache (tape_cache.Tape, the live cache of
+               <db> is carried over when it belongs to that DB) and dropped, so finished soaks stay
+               analysable without holding a DB.
+  * watch    - recycle + fill every --interval seconds; run one watcher per template.
+
+soak_queue.py claims through here; the .ps1 soak scripts call `claim` and, once the soak is over,
+`recycle` (so finished DBs don't pile up when no watcher runs).
+
+Usage: py scripts/db_pool.py watch [--tmpl kse_soak_seed] [--keep 2] [--interval 30] [--strategy file_copy]
+       py scripts/db_pool.py claim --as kse_soak [--tmpl kse_soak_seed]
+       py scripts/db_pool.py fill | recycle [--no-tape] | status
+"""
+import argparse, json, os, re, shutil, sys, time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import tape_cache
+
+ADMIN_DB = "postgres"
+TMPL = "kse_soak_seed"
+MARK = "kse-pool spare of {tmpl} oid={oid}"
+SPARE_RE = r"^{tmpl}__spare[0-9]+$"
+DONE_RE = re.compile(r"^(.+)__done[0-9]+$")
+IDENT = re.compile(r"^[a-z_][a-z0-9_]{0,62}$")
+
+DBS_SQL = '''
+SELECT datname, oid, COALESCE(shobj_description(oid, 'pg_database'), ''), pg_database_size(oid)
+FROM pg_database WHERE NOT datistemplate OR datname = :'tmpl' ORDER BY datname;'''
+TERMINATE_SQL = ("SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity "
+                 "WHERE datname = :'db' AND pid <> pg_backend_pid();")
+
+
+def ident(name):
+    if not IDENT.match(name):
+        sys.exit(f"{name!r} is not a plain lower-case identifier")
+    return name
+
+
+def databases(tmpl):
+    """{name: (oid, comment, bytes)}"""
+    return {n: (int(o), c, int(b)) for n, o, c, b in kse_db.rows(ADMIN_DB, DBS_SQL, {"tmpl": tmpl})}
+
+
+def spares(dbs, tmpl):
+    """(ready spares oldest first, stale spares) of this template."""
+    if tmpl not in dbs:
+        raise kse_db.QueryError(ADMIN_DB, f"template {tmpl} does not exist")
+    mark = MARK.format(tmpl=tmpl, oid=dbs[tmpl][0])
+    pat = re.compile(SPARE_RE.format(tmpl=re.escape(tmpl)))
+    mine = sorted(n for n in dbs if pat.match(n))
+    return [n for n in mine if dbs[n][1] == mark], [n for n in mine if dbs[n][1] != mark]
+
+
+def clone(tmpl, name, strategy="", attempts=5):
+    """CREATE DATABASE name TEMPLATE tmpl, retried while something else holds the template open."""
+    strat = f" STRATEGY {strategy}" if strategy else ""
+    for i in range(attempts):
+        kse_db._run(ADMIN_DB, TERMINATE_SQL, {"db": tmpl})
+        try:
+            kse_db._run(ADMIN_DB, f"CREATE DATABASE {name} TEMPLATE {tmpl}{strat};")
+            return
+        except kse_db.QueryError as ex:
+            if "being accessed by other users" not in str(ex) or i == attempts - 1:
+                raise
+            time.sleep(2 + 2 * i)
+
+
+def drop(name):
+    kse_db._run(ADMIN_DB, TERMINATE_SQL, {"db": name})
+    kse_db._run(ADMIN_DB, f"DROP DATABASE IF EXISTS {name};")
+
+
+def stamp():
+    now = datetime.now(timezone.utc)
+    return now.strftime("%Y%m%d%H%M%S") + f"{now.microsecond // 1000:03d}"
+
+
+def claim(tmpl, target, strategy=""):
+    """Make `target` a fresh copy of `tmpl` -> "spare <name>" or "clone" (no spare was ready)."""
+    ident(tmpl), ident(target)
+    dbs = databases(tmpl)
+    ready, _ = spares(dbs, tmpl)
+    if target in dbs:
+        kse_db._run(ADMIN_DB, TERMINATE_SQL, {"db": target})
+        done = f"{target[:63 - 23]}__done{stamp()}"
+        kse_db._run(ADMIN_DB, f"ALTER DATABASE {target} RENAME TO {done};")
+    for s in ready:
+        try:
+            kse_db._run(ADMIN_DB, f"ALTER DATABASE {s} RENAME TO {target};\n"
+                                  f"COMMENT ON DATABASE {target} IS 'kse-pool claimed from {tmpl}';")
+            return f"spare {s}"
+        except kse_db.QueryError:
+            continue  # another claimer got it first, or it's in use
+    clone(tmpl, target, strategy)
+    return "clone"
+
+
+def fill(tmpl, keep, strategy="", say=print):
+    """Drop stale spares and clone until `keep` ready ones exist -> number created."""
+    ident(tmpl)
+    dbs = databases(tmpl)
+    ready, stale = spares(dbs, tmpl)
+    for s in stale:
+        say(f"dropping stale spare {s}")
+        drop(s)
+    made = 0
+    while len(ready) + made < keep:
+        name = f"{tmpl[:63 - 22]}__spare{time.time_ns() // 1000 % 10 ** 15}"
+        t0 = time.perf_counter()
+        clone(tmpl, name, strategy)
+        kse_db._run(ADMIN_DB, f"COMMENT ON DATABASE {name} IS '{MARK.format(tmpl=tmpl, oid=dbs[tmpl][0])}';")
+        made += 1
+        say(f"spare {name} ready in {time.perf_counter() - t0:.1f}s ({len(ready) + made}/{keep})")
+    return made
+
+
+def recycle(tmpl, tape=True, say=print):
+    """Cache the tape of every finished (<db>__done<ts>) DB, then drop it -> number dropped."""
+    dbs = databases(tmpl)
+    n = 0
+    for name in sorted(dbs):
+        m = DONE_RE.match(name)
+        if not m:
+            continue
+        if tape:
+            live, dst = tape_cache.CACHE_DIR / m.group(1), tape_cache.CACHE_DIR / name
+            meta = json.loads((live / "meta.json").read_text(encoding="utf-8")) if (live / "meta.json").exists() else {}
+            if meta.get("oid") == dbs[name][0] and not dst.exists():
+                shutil.move(str(live), str(dst))  # the soak's own live cache: keep its rows, sync the rest
+            t0 = time.perf_counter()
+            tp = tape_cache.Tape(name)
+            added = tp.sync(final=True)
+            say(f"{name}: tape cached ({tp.n:,} trades, {added:,} new) in {time.perf_counter() - t0:.1f}s")
+        drop(name)
+        n += 1
+        say(f"{name}: dropped ({dbs[name][2] / 2 ** 30:.2f} GB freed)")
+    return n
+
+
+def status(tmpl):
+    dbs = databases(tmpl)
+    ready, stale = spares(dbs, tmpl)
+    gb = lambda n: f"{dbs[n][2] / 2 ** 30:.2f} GB"
+    print(f"template {tmpl} (oid {dbs[tmpl][0]}, {gb(tmpl)})")
+    for s in ready:
+        print(f"  ready  {s}  {gb(s)}")
+    for s in stale:
+        print(f"  stale  {s}  {gb(s)}  [{dbs[s][1] or 'unmarked'}]")
+    for n in sorted(dbs):
+        if DONE_RE.match(n):
+            print(f"  done   {n}  {gb(n)}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cmd", choices=["watch", "fill", "claim", "recycle", "status"])
+    ap.add_argument("--tmpl", default=TMPL)
+    ap.add_argument("--as", dest="target", default="", help="claim: the soak DB name to hand out")
+    ap.add_argument("--keep", type=int, default=2, help="ready spares to maintain")
+    ap.add_argument("--interval", type=float, default=30.0, help="watch: seconds between passes")
+    ap.add_argument("--strategy", default="", choices=["", "wal_log", "file_copy"],
+                    help="CREATE DATABASE STRATEGY (PG15+; file_copy writes less WAL for big templates)")
+    ap.add_argument("--no-tape", action="store_true", help="recycle without caching the finished tapes")
+    args = ap.parse_args()
+    say = lambda msg: print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+    try:
+        if args.cmd == "claim":
+            if not args.target:
+                sys.exit("claim needs --as <db>")
+            t0 = time.perf_counter()
+            how = claim(args.tmpl, args.target, args.strategy)
+            say(f"{args.target} <- {how} in {time.perf_counter() - t0:.1f}s")
+        elif args.cmd == "fill":
+            fill(args.tmpl, args.keep, args.strategy, say)
+        elif args.cmd == "recycle":
+            recycle(args.tmpl, not args.no_tape, say)
+        elif args.cmd == "status":
+            status(args.tmpl)
+        else:
+            say(f"keeping {args.keep} spare(s) of {args.tmpl}, every {args.interval:g}s (Ctrl-C to stop)")
+            while True:
+                try:
+                    recycle(args.tmpl, not args.no_tape, say)
+                    fill(args.tmpl, args.keep, args.strategy, say)
+                except kse_db.QueryError as ex:
+                    say(f"pass failed, retrying next interval: {ex}")
+                time.sleep(args.interval)
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Historical order-book depth, rebuilt by replaying the Orders history as a time-sorted event stream.
+
+wall_diag.py and book_recorder.py only see the books while orders rest; once an order fills or is
+cancelled the Orders table keeps just its final state. The lifecycle is still recoverable, though:
+
+  add     COALESCE(ActivatedAt, CreatedAt) of every limit order that ever reached the book
+          (Open / Filled / Cancelled, Stop cleared, not a bracket child cancelled unfilled; a Pending
+          stop-limit or Attached bracket child never did), full qty
+  fill    each Transactions row reduces the resting qty of its BuyOrderId and SellOrderId at the
+          trade's Timestamp (the taker side is usually not resting yet; its fill just shrinks the
+          add it follows)
+  settle  at UpdatedAt a Filled / Cancelled order leaves the book and an Open one is clamped to
+          Quantity - AmountFilled, covering fills with no linked trade and cancels of the remainder
+
+Postgres sorts the union and COPYs it out; the replay reads it as a stream (kse_db.stream), so memory
+is the live orders and levels, not the history. Per book it keeps price-tick -> qty for both sides
+plus a lazily-pruned heap for the best price, and per --res bucket writes:
+
+  spread_bps   time-weighted quoted spread over the bucket (only while both sides quote and uncrossed)
+  depth_<N>    resting qty within N bps of the mid on each side, summed (--bps), at the bucket close
+  top/hhi/round  wall_diag's wall metrics per side at the bucket close (sides with >= --min-levels)
+
+Rows go to data/depth/<db>/depth-<res>.csv (one per book and bucket); the per-bucket averages over the
+books are printed and written to summary-<res>.csv.
+
+Usage: py scripts/depth_replay.py [--db kse_soak] [--res 5m] [--bps 10,50,100] [--min-levels 50]
+       [--from 2026-10-18T12:00:00] [--to ...]
+"""
+import argparse, csv, heapq, os, re, sys, time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+from wall_diag import snap_unit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.path.join(ROOT, "data", "depth")
+TICK = 1e-4
+ADD, FILL, SETTLE = 0, 1, 2
+
+# limit orders that reached the book: a promoted stop has Stop cleared (and ActivatedAt set), a Pending
+# stop-limit keeps it; a bracket child cancelled unfilled never left Attached
+RESTED = '''"Entry" = 'Limit' AND "Status" IN ('Open', 'Filled', 'Cancelled') AND "Price" > 0 AND "Stop" = 'None'
+      AND NOT ("ParentOrderId" IS NOT NULL AND COALESCE("AmountFilled", 0) = 0 AND "Status" = 'Cancelled')'''
+EVENTS_SQL = f'''
+COPY (
+  SELECT extract(epoch from t), kind, oid, sid, ccy, side, price, qty FROM (
+    SELECT COALESCE("ActivatedAt", "CreatedAt") AS t, 0 AS kind, "OrderId" AS oid, "StockId" AS sid,
+           "Currency" AS ccy, "Side" AS side, "Price" AS price, "Quantity" AS qty
+    FROM "Orders"
+    WHERE {RESTED}
+    UNION ALL
+    SELECT "Timestamp", 1, "BuyOrderId", NULL, NULL, NULL, NULL, "Quantity"
+    FROM "Transactions" WHERE "BuyOrderId" IS NOT NULL
+    UNION ALL
+    SELECT "Timestamp", 1, "SellOrderId", NULL, NULL, NULL, NULL, "Quantity"
+    FROM "Transactions" WHERE "SellOrderId" IS NOT NULL
+    UNION ALL
+    SELECT "UpdatedAt", 2, "OrderId", NULL, NULL, NULL, NULL,
+           CASE WHEN "Status" = 'Open' THEN "Quantity" - "AmountFilled" ELSE 0 END
+    FROM "Orders"
+    WHERE {RESTED}
+      AND "UpdatedAt" IS NOT NULL
+  ) e
+  WHERE t IS NOT NULL AND t < to_timestamp(:until)
+  ORDER BY t, kind, oid
+) TO STDOUT (FORMAT csv);'''
+
+
+def parse_res(s):
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd]?)", s.strip())
+    if not m:
+        sys.exit(f"bad --res {s!r} (e.g. 30s, 5m, 1h)")
+    return float(m.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[m.group(2)]
+
+
+def parse_time(s):
+    if not s:
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        dt = datetime.fromisoformat(s)
+        return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class Side:
+    """One side of one book: price tick -> resting qty, with a heap of ticks for the best price."""
+    __slots__ = ("qty", "heap", "sign")
+
+    def __init__(self, sign):
+        self.qty, self.heap, self.sign = {}, [], sign  # sign -1 for bids (max-heap on the tick)
+
+    def add(self, tick, q):
+        old = self.qty.get(tick, 0)
+        if q + old > 0:
+            self.qty[tick] = q + old
+            if not old:
+                heapq.heappush(self.heap, self.sign * tick)
+        else:
+            self.qty.pop(tick, None)
+        if len(self.heap) > 2 * len(self.qty) + 64:  # bound the stale entries
+            self.heap = [self.sign * t for t in self.qty]
+            heapq.heapify(self.heap)
+
+    def best(self):
+        h = self.heap
+        while h and self.sign * h[0] not in self.qty:
+            heapq.heappop(h)
+        return self.sign * h[0] if h else None
+
+
+class Book:
+    __slots__ = ("bids", "asks", "t", "spread", "sw", "st")
+
+    def __init__(self, t0):
+        self.bids, self.asks = Side(-1), Side(1)
+        self.t, self.spread, self.sw, self.st = t0, None, 0.0, 0.0
+
+    def advance(self, t):
+        """Time-weight the current spread up to t."""
+        if self.spread is not None and t > self.t:
+            self.sw += self.spread * (t - self.t)
+            self.st += t - self.t
+        self.t = max(self.t, t)
+
+    def requote(self):
+        b, a = self.bids.best(), self.asks.best()
+        self.spread = (a - b) / ((a + b) / 2) * 1e4 if b is not None and a is not None and a > b else None
+
+
+def close_bucket(books, start, res, bps, min_levels):
+    """Per-book rows for the bucket [start, start + res); resets the time-weighting."""
+    end = start + res
+    out = []
+    for key, bk in books.items():
+        bk.advance(end)
+        b, a = bk.bids.best(), bk.asks.best()
+        row = {"book": key, "spread_bps": bk.sw / bk.st if bk.st else None,
+               "quoted": bk.st / res, "bid_levels": len(bk.bids.qty), "ask_levels": len(bk.asks.qty)}
+        mid = (a + b) / 2 if b is not None and a is not None else None
+        for n in bps:
+            if mid is None:
+                row[f"depth_{n}"] = None
+                continue
+            lo, hi = mid * (1 - n / 1e4), mid * (1 + n / 1e4)
+            row[f"depth_{n}"] = (sum(q for t, q in bk.bids.qty.items() if t >= lo)
+                                 + sum(q for t, q in bk.asks.qty.items() if t <= hi))
+        walls = []
+        for side in (bk.bids, bk.asks):
+            if len(side.qty) < min_levels:
+                continue
+            qs = side.qty.values()
+            total = sum(qs)
+            rq = 0
+            for t, q in side.qty.items():
+                u = snap_unit(t * TICK)
+                if abs(t * TICK / u - round(t * TICK / u)) < 1e-6:
+                    rq += q
+            walls.append((max(qs) / total, sum((q / total) ** 2 for q in qs), rq / total))
+        for i, name in enumerate(("top", "hhi", "round")):
+            row[name] = sum(w[i] for w in walls) / len(walls) if walls else None
+        bk.sw = bk.st = 0.0
+        out.append(row)
+    return out
+
+
+def replay(db, res, bps, min_levels, since, until, on_bucket, say=print):
+    """Stream the events, calling on_bucket(start, rows) for each bucket from `since` on -> event count."""
+    books, live = {}, {}  # (sid, ccy) -> Book; order id -> [book key, side, tick, remaining]
+    bucket = None
+    n = 0
+    t0 = time.perf_counter()
+    for ts, kind, oid, sid, ccy, side, price, qty in kse_db.stream(db, EVENTS_SQL, {"until": until}):
+        t, kind, oid, q = float(ts), int(kind), int(oid), int(qty or 0)
+        if bucket is None:
+            bucket = (t // res) * res
+        while t >= bucket + res:  # close every bucket this event jumps past, idle ones included
+            if since is None or bucket >= since:
+                on_bucket(bucket, close_bucket(books, bucket, res, bps, min_levels))
+            else:
+                for bk in books.values():
+                    bk.advance(bucket + res)
+                    bk.sw = bk.st = 0.0
+            bucket += res
+        if kind == ADD:
+            key = (int(sid), ccy)
+            bk = books.get(key)
+            if bk is None:
+                bk = books[key] = Book(bucket)
+            o = live[oid] = [key, side == "Buy", round(float(price) / TICK), q]
+            bk.advance(t)
+            (bk.bids if o[1] else bk.asks).add(o[2], q)
+            bk.requote()
+        else:
+            o = live.get(oid)
+            if o is None:
+                continue  # a market order's fill, or an order that was never on the book
+            left = max(0, o[3] - q) if kind == FILL else min(o[3], q)
+            if left != o[3]:
+                bk = books[o[0]]
+                bk.advance(t)
+                (bk.bids if o[1] else bk.asks).add(o[2], left - o[3])
+                bk.requote()
+                o[3] = left
+            if not left:
+                del live[oid]
+        n += 1
+        if n % 1_000_000 == 0:
+            say(f"  {n:,} events, {len(live):,} resting orders, "
+                f"{datetime.fromtimestamp(t, timezone.utc):%Y-%m-%d %H:%M} ({time.perf_counter() - t0:.0f}s)")
+    if bucket is not None and (since is None or bucket >= since):
+        on_bucket(bucket, close_bucket(books, bucket, res, bps, min_levels))
+    return n
+
+
+def mean(vals):
+    vals = [v for v in vals if v is not None]
+    return sum(vals) / len(vals) if vals else None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="kse_soak")
+    ap.add_argument("--res", default="5m", help="bucket size: 30s, 5m, 1h, ...")
+    ap.add_argument("--bps", default="10,50,100", help="depth bands around the mid, in bps")
+    ap.add_argument("--min-levels", type=int, default=50, help="wall metrics skip sides with fewer levels")
+    ap.add_argument("--from", dest="since", default="", help="first bucket to emit (ISO or epoch)")
+    ap.add_argument("--to", dest="until", default="", help="stop the replay here (ISO or epoch)")
+    ap.add_argument("--out", default="", help="output dir (default data/depth/<db>)")
+    ap.add_argument("--quiet", action="store_true", help="no per-bucket table, just the files")
+    args = ap.parse_args()
+
+    res = parse_res(args.res)
+    bps = [int(b) for b in args.bps.split(",") if b]
+    since, until = parse_time(args.since), parse_time(args.until)
+    out_dir = args.out or os.path.join(OUT_DIR, args.db)
+    os.makedirs(out_dir, exist_ok=True)
+    depth_cols = [f"depth_{n}" for n in bps]
+    cols = ["spread_bps", "quoted", "bid_levels", "ask_levels", *depth_cols, "top", "hhi", "round"]
+    fmt = lambda v: "" if v is None else (f"{v:.5g}" if isinstance(v, float) else v)
+    book_path = os.path.join(out_dir, f"depth-{args.res}.csv")
+    sum_path = os.path.join(out_dir, f"summary-{args.res}.csv")
+
+    with open(book_path, "w", newline="", encoding="utf-8") as bf, open(sum_path, "w", newline="", encoding="utf-8") as sf:
+        bw, sw = csv.writer(bf), csv.writer(sf)
+        bw.writerow(["bucket", "utc", "stock", "ccy", *cols])
+        sw.writerow(["bucket", "utc", "books", *cols])
+        if not args.quiet:
+            print(f"{'utc':<17} {'books':>5} {'spread':>7} " + " ".join(f"{c:>9}" for c in depth_cols)
+                  + f" {'top':>6} {'hhi':>7} {'round':>6}")
+
+        def on_bucket(start, rows):
+            utc = datetime.fromtimestamp(start, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            for r in sorted(rows, key=lambda r: r["book"]):
+                bw.writerow([f"{start:.0f}", utc, *r["book"], *(fmt(r[c]) for c in cols)])
+            agg = {c: mean(r[c] for r in rows) for c in cols}
+            sw.writerow([f"{start:.0f}", utc, len(rows), *(fmt(agg[c]) for c in cols)])
+            if not args.quiet:
+                f = lambda v, s: "-".rjust(len(format(0.0, s))) if v is None else format(v, s)
+                print(f"{utc[:16]:<17} {len(rows):>5} {f(agg['spread_bps'], '7.1f')} "
+                      + " ".join(f(agg[c], "9.0f") for c in depth_cols)
+                      + f" {f(agg['top'], '6.3f')} {f(agg['hhi'], '7.4f')} {f(agg['round'], '6.3f')}", flush=True)
+
+        t0 = time.perf_counter()
+        try:
+            n = replay(args.db, res, bps, args.min_levels, since, until if until is not None else 1e11,
+                       on_bucket, say=lambda m: print(m, file=sys.stderr, flush=True))
+        except kse_db.QueryError as ex:
+            sys.exit(str(ex))
+    print(f"{n:,} events replayed in {time.perf_counter() - t0:.1f}s -> {book_path}, {sum_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Tiny HDR-style latency histogram shared by the load / fan-out / read-path benchmarks.
+
+Log-linear buckets with a fixed number of sub-buckets per power of two (2048 by default, i.e. ~3
+significant digits), stored sparsely so a histogram covering 1us..1h stays a few KB. Values are
+integers in whatever unit the caller records (the benchmarks use microseconds). Histograms merge
+by adding counts, serialise to a compact dict for the JSON results files, and print the standard
+HdrHistogram percentile-distribution (.hgrm) text so the output plots in the usual HdrHistogram tools.
+
+Pure Python, no dependency on the `hdrh` package.
+"""
+import math
+
+SUB_BITS = 11  # 2048 sub-buckets -> relative error <= 1/1024
+
+
+class Histogram:
+    def __init__(self, sub_bits=SUB_BITS):
+        self.sub_bits = sub_bits
+        self.sub_count = 1 << sub_bits
+        self.half = self.sub_count >> 1
+        self.counts = {}
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    # -- bucket maths ------------------------------------------------------------------------------
+    def _index(self, v):
+        if v < self.sub_count:
+            return v
+        shift = v.bit_length() - self.sub_bits
+        return self.sub_count + (shift - 1) * self.half + ((v >> shift) - self.half)
+
+    def _bounds(self, idx):
+        """[lo, hi] of the values that land in bucket idx."""
+        if idx < self.sub_count:
+            return idx, idx
+        shift = (idx - self.sub_count) // self.half + 1
+        sub = (idx - self.sub_count) % self.half + self.half
+        lo = sub << shift
+        return lo, lo + (1 << shift) - 1
+
+    # -- recording ---------------------------------------------------------------------------------
+    def record(self, value, count=1):
+        v = max(0, int(value))
+        i = self._index(v)
+        self.counts[i] = self.counts.get(i, 0) + count
+        self.total += count
+        self.min = v if self.min is None or v < self.min else self.min
+        self.max = v if self.max is None or v > self.max else self.max
+
+    def merge(self, other):
+        for i, c in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + c
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    # -- queries -----------------------------------------------------------------------------------
+    def percentile(self, p):
+        """Value at percentile p (0..100); the bucket's upper bound, clamped to the observed max."""
+        if not self.total:
+            return None
+        want = max(1, math.ceil(self.total * p / 100.0))
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= want:
+                return min(self._bounds(i)[1], self.max)
+        return self.max
+
+    def mean(self):
+        if not self.total:
+            return None
+        return sum(sum(self._bounds(i)) / 2.0 * c for i, c in self.counts.items()) / self.total
+
+    def summary(self, scale=1.0, pcts=(50, 95, 99, 99.9)):
+        """{'n', 'mean', 'p50', ..., 'max'} with values divided by `scale` (e.g. 1000 for us -> ms)."""
+        out = {"n": self.total}
+        if not self.total:
+            return out
+        out["mean"] = self.mean() / scale
+        for p in pcts:
+            out["p%s" % ("%g" % p).replace(".", "")] = self.percentile(p) / scale
+        out["max"] = self.max / scale
+        return out
+
+    # -- serialisation -----------------------------------------------------------------------------
+    def to_dict(self):
+        return {"sub_bits": self.sub_bits, "min": self.min, "max": self.max,
+                "counts": [[i, c] for i, c in sorted(self.counts.items())]}
+
+    @classmethod
+    def from_dict(cls, d):
+        h = cls(d.get("sub_bits", SUB_BITS))
+        for i, c in d.get("counts", []):
+            h.counts[int(i)] = int(c)
+            h.total += int(c)
+        h.min, h.max = d.get("min"), d.get("max")
+        return h
+
+    def hgrm(self, scale=1.0, ticks_per_half=5):
+        """HdrHistogram percentile-distribution text (Value / Percentile / TotalCount / 1/(1-Percentile))."""
+        lines = ["%12s %14s %10s %14s" % ("Value", "Percentile", "TotalCount", "1/(1-Percentile)"), ""]
+        if not self.total:
+            return "\n".join(lines) + "\n"
+        # Percentile ladder that halves the remaining distance each level, like HdrHistogram's output;
+        # stops once the remaining tail holds less than one sample.
+        ladder, k = [], 0
+        while k < 40:
+            lo, hi = 100.0 * (1 - 0.5 ** k), 100.0 * (1 - 0.5 ** (k + 1))
+            ladder.extend(lo + (hi - lo) * j / ticks_per_half for j in range(ticks_per_half))
+            if 0.5 ** (k + 1) * self.total < 1:
+                break
+            k += 1
+        for p in ladder:
+            v = self.percentile(p if p > 0 else 0.0001)
+            want = max(1, math.ceil(self.total * p / 100.0))
+            lines.append("%12.3f %14.12f %10d %14.2f" % (v / scale, p / 100.0, want, 1.0 / (1.0 - p / 100.0)))
+        lines.append("%12.3f %14.12f %10d %14s" % (self.max / scale, 1.0, self.total, "inf"))
+        lines.append("#[Mean    = %12.3f, StdDeviation   = %12.3f]" % (self.mean() / scale, self._std() / scale))
+        lines.append("#[Max     = %12.3f, Total count    = %12d]" % (self.max / scale, self.total))
+        return "\n".join(lines) + "\n"
+
+    def _std(self):
+        mu = self.mean()
+        var = sum(((sum(self._bounds(i)) / 2.0) - mu) ** 2 * c for i, c in self.counts.items()) / self.total
+        return math.sqrt(var)
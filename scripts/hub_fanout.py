@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""SignalR fan-out benchmark for /hubs/market: delivery latency + drop rate vs subscriber count.
+
+MarketHubBroadcaster (QuoteUpdated, CandleClosed), OrderBookBroadcaster (OrderBookSnapshot, <=1 per
+100ms per book) and TelemetryBroadcaster (OnTelemetryEvent, admin group) all push into hub groups.
+This opens thousands of hub connections multiplexed on one asyncio loop (raw SignalR JSON protocol
+over aiohttp websockets, negotiate skipped), joins each to --groups-per-conn quotes groups drawn
+round-robin from --books (plus the telemetry group for --telemetry-share of them), and timestamps
+every received push against the server-side event time carried in its payload:
+    QuoteUpdated.lastUpdated, OrderBookSnapshot.lastUpdatedUtc, CandleClosed.openTime+bucket,
+    OnTelemetryEvent.timestamp.
+
+It steps through --steps subscriber counts (connections are added, never torn down, between steps) and
+measures a --window at each after --settle. A push counts as DROPPED when another subscriber of the
+same group received it but this one didn't; only pushes whose event time is inside the window (minus
+--grace at each edge) are scored. Clocks are assumed shared (local server); for a remote one pass
+--clock-offset-ms (server minus local). Server CPU is sampled when --server-pid is given and psutil
+is installed.
+
+All connections share one JWT (hub groups are per connection, not per user). The default admin login
+matches kse-order-smoke.ps1; the telemetry group needs an admin token.
+
+Requires aiohttp (pip install aiohttp); psutil optional.
+
+Usage: py scripts/hub_fanout.py --steps 100,500,1000,2000 --books 1-20:USD,1-5:EUR
+       [--groups-per-conn 3] [--telemetry-share 0.1] [--window 60] [--server-pid 1234]
+"""
+import argparse, asyncio, json, re, sys, time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from hdr_hist import Histogram
+
+try:
+    import aiohttp
+except ImportError:
+    sys.exit("hub_fanout.py needs aiohttp:  pip install aiohttp")
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ROOT = Path(__file__).resolve().parent.parent
+OUT_DIR = ROOT / "data" / "loadgen"
+RS = "\x1e"  # SignalR record separator
+CCY = {"USD": 0, "EUR": 1, "GBP": 2, "JPY": 3, "CHF": 4}
+CCY_NAME = {v: k for k, v in CCY.items()}
+
+
+def parse_books(s):
+    """'1-20:USD,5:EUR' -> [(1,'USD'), ..., (5,'EUR')]"""
+    out = []
+    for part in s.split(","):
+        ids, _, ccy = part.partition(":")
+        lo, _, hi = ids.partition("-")
+        out.extend((sid, ccy or "USD") for sid in range(int(lo), int(hi or lo) + 1))
+    return out
+
+
+TS_RE = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?(Z|[+-]\d\d:\d\d)?$")
+
+
+def parse_ts(s):
+    """.NET DateTime/DateTimeOffset JSON -> epoch seconds (7-digit fractions; no zone = UTC)."""
+    m = TS_RE.match(s or "")
+    if not m:
+        return None
+    frac = (m.group(2) or ".0")[:7]
+    tz = m.group(3) or "Z"
+    dt = datetime.fromisoformat(m.group(1) + frac + ("+00:00" if tz == "Z" else tz))
+    return dt.timestamp()
+
+
+def ccy_of(v):
+    return CCY_NAME.get(v, v) if isinstance(v, int) else v
+
+
+def identify(target, arg):
+    """(group, message id, server event time) for one push, or None for pushes we don't score."""
+    if target == "QuoteUpdated":
+        g = f"quotes:{arg.get('stockId')}:{ccy_of(arg.get('currency'))}"
+        t = parse_ts(arg.get("lastUpdated"))
+        return g, (arg.get("lastUpdated"), arg.get("volume")), t
+    if target == "OrderBookSnapshot":
+        g = f"quotes:{arg.get('stockId')}:{ccy_of(arg.get('currency'))}"
+        return g, arg.get("bookVersion"), parse_ts(arg.get("lastUpdatedUtc"))
+    if target == "CandleClosed":
+        g = f"quotes:{arg.get('stockId')}:{ccy_of(arg.get('currencyType', arg.get('currency')))}"
+        t = parse_ts(arg.get("openTime"))
+        return g, (arg.get("openTime"), arg.get("bucketSeconds")), (t + (arg.get("bucketSeconds") or 0)) if t else None
+    if target == "OnTelemetryEvent":
+        return "telemetry", (arg.get("timestamp"), arg.get("source"), hash(arg.get("message"))), parse_ts(arg.get("timestamp"))
+    return None
+
+
+class Recorder:
+    """Everything received during one measurement window."""
+
+    def __init__(self, t0, t1, offset):
+        self.t0, self.t1, self.offset = t0, t1, offset
+        self.hist = defaultdict(Histogram)
+        self.seen = defaultdict(lambda: defaultdict(int))  # (target, group) -> msg id -> receivers
+        self.msgs = 0
+
+    def add(self, target, group, mid, ev_t, now):
+        if ev_t is None or not (self.t0 <= ev_t <= self.t1):
+            return
+        self.msgs += 1
+        lat = max(0.0, now - (ev_t - self.offset))
+        self.hist[target].record(lat * 1e6)
+        self.seen[(target, group)][mid] += 1
+
+
+class Conn:
+    def __init__(self, idx, groups, telemetry):
+        self.idx, self.groups, self.telemetry = idx, groups, telemetry
+        self.ws = None
+        self.alive = False
+        self.inv = 0
+        self.task = None
+
+
+async def connect(session, args, token, conn, state):
+    url = args.base.replace("http", "ws", 1) + f"/hubs/market?access_token={token}"
+    try:
+        conn.ws = await session.ws_connect(url, heartbeat=None, max_msg_size=0)
+        await conn.ws.send_str(json.dumps({"protocol": "json", "version": 1}) + RS)
+        hs = await conn.ws.receive(timeout=10)
+        if hs.type != aiohttp.WSMsgType.TEXT or json.loads(hs.data.split(RS)[0]).get("error"):
+            raise RuntimeError(f"handshake rejected: {hs.data!r}")
+        for sid, ccy in conn.groups:
+            await invoke(conn, "JoinQuotes", [sid, CCY[ccy]])
+        if conn.telemetry:
+            await invoke(conn, "JoinTelemetry", [])
+        conn.alive = True
+    except Exception as ex:  # noqa: BLE001 — a failed connection is a measurement, not a crash
+        state["connect_errors"] += 1
+        state["last_error"] = repr(ex)
+        return
+    conn.task = asyncio.create_task(reader(conn, state))
+
+
+async def invoke(conn, target, arguments):
+    conn.inv += 1
+    await conn.ws.send_str(json.dumps({"type": 1, "invocationId": str(conn.inv),
+                                       "target": target, "arguments": arguments}) + RS)
+
+
+async def reader(conn, state):
+    ws = conn.ws
+    async for msg in ws:
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            break
+        now = time.time()
+        rec = state["rec"]
+        for frame in msg.data.split(RS):
+            if not frame:
+                continue
+            m = json.loads(frame)
+            t = m.get("type")
+            if t == 1 and rec is not None and m.get("arguments"):
+                ident = identify(m["target"], m["arguments"][0])
+                if ident:
+                    rec.add(m["target"], ident[0], ident[1], ident[2], now)
+            elif t == 3 and m.get("error"):
+                state["invoke_errors"] += 1
+            elif t == 7:
+                state["server_closed"] += 1
+    conn.alive = False
+
+
+async def pinger(conns, stop):
+    """SignalR drops a client that is silent for 30s (ClientTimeoutInterval) — ping every 10s."""
+    ping = json.dumps({"type": 6}) + RS
+    while not stop.is_set():
+        for c in conns:
+            if c.alive:
+                try:
+                    await c.ws.send_str(ping)
+                except Exception:  # noqa: BLE001
+                    c.alive = False
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def login(session, args):
+    async with session.post(f"{args.base}/api/auth/login",
+                            json={"Username": args.user, "Password": args.password}) as r:
+        if r.status != 200:
+            sys.exit(f"login failed: HTTP {r.status} {await r.text()}")
+        body = await r.json()
+    if args.telemetry_share > 0 and not body.get("isAdmin"):
+        sys.exit("--telemetry-share > 0 needs an admin login (JoinTelemetry is admin-only)")
+    return body["token"]
+
+
+def score(rec, conns):
+    """Per target: latency summary + drop rate against the group's subscriber count."""
+    members = defaultdict(int)
+    for c in conns:
+        if c.alive:
+            for sid, ccy in c.groups:
+                members[f"quotes:{sid}:{ccy}"] += 1
+            if c.telemetry:
+                members["telemetry"] += 1
+    out = {}
+    expected, received = defaultdict(int), defaultdict(int)
+    for (target, group), ids in rec.seen.items():
+        n = members.get(group, 0)
+        for got in ids.values():
+            expected[target] += n
+            received[target] += min(got, n)
+    for target, h in rec.hist.items():
+        s = h.summary(1000.0)
+        e = expected[target]
+        s["drop_pct"] = 100.0 * (1 - received[target] / e) if e else None
+        s["distinct_msgs"] = sum(len(v) for (t, _), v in rec.seen.items() if t == target)
+        out[target] = s
+    return out
+
+
+async def run(args):
+    books = parse_books(args.books)
+    steps = [int(x) for x in args.steps.split(",")]
+    proc = None
+    if args.server_pid:
+        if psutil is None:
+            print("note: psutil not installed — server CPU column left blank")
+        else:
+            proc = psutil.Process(args.server_pid)
+            proc.cpu_percent(None)
+    conns = []
+    state = {"rec": None, "connect_errors": 0, "invoke_errors": 0, "server_closed": 0, "last_error": ""}
+    results = []
+    stop = asyncio.Event()
+    conn_limit = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=conn_limit) as session:
+        token = await login(session, args)
+        pings = asyncio.create_task(pinger(conns, stop))
+        telem_every = int(round(1 / args.telemetry_share)) if args.telemetry_share > 0 else 0
+        for target_n in steps:
+            # Ramp up to this step's subscriber count at --ramp conns/s.
+            pending = []
+            while len(conns) < target_n:
+                i = len(conns)
+                groups = [books[(i * args.groups_per_conn + k) % len(books)] for k in range(args.groups_per_conn)]
+                c = Conn(i, groups, telem_every > 0 and i % telem_every == 0)
+                conns.append(c)
+                pending.append(asyncio.create_task(connect(session, args, token, c, state)))
+                if len(pending) % max(1, int(args.ramp / 10)) == 0:
+                    await asyncio.sleep(0.1)
+            await asyncio.gather(*pending)
+            alive = sum(c.alive for c in conns)
+            print(f"[{target_n}] connected {alive}/{len(conns)} (connect errors so far {state['connect_errors']}"
+                  + (f"; last: {state['last_error']}" if state["connect_errors"] else "") + ")", flush=True)
+            await asyncio.sleep(args.settle)
+
+            now = time.time()
+            rec = Recorder(now + args.grace, now + args.window - args.grace, args.clock_offset_ms / 1000.0)
+            state["rec"] = rec
+            if proc:
+                proc.cpu_percent(None)
+            await asyncio.sleep(args.window + args.grace)  # trailing grace lets in-flight pushes land
+            state["rec"] = None
+            cpu = proc.cpu_percent(None) if proc else None
+
+            per = score(rec, conns)
+            results.append({"subscribers": target_n, "alive": sum(c.alive for c in conns), "cpu_pct": cpu,
+                            "msgs": rec.msgs, "msgs_per_s": rec.msgs / max(1e-9, args.window - 2 * args.grace),
+                            "targets": per, "hist_us": {t: h.to_dict() for t, h in rec.hist.items()}})
+            print_step(results[-1])
+        stop.set()
+        await pings
+        for c in conns:
+            if c.ws is not None and not c.ws.closed:
+                await c.ws.close()
+    return results, state
+
+
+def print_step(r):
+    cpu = f"{r['cpu_pct']:.0f}%" if r["cpu_pct"] is not None else "-"
+    print(f"  subs={r['subscribers']} alive={r['alive']} recv={r['msgs_per_s']:.0f}/s server_cpu={cpu}")
+    for t, s in sorted(r["targets"].items()):
+        drop = f"{s['drop_pct']:.2f}%" if s.get("drop_pct") is not None else "-"
+        print(f"    {t:<18} n={s['n']:>8}  p50={s['p50']:>8.1f}  p95={s['p95']:>8.1f}  p99={s['p99']:>8.1f}"
+              f"  p99.9={s['p999']:>8.1f}  max={s['max']:>8.1f} ms  drop={drop}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:5000")
+    ap.add_argument("--user", default="admin")
+    ap.add_argument("--password", default="hallo123")
+    ap.add_argument("--steps", default="100,500,1000", help="cumulative subscriber counts to measure at")
+    ap.add_argument("--books", default="1-20:USD", help="quotes groups to spread subscribers over")
+    ap.add_argument("--groups-per-conn", type=int, default=3)
+    ap.add_argument("--telemetry-share", type=float, default=0.0, help="fraction of connections joining telemetry")
+    ap.add_argument("--ramp", type=float, default=200.0, help="new connections per second")
+    ap.add_argument("--settle", type=float, default=5.0, help="seconds after ramp before measuring")
+    ap.add_argument("--window", type=float, default=30.0, help="measurement seconds per step")
+    ap.add_argument("--grace", type=float, default=2.0, help="edge seconds excluded from drop scoring")
+    ap.add_argument("--clock-offset-ms", type=float, default=0.0, help="server clock minus local clock")
+    ap.add_argument("--server-pid", type=int, default=0, help="sample this process's CPU (needs psutil)")
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+    args.base = args.base.rstrip("/")
+
+    results, state = asyncio.run(run(args))
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    out = Path(args.out) if args.out else OUT_DIR / f"hub-fanout-{ts}.json"
+    out.write_text(json.dumps({"ts": ts, "base": args.base, "books": args.books,
+                               "groups_per_conn": args.groups_per_conn, "window_s": args.window,
+                               "connect_errors": state["connect_errors"], "invoke_errors": state["invoke_errors"],
+                               "server_closed": state["server_closed"], "steps": results}, indent=1),
+                   encoding="utf-8")
+    print(f"\nresults -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,9 +28,9 @@ function Depth {
 }
 
 Write-Host "[$(Stamp)] $Label : resetting $db from template $tmpl"
-docker exec $pg psql -U kse -d postgres -c "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname IN ('$db','$tmpl') AND pid <> pg_backend_pid();" | Out-Null
-docker exec $pg psql -U kse -d postgres -c "DROP DATABASE IF EXISTS $db;" | Out-Null
-docker exec $pg psql -U kse -d postgres -c "CREATE DATABASE $db TEMPLATE $tmpl;" | Out-Null
+# db_pool spare renamed into place when one is ready (scripts\db_pool.py watch), else a synchronous clone
+& python "$root\scripts\db_pool.py" claim --tmpl $tmpl --as $db
+if ($LASTEXITCODE -ne 0) { throw "$Label : could not claim a copy of $tmpl" }
 
 Write-Host "[$(Stamp)] $Label : launching server (bots on) -> $log"
 $env:KSE_DB_CONNECTION_STRING = $conn
@@ -73,4 +73,7 @@ finally {
     Write-Host "[$(Stamp)] $Label : stopping server (pid $($proc.Id))"
     Stop-Process -Id $proc.Id -Force -ErrorAction SilentlyContinue
   }
+  # Cache and drop the DBs earlier claims retired ($db__done<ts>), or they pile up without a watcher
+  try { & python "$root\scripts\db_pool.py" recycle --tmpl $tmpl | Write-Host }
+  catch { Write-Host "[$(Stamp)] $Label : db_pool recycle skipped: $_" }
 }
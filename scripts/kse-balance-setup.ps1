@@ -1,4 +1,7 @@
 # One-time: build a pristine, zero-trade seeded template (kse_soak_seed) for fast per-run resets.
+# -Copy seeds with scripts/reseed_copy.py (binary COPY of the generated fleet, seconds) instead of a
+# bots-off server reading AIUserData.xlsx; -Bundle points it at a saved fleet bundle.
+param([switch]$Copy, [string]$Bundle = "")
 # Continue (not Stop): docker psql emits benign NOTICEs on stderr (e.g. "database does not exist, skipping")
 # which Stop turns into a terminating error; the critical steps below have explicit throws / $LASTEXITCODE checks.
 $ErrorActionPreference = "Continue"
@@ -26,31 +29,39 @@ Write-Host "[$(Stamp)] applying EF migrations to $db"
 dotnet ef database update --project "$root\KieshStockExchange.Server\KieshStockExchange.Server.csproj" 2>&1 | Select-Object -Last 3
 if ($LASTEXITCODE -ne 0) { throw "ef database update failed (exit $LASTEXITCODE)" }
 
-Write-Host "[$(Stamp)] launching server BOTS-OFF to seed $db -> $log"
-$env:ASPNETCORE_ENVIRONMENT   = "Development"
-$env:Bots__AutoStart          = "false"
-$env:Seed__AutoOnEmptyDb      = "true"
-$proc = Start-Process -FilePath $exe -PassThru -WindowStyle Hidden `
-        -WorkingDirectory "$root\KieshStockExchange.Server" `
-        -RedirectStandardOutput $log -RedirectStandardError "$log.err"
+if ($Copy) {
+  Write-Host "[$(Stamp)] seeding $db by binary COPY"
+  $reseedArgs = @("$root\scripts\reseed_copy.py", "--db", $db)
+  if ($Bundle) { $reseedArgs += @("--bundle", $Bundle) }
+  & python @reseedArgs
+  if ($LASTEXITCODE -ne 0) { throw "reseed_copy.py failed (exit $LASTEXITCODE)" }
+} else {
+  Write-Host "[$(Stamp)] launching server BOTS-OFF to seed $db -> $log"
+  $env:ASPNETCORE_ENVIRONMENT   = "Development"
+  $env:Bots__AutoStart          = "false"
+  $env:Seed__AutoOnEmptyDb      = "true"
+  $proc = Start-Process -FilePath $exe -PassThru -WindowStyle Hidden `
+          -WorkingDirectory "$root\KieshStockExchange.Server" `
+          -RedirectStandardOutput $log -RedirectStandardError "$log.err"
 
-try {
-  $ready = $false
-  for ($i = 0; $i -lt 200; $i++) {
-    Start-Sleep -Seconds 3
-    if ($proc.HasExited) { throw "server exited during seed (exit $($proc.ExitCode)); see $log.err" }
-    if (Select-String -Path $log -Pattern "Application started" -Quiet -ErrorAction SilentlyContinue) { $ready = $true; break }
+  try {
+    $ready = $false
+    for ($i = 0; $i -lt 200; $i++) {
+      Start-Sleep -Seconds 3
+      if ($proc.HasExited) { throw "server exited during seed (exit $($proc.ExitCode)); see $log.err" }
+      if (Select-String -Path $log -Pattern "Application started" -Quiet -ErrorAction SilentlyContinue) { $ready = $true; break }
+    }
+    if (-not $ready) { throw "server never reached 'Application started' within timeout" }
+    Write-Host "[$(Stamp)] seed complete; settling 5s then stopping"
+    Start-Sleep -Seconds 5
   }
-  if (-not $ready) { throw "server never reached 'Application started' within timeout" }
-  Write-Host "[$(Stamp)] seed complete; settling 5s then stopping"
-  Start-Sleep -Seconds 5
-}
-finally {
-  if (-not $proc.HasExited) { Stop-Process -Id $proc.Id -Force -ErrorAction SilentlyContinue }
-  $env:Bots__AutoStart     = $null
-  $env:Seed__AutoOnEmptyDb = $null
+  finally {
+    if (-not $proc.HasExited) { Stop-Process -Id $proc.Id -Force -ErrorAction SilentlyContinue }
+    $env:Bots__AutoStart     = $null
+    $env:Seed__AutoOnEmptyDb = $null
+  }
+  Start-Sleep -Seconds 2
 }
-Start-Sleep -Seconds 2
 
 Write-Host "[$(Stamp)] cloning $db -> $tmpl (pristine template)"
 docker exec $pg psql -U kse -d postgres -c "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = '$db' AND pid <> pg_backend_pid();" | Out-Null
@@ -25,9 +25,10 @@ function Q($f) { (Get-Content $f -Raw | docker exec -i $pg psql -U kse -d $Db -t
 function Cnt($pat) { (Select-String -Path $log -Pattern $pat -ErrorAction SilentlyContinue | Measure-Object).Count }
 
 Write-Host "[$(Stamp)] [$Db] resetting from $Tmpl"
-docker exec $pg psql -U kse -d postgres -c "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname='$Db' AND pid <> pg_backend_pid();" | Out-Null
-docker exec $pg psql -U kse -d postgres -c "DROP DATABASE IF EXISTS $Db;" | Out-Null
-docker exec $pg psql -U kse -d postgres -c "CREATE DATABASE $Db TEMPLATE $Tmpl;" | Out-Null
+# A pre-cloned db_pool spare is renamed into place (run `py scripts\db_pool.py watch` to keep some ready);
+# without one this is the old synchronous clone. The previous $Db is kept as $Db__done<ts> for recycling.
+& python "$root\scripts\db_pool.py" claim --tmpl $Tmpl --as $Db
+if ($LASTEXITCODE -ne 0) { throw "[$Db] could not claim a copy of $Tmpl" }
 
 Write-Host "[$(Stamp)] [$Db] launching server on port $Port -> $log"
 $env:KSE_DB_CONNECTION_STRING = $conn
@@ -67,4 +68,7 @@ finally {
     $env:PYTHONIOENCODING = "utf-8"
     & python "$root\scripts\candle_export.py" --db $Db --note $Note | Write-Host
   } catch { Write-Host "[$(Stamp)] [$Db] candle export skipped: $_" }
+  # Cache and drop the DBs earlier claims retired ($Db__done<ts>), or they pile up without a watcher
+  try { & python "$root\scripts\db_pool.py" recycle --tmpl $Tmpl | Write-Host }
+  catch { Write-Host "[$(Stamp)] [$Db] db_pool recycle skipped: $_" }
 }
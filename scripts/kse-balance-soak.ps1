@@ -20,9 +20,9 @@ function Q($f) { (Get-Content $f -Raw | docker exec -i $pg psql -U kse -d $db -t
 function Cnt($pat) { (Select-String -Path $log -Pattern $pat -ErrorAction SilentlyContinue | Measure-Object).Count }
 
 Write-Host "[$(Stamp)] SOAK4H resetting $db from $tmpl"
-docker exec $pg psql -U kse -d postgres -c "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname IN ('$db','$tmpl') AND pid <> pg_backend_pid();" | Out-Null
-docker exec $pg psql -U kse -d postgres -c "DROP DATABASE IF EXISTS $db;" | Out-Null
-docker exec $pg psql -U kse -d postgres -c "CREATE DATABASE $db TEMPLATE $tmpl;" | Out-Null
+# db_pool spare renamed into place when one is ready (scripts\db_pool.py watch), else a synchronous clone
+& python "$root\scripts\db_pool.py" claim --tmpl $tmpl --as $db
+if ($LASTEXITCODE -ne 0) { throw "SOAK4H could not claim a copy of $tmpl" }
 
 Write-Host "[$(Stamp)] SOAK4H launching server -> $log"
 $env:KSE_DB_CONNECTION_STRING = $conn
@@ -63,4 +63,7 @@ finally {
     Write-Host "[$(Stamp)] SOAK4H stopping server (pid $($proc.Id))"
     Stop-Process -Id $proc.Id -Force -ErrorAction SilentlyContinue
   }
+  # Cache and drop the DBs earlier claims retired ($db__done<ts>), or they pile up without a watcher
+  try { & python "$root\scripts\db_pool.py" recycle --tmpl $tmpl | Write-Host }
+  catch { Write-Host "[$(Stamp)] SOAK4H db_pool recycle skipped: $_" }
 }
@@ -0,0 +1,200 @@
+"""Shared soak-DB access for the scripts: docker psql, sync or async, with a bounded "pool".
+
+Every script used to carry its own subprocess.run(["docker", "exec", ..., "psql", ...]) helper and
+run its queries one after another. This keeps the same transport (psql inside the Postgres
+container, --csv output, no driver dependency) but lets a caller run many queries against many DBs
+at once: each in-flight query is one psql process, and a Pool caps how many run concurrently so a
+4-arm comparison doesn't open 40 backends on the soak host.
+
+    rows = kse_db.rows("kse_soak", sql)                        # header stripped, csv-parsed
+    res = kse_db.fan_out(["kse_a", "kse_b"], {"n": sql1, "m": sql2}, size=8)   # res[db][name] -> rows
+
+Failures raise QueryError (db + psql stderr); the CLI scripts turn that into sys.exit.
+
+Diagnostics that get re-run against the same finished soak (tweak a threshold, re-plot) go through
+cached_rows(): the result is stored gzipped under data/cache/query/, keyed by (db, normalized SQL,
+psql -v params, watermark), where the watermark is max(TransactionId)/max(OrderId). While the soak
+is still running the watermark moves and every call re-queries; once it stops, repeats only cost the
+one index-only watermark probe. Entries for an older watermark of the same query are dropped on the
+next miss, and the directory is LRU-trimmed (by mtime) to KSE_QUERY_CACHE_MB (default 256).
+KSE_NO_CACHE=1 bypasses it.
+"""
+import asyncio, csv, gzip, hashlib, io, json, os, re, subprocess, sys
+from collections import namedtuple
+from pathlib import Path
+
+PG = "kieshstockexchange-postgres-1"
+USER = "kse"
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "cache" / "query"
+CACHE_CAP = int(float(os.environ.get("KSE_QUERY_CACHE_MB", "256")) * 1024 * 1024)
+
+# max on the PKs is an index-only probe; tape_end is the timestamp of the newest trade, the anchor the
+# windowed diagnostics use instead of now() so a finished soak keeps answering the same question.
+WATERMARK_SQL = (
+    'SELECT (SELECT max("TransactionId") FROM "Transactions"), (SELECT max("OrderId") FROM "Orders"), '
+    '(SELECT extract(epoch from "Timestamp") FROM "Transactions" ORDER BY "TransactionId" DESC LIMIT 1);'
+)
+Watermark = namedtuple("Watermark", "tx order tape_end")
+
+
+class QueryError(RuntimeError):
+    def __init__(self, db, stderr):
+        super().__init__(f"psql failed on {db}: {stderr.strip()}")
+        self.db = db
+
+
+def _cmd(db, params=None):
+    """psql reading SQL from stdin; `params` become -v variables (:name / :'name' in the SQL)."""
+    cmd = ["docker", "exec", "-i", PG, "psql", "-U", USER, "-d", db, "--csv", "-v", "ON_ERROR_STOP=1"]
+    for k, v in (params or {}).items():
+        cmd += ["-v", f"{k}={v}"]
+    return cmd + ["-f", "-"]
+
+
+def _parse(text):
+    out = list(csv.reader(io.StringIO(text)))
+    return out[1:] if out else []
+
+
+def psql(db, sql):
+    """Raw --csv output lines (header included) — the shape the older per-script helpers returned."""
+    r = subprocess.run(_cmd(db), input=sql, capture_output=True, text=True)
+    if r.returncode != 0:
+        sys.exit(f"psql failed: {r.stderr.strip()}")
+    return r.stdout.strip().splitlines()
+
+
+def _run(db, sql, params=None):
+    r = subprocess.run(_cmd(db, params), input=sql, capture_output=True, text=True)
+    if r.returncode != 0:
+        raise QueryError(db, r.stderr)
+    return r.stdout
+
+
+def rows(db, sql, params=None):
+    """Query -> list of string rows (header stripped). Raises QueryError."""
+    return _parse(_run(db, sql, params))
+
+
+def stream(db, sql, params=None):
+    """Yield csv rows as psql prints them, for results too big to hold. Raises QueryError at the end.
+
+    Use it with COPY (...) TO STDOUT (FORMAT csv): a plain SELECT is buffered whole inside psql."""
+    p = subprocess.Popen(_cmd(db, params), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    p.stdin.write(sql.encode())
+    p.stdin.close()
+    done = False
+    try:
+        yield from csv.reader(io.TextIOWrapper(p.stdout, encoding="utf-8", newline=""))
+        done = True
+    finally:
+        if not done:
+            p.kill()  # the consumer stopped early
+        err = p.stderr.read().decode(errors="replace")
+        p.stdout.close(), p.stderr.close()
+        rc = p.wait()
+    if rc != 0:
+        raise QueryError(db, err)
+
+
+def copy_in(db, table, columns, data, fmt="binary"):
+    """COPY `data` (bytes in COPY format `fmt`) into table(columns) -> rows copied. Raises QueryError.
+
+    The SQL goes in with -c so psql's stdin is free to carry the (binary) payload."""
+    cols = ",".join(f'"{c}"' for c in columns)
+    cmd = _cmd(db)[:-2] + ["-c", f'COPY "{table}" ({cols}) FROM STDIN (FORMAT {fmt});']
+    r = subprocess.run(cmd, input=data, capture_output=True)
+    if r.returncode != 0:
+        raise QueryError(db, r.stderr.decode(errors="replace"))
+    m = re.search(rb"COPY (\d+)", r.stdout)
+    return int(m.group(1)) if m else None
+
+
+def watermark(db):
+    tx, order, end = (rows(db, WATERMARK_SQL) or [["", "", ""]])[0]
+    return Watermark(int(tx or 0), int(order or 0), float(end or 0))
+
+
+def _normalize(sql):
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+def _trim(cap):
+    files = sorted(CACHE_DIR.glob("*.csv.gz"), key=lambda f: f.stat().st_mtime)
+    total = sum(f.stat().st_size for f in files)
+    for f in files:
+        if total <= cap:
+            break
+        total -= f.stat().st_size
+        f.unlink(missing_ok=True)
+
+
+def cached_rows(db, sql, params=None, wm=None):
+    """rows(), memoized on disk for as long as the DB's watermark doesn't move.
+
+    Pass `wm` when the caller already probed it (one probe can serve several queries)."""
+    if os.environ.get("KSE_NO_CACHE"):
+        return rows(db, sql, params)
+    wm = wm or watermark(db)
+    qkey = hashlib.sha256(json.dumps([db, _normalize(sql)]).encode()).hexdigest()[:20]
+    pkey = hashlib.sha256(json.dumps(sorted((params or {}).items()), default=str).encode()).hexdigest()[:12]
+    mark = f"{wm.tx}-{wm.order}"
+    path = CACHE_DIR / f"{qkey}-{pkey}-{mark}.csv.gz"
+    if path.exists():
+        try:
+            text = gzip.decompress(path.read_bytes()).decode()
+            os.utime(path)  # LRU touch
+            return _parse(text)
+        except (OSError, EOFError):
+            path.unlink(missing_ok=True)
+    text = _run(db, sql, params)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for stale in CACHE_DIR.glob(f"{qkey}-*.csv.gz"):  # same query at an older watermark, any params
+        if not stale.name.endswith(f"-{mark}.csv.gz"):
+            stale.unlink(missing_ok=True)
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    tmp.write_bytes(gzip.compress(text.encode(), compresslevel=6))
+    os.replace(tmp, path)
+    _trim(CACHE_CAP)
+    return _parse(text)
+
+
+class Pool:
+    """At most `size` psql processes in flight across every DB this pool serves."""
+
+    def __init__(self, size=8):
+        self.size = size
+        self._sem = None
+
+    async def rows(self, db, sql, params=None):
+        if self._sem is None:  # bind to the running loop lazily
+            self._sem = asyncio.Semaphore(self.size)
+        async with self._sem:
+            p = await asyncio.create_subprocess_exec(*_cmd(db, params), stdin=asyncio.subprocess.PIPE,
+                                                     stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            out, err = await p.communicate(sql.encode())
+        if p.returncode != 0:
+            raise QueryError(db, err.decode(errors="replace"))
+        return _parse(out.decode())
+
+    async def many(self, jobs):
+        """jobs: {key: (db, sql)} -> {key: rows}, all submitted at once."""
+        keys = list(jobs)
+        res = await asyncio.gather(*(self.rows(*jobs[k]) for k in keys), return_exceptions=True)
+        # let every psql finish before raising, so no subprocess outlives the loop
+        for r in res:
+            if isinstance(r, BaseException):
+                raise r
+        return dict(zip(keys, res))
+
+
+def fan_out(dbs, queries, size=8):
+    """Run every named query against every DB concurrently -> {db: {name: rows}}.
+
+    `queries` maps name -> sql, or name -> callable(db) -> sql for per-DB SQL."""
+    jobs = {(db, name): (db, q(db) if callable(q) else q) for db in dbs for name, q in queries.items()}
+    res = asyncio.run(Pool(size).many(jobs))
+    out = {db: {} for db in dbs}
+    for (db, name), r in res.items():
+        out[db][name] = r
+    return out
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""Offline fast-forward market: the seeded bot fleet trading price-time-priority books, no server.
+
+Every "what does this seed / parameter change do to the market" question used to cost the .NET
+server, Postgres and a 45-minute soak. This is a discrete-event approximation driven by the same
+AIUserData.xlsx the server seeds from (Tools/GenerateAIUsers.py):
+
+  * books     - one limit order book per (StockId, Currency) Listings row, price-time priority,
+                trades print at the resting price; MidPrice is the touch mid the taker saw.
+  * accounts  - Holding sheet: home-currency Balance, BalanceSecondary in the other currency, one
+                position per stock (the server's Positions shape). Buys reserve cash, sells reserve
+                shares; shorts may go negative up to PerPositionMaxPrc of the portfolio.
+  * bots      - Profile sheet: each bot wakes every DecisionIntervalSeconds (+-50% jitter) and acts
+                with TradeProb on a home-currency listing from its WatchlistCsv. Side from BuyBiasPrc
+                tilted by a per-stock sentiment (BotSentimentService's OU rings, x SENTIMENT_MAX_BIAS).
+                Type: UseMarketProb x MARKET_PROB_MULT true-market, UseSlippageMarketProb slippage-market
+                (IOC limit at SlippageTolerancePrc), else a limit on the Close / Mid / Far tier
+                (TIER_CLOSE/TIER_MID, FarBudgetPrc caps the Far share of open orders) with
+                AggressivenessPrc jitter, all distances x DISTANCE_MULT. Size MinTrade..MaxTradeAmountPrc
+                of portfolio, after the cash reserve (Min..MaxCashReservePrc) and PerPositionMaxPrc room.
+                MaxOpenOrders cancels the oldest. StopProb / TrailingProb arm protective stops on a long
+                (StopDistance band), ShortProb opens a short, Long/ShortBracketProb add a take-profit
+                (TpOffset band) and stop once the entry fills. MarketMaker (0, 6) bots re-quote both
+                sides at QUOTE_HALF_SPREAD instead.
+
+It is NOT the C# engine: no value anchor, fundamentals, exogenous shocks, cohorts' special logic
+(arbitrage, rotator, conviction trade as generic bots), cash injections or FX conversion. It's meant
+to rank configurations against each other cheaply, roughly 10-100x faster than real time depending on
+fleet size (--fleet-frac samples the fleet).
+
+Output is the Transactions schema: data/sim/market-<ts>/transactions.csv.gz always, plus optionally
+  --tape NAME   the tape_cache columnar cache (data/cache/tape/NAME) for Bars / interim scoring
+  --db NAME     rows COPY'd into that DB's "Transactions" (--replace truncates it first) so
+                candle_export / r4_realism_score / soak_scorecard run unchanged; timestamps end at now.
+
+Usage: py scripts/market_sim.py [--xlsx KieshStockExchange.Server/Resources/Raw/AIUserData.xlsx]
+       [--minutes 45] [--fleet-frac 1.0] [--seed 1] [--set DISTANCE_MULT=0.3 ...] [--tape NAME] [--db NAME --replace]
+"""
+import argparse, csv, gzip, heapq, io, math, os, random, sys, time
+from collections import deque
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import sentiment_sim
+import tape_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+XLSX = os.path.join(ROOT, "KieshStockExchange.Server", "Resources", "Raw", "AIUserData.xlsx")
+
+# appsettings.json Bots:* dials this model uses (override with --set)
+KNOBS = {
+    "DISTANCE_MULT": 0.2,        # DecisionDistanceMult
+    "MARKET_PROB_MULT": 1.5,     # MarketProbMult
+    "TIER_CLOSE": 0.85,          # Tiers:CloseProb
+    "TIER_MID": 0.10,            # Tiers:MidProb
+    "QUOTE_HALF_SPREAD": 0.003,  # QuoteHalfSpreadPrc
+    "SENTIMENT_MAX_BIAS": 0.1,   # SentimentMaxBias
+    "TAIL_SHAPE": 0.3,           # TradeSizeTailShape (u^(1 + 3*shape))
+}
+MM_STRATEGIES = (0, 6)
+BUY, SELL = 0, 1
+TX_COLUMNS = ("TransactionId", "StockId", "Currency", "Price", "MidPrice", "Quantity",
+              "BuyerId", "SellerId", "BuyOrderId", "SellOrderId", "Timestamp")
+
+
+def load_workbook(path):
+    try:
+        import openpyxl
+    except ImportError:
+        sys.exit("openpyxl is required: pip install -r Tools/requirements.txt")
+    if not os.path.exists(path):
+        sys.exit(f"{path} not found - generate it with Tools/GenerateAIUsers.py or pass --xlsx")
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    def sheet(name):
+        it = wb[name].iter_rows(values_only=True)
+        head = [str(h).strip() for h in next(it)]
+        return head, [r for r in it if r and r[0] is not None]
+
+    _, listings = sheet("Listings")
+    _, stocks = sheet("Stocks")
+    phead, profiles = sheet("Profile")
+    hhead, holdings = sheet("Holding")
+    return ([int(r[0]) for r in stocks],
+            {(int(s), str(c)): float(p) for s, c, _, p in listings},
+            [dict(zip(phead, r)) for r in profiles],
+            hhead, holdings)
+
+
+class Order:
+    __slots__ = ("oid", "uid", "key", "side", "price", "rem", "live", "reserved", "bracket", "tier")
+
+    def __init__(self, oid, uid, key, side, price, qty, bracket=None, tier=0):
+        self.oid, self.uid, self.key, self.side, self.price = oid, uid, key, side, price
+        self.rem, self.live, self.reserved, self.bracket, self.tier = qty, True, 0.0, bracket, tier
+
+
+class Book:
+    def __init__(self, seed):
+        self.bids, self.asks = [], []  # heaps of (-price | price, seq, Order)
+        self.last = seed
+        self.stops = []  # [uid, side, trigger, qty, trail_frac, extreme]
+
+    def _top(self, heap):
+        while heap and not heap[0][2].live:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def best_bid(self):
+        return self._top(self.bids)
+
+    def best_ask(self):
+        return self._top(self.asks)
+
+    def mid(self):
+        b, a = self.best_bid(), self.best_ask()
+        return (b.price + a.price) / 2 if b and a else None
+
+    def ref(self):
+        return self.mid() or self.last
+
+
+class Bot:
+    __slots__ = ("uid", "p", "home", "watch", "orders", "interval", "mm")
+
+    def __init__(self, p, keys):
+        self.uid = int(p["UserId"])
+        self.p = {k: float(v or 0) for k, v in p.items() if k not in ("WatchlistCsv", "HomeCurrency")}
+        self.home = str(p.get("HomeCurrency") or "USD")
+        wl = [int(s) for s in str(p.get("WatchlistCsv") or "").split(",") if s.strip().isdigit()]
+        self.watch = [(s, self.home) for s in wl if (s, self.home) in keys] or \
+            [k for k in keys if k[1] == self.home][:10]
+        self.orders = deque()
+        self.interval = max(1.0, self.p["DecisionIntervalSeconds"])
+        self.mm = int(self.p.get("Strategy", 3)) in MM_STRATEGIES
+
+
+class Market:
+    def __init__(self, args, stocks, listings, profiles, hhead, holdings):
+        self.args = args
+        self.k = dict(KNOBS, **args.knobs)
+        self.rng = random.Random(args.seed)
+        self.seed_px = listings
+        self.books = {key: Book(p) for key, p in listings.items()}
+        self.fx = {"USD": 1.0, "EUR": 1.08}  # Config.FX_BASE_RATES EUR/USD, for portfolio valuation only
+        self.bots = {}
+        for p in profiles:
+            if self.rng.random() <= args.fleet_frac:
+                b = Bot(p, self.books)
+                if b.watch:
+                    self.bots[b.uid] = b
+        self.cash, self.pos = {}, {}  # uid -> {ccy: [total, reserved]}, uid -> {sid: [qty, reserved]}
+        tick_cols = hhead[2:2 + len(stocks)]
+        for r in holdings:
+            uid = int(r[0])
+            if uid not in self.bots:
+                continue
+            home = self.bots[uid].home
+            other = "EUR" if home == "USD" else "USD"
+            sec = float(r[hhead.index("BalanceSecondary")] or 0) if "BalanceSecondary" in hhead else 0.0
+            self.cash[uid] = {home: [float(r[1] or 0), 0.0], other: [sec, 0.0]}
+            self.pos[uid] = {sid: [int(q or 0), 0] for sid, q in zip(stocks, r[2:2 + len(tick_cols)]) if q}
+        for uid in self.bots:
+            self.cash.setdefault(uid, {"USD": [0.0, 0.0], "EUR": [0.0, 0.0]})
+            self.pos.setdefault(uid, {})
+        # per-stock sentiment: BotSentimentService rings, advanced once per simulated second
+        sids = sorted({s for s, _ in self.books})
+        self.sidx = {s: i for i, s in enumerate(sids)}
+        self.ring = [[0.0] * len(sentiment_sim.PS_TAU) for _ in sids]
+        self.glob = [0.0] * len(sentiment_sim.GLOBAL_TAU)
+        self.sent = [0.0] * len(sids)
+        self.seq = 0
+        self.next_oid = 1
+        self.tx = []
+        self.t = 0.0
+
+    # --- sentiment ---
+    def tick_sentiment(self):
+        u = lambda: (self.rng.random() * 2 - 1) * sentiment_sim.SQRT3
+        gs = 0.0
+        for k, (tau, sig) in enumerate(zip(sentiment_sim.GLOBAL_TAU, sentiment_sim.GLOBAL_SIG)):
+            a = math.exp(-1.0 / tau)
+            self.glob[k] = a * self.glob[k] + sig * math.sqrt(1 - a * a) * u()
+            gs += self.glob[k]
+        coef = [(math.exp(-1.0 / t), s * math.sqrt(1 - math.exp(-2.0 / t)))
+                for t, s in zip(sentiment_sim.PS_TAU, sentiment_sim.PS_SIG)]
+        for i, ring in enumerate(self.ring):
+            s = gs
+            for k, (a, n) in enumerate(coef):
+                ring[k] = a * ring[k] + n * u()
+                s += ring[k]
+            self.sent[i] = s
+
+    # --- accounts ---
+    def portfolio(self, uid, ccy):
+        v = sum(c[0] * self.fx[cur] for cur, c in self.cash[uid].items())
+        for sid, (q, _) in self.pos[uid].items():
+            if q:
+                b = self.books.get((sid, ccy)) or self.books.get((sid, "USD")) or self.books.get((sid, "EUR"))
+                v += q * b.last * self.fx[ccy if (sid, ccy) in self.books else ("USD" if (sid, "USD") in self.books else "EUR")]
+        return max(0.0, v / self.fx[ccy])
+
+    def release(self, o):
+        if o.side == BUY:
+            self.cash[o.uid][o.key[1]][1] -= o.reserved
+        else:
+            self.pos[o.uid][o.key[0]][1] -= o.reserved
+        o.reserved = 0.0
+
+    def cancel(self, o):
+        if o.live:
+            o.live = False
+            self.release(o)
+
+    # --- matching ---
+    def submit(self, uid, key, side, qty, limit=None, bracket=None, tier=0, ioc=False):
+        """Match an incoming order; a limit remainder rests unless ioc. Returns filled quantity."""
+        if qty <= 0:
+            return 0
+        book = self.books[key]
+        sid, ccy = key
+        o = Order(self.next_oid, uid, key, side, limit, qty, bracket, tier)
+        self.next_oid += 1
+        mid = book.mid()
+        filled = 0
+        cash, pos = self.cash[uid][ccy], self.pos[uid].setdefault(sid, [0, 0])
+        opp = book.asks if side == BUY else book.bids
+        while o.rem > 0:
+            top = book.best_ask() if side == BUY else book.best_bid()
+            if top is None or top.uid == uid:
+                break
+            px = top.price
+            if limit is not None and (px > limit if side == BUY else px < limit):
+                break
+            q = min(o.rem, top.rem)
+            if side == BUY:
+                q = min(q, int((cash[0] - cash[1]) // px))
+            if q <= 0:
+                break
+            self.fill(o if side == BUY else top, top if side == BUY else o, px, q, mid)
+            filled += q
+            if top.rem == 0:
+                top.live = False
+                heapq.heappop(opp)
+        if o.rem > 0 and limit is not None and not ioc:
+            if side == BUY:
+                o.rem = min(o.rem, int((cash[0] - cash[1]) // limit))
+                o.reserved = o.rem * limit
+                cash[1] += o.reserved
+            else:
+                o.reserved = o.rem
+                pos[1] += o.rem
+            if o.rem > 0:
+                self.seq += 1
+                heapq.heappush(book.bids if side == BUY else book.asks, ((-limit if side == BUY else limit), self.seq, o))
+                self.bots[uid].orders.append(o)
+                return filled
+        o.live = False
+        return filled
+
+    def fill(self, buy, sell, px, q, mid):
+        sid, ccy = buy.key
+        notional = px * q
+        for o in (buy, sell):
+            if o.reserved:  # a resting order's reservation shrinks with its fill
+                if o.side == BUY:
+                    part = q * o.price
+                    self.cash[o.uid][ccy][1] -= part
+                    o.reserved -= part
+                else:
+                    self.pos[o.uid][sid][1] -= q
+                    o.reserved -= q
+            o.rem -= q
+        self.cash[buy.uid][ccy][0] -= notional
+        self.cash[sell.uid][ccy][0] += notional
+        self.pos[buy.uid].setdefault(sid, [0, 0])[0] += q
+        self.pos[sell.uid].setdefault(sid, [0, 0])[0] -= q
+        self.books[buy.key].last = px
+        self.tx.append((len(self.tx) + 1, sid, ccy, px, mid, q, buy.uid, sell.uid, buy.oid, sell.oid, self.t))
+        for o in (buy, sell):
+            if o.bracket:
+                self.arm_bracket(o, px, q)
+
+    def arm_bracket(self, o, px, q):
+        tp, sd = o.bracket
+        exit_side = SELL if o.side == BUY else BUY
+        tp_px = px * (1 + tp) if exit_side == SELL else px * (1 - tp)
+        self.submit(o.uid, o.key, exit_side, q, limit=tp_px)
+        trig = px * (1 - sd) if exit_side == SELL else px * (1 + sd)
+        self.books[o.key].stops.append([o.uid, exit_side, trig, q, 0.0, px])
+
+    def run_stops(self, key):
+        book = self.books[key]
+        for _ in range(5):  # a fired stop can fire the next; bound the cascade per event
+            fired, keep = [], []
+            for s in book.stops:
+                uid, side, trig, q, trail, ext = s
+                if trail:
+                    ext = max(ext, book.last) if side == SELL else min(ext, book.last)
+                    s[5], s[2] = ext, ext * (1 - trail) if side == SELL else ext * (1 + trail)
+                (fired if (book.last <= s[2] if side == SELL else book.last >= s[2]) else keep).append(s)
+            book.stops = keep
+            if not fired:
+                return
+            for uid, side, _, q, _, _ in fired:
+                if side == SELL:
+                    have = self.pos[uid].get(key[0], [0, 0])
+                    q = min(q, max(0, have[0] - have[1]))
+                self.submit(uid, key, side, q)
+
+    # --- bots ---
+    def draw(self, lo, hi):
+        return lo + (hi - lo) * self.rng.random()
+
+    def decide(self, bot):
+        rng, p, k = self.rng, bot.p, self.k
+        key = bot.watch[int(rng.random() * len(bot.watch))]
+        book = self.books[key]
+        ref = book.ref()
+        while bot.orders and not bot.orders[0].live:
+            bot.orders.popleft()
+        cap = max(1, int(p["MaxOpenOrders"]))
+        while len(bot.orders) >= cap:
+            self.cancel(bot.orders.popleft())
+        port = self.portfolio(bot.uid, key[1])
+        cash = self.cash[bot.uid][key[1]]
+        pos = self.pos[bot.uid].setdefault(key[0], [0, 0])
+        u = rng.random() ** (1 + 3 * k["TAIL_SHAPE"])
+        size = min((p["MinTradeAmountPrc"] + (p["MaxTradeAmountPrc"] - p["MinTradeAmountPrc"]) * u)
+                   * (1 + rng.random() * p["AggressivenessPrc"]), p["MaxTradeAmountPrc"]) * port
+        dist = k["DISTANCE_MULT"]
+
+        if bot.mm:
+            for o in [o for o in bot.orders if o.live and o.key == key]:
+                self.cancel(o)
+            q = max(1, int(size / ref))
+            h = k["QUOTE_HALF_SPREAD"]
+            self.submit(bot.uid, key, BUY, q, limit=ref * (1 - h))
+            if pos[0] - pos[1] > 0:
+                self.submit(bot.uid, key, SELL, min(q, pos[0] - pos[1]), limit=ref * (1 + h))
+            return
+
+        r = rng.random()
+        sd = self.draw(p["StopDistanceMinPrc"] or 0.01, p["StopDistanceMaxPrc"] or 0.02) * dist
+        tp = self.draw(p["TpOffsetMinPrc"] or 0.01, p["TpOffsetMaxPrc"] or 0.02) * dist
+        free = pos[0] - pos[1]
+        acc = p["StopProb"]
+        if r < acc and free > 0:
+            book.stops.append([bot.uid, SELL, ref * (1 - sd), max(1, free // 2), 0.0, ref])
+            return
+        acc += p["TrailingProb"]
+        if r < acc and free > 0:
+            book.stops.append([bot.uid, SELL, ref * (1 - sd), max(1, free // 2), sd, ref])
+            return
+        bracket, short = None, False
+        acc += p["ShortProb"]
+        if r < acc:
+            short = True
+        elif r < acc + p["LongBracketProb"]:
+            bracket = (tp, sd)
+        elif r < acc + p["LongBracketProb"] + p["ShortBracketProb"]:
+            short, bracket = True, (tp, sd)
+
+        s = self.sent[self.sidx[key[0]]]
+        buy_p = min(0.98, max(0.02, p["BuyBiasPrc"] + k["SENTIMENT_MAX_BIAS"] * max(-1.0, min(1.0, s))))
+        side = SELL if short else (BUY if rng.random() < buy_p else SELL)
+        if side == BUY:
+            reserve = self.draw(p["MinCashReservePrc"], p["MaxCashReservePrc"]) * port
+            room = max(0.0, p["PerPositionMaxPrc"] * port - max(0, pos[0]) * ref)
+            size = min(size, max(0.0, cash[0] - cash[1] - reserve), room)
+        q = int(size / ref) if ref > 0 else 0
+        if side == SELL:
+            if short:
+                short_room = int(max(0.0, p["PerPositionMaxPrc"] * port / ref + min(0, pos[0])))
+                q = min(max(q, 1), short_room)
+            else:
+                q = min(q if q > 0 else free, max(0, free))
+        if q <= 0:
+            return
+
+        t = rng.random()
+        if t < p["UseMarketProb"] * k["MARKET_PROB_MULT"] and not bracket:
+            self.submit(bot.uid, key, side, q)
+        elif t < p["UseMarketProb"] * k["MARKET_PROB_MULT"] + p["UseSlippageMarketProb"] and not bracket:
+            slip = p["SlippageTolerancePrc"]
+            self.submit(bot.uid, key, side, q, limit=ref * (1 + slip if side == BUY else 1 - slip), ioc=True)
+        else:
+            v = rng.random()
+            far_open = sum(1 for o in bot.orders if o.live and o.tier == 2)
+            if v < k["TIER_CLOSE"]:
+                lo, hi, tier = p["MinLimitOffsetPrc"], p["MaxLimitOffsetPrc"], 0
+            elif v < k["TIER_CLOSE"] + k["TIER_MID"] and p["MidLimitMaxPrc"] > 0:
+                lo, hi, tier = p["MidLimitMinPrc"], p["MidLimitMaxPrc"], 1
+            elif p["FarLimitMaxPrc"] > 0 and far_open < p["FarBudgetPrc"] * cap:
+                lo, hi, tier = p["FarLimitMinPrc"], p["FarLimitMaxPrc"], 2
+            else:
+                lo, hi, tier = p["MinLimitOffsetPrc"], p["MaxLimitOffsetPrc"], 0
+            lo, hi = lo * dist, hi * dist
+            off = self.draw(lo, hi)
+            off = max(lo, min(hi, off * (1 + (rng.random() * 2 - 1) * p["AggressivenessPrc"])))
+            px = ref * (1 - off) if side == BUY else ref * (1 + off)
+            self.submit(bot.uid, key, side, q, limit=px, bracket=bracket, tier=tier)
+        self.run_stops(key)
+
+    def run(self, seconds):
+        heap = [(self.rng.random() * b.interval, b.uid) for b in self.bots.values()]
+        heapq.heapify(heap)
+        next_sec = 0.0
+        while heap and heap[0][0] < seconds:
+            t, uid = heapq.heappop(heap)
+            while next_sec <= t:
+                self.tick_sentiment()
+                next_sec += 1.0
+            self.t = t
+            bot = self.bots[uid]
+            if self.rng.random() < bot.p["TradeProb"]:
+                self.decide(bot)
+            heapq.heappush(heap, (t + bot.interval * (0.5 + self.rng.random()), uid))
+
+
+def tx_rows(tx, t0):
+    """Transactions rows as strings, timestamps offset by t0 (epoch seconds)."""
+    for tid, sid, ccy, px, mid, q, buyer, seller, boid, soid, t in tx:
+        ts = datetime.fromtimestamp(t0 + t, timezone.utc).isoformat()
+        yield (tid, sid, ccy, f"{px:.10f}", "" if mid is None else f"{mid:.10f}", q, buyer, seller, boid, soid, ts)
+
+
+def write_db(db, tx, t0, replace):
+    buf = io.StringIO()
+    if replace:
+        buf.write('TRUNCATE "Transactions";\n')
+    cols = ",".join(f'"{c}"' for c in TX_COLUMNS if c != "TransactionId")
+    buf.write(f'COPY "Transactions" ({cols}) FROM STDIN WITH (FORMAT csv);\n')
+    w = csv.writer(buf, lineterminator="\n")
+    for r in tx_rows(tx, t0):
+        w.writerow(r[1:])  # let the identity column number them after any existing rows
+    buf.write("\\.\n")
+    kse_db._run(db, buf.getvalue())
+
+
+def write_tape(name, tx, t0):
+    tape = tape_cache.Tape(name)
+    tape.reset()
+    tape.meta["oid"], tape.meta["has_mid"] = 0, True
+    for i in range(0, len(tx), tape_cache.BATCH):
+        tape.ingest([(tid, sid, ccy, t0 + t, px, mid if mid is not None else "", q, b, s)
+                     for tid, sid, ccy, px, mid, q, b, s, _, _, t in tx[i:i + tape_cache.BATCH]])
+    return tape
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--xlsx", default=XLSX)
+    ap.add_argument("--minutes", type=float, default=45.0)
+    ap.add_argument("--fleet-frac", type=float, default=1.0, help="sample this share of the bots")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--set", action="append", default=[], help=f"KNOB=value; knobs: {', '.join(KNOBS)}")
+    ap.add_argument("--tape", default="", help="also write the tape_cache under this name")
+    ap.add_argument("--db", default="", help="also COPY the trades into this DB's Transactions")
+    ap.add_argument("--replace", action="store_true", help="with --db: TRUNCATE Transactions first")
+    ap.add_argument("--out", default="", help="output dir (default data/sim/market-<ts>)")
+    args = ap.parse_args()
+    args.knobs = {}
+    for s in args.set:
+        k, _, v = s.partition("=")
+        if k not in KNOBS:
+            sys.exit(f"unknown knob {k!r}; knobs: {', '.join(KNOBS)}")
+        args.knobs[k] = float(v)
+
+    t0 = time.perf_counter()
+    m = Market(args, *load_workbook(args.xlsx))
+    t1 = time.perf_counter()
+    print(f"{len(m.bots)} bots, {len(m.books)} books loaded in {t1 - t0:.1f}s - simulating {args.minutes:g} min")
+    m.run(args.minutes * 60)
+    wall = time.perf_counter() - t1
+    print(f"{len(m.tx):,} trades in {wall:.1f}s ({args.minutes * 60 / max(wall, 1e-9):.0f}x real time)")
+
+    end = time.time()
+    start = end - args.minutes * 60
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    out = args.out or os.path.join(ROOT, "data", "sim", f"market-{ts}")
+    os.makedirs(out, exist_ok=True)
+    with gzip.open(os.path.join(out, "transactions.csv.gz"), "wt", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(TX_COLUMNS)
+        w.writerows(tx_rows(m.tx, start))
+    per = {}
+    for r in m.tx:
+        per[r[1:3]] = per.get(r[1:3], 0) + 1
+    moves = sorted((b.last / m.seed_px[key] - 1) * 100 for key, b in m.books.items() if key in per)
+    if moves:
+        print(f"books traded {len(per)}/{len(m.books)}  median move {moves[len(moves) // 2]:+.2f}%  "
+              f"range {moves[0]:+.1f}%..{moves[-1]:+.1f}%")
+    print(f"-> {out}")
+    if args.tape:
+        print(f"tape -> {write_tape(args.tape, m.tx, start).dir}")
+    if args.db:
+        try:
+            write_db(args.db, m.tx, start, args.replace)
+        except kse_db.QueryError as ex:
+            sys.exit(str(ex))
+        print(f"{len(m.tx):,} rows -> {args.db}.\"Transactions\"")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Liquidity-quality metrics over the cached tape, vectorized: spreads, price impact, lambda, sign memory.
+
+Transactions.MidPrice (the touch mid captured on taker arrival, Bots:BounceReference) only fed the
+bounce ACF checks. With it every trade has a quote to be measured against, so per (book, --res bucket)
+this computes, in NumPy over the tape_cache columns:
+
+  eff_bps       effective spread 2 s (P - M) / M, qty-weighted, s = the trade's sign
+  real_<h>      realized spread 2 s (P - M_h) / M at each --horizons h (seconds), M_h the mid in force at
+                t + h (the MidPrice of the book's first trade at or after it); impact_<h> = eff - real
+  lambda        Kyle's lambda: OLS slope of the next trade's mid change (bps) on signed notional, in
+                bps per 100k of the book's currency
+  amihud        |log mid change over the bucket| / notional, in bps per 1M
+  acf<k>        trade-sign autocorrelation at each --lags k, pairs within the book and bucket
+  mm_share      share of qty with a market-maker cohort bot (AIUsers.Strategy 6, sized by
+                Config.MARKET_MAKER_COHORT_SIZE) on either side
+
+Signs: + when P > M (buyer-initiated), - when P < M, and the tick rule (carrying the last non-zero
+price change) where the mid is missing or equals the price. Without MidPrice on the tape (flag off)
+only lambda (on the trade price), amihud, acf and mm_share are filled.
+
+Rows go to data/micro/<name>/micro-<res>.csv; the pooled per-bucket and whole-window figures are
+printed. The tape is synced first (--db) unless --tape names an existing cache (e.g. a synth_tape.py
+--tape one).
+
+Usage: py scripts/microstructure.py [--db kse_soak] [--tape NAME] [--res 1h] [--window-min 0]
+       [--horizons 5,30,300] [--lags 1,5,10] [--live]
+"""
+import argparse, csv, os, sys, time
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import tape_cache
+from depth_replay import parse_res
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Tools"))
+import Config
+
+OUT_DIR = os.path.join(ROOT, "data", "micro")
+MM_STRATEGY = 6  # AiStrategy.MarketMakerHouse, the MARKET_MAKER_COHORT_SIZE cohort
+MM_SQL = f'SELECT "UserId" FROM "AIUsers" WHERE "Strategy" = {MM_STRATEGY};'
+
+
+def load(tape, window_min):
+    """Tape columns as arrays, sorted by (book, ts), limited to the last window_min minutes."""
+    c = {k: np.frombuffer(tape.cols[k], dtype=tape.cols[k].typecode) for k in
+         ("sid", "ccy", "ts", "px", "mid", "qty", "buyer", "seller")}
+    if window_min and tape.n:
+        keep = c["ts"] >= c["ts"].max() - window_min * 60
+        c = {k: v[keep] for k, v in c.items()}
+    book = c["sid"].astype(np.int64) * 8 + (c["ccy"].astype(np.int64) + 1)
+    order = np.lexsort((c["ts"], book))
+    c = {k: v[order] for k, v in c.items()}
+    c["book"] = book[order]
+    return c
+
+
+def signs(c):
+    """+1 / -1 per trade: quote rule against the mid, tick rule (within the book) where it can't decide."""
+    px, mid, book = c["px"], c["mid"], c["book"]
+    s = np.sign(px - mid)
+    s[np.isnan(s)] = 0
+    dp = np.zeros(len(px))
+    dp[1:] = np.sign(px[1:] - px[:-1])
+    dp[1:][book[1:] != book[:-1]] = 0
+    # carry the last non-zero price change forward, without crossing into the next book
+    start = np.r_[True, book[1:] != book[:-1]]
+    idx = np.where((dp != 0) | start, np.arange(len(px)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    tick = dp[idx]
+    s = np.where(s != 0, s, tick)
+    return np.where(s != 0, s, 1.0)  # a book's opening run of flat prints counts as buys
+
+
+def forward_index(c, h):
+    """Index of each trade's book's first trade at or after ts + h, -1 where there is none."""
+    ts, book = c["ts"], c["book"]
+    if not len(ts):
+        return np.zeros(0, dtype=np.int64)
+    rank = np.unique(book, return_inverse=True)[1].astype(np.float64)
+    span = ts.max() - ts.min() + h + 1.0
+    key = rank * span + (ts - ts.min())
+    j = np.searchsorted(key, key + h, side="left")
+    ok = j < len(ts)
+    j = np.where(ok, j, 0)
+    return np.where(ok & (book[j] == book), j, -1)
+
+
+def metrics(c, s, group, ngroups, horizons, lags):
+    """Per-group metric columns for a group id per trade (trades in (book, ts) order)."""
+    px, mid, qty, book = c["px"], c["mid"], c["qty"].astype(np.float64), c["book"]
+    bc = lambda w, m=None: np.bincount(group if m is None else group[m], weights=w, minlength=ngroups)
+    ratio = lambda a, b: np.divide(a, b, out=np.full(ngroups, np.nan), where=b > 0)
+    out = {"trades": np.bincount(group, minlength=ngroups), "qty": bc(qty)}
+    notional = px * qty
+    out["notional"] = bc(notional)
+    has = ~np.isnan(mid)
+    out["mid_cov"] = ratio(bc(has.astype(np.float64)), out["trades"].astype(np.float64))
+    eff = np.where(has, 2 * s * (px - mid) / np.where(has, mid, 1) * 1e4, 0.0)
+    wq = np.where(has, qty, 0.0)
+    out["eff_bps"] = ratio(bc(eff * wq), bc(wq))
+    for h in horizons:
+        j = forward_index(c, h)
+        ok = has & (j >= 0)
+        mf = np.where(ok, mid[np.maximum(j, 0)], np.nan)
+        ok &= ~np.isnan(mf)
+        real = np.where(ok, 2 * s * (px - np.where(ok, mf, 0)) / np.where(has, mid, 1) * 1e4, 0.0)
+        w = np.where(ok, qty, 0.0)
+        out[f"real_{h:g}"] = ratio(bc(real * w), bc(w))
+        out[f"impact_{h:g}"] = out["eff_bps"] - out[f"real_{h:g}"]
+
+    # lambda: next trade's reference change vs this trade's signed notional, same book and group
+    ref = np.where(has, mid, px)
+    same = np.r_[(book[1:] == book[:-1]) & (group[1:] == group[:-1]), False]
+    nxt = np.r_[ref[1:], np.nan]
+    y = np.where(same, (nxt - ref) / ref * 1e4, 0.0)
+    x = np.where(same, s * notional / 1e5, 0.0)
+    m = same.astype(np.float64)
+    n, sx, sy, sxy, sxx = bc(m), bc(x), bc(y), bc(x * y), bc(x * x)
+    out["lambda"] = ratio(n * sxy - sx * sy, n * sxx - sx * sx)
+
+    # amihud: |log(last ref / first ref)| of the group over its notional
+    first = np.r_[True, (group[1:] != group[:-1]) | (book[1:] != book[:-1])]
+    last = np.r_[first[1:], True]  # first / last trade of each contiguous (book, group) run
+    lr = np.abs(np.log(ref[last] / ref[first])) * 1e4
+    seg_group = group[first]
+    out["amihud"] = ratio(np.bincount(seg_group, weights=lr, minlength=ngroups), out["notional"] / 1e6)
+
+    sm = bc(s)
+    mean = ratio(sm, out["trades"].astype(np.float64))
+    for k in lags:
+        ok = np.zeros(len(s), dtype=bool)
+        if k < len(s):
+            ok[:-k] = (book[k:] == book[:-k]) & (group[k:] == group[:-k])
+        prod = np.where(ok, s * np.r_[s[k:], np.zeros(k)], 0.0)
+        cov = ratio(bc(prod), bc(ok.astype(np.float64))) - mean ** 2
+        out[f"acf{k}"] = ratio(cov, 1 - mean ** 2)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="kse_soak")
+    ap.add_argument("--tape", default="", help="read this tape_cache as-is instead of syncing --db")
+    ap.add_argument("--res", default="1h", help="bucket size: 5m, 1h, 1d, ...")
+    ap.add_argument("--window-min", type=float, default=0.0, help="only the tape's last N minutes (0 = all)")
+    ap.add_argument("--horizons", default="5,30,300", help="realized-spread horizons, seconds")
+    ap.add_argument("--lags", default="1,5,10", help="trade-sign ACF lags")
+    ap.add_argument("--live", action="store_true", help="soak still running: leave the newest trades for later")
+    args = ap.parse_args()
+
+    res = parse_res(args.res)
+    horizons = [float(h) for h in args.horizons.split(",") if h]
+    lags = [int(k) for k in args.lags.split(",") if k]
+    name = args.tape or args.db
+    t0 = time.perf_counter()
+    tape = tape_cache.Tape(name)
+    mm = np.zeros(0, dtype=np.int64)
+    try:
+        if not args.tape:
+            added = tape.sync(final=not args.live)
+            print(f"tape {name}: {tape.n:,} trades ({added:,} new)")
+        if not args.tape or args.tape == args.db:
+            mm = np.array([int(r[0]) for r in kse_db.rows(args.db, MM_SQL)], dtype=np.int64)
+    except kse_db.QueryError as ex:
+        if not args.tape:
+            sys.exit(str(ex))
+        print(f"no cohort lookup ({ex}); mm_share left empty")
+    if not tape.n:
+        sys.exit(f"tape {name} is empty")
+
+    c = load(tape, args.window_min)
+    s = signs(c)
+    bucket = (c["ts"] // res).astype(np.int64)
+    books, book_ix = np.unique(c["book"], return_inverse=True)
+    buckets, bucket_ix = np.unique(bucket, return_inverse=True)
+    t1 = time.perf_counter()
+    per_book = metrics(c, s, book_ix * len(buckets) + bucket_ix, len(books) * len(buckets), horizons, lags)
+    per_bucket = metrics(c, s, bucket_ix, len(buckets), horizons, lags)
+    whole = metrics(c, s, np.zeros(len(s), dtype=np.int64), 1, horizons, lags)
+    if mm.size:
+        q = c["qty"].astype(np.float64)
+        with_mm = (np.isin(c["buyer"], mm) | np.isin(c["seller"], mm)) * q
+        for out, g, ng in ((per_book, book_ix * len(buckets) + bucket_ix, len(books) * len(buckets)),
+                           (per_bucket, bucket_ix, len(buckets)), (whole, np.zeros(len(s), dtype=np.int64), 1)):
+            out["mm_share"] = np.bincount(g, weights=with_mm, minlength=ng) / np.maximum(out["qty"], 1)
+    compute = time.perf_counter() - t1
+
+    cols = ["trades", "qty", "notional", "mid_cov", "eff_bps",
+            *(f"{p}_{h:g}" for h in horizons for p in ("real", "impact")), "lambda", "amihud",
+            *(f"acf{k}" for k in lags), "mm_share"]
+    fmt = lambda v: "" if v is None or v != v else (f"{v:.6g}" if isinstance(v, float) else str(v))
+    out_dir = os.path.join(OUT_DIR, name)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"micro-{args.res}.csv")
+    utc = lambda b: datetime.fromtimestamp(b * res, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["bucket", "utc", "stock", "ccy", *cols])
+        for bi, bk in enumerate(books):
+            sid, ci = divmod(int(bk), 8)
+            ccy = tape_cache.CCY[ci - 1] if 0 < ci <= len(tape_cache.CCY) else "?"
+            for ui, b in enumerate(buckets):
+                g = bi * len(buckets) + ui
+                if per_book["trades"][g]:
+                    w.writerow([int(b * res), utc(b), sid, ccy,
+                                *(fmt(per_book[k][g].item()) if k in per_book else "" for k in cols)])
+
+    show = ["trades", "eff_bps", *(f"real_{h:g}" for h in horizons), "lambda", "amihud", f"acf{lags[0]}", "mm_share"]
+    f = lambda v: "-" if v != v else f"{v:.3g}"
+    print(f"{len(c['ts']):,} trades, {len(books)} books x {len(buckets)} buckets of {args.res}; "
+          f"metrics in {compute:.2f}s (total {time.perf_counter() - t0:.1f}s). "
+          f"MARKET_MAKER_COHORT_SIZE={Config.MARKET_MAKER_COHORT_SIZE}, {mm.size} cohort bots on this DB")
+    if not (whole["mid_cov"][0] > 0):
+        print("no MidPrice on this tape (Bots:BounceReference off): no spreads, tick-rule signs, lambda on trade prices (bounce-biased)")
+    print(f"{'bucket':<17} " + " ".join(f"{k:>10}" for k in show))
+    rows = [(utc(b)[:16], {k: per_bucket[k][i] for k in show if k in per_bucket}) for i, b in enumerate(buckets)]
+    for label, r in rows[-20:] + [("all", {k: whole[k][0] for k in show if k in whole})]:
+        print(f"{label:<17} " + " ".join(f"{f(float(r[k])) if k in r else '-':>10}" for k in show))
+    print(f"-> {path}")
+
+
+if __name__ == "__main__":
+    main()
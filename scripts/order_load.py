@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""Concurrent human-user load on the order-entry HTTP API, with per-endpoint latency percentiles.
+
+kse-order-smoke.ps1 checks that each order type WORKS; this measures how OrderController /
+OrderEntryService BEHAVE under N concurrent human traders on top of the bot loop. It logs N synthetic
+users in via /api/auth/login (self-registering them with --register; JWTs are cached under
+data/loadgen/ so reruns skip the 10/min auth limiter), then drives an open-loop Poisson arrival
+stream of limit / market / stop / modify / cancel requests at --rate req/s over one pooled aiohttp
+session. Latency is measured from the INTENDED send time, so a stalled server shows up in the tail
+instead of silently lowering the offered load (coordinated omission).
+
+Orders are kept harmless: limits rest well away from the touch, stops are buy-stops far above it,
+market orders are qty-1 buys with a budget cap (or sells of shares the user already filled). Every
+resting order left at the end is cancelled via /cancel-batch unless --no-cleanup.
+
+Outcome classes per endpoint: ok (2xx + accepted OrderResult), rejected (2xx but a business failure
+status), throttled (429 — the per-user 'orders' limiter is 60/min, so keep rate/users <= 1), error
+(anything else). Report: p50/p95/p99/p99.9 ms + rates, and a JSON file with the HDR histograms
+(hdr_hist.Histogram.to_dict) under data/loadgen/ for later comparison; --hgrm writes .hgrm files too.
+
+Requires aiohttp (pip install aiohttp). Run against the local docker-compose Postgres + dotnet server.
+
+Usage: py scripts/order_load.py --users 50 --rate 40 --duration 120 [--register]
+       [--mix limit=40,market=10,stop=15,modify=20,cancel=15] [--stocks 1-20] [--currency USD]
+"""
+import argparse, asyncio, json, random, sys, time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from hdr_hist import Histogram
+
+try:
+    import aiohttp
+except ImportError:
+    sys.exit("order_load.py needs aiohttp:  pip install aiohttp")
+
+ROOT = Path(__file__).resolve().parent.parent
+OUT_DIR = ROOT / "data" / "loadgen"
+TOKENS = OUT_DIR / "tokens.json"
+
+# OrderResult.Status values that mean the engine accepted the request.
+ACCEPTED = {"Success", "PartialFill", "Filled", "PlacedOnBook"}
+OPS = ("limit", "market", "stop", "modify", "cancel")
+
+
+def parse_mix(s):
+    mix = {}
+    for part in s.split(","):
+        k, _, v = part.partition("=")
+        if k.strip() not in OPS:
+            sys.exit(f"unknown op in --mix: {k!r} (expected {', '.join(OPS)})")
+        mix[k.strip()] = float(v)
+    return mix
+
+
+def parse_stocks(s):
+    ids = []
+    for part in s.split(","):
+        lo, _, hi = part.partition("-")
+        ids.extend(range(int(lo), int(hi or lo) + 1))
+    return ids
+
+
+class Stats:
+    """Per-endpoint latency histograms (us) + outcome counters."""
+
+    def __init__(self):
+        self.hist = defaultdict(Histogram)
+        self.outcomes = defaultdict(lambda: defaultdict(int))
+
+    def add(self, endpoint, lat_us, outcome):
+        self.hist[endpoint].record(lat_us)
+        self.outcomes[endpoint][outcome] += 1
+
+
+class User:
+    def __init__(self, name, uid, token):
+        self.name, self.uid, self.token = name, uid, token
+        self.resting = deque()  # (orderId, kind, stockId, side), kind in {"limit", "stop"}
+        self.held = defaultdict(int)  # stockId -> shares filled by this run
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+# -- login -------------------------------------------------------------------------------------------
+
+def load_token_cache():
+    try:
+        return json.loads(TOKENS.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+async def auth_post(session, base, path, body):
+    """POST to /api/auth/*, waiting out the 10/min per-IP limiter on 429."""
+    while True:
+        async with session.post(f"{base}/api/auth/{path}", json=body) as r:
+            if r.status != 429:
+                return r.status, (await r.json(content_type=None) if r.status < 500 else None)
+        wait = 61 - (time.time() % 60)
+        print(f"  auth limiter hit — waiting {wait:.0f}s for the next window", flush=True)
+        await asyncio.sleep(wait)
+
+
+async def login_users(session, args):
+    cache = load_token_cache()
+    now = datetime.now(timezone.utc).isoformat()
+    users = []
+    for i in range(args.users):
+        name = f"{args.user_prefix}{i:05d}"
+        c = cache.get(f"{args.base}|{name}")
+        if c and c["expires"] > now:
+            users.append(User(name, c["userId"], c["token"]))
+            continue
+        st, body = await auth_post(session, args.base, "login", {"Username": name, "Password": args.password})
+        if st == 401 and args.register:
+            st, body = await auth_post(session, args.base, "register", {
+                "Username": name, "Password": args.password, "Email": f"{name}@load.test",
+                "FullName": f"Load User {i}", "BirthDate": "1990-01-01T00:00:00Z"})
+        if st != 200 or not body:
+            sys.exit(f"login failed for {name}: HTTP {st} {body}  (use --register to create the users)")
+        users.append(User(name, body["userId"], body["token"]))
+        cache[f"{args.base}|{name}"] = {"userId": body["userId"], "token": body["token"],
+                                        "expires": body["expiresUtc"]}
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    TOKENS.write_text(json.dumps(cache, indent=1), encoding="utf-8")
+    return users
+
+
+# -- market prices -----------------------------------------------------------------------------------
+
+async def fetch_prices(session, args, headers, prices):
+    for sid in args.stock_ids:
+        try:
+            async with session.get(f"{args.base}/api/market-lookup/latest-price/{sid}/{args.currency}",
+                                   headers=headers) as r:
+                v = await r.json(content_type=None) if r.status == 200 else None
+            if v:
+                prices[sid] = float(v)
+        except aiohttp.ClientError:
+            pass
+
+
+async def refresh_prices(session, args, headers, prices, stop):
+    """Keep order prices anchored to the live market while the run lasts (every 10s)."""
+    while True:
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=10)
+            return
+        except asyncio.TimeoutError:
+            await fetch_prices(session, args, headers, prices)
+
+
+# -- one request -------------------------------------------------------------------------------------
+
+def money(x):
+    return round(x, 2)
+
+
+def build(op, user, prices, args, rng):
+    """(endpoint label, url, json body, placed-order info) for one operation; falls back to a resting
+    limit when a modify/cancel has nothing to act on."""
+    base = args.base
+    if op in ("modify", "cancel") and not user.resting:
+        op = "limit"
+    sid = rng.choice([s for s in args.stock_ids if s in prices] or args.stock_ids)
+    px = prices.get(sid, 100.0)
+    ccy = args.currency
+
+    if op == "limit":
+        side = "Sell" if user.held[sid] > 0 and rng.random() < 0.5 else "Buy"
+        off = rng.uniform(0.03, 0.08)
+        price = money(px * (1 - off) if side == "Buy" else px * (1 + off))
+        body = {"userId": user.uid, "stockId": sid, "quantity": 1, "side": side, "entry": "Limit",
+                "stop": "None", "currency": ccy, "price": price}
+        return "place:limit", f"{base}/api/orders/place", body, ("limit", sid, side)
+    if op == "market":
+        if user.held[sid] > 0 and rng.random() < 0.5:
+            body = {"userId": user.uid, "stockId": sid, "quantity": 1, "side": "Sell", "entry": "Market",
+                    "stop": "None", "currency": ccy}
+            return "place:market", f"{base}/api/orders/place", body, ("market", sid, "Sell")
+        body = {"userId": user.uid, "stockId": sid, "quantity": 1, "side": "Buy", "entry": "Market",
+                "stop": "None", "currency": ccy, "buyBudget": money(px * 1.5)}
+        return "place:market", f"{base}/api/orders/place", body, ("market", sid, "Buy")
+    if op == "stop":
+        body = {"userId": user.uid, "stockId": sid, "quantity": 1, "side": "Buy", "entry": "Market",
+                "stop": "Stop", "currency": ccy, "stopPrice": money(px * rng.uniform(1.15, 1.30)),
+                "buyBudget": money(px * 1.6)}
+        return "place:stop", f"{base}/api/orders/place", body, ("stop", sid, "Buy")
+    oid, kind, osid, oside = user.resting[0]
+    opx = prices.get(osid, 100.0)
+    if op == "modify":
+        user.resting.rotate(-1)
+        if kind == "stop":
+            body = {"userId": user.uid, "quantity": None, "stopPrice": money(opx * rng.uniform(1.15, 1.30)),
+                    "limitPrice": None}
+            return "modify-stop", f"{base}/api/orders/{oid}/modify-stop", body, None
+        off = rng.uniform(0.03, 0.08)  # stays away from the touch on its own side, like a fresh limit
+        body = {"userId": user.uid, "quantity": None,
+                "price": money(opx * (1 - off) if oside == "Buy" else opx * (1 + off))}
+        return "modify", f"{base}/api/orders/{oid}/modify", body, None
+    user.resting.popleft()
+    return "cancel", f"{base}/api/orders/{oid}/cancel?userId={user.uid}", None, None
+
+
+async def fire(session, user, endpoint, url, body, placed, intended, stats):
+    try:
+        async with session.post(url, json=body, headers=user.headers) as r:
+            status = r.status
+            res = await r.json(content_type=None) if status == 200 else None
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        stats.add(endpoint, (time.perf_counter() - intended) * 1e6, "error")
+        return
+    lat = (time.perf_counter() - intended) * 1e6
+    if status == 429:
+        stats.add(endpoint, lat, "throttled")
+        return
+    if status != 200 or not isinstance(res, dict):
+        stats.add(endpoint, lat, "error")
+        return
+    ok = res.get("status") in ACCEPTED
+    stats.add(endpoint, lat, "ok" if ok else "rejected")
+    if ok and placed:
+        kind, sid, side = placed
+        po = res.get("placedOrder") or {}
+        filled = int(res.get("totalFilledQuantity") or 0)
+        user.held[sid] += filled if side == "Buy" else -filled
+        # An armed stop reports PlacedOnBook too; a partially filled limit keeps resting.
+        if kind in ("limit", "stop") and po.get("orderId") and res.get("status") in ("PlacedOnBook", "PartialFill"):
+            user.resting.append((po["orderId"], kind, sid, side))
+
+
+# -- driver ------------------------------------------------------------------------------------------
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    ops, weights = list(mix), list(mix.values())
+    rng = random.Random(args.seed)
+    stats = Stats()
+    conn = aiohttp.TCPConnector(limit=args.connections, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=conn, timeout=timeout) as session:
+        users = await login_users(session, args)
+        print(f"{len(users)} users logged in; base={args.base} rate={args.rate}/s "
+              f"duration={args.duration}s pool={args.connections}")
+        if args.rate / max(1, len(users)) > 1.0:
+            print(f"  note: {args.rate / len(users):.2f} req/s/user exceeds the 60/min 'orders' limiter "
+                  "— expect 429s (reported as throttled)")
+        prices, stop = {}, asyncio.Event()
+        await fetch_prices(session, args, users[0].headers, prices)
+        if not prices:
+            sys.exit(f"no latest price for any of stocks {args.stocks} in {args.currency} — is the server up?")
+        pricer = asyncio.create_task(refresh_prices(session, args, users[0].headers, prices, stop))
+
+        inflight = asyncio.Semaphore(args.max_inflight)
+        tasks = set()
+
+        async def one(user, endpoint, url, body, placed, intended):
+            async with inflight:
+                await fire(session, user, endpoint, url, body, placed, intended, stats)
+
+        t0 = time.perf_counter()
+        next_t = t0
+        sent = 0
+        while True:
+            next_t += rng.expovariate(args.rate)
+            if next_t - t0 >= args.duration:
+                break
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            user = users[sent % len(users)] if args.round_robin else rng.choice(users)
+            endpoint, url, body, placed = build(rng.choices(ops, weights)[0], user, prices, args, rng)
+            t = asyncio.create_task(one(user, endpoint, url, body, placed, next_t))
+            tasks.add(t)
+            t.add_done_callback(tasks.discard)
+            sent += 1
+        if tasks:
+            await asyncio.gather(*tasks)
+        wall = time.perf_counter() - t0
+        stop.set()
+        await pricer
+
+        if not args.no_cleanup:
+            left = 0
+            for u in users:
+                ids = [oid for oid, _, _, _ in u.resting]
+                for i in range(0, len(ids), 500):
+                    async with session.post(f"{args.base}/api/orders/cancel-batch",
+                                            json={"orderIds": ids[i:i + 500]}, headers=u.headers) as r:
+                        left += len(ids[i:i + 500]) if r.status == 200 else 0
+            print(f"cleanup: cancelled {left} resting orders")
+    return stats, sent, wall
+
+
+def report(stats, sent, wall, args):
+    print(f"\nsent={sent} in {wall:.1f}s  achieved={sent / wall:.1f} req/s (target {args.rate})")
+    print(f"{'endpoint':<14}{'n':>7}{'ok%':>7}{'rej%':>7}{'429%':>7}{'err%':>7}"
+          f"{'p50':>9}{'p95':>9}{'p99':>9}{'p99.9':>9}{'max':>9}   (ms)")
+    total = Histogram()
+    for ep in sorted(stats.hist):
+        h, oc = stats.hist[ep], stats.outcomes[ep]
+        total.merge(h)
+        s = h.summary(1000.0)
+        n = s["n"]
+        print(f"{ep:<14}{n:>7}" + "".join(f"{100.0 * oc[k] / n:>7.1f}" for k in ("ok", "rejected", "throttled", "error"))
+              + "".join(f"{s[k]:>9.1f}" for k in ("p50", "p95", "p99", "p999", "max")))
+    if total.total:
+        s = total.summary(1000.0)
+        print(f"{'ALL':<14}{s['n']:>7}{'':>28}" + "".join(f"{s[k]:>9.1f}" for k in ("p50", "p95", "p99", "p999", "max")))
+
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    out = Path(args.out) if args.out else OUT_DIR / f"order-load-{ts}.json"
+    doc = {"ts": ts, "base": args.base, "users": args.users, "rate": args.rate, "duration": args.duration,
+           "mix": args.mix, "sent": sent, "wall_s": wall,
+           "endpoints": {ep: {"summary_ms": stats.hist[ep].summary(1000.0), "outcomes": dict(stats.outcomes[ep]),
+                              "hist_us": stats.hist[ep].to_dict()} for ep in sorted(stats.hist)}}
+    out.write_text(json.dumps(doc, indent=1), encoding="utf-8")
+    print(f"\nresults -> {out}")
+    if args.hgrm:
+        d = Path(args.hgrm)
+        d.mkdir(parents=True, exist_ok=True)
+        for ep, h in stats.hist.items():
+            (d / f"{ts}-{ep.replace(':', '_')}.hgrm").write_text(h.hgrm(1000.0), encoding="utf-8")
+        print(f"hgrm files -> {d}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:5000")
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--user-prefix", default="loadusr")
+    ap.add_argument("--password", default="loadtest123")
+    ap.add_argument("--register", action="store_true", help="self-register users that don't exist yet")
+    ap.add_argument("--rate", type=float, default=10.0, help="target total requests/s (Poisson arrivals)")
+    ap.add_argument("--duration", type=float, default=60.0, help="seconds of load")
+    ap.add_argument("--mix", default="limit=40,market=10,stop=15,modify=20,cancel=15")
+    ap.add_argument("--stocks", default="1-20", help="stock ids, e.g. 1-20 or 3,5,7")
+    ap.add_argument("--currency", default="USD")
+    ap.add_argument("--connections", type=int, default=64, help="pooled keep-alive connections")
+    ap.add_argument("--max-inflight", type=int, default=512)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--round-robin", action="store_true", help="cycle users instead of picking at random")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--no-cleanup", action="store_true")
+    ap.add_argument("--out", default="")
+    ap.add_argument("--hgrm", default="", help="directory for per-endpoint .hgrm files")
+    args = ap.parse_args()
+    args.base = args.base.rstrip("/")
+    args.stock_ids = parse_stocks(args.stocks)
+
+    stats, sent, wall = asyncio.run(run(args))
+    report(stats, sent, wall, args)
+
+
+if __name__ == "__main__":
+    main()
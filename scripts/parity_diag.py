@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Cross-listing parity: basis, lead-lag and basis half-life for every dual-listed (USD + EUR) stock.
+
+fx_pair_corr.py takes a per-minute CSV and gives one return correlation and one log(USD/EUR) std per
+stock, with the FX rate folded into the std. This works on the cached tape for all of
+Config.CROSS_LISTED_STOCK_IDS at once (NumPy) on a --res grid (default 5s, the arbitrage latency scale):
+
+  basis     log(USD close) - log(EUR close x EUR/USD), closes = last MidPrice (else price) carried
+            forward; a bucket counts while both books traded within --max-age seconds. Mean, std and
+            p95 |basis| in bps.
+  lead-lag  cross-correlation of the two listings' bucket returns (EUR in USD terms) at lags
+            -N..+N buckets (--lags), all stocks in one batched FFT; positive peak lag = USD leads
+            EUR, negative = EUR leads
+  half-life OU / AR(1) fit of the demeaned basis on the grid, -ln 2 / ln(phi) x res
+  arb_share share of the dual books' qty with an arbitrage cohort bot (AIUsers.Strategy 5,
+            Config.ARBITRAGE_COHORT_SIZE) on either side
+
+The FX mid is not persisted. --fx-log reads FxRateService's "FX EUR/USD: old -> new" ticks from the
+server's Serilog file log (logs/server-*.log: the text template, or the JSON events
+appsettings.Production writes) as a step function; --fx base uses Config.FX_BASE_RATES; the default, implied, takes the cross-sectional median
+of log(USD/EUR) over the dual stocks per bucket, so a stock's basis is measured against the pack
+(the common FX move drops out along with any basis all stocks share).
+
+Writes data/parity/<name>/parity.csv (per stock) and xcorr.csv (the lag curves).
+
+Usage: py scripts/parity_diag.py [--db kse_soak] [--tape NAME] [--res 5s] [--lags 24]
+       [--fx implied|log|base] [--fx-log "KieshStockExchange.Server/logs/server-*.log"] [--window-min 0]
+"""
+import argparse, csv, glob, json, math, os, re, sys, time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import tape_cache
+from depth_replay import parse_res
+from microstructure import load
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Tools"))
+import Config
+
+OUT_DIR = os.path.join(ROOT, "data", "parity")
+USD, EUR = tape_cache.CCY.index("USD"), tape_cache.CCY.index("EUR")
+ARB_STRATEGY = 5  # AiStrategy.Arbitrage, the ARBITRAGE_COHORT_SIZE cohort
+ARB_SQL = f'SELECT "UserId" FROM "AIUsers" WHERE "Strategy" = {ARB_STRATEGY};'
+FX_LINE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d+ [+-]\d\d:?\d\d) \[INF\] FX (\w+)/(\w+): ([\d.]+) -> ([\d.]+)")
+
+
+def _fx_tick(line):
+    """(epoch, from, to, old, new) of an FxRateService tick line, text or JSON sink, else None."""
+    if line.startswith("{"):  # appsettings.Production: Serilog JsonFormatter, message left unrendered
+        try:
+            ev = json.loads(line)
+        except ValueError:
+            return None
+        if not ev.get("MessageTemplate", "").startswith("FX {From}/{To}"):
+            return None
+        p = ev.get("Properties", {})
+        stamp = re.sub(r"(\.\d{6})\d+", r"\1", ev["Timestamp"])  # .NET writes 7 fraction digits
+        return (datetime.fromisoformat(stamp).timestamp(), str(p.get("From")), str(p.get("To")),
+                float(p["Old"]), float(p["New"]))
+    m = FX_LINE.match(line)
+    if not m:
+        return None
+    return (datetime.strptime(m.group(1), "%Y-%m-%d %H:%M:%S.%f %z").timestamp(), m.group(2), m.group(3),
+            float(m.group(4)), float(m.group(5)))
+
+
+def fx_from_logs(pattern):
+    """EUR/USD step function from FxRateService log lines -> (tick epochs, mid after each, mid before the first)."""
+    ticks = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                tick = _fx_tick(line)
+                if tick is None:
+                    continue
+                t, base, quote, old, new = tick
+                if (base, quote) == ("USD", "EUR"):
+                    old, new = 1 / old, 1 / new
+                elif (base, quote) != ("EUR", "USD"):
+                    continue
+                ticks.append((t, old, new))
+    if not ticks:
+        sys.exit(f"no 'FX EUR/USD' lines in {pattern}")
+    ticks.sort()
+    return np.array([t for t, _, _ in ticks]), np.array([n for _, _, n in ticks]), ticks[0][1]
+
+
+def grid(c, stocks, ccy, res, t0, nb):
+    """[stock, bucket] last reference price (NaN before a book's first trade) and last-trade epoch."""
+    px = np.full((len(stocks), nb), np.nan)
+    last_t = np.full((len(stocks), nb), -np.inf)
+    row = {s: i for i, s in enumerate(stocks)}
+    m = (c["ccy"] == ccy) & np.isin(c["sid"], stocks)
+    sid, ts = c["sid"][m], c["ts"][m]
+    ref = np.where(np.isnan(c["mid"][m]), c["px"][m], c["mid"][m])
+    r = np.array([row[s] for s in sid], dtype=np.int64) if len(sid) else np.zeros(0, dtype=np.int64)
+    b = ((ts - t0) // res).astype(np.int64)
+    px[r, b] = ref  # (book, ts) order: the last write per cell is the bucket's last trade
+    last_t[r, b] = ts
+    # carry forward along each row
+    idx = np.where(~np.isnan(px), np.arange(nb), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    rows = np.arange(len(stocks))[:, None]
+    return px[rows, idx], np.maximum.accumulate(last_t, axis=1)
+
+
+def xcorr(x, y, lags):
+    """Row-wise corr(x_t, y_{t+k}) for k in -lags..lags via FFT; NaNs treated as zero returns."""
+    x = np.nan_to_num(x - np.nanmean(x, axis=1, keepdims=True))
+    y = np.nan_to_num(y - np.nanmean(y, axis=1, keepdims=True))
+    n = x.shape[1]
+    size = 1 << int(math.ceil(math.log2(2 * n)))
+    cc = np.fft.irfft(np.conj(np.fft.rfft(x, size)) * np.fft.rfft(y, size), size)
+    cc = np.concatenate([cc[:, -lags:], cc[:, :lags + 1]], axis=1)  # lags -N..-1, 0..N
+    norm = np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+    return np.divide(cc, norm[:, None], out=np.full_like(cc, np.nan), where=norm[:, None] > 0)
+
+
+def half_life(basis, ok, res):
+    """Per-row OU half-life (seconds) of the basis over consecutive valid buckets -> (half-life, phi)."""
+    pair = ok[:, 1:] & ok[:, :-1]
+    mean = np.nanmean(np.where(ok, basis, np.nan), axis=1, keepdims=True)
+    d = np.where(ok, basis - mean, 0.0)
+    num = (d[:, 1:] * d[:, :-1] * pair).sum(axis=1)
+    den = (d[:, :-1] ** 2 * pair).sum(axis=1)
+    phi = np.divide(num, den, out=np.full(len(basis), np.nan), where=den > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hl = np.where(phi >= 1, np.inf, np.where(phi > 0, -math.log(2) / np.log(phi) * res, 0.0))
+    return np.where(np.isnan(phi), np.nan, hl), phi
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="kse_soak")
+    ap.add_argument("--tape", default="", help="read this tape_cache as-is instead of syncing --db")
+    ap.add_argument("--res", default="5s", help="grid step")
+    ap.add_argument("--lags", type=int, default=24, help="lead-lag window, +-buckets")
+    ap.add_argument("--max-age", type=float, default=60.0, help="a side's last trade older than this -> no basis")
+    ap.add_argument("--fx", choices=["implied", "log", "base"], default="", help="default: log with --fx-log, else implied")
+    ap.add_argument("--fx-log", default="", help="server log file(s), glob")
+    ap.add_argument("--window-min", type=float, default=0.0, help="only the tape's last N minutes (0 = all)")
+    ap.add_argument("--live", action="store_true", help="soak still running: leave the newest trades for later")
+    args = ap.parse_args()
+    fx_mode = args.fx or ("log" if args.fx_log else "implied")
+    if fx_mode == "log" and not args.fx_log:
+        sys.exit("--fx log needs --fx-log <server log glob>")
+
+    res = parse_res(args.res)
+    name = args.tape or args.db
+    t_start = time.perf_counter()
+    tape = tape_cache.Tape(name)
+    arb = np.zeros(0, dtype=np.int64)
+    try:
+        if not args.tape:
+            added = tape.sync(final=not args.live)
+            print(f"tape {name}: {tape.n:,} trades ({added:,} new)")
+        if not args.tape or args.tape == args.db:
+            arb = np.array([int(r[0]) for r in kse_db.rows(args.db, ARB_SQL)], dtype=np.int64)
+    except kse_db.QueryError as ex:
+        if not args.tape:
+            sys.exit(str(ex))
+        print(f"no cohort lookup ({ex}); arb_share left empty")
+    if not tape.n:
+        sys.exit(f"tape {name} is empty")
+
+    c = load(tape, args.window_min)
+    dual = np.isin(c["sid"], Config.CROSS_LISTED_STOCK_IDS) & np.isin(c["ccy"], (USD, EUR))
+    c = {k: v[dual] for k, v in c.items()}
+    stocks = sorted(set(np.unique(c["sid"][c["ccy"] == USD]).tolist()) & set(np.unique(c["sid"][c["ccy"] == EUR]).tolist()))
+    if not stocks:
+        sys.exit(f"no CROSS_LISTED_STOCK_IDS stock traded on both books in {name}")
+    t1 = time.perf_counter()
+    t0 = math.floor(c["ts"].min() / res) * res
+    nb = int((c["ts"].max() - t0) // res) + 1
+    usd, usd_t = grid(c, stocks, USD, res, t0, nb)
+    eur, eur_t = grid(c, stocks, EUR, res, t0, nb)
+    ends = t0 + (np.arange(nb) + 1) * res
+    fresh = ((ends - usd_t) <= args.max_age) & ((ends - eur_t) <= args.max_age) & ~np.isnan(usd) & ~np.isnan(eur)
+    raw = np.log(usd) - np.log(eur)  # log(USD/EUR) ~ log(EUR/USD fx) under parity
+    if fx_mode == "log":
+        tick_t, tick_mid, first = fx_from_logs(args.fx_log)
+        i = np.searchsorted(tick_t, ends, side="right") - 1
+        log_fx = np.log(np.where(i >= 0, tick_mid[np.maximum(i, 0)], first))
+        covered = (ends >= tick_t[0] - 120) & (ends <= tick_t[-1] + 120)
+        fresh &= covered[None, :]
+    elif fx_mode == "base":
+        log_fx = np.full(nb, math.log(Config.FX_BASE_RATES["EUR/USD"]))
+    else:
+        with np.errstate(all="ignore"):
+            log_fx = np.nanmedian(np.where(fresh, raw, np.nan), axis=0)
+        fresh &= (fresh.sum(axis=0) >= 3)[None, :] & ~np.isnan(log_fx)[None, :]
+    basis = (raw - log_fx[None, :]) * 1e4
+    basis = np.where(fresh, basis, np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ru = np.diff(np.log(usd), axis=1)
+        re_ = np.diff(np.log(eur) + log_fx[None, :], axis=1)  # EUR listing in USD terms
+    ok_r = fresh[:, 1:] & fresh[:, :-1]
+    cc = xcorr(np.where(ok_r, ru, np.nan), np.where(ok_r, re_, np.nan), args.lags)
+    lag_axis = np.arange(-args.lags, args.lags + 1)
+    peak = lag_axis[np.nanargmax(np.where(np.isnan(cc), -np.inf, cc), axis=1)]
+    pos, neg = np.nansum(cc[:, args.lags + 1:], axis=1), np.nansum(cc[:, :args.lags], axis=1)
+    hl, phi = half_life(basis, fresh, res)
+
+    qty = c["qty"].astype(np.float64)
+    row_of = {s: i for i, s in enumerate(stocks)}
+    in_grid = np.isin(c["sid"], stocks)
+    r_idx = np.array([row_of.get(int(s), 0) for s in c["sid"]], dtype=np.int64)
+    tot = np.bincount(r_idx[in_grid], weights=qty[in_grid], minlength=len(stocks))
+    arb_share = None
+    if arb.size:
+        a = (np.isin(c["buyer"], arb) | np.isin(c["seller"], arb)) & in_grid
+        arb_share = np.bincount(r_idx[a], weights=qty[a], minlength=len(stocks)) / np.maximum(tot, 1)
+    compute = time.perf_counter() - t1
+
+    out_dir = os.path.join(OUT_DIR, name)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "parity.csv")
+    fmt = lambda v: "" if v is None or v != v else f"{v:.6g}"
+    per = []
+    for i, s in enumerate(stocks):
+        b = basis[i][~np.isnan(basis[i])]
+        per.append({"stock": s, "coverage": fresh[i].mean(), "basis_mean": b.mean() if b.size else math.nan,
+                    "basis_std": b.std() if b.size > 1 else math.nan,
+                    "basis_p95": np.percentile(np.abs(b), 95) if b.size else math.nan,
+                    "corr0": cc[i, args.lags], "peak_lag": int(peak[i]), "peak_corr": np.nanmax(cc[i]) if (~np.isnan(cc[i])).any() else math.nan,
+                    "lead_usd": pos[i] - neg[i], "phi": phi[i], "half_life_s": hl[i],
+                    "arb_share": arb_share[i] if arb_share is not None else math.nan})
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=list(per[0]))
+        w.writeheader()
+        for r in per:
+            w.writerow({k: (v if k in ("stock", "peak_lag") else fmt(float(v))) for k, v in r.items()})
+    with open(os.path.join(out_dir, "xcorr.csv"), "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["stock", *(f"lag{k:+d}" for k in lag_axis)])
+        for i, s in enumerate(stocks):
+            w.writerow([s, *(fmt(float(v)) for v in cc[i])])
+
+    print(f"{len(stocks)} dual stocks, {nb:,} buckets of {args.res}, fx={fx_mode}; "
+          f"computed in {compute:.2f}s (total {time.perf_counter() - t_start:.1f}s). "
+          f"ARBITRAGE_COHORT_SIZE={Config.ARBITRAGE_COHORT_SIZE}, {arb.size} cohort bots on this DB")
+    f = lambda v, s: "-".rjust(len(format(0.0, s))) if v != v else format(v, s)
+    print(f"{'stock':>5} {'cover':>6} {'basis':>7} {'std':>7} {'p95|b|':>7} {'corr0':>6} {'peak':>5} "
+          f"{'pk corr':>7} {'USD lead':>8} {'half-life':>9} {'arb':>6}")
+    for r in per:
+        print(f"{r['stock']:>5} {f(r['coverage'], '6.2f')} {f(r['basis_mean'], '7.1f')} {f(r['basis_std'], '7.1f')} "
+              f"{f(r['basis_p95'], '7.1f')} {f(r['corr0'], '6.3f')} {r['peak_lag'] * res:>4.0f}s {f(r['peak_corr'], '7.3f')} "
+              f"{f(r['lead_usd'], '+8.3f')} {f(r['half_life_s'], '8.1f')}s {f(r['arb_share'], '6.3f')}")
+    med = lambda k: float(np.nanmedian([r[k] for r in per]))
+    print(f"  median: basis std {med('basis_std'):.1f} bps, p95 |basis| {med('basis_p95'):.1f} bps, "
+          f"corr0 {med('corr0'):.3f}, half-life {med('half_life_s'):.1f}s, peak lag {med('peak_lag') * res:+.0f}s")
+    print(f"-> {path}")
+
+
+if __name__ == "__main__":
+    main()
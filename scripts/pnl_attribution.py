@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Fleet-wide average-cost PnL attribution per bot, grouped by strategy, cohort and home currency.
+
+soak_scorecard.conviction_wl replays the Conviction range's trades row by row in a dict, long side only.
+This does every account on the cached tape at once (NumPy): each trade is a +qty fill for the buyer and
+a -qty fill for the seller, sorted by (user, stock) and replayed with average-cost accounting, long and
+short:
+
+  position   per (user, stock), across that stock's listings (Positions is per stock), prices in USD
+             (other listings at Config.FX_BASE_RATES: the FX mid is not persisted, so FX drift shows
+             up as trading PnL)
+  avg cost   moves only on fills that add to the position; a reducing fill realizes
+             (price - avg) x closed qty x side, a crossing fill closes the old side and opens the new
+             one at the fill price
+  episode    flat -> flat (or -> crossed) round trip; closed ones count as a win / loss when their
+             realized PnL is beyond +-WIN_EPS, and their duration is the holding time
+  unrealized (last trade price of the stock - avg) x position on what is still open
+
+The avg-cost recurrence avg_i = w_i * avg_i-1 + c_i is solved with a segmented affine prefix scan
+(w = 0 wherever a position starts from flat), so a pass is O(n log run) array work. The state per
+(user, stock) is kept in data/pnl/<name>/state.npz with the tape row it covers: a rerun replays only
+the trades the tape gained since, and a first pass over a long tape goes in --chunk sized slices
+through the same carry. Rebuilt from scratch when the tape was (a new clone under the same name).
+
+  strategy   AIUsers.Strategy (AiStrategy)
+  cohort     fleet (Config.STRATEGY_CHOICES) / arbitrage / market-maker / rotator / conviction, and the
+             non-bot accounts: house (Platform:HouseUserId), jump-aggressor (Bots:Jumps:AggressorUserId),
+             other
+  home       AIUsers.HomeCurrency
+
+Writes data/pnl/<name>/bots.csv (one row per account) and groups.csv (per strategy, cohort, home
+currency and strategy x home).
+
+Usage: py scripts/pnl_attribution.py [--db kse_soak] [--tape NAME] [--live] [--reset] [--chunk 5000000]
+"""
+import argparse, csv, json, os, sys, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import tape_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Tools"))
+import Config
+
+OUT_DIR = os.path.join(ROOT, "data", "pnl")
+ACCOUNTS_DIR = os.path.join(ROOT, "data", "cache", "accounts")
+APPSETTINGS = os.path.join(ROOT, "KieshStockExchange.Server", "appsettings.json")
+STRATEGIES = {0: "MarketMaker", 1: "TrendFollower", 2: "MeanReversion", 3: "Random", 4: "Scalper",
+              5: "Arbitrage", 6: "MarketMakerHouse", 7: "Rotator", 8: "Conviction"}  # AiStrategy
+COHORTS = {5: "arbitrage", 6: "market-maker", 7: "rotator", 8: "conviction"}
+BOTS_SQL = 'SELECT "UserId", "Strategy", "HomeCurrency" FROM "AIUsers";'
+WIN_EPS = 0.005  # USD; conviction_wl's win / loss threshold
+STATE_VERSION = 1
+# per-(user, stock) state: name -> dtype. ep_* describe the open episode (if pos != 0).
+FIELDS = (("key", np.int64), ("pos", np.int64), ("avg", np.float64), ("realized", np.float64),
+          ("fills", np.int64), ("turnover", np.float64), ("wins", np.int64), ("losses", np.int64),
+          ("closed", np.int64), ("hold_sum", np.float64), ("ep_start", np.float64), ("ep_real", np.float64))
+
+
+def usd_rates():
+    """Multiplier into USD per tape_cache.CCY index (1.0 for a currency without a base rate)."""
+    out = np.ones(len(tape_cache.CCY))
+    for i, ccy in enumerate(tape_cache.CCY):
+        if f"{ccy}/USD" in Config.FX_BASE_RATES:
+            out[i] = Config.FX_BASE_RATES[f"{ccy}/USD"]
+        elif f"USD/{ccy}" in Config.FX_BASE_RATES:
+            out[i] = 1 / Config.FX_BASE_RATES[f"USD/{ccy}"]
+    return out
+
+
+def affine_scan(w, c):
+    """In place: c_i <- w_i * c_i-1 + c_i over the whole array (Hillis-Steele; w_i = 0 cuts the carry)."""
+    k, n = 1, len(c)
+    while k < n and w[k:].any():
+        c[k:] = c[k:] + w[k:] * c[:-k]
+        w[k:] = w[k:] * w[:-k]
+        k *= 2
+    return c
+
+
+def empty_state():
+    return {name: np.zeros(0, dtype=dt) for name, dt in FIELDS}
+
+
+def replay(state, key, q, px, ts):
+    """Apply one slice of fills (sorted by key, then tape order) to `state` -> the updated state."""
+    first = np.r_[True, key[1:] != key[:-1]]
+    gk = key[first]
+    gstart = np.flatnonzero(first)
+    gi = np.cumsum(first) - 1  # fill -> group of this slice
+    # carry in from the state (groups it already holds)
+    at = np.searchsorted(state["key"], gk)
+    known = (at < len(state["key"])) & (state["key"][np.minimum(at, len(state["key"]) - 1)] == gk) \
+        if len(state["key"]) else np.zeros(len(gk), dtype=bool)
+    carry = {name: np.zeros(len(gk), dtype=dt) for name, dt in FIELDS}
+    for name, _ in FIELDS:
+        carry[name][known] = state[name][at[known]]
+    carry["key"] = gk
+
+    pos = np.cumsum(q)
+    pos -= np.repeat(pos[gstart] - q[gstart], np.diff(np.r_[gstart, len(q)]))  # restart per group
+    pos += carry["pos"][gi]
+    prev = pos - q
+    ap, an = np.abs(prev), np.abs(pos)
+    cross = (prev != 0) & (pos != 0) & (np.sign(prev) != np.sign(pos))
+    opens = (prev == 0) & (pos != 0)
+    adds = ~cross & ~opens & (an > ap)
+    closing = (prev != 0) & ((an < ap) | cross)  # fill realizes something
+
+    # avg cost after each fill: avg_i = w_i * avg_i-1 + c_i
+    w = np.where(adds, ap / np.maximum(an, 1), np.where(closing & ~cross & (pos != 0), 1.0, 0.0))
+    c = np.where(adds, np.abs(q) * px / np.maximum(an, 1), np.where(cross | opens, px, 0.0))
+    c[gstart] += w[gstart] * carry["avg"]  # the state's avg enters through each group's first fill
+    w[gstart] = 0.0
+    avg = affine_scan(w, c)
+    avg_prev = np.r_[0.0, avg[:-1]]
+    avg_prev[gstart] = carry["avg"]
+    shut = np.where(cross, ap, np.where(closing, ap - an, 0))
+    real = np.where(closing, (px - avg_prev) * shut * np.sign(prev), 0.0)
+
+    # episodes: a continued one per group entering with a position, plus one per open / cross
+    cont = first & (carry["pos"][gi] != 0)
+    starts = opens | cross
+    ep_after = np.cumsum(cont.astype(np.int64) + starts) - 1
+    ep_before = ep_after - starts  # the episode a closing fill realizes into
+    n_ep = int(ep_after[-1]) + 1 if len(ep_after) else 0
+    ep_group = np.zeros(n_ep, dtype=np.int64)
+    ep_t0 = np.zeros(n_ep)
+    ep_real = np.bincount(ep_before[closing], weights=real[closing], minlength=n_ep).astype(np.float64)
+    ep_group[ep_after[starts]] = gi[starts]
+    ep_t0[ep_after[starts]] = ts[starts]
+    ci = np.flatnonzero(cont)
+    ep_group[ep_after[ci] - starts[ci]] = gi[ci]
+    ep_t0[ep_after[ci] - starts[ci]] = carry["ep_start"][gi[ci]]
+    ep_real[ep_after[ci] - starts[ci]] += carry["ep_real"][gi[ci]]
+    ends = closing & ((pos == 0) | cross)
+    ep_closed = np.zeros(n_ep, dtype=bool)
+    ep_closed[ep_before[ends]] = True
+    ep_t1 = np.zeros(n_ep)
+    ep_t1[ep_before[ends]] = ts[ends]
+
+    ng = len(gk)
+    done = ep_closed
+    carry["wins"] += np.bincount(ep_group[done & (ep_real > WIN_EPS)], minlength=ng)
+    carry["losses"] += np.bincount(ep_group[done & (ep_real < -WIN_EPS)], minlength=ng)
+    carry["closed"] += np.bincount(ep_group[done], minlength=ng)
+    carry["hold_sum"] += np.bincount(ep_group[done], weights=(ep_t1 - ep_t0)[done], minlength=ng)
+    last = np.r_[gstart[1:], len(q)] - 1
+    carry["pos"] = pos[last]
+    carry["avg"] = np.where(pos[last] != 0, avg[last], 0.0)
+    carry["realized"] += np.bincount(gi, weights=real, minlength=ng)
+    carry["fills"] += np.bincount(gi, minlength=ng)
+    carry["turnover"] += np.bincount(gi, weights=np.abs(q) * px, minlength=ng)
+    # the open episode, if any, is the group's last one
+    open_ep = ep_after[last]
+    still = carry["pos"] != 0
+    carry["ep_start"] = np.where(still, ep_t0[open_ep], 0.0)
+    carry["ep_real"] = np.where(still, ep_real[open_ep], 0.0)
+
+    # merge: groups this slice touched replace their old rows
+    keep = np.ones(len(state["key"]), dtype=bool)
+    keep[at[known]] = False
+    merged = {name: np.concatenate([state[name][keep], carry[name]]) for name, _ in FIELDS}
+    order = np.argsort(merged["key"], kind="stable")
+    return {name: v[order] for name, v in merged.items()}
+
+
+def load_state(path):
+    try:
+        z = np.load(path)
+    except (OSError, ValueError):
+        return None
+    meta = json.loads(str(z["meta"]))
+    if meta.get("version") != STATE_VERSION:
+        return None
+    return meta, {name: z[name] for name, _ in FIELDS}, z["marks"]
+
+
+def save_state(path, meta, state, marks):
+    tmp = path + f".tmp{os.getpid()}.npz"
+    np.savez(tmp, meta=json.dumps(meta), marks=marks, **state)
+    os.replace(tmp, path)
+
+
+def accounts(db, oid=None, quiet=False):
+    """UserId -> (strategy, cohort, home) for the AIUsers fleet, plus the house / jump-aggressor ids.
+
+    The fleet is fixed once seeded, so the lookup is kept in data/cache/accounts/<db>.json under the
+    DB's pg_database oid (the tape cache's identity): while `oid` matches, no query runs. Without a
+    DB (quiet) the last cached map is used, else every account groups as other."""
+    try:
+        with open(APPSETTINGS, encoding="utf-8-sig") as fh:
+            cfg = json.load(fh)
+    except (OSError, ValueError):
+        cfg = {}
+    special = {int(cfg.get("Platform", {}).get("HouseUserId", 20002)): "house",
+               int(cfg.get("Bots", {}).get("Jumps", {}).get("AggressorUserId", 20003)): "jump-aggressor"}
+    path = os.path.join(ACCOUNTS_DIR, f"{db}.json")
+    try:
+        with open(path, encoding="utf-8") as fh:
+            cached = json.load(fh)
+    except (OSError, ValueError):
+        cached = None
+    if cached and oid is not None and cached.get("oid") == oid:
+        bots = cached["bots"]
+    else:
+        try:
+            bots = [[int(uid), int(strat), home or "USD"] for uid, strat, home in kse_db.rows(db, BOTS_SQL)]
+            os.makedirs(ACCOUNTS_DIR, exist_ok=True)
+            tmp = f"{path}.tmp{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"oid": oid, "bots": bots}, fh)
+            os.replace(tmp, path)
+        except kse_db.QueryError as ex:
+            if cached:
+                print(f"no AIUsers lookup ({ex}); using the cached map from {path}")
+                bots = cached["bots"]
+            elif quiet:
+                print(f"no AIUsers lookup ({ex}); every account groups as other")
+                bots = []
+            else:
+                raise
+    meta = {uid: (STRATEGIES.get(s, str(s)), "fleet" if s in Config.STRATEGY_CHOICES else COHORTS.get(s, f"strategy-{s}"),
+                  home) for uid, s, home in bots}
+    return meta, special
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="kse_soak")
+    ap.add_argument("--tape", default="", help="read this tape_cache as-is instead of syncing --db")
+    ap.add_argument("--live", action="store_true", help="soak still running: leave the newest trades for later")
+    ap.add_argument("--reset", action="store_true", help="ignore the saved state, replay the whole tape")
+    ap.add_argument("--chunk", type=int, default=5_000_000, help="trades per replay slice")
+    args = ap.parse_args()
+
+    name = args.tape or args.db
+    t0 = time.perf_counter()
+    tape = tape_cache.Tape(name)
+    try:
+        if not args.tape:
+            added = tape.sync(final=not args.live)
+            print(f"tape {name}: {tape.n:,} trades ({added:,} new)")
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    if not tape.n:
+        sys.exit(f"tape {name} is empty")
+
+    out_dir = os.path.join(OUT_DIR, name)
+    os.makedirs(out_dir, exist_ok=True)
+    state_path = os.path.join(out_dir, "state.npz")
+    cols = {k: np.frombuffer(tape.cols[k], dtype=tape.cols[k].typecode)
+            for k in ("tid", "sid", "ccy", "ts", "px", "qty", "buyer", "seller")}
+    nsid = int(cols["sid"].max()) + 1
+    loaded = None if args.reset else load_state(state_path)
+    done = 0
+    if loaded:
+        meta, state, marks = loaded
+        n0 = meta["n"]
+        if (meta["oid"] == tape.meta.get("oid") and 0 < n0 <= tape.n and int(cols["tid"][n0 - 1]) == meta["tid"]
+                and meta["nsid"] >= nsid):
+            done, nsid = n0, meta["nsid"]
+    if not done:
+        state, marks = empty_state(), np.full(nsid, np.nan)
+    start = done
+
+    rates = usd_rates()
+    while done < tape.n:
+        hi = min(done + args.chunk, tape.n)
+        sl = slice(done, hi)
+        px = cols["px"][sl] * rates[cols["ccy"][sl]]
+        qty = cols["qty"][sl].astype(np.int64)
+        sid = cols["sid"][sl].astype(np.int64)
+        legs = lambda b, s: np.stack([b, s], axis=1).ravel()  # tape order, buy leg first
+        user = legs(cols["buyer"][sl], cols["seller"][sl]).astype(np.int64)
+        ok = user > 0
+        key = (user * nsid + legs(sid, sid))[ok]
+        order = np.argsort(key, kind="stable")
+        state = replay(state, key[order], legs(qty, -qty)[ok][order], legs(px, px)[ok][order],
+                       legs(cols["ts"][sl], cols["ts"][sl])[ok][order])
+        marks[sid] = px  # the last assignment per stock wins: its latest trade
+        done = hi
+    if done > start or not os.path.exists(state_path):
+        save_state(state_path, {"version": STATE_VERSION, "oid": tape.meta.get("oid"), "n": done,
+                                "tid": int(cols["tid"][done - 1]), "nsid": nsid}, state, marks)
+    compute = time.perf_counter() - t0
+
+    bots_meta, special = accounts(args.db, tape.meta.get("oid") if name == args.db else None, quiet=bool(args.tape))
+    user = state["key"] // nsid
+    sid = state["key"] % nsid
+    mark = marks[sid]
+    unreal = np.where(state["pos"] != 0, (mark - state["avg"]) * state["pos"], 0.0)
+    unreal = np.nan_to_num(unreal)
+    users, ui = np.unique(user, return_inverse=True)
+    nu = len(users)
+    agg = lambda v: np.bincount(ui, weights=v, minlength=nu)
+    per = {"realized": agg(state["realized"]), "unrealized": agg(unreal),
+           "turnover": agg(state["turnover"]), "fills": agg(state["fills"]),
+           "wins": agg(state["wins"]), "losses": agg(state["losses"]), "closed": agg(state["closed"]),
+           "hold_sum": agg(state["hold_sum"]), "open": agg((state["pos"] != 0).astype(np.float64)),
+           "exposure": agg(np.abs(state["pos"]) * np.nan_to_num(mark))}
+    per["total"] = per["realized"] + per["unrealized"]
+
+    labels = []
+    for u in users.tolist():
+        if u in bots_meta:
+            labels.append(bots_meta[u])
+        else:
+            labels.append(("-", special.get(u, "other"), "-"))
+    with open(os.path.join(out_dir, "bots.csv"), "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["user", "strategy", "cohort", "home", "fills", "turnover_usd", "realized_usd", "unrealized_usd",
+                    "total_usd", "wins", "losses", "round_trips", "mean_hold_s", "open_positions", "exposure_usd"])
+        for i, u in enumerate(users.tolist()):
+            hold = per["hold_sum"][i] / per["closed"][i] if per["closed"][i] else ""
+            w.writerow([u, *labels[i], int(per["fills"][i]), f"{per['turnover'][i]:.2f}", f"{per['realized'][i]:.2f}",
+                        f"{per['unrealized'][i]:.2f}", f"{per['total'][i]:.2f}", int(per["wins"][i]),
+                        int(per["losses"][i]), int(per["closed"][i]), hold if hold == "" else f"{hold:.1f}",
+                        int(per["open"][i]), f"{per['exposure'][i]:.2f}"])
+
+    dims = (("strategy", lambda l: l[0]), ("cohort", lambda l: l[1]), ("home", lambda l: l[2]),
+            ("strategy x home", lambda l: f"{l[0]} / {l[2]}"))
+    groups = []
+    for dim, pick in dims:
+        names = np.array([pick(l) for l in labels])
+        for g in sorted(set(names.tolist())):
+            m = names == g
+            tot, turn = per["total"][m], per["turnover"][m].sum()
+            wl = per["wins"][m].sum() + per["losses"][m].sum()
+            closed = per["closed"][m].sum()
+            groups.append({"dim": dim, "group": g, "accounts": int(m.sum()), "fills": int(per["fills"][m].sum()),
+                           "turnover_usd": turn, "realized_usd": per["realized"][m].sum(),
+                           "unrealized_usd": per["unrealized"][m].sum(), "total_usd": tot.sum(),
+                           "per_account_usd": tot.mean(), "median_account_usd": float(np.median(tot)),
+                           "bps_of_turnover": tot.sum() / turn * 1e4 if turn else None,
+                           "win_rate": per["wins"][m].sum() / wl if wl else None,
+                           "round_trips": int(closed), "mean_hold_s": per["hold_sum"][m].sum() / closed if closed else None,
+                           "exposure_usd": per["exposure"][m].sum()})
+    path = os.path.join(out_dir, "groups.csv")
+    fmt = lambda v: "" if v is None else (f"{v:.6g}" if isinstance(v, float) else v)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=list(groups[0]))
+        w.writeheader()
+        for g in groups:
+            w.writerow({k: fmt(float(v) if isinstance(v, np.floating) else v) for k, v in g.items()})
+
+    print(f"{done - start:,} trades replayed ({done:,} covered), {len(state['key']):,} positions, {nu:,} accounts "
+          f"in {compute:.2f}s (total {time.perf_counter() - t0:.1f}s); USD, EUR at {Config.FX_BASE_RATES['EUR/USD']}")
+    f = lambda v, s: "-".rjust(len(format(0.0, s))) if v is None else format(v, s)
+    for dim in ("strategy", "cohort", "home"):
+        print(f"\n{dim:<18} {'accts':>6} {'turnover':>14} {'realized':>13} {'unrealized':>13} {'total':>13} "
+              f"{'/acct':>10} {'bps':>7} {'win%':>6} {'hold':>8}")
+        for g in (g for g in groups if g["dim"] == dim):
+            hold = f"{g['mean_hold_s'] / 60:7.1f}m" if g["mean_hold_s"] is not None else f"{'-':>8}"
+            print(f"{g['group']:<18} {g['accounts']:>6} {g['turnover_usd']:>14,.0f} {g['realized_usd']:>13,.0f} "
+                  f"{g['unrealized_usd']:>13,.0f} {g['total_usd']:>13,.0f} {g['per_account_usd']:>10,.0f} "
+                  f"{f(g['bps_of_turnover'], '+7.1f')} {f(None if g['win_rate'] is None else g['win_rate'] * 100, '6.1f')} {hold}")
+    print(f"-> {path}")
+
+
+if __name__ == "__main__":
+    main()
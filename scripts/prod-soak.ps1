@@ -2,6 +2,8 @@
 # 2026-07-16 news+market-char epoch) so a local A/B screen reproduces the live market, then hands off to
 # kse-balance-soak-p.ps1. Pass candidate-lever overrides as -Override "Key=Value" (repeatable) to A/B a
 # single lever against the prod baseline. Run SOLO (one at a time) or with a >=4-min stagger.
+# For several arms at once (isolated port/DB/env per arm, auto stagger, one comparison table) use
+# scripts/soak_queue.py --prod.
 #
 #   pwsh scripts/prod-soak.ps1 -Db kse_wk_base -Minutes 45 -Port 5081
 #   pwsh scripts/prod-soak.ps1 -Db kse_wk_cash22 -Minutes 45 -Port 5081 -Override "Bots__CashInjection__IntervalMinutes=22"
@@ -1,6 +1,7 @@
 # Q2 visual: bounce-mid ON vs OFF on the SAME trades. Reads kse_bnc_mid2 (has both Price + MidPrice),
 # builds 1-min candle CLOSE two ways — last-trade Price (OFF / today) vs mid-price (ON / baked) — and overlays
 # them per stock so the bounce-removal (smoother close, less tick zig-zag) is visible on an identical price path.
+# vol_signature.py plots where that zig-zag dies out across bucket sizes.
 import subprocess, sys
 from collections import defaultdict
 import matplotlib
@@ -3,6 +3,7 @@
 # Pattern: temporarily apply a config override to appsettings.json (Bots:* keys), run a 45m soak,
 # score it, log the result, then restore appsettings.json. Designed to be called repeatedly in a
 # script that builds up a comparison table.
+# scripts/soak_queue.py runs many such arms concurrently via env overrides, without editing the file.
 #
 # Usage:
 #   scripts/r4_experiment.ps1 -Tag "exp_inertia_on" `
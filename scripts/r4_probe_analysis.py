@@ -1,3 +1,4 @@
+#!/usr/bin/env python3
 """R4 §0009 Stage 1+2 probe analysis.
 
 Reads Stage 1 (MatchSymmetryProbe) and Stage 2 (BotDecisionProbe) CSVs and reports
@@ -9,281 +10,472 @@ Five report blocks:
   3. Advanced bracket cohort (kindPre, bias, kindPost) cross-tab + result success rate
   4. MarketMaker quote-side ratio
   5. Matcher depth context (when depth_ctx rows exist)
+
+The probe files grow without bound on long soaks, so each is read once in --chunk-mb blocks: a block
+is split into fields with numpy (no per-row Python), every column gets an explicit dtype (surface /
+side / context / hour are categorical codes, strategy int8, ids and flags int32 with a NA sentinel,
+components float64 with NaN) and every block folds into per-key count / sum accumulators, so all
+the report blocks come out of that single pass. Only the matcher fill values (Stage 1 medians) are
+kept whole, as float64 arrays per group. Lines that don't have the file's field count (a probe
+killed mid-write, an empty line) and the header the probes re-write on each restart are skipped.
+
+The component CIs are a Poisson bootstrap: every plain row gets a Poisson(1) weight per replicate,
+which resamples fixed --boot-rows slices independently, so the slices run in a --jobs process pool
+while the file is still being read and only their weighted sums come back. Results depend on neither
+--jobs nor --chunk-mb.
+
+Usage: py scripts/r4_probe_analysis.py [--logs KieshStockExchange.Server/logs] [--chunk-mb 64]
+       [--boot 1000] [--jobs N]
 """
-import csv, sys, statistics, random
-from collections import defaultdict, Counter
-from datetime import datetime
-from pathlib import Path
-
-ROOT = Path(__file__).resolve().parent.parent
-LOG_DIR = ROOT / "KieshStockExchange.Server" / "logs"
-MATCHER_CSV = LOG_DIR / "match-symmetry-probe.csv"
-BOT_CSV = LOG_DIR / "bot-decision-probe.csv"
-
-# ---------- Stage 1: matcher / settler symmetry (unchanged from earlier version) ----------
-matcher_groups = defaultdict(list)
-depth_rows = defaultdict(list)  # side -> list of (levelIdx, depth)
-if MATCHER_CSV.exists():
-    with open(MATCHER_CSV, newline="") as f:
-        for row in csv.DictReader(f):
-            ctx = row["context"]
-            key = (row["surface"], row["side"], ctx)
-            val = float(row["value"])
-            if ctx == "depth_ctx":
-                packed = int(val)
-                level = packed // 1_000_000
-                depth = packed % 1_000_000
-                depth_rows[row["side"]].append((level, depth))
-            else:
-                matcher_groups[key].append(val)
-
-# ---------- Stage 2: bot decision probe ----------
-plain_rows = []     # list of dicts
-adv_intent = []     # list of (strategy, kindPre, bias, kindPost)
-adv_result = []     # list of (strategy, kindPost, qty, flipQty, success)
-mm_rows = []        # list of (botId, buys, sells, choseBuy)
-
-def parse_int(v):
-    if v == "" or v is None: return None
-    try: return int(v)
-    except: return None
-
-def parse_float(v):
-    if v == "" or v is None: return None
-    try: return float(v)
-    except: return None
-
-if BOT_CSV.exists():
-    with open(BOT_CSV, newline="") as f:
-        for row in csv.DictReader(f):
-            s = row["surface"]
-            if s == "plain":
-                plain_rows.append({
-                    "ts": row["timestamp"],
-                    "bot_id": parse_int(row["bot_id"]),
-                    "strategy": parse_int(row["strategy"]),
-                    "cash_prc": parse_float(row["cash_prc"]),
-                    "inv_notional": parse_float(row["inv_notional"]),
-                    "homeostatic": parse_float(row["homeostatic"]),
-                    "directional_eff": parse_float(row["directional_eff"]),
-                    "anchor": parse_float(row["anchor"]),
-                    "herd": parse_float(row["herd"]),
-                    "buy_prob": parse_float(row["buy_prob"]),
-                    "is_buy": parse_int(row["is_buy"]),
-                    "is_market": parse_int(row["is_market"]),
-                })
-            elif s == "adv_intent":
-                adv_intent.append((parse_int(row["strategy"]), parse_int(row["kind_pre"]),
-                                   parse_int(row["bias"]), parse_int(row["kind_post"])))
-            elif s == "adv_result":
-                adv_result.append((parse_int(row["strategy"]), parse_int(row["kind_post"]),
-                                   parse_int(row["qty"]), parse_int(row["flip_qty"]),
-                                   parse_int(row["is_buy"])))  # is_buy column repurposed as success
-            elif s == "mm":
-                mm_rows.append((parse_int(row["bot_id"]), parse_int(row["mm_buys"]),
-                                parse_int(row["mm_sells"]), parse_int(row["is_buy"])))
-
-# ---------- helpers ----------
-def percentile(xs, p):
-    if not xs: return float("nan")
-    xs_s = sorted(xs)
-    idx = max(0, min(len(xs_s)-1, int(len(xs_s) * p)))
-    return xs_s[idx]
-
-def bootstrap_ci(xs, n=1000, alpha=0.05):
-    if len(xs) < 30: return (float("nan"), float("nan"))
-    rng = random.Random(42)
-    means = []
-    for _ in range(n):
-        sample = [xs[rng.randrange(len(xs))] for _ in range(len(xs))]
-        means.append(sum(sample)/len(sample))
-    means.sort()
-    return (means[int(n*alpha/2)], means[int(n*(1-alpha/2))])
-
-STRAT_NAMES = {0: "Random", 1: "TrendFollower", 2: "MeanReversion", 3: "MarketMaker", 4: "Scalper"}
+import argparse, math, os, sys, time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from pnl_attribution import STRATEGIES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_DIR = os.path.join(ROOT, "KieshStockExchange.Server", "logs")
+MATCHER_COLS = ("timestamp", "surface", "side", "context", "value")
+BOT_COLS = ("timestamp", "surface", "bot_id", "strategy", "cash_prc", "inv_notional", "homeostatic",
+            "directional_eff", "anchor", "herd", "buy_prob", "kind_pre", "bias", "kind_post", "qty",
+            "flip_qty", "is_buy", "is_market", "mm_buys", "mm_sells")
+COMPONENTS = ("homeostatic", "directional_eff", "anchor", "herd")
 KIND_NAMES = {0: "LongBracket", 1: "ShortBracket"}
+NA = {np.dtype(np.int8): np.iinfo(np.int8).min, np.dtype(np.int32): np.iinfo(np.int32).min}
+INV_HEAVY = 1000.0  # |inv_notional| above this is a heavy long / short
+SEED = 42
+
+# Poisson(1) by inverse CDF over 16-bit uniforms: a table lookup per weight instead of a Poisson draw
+_CDF = np.cumsum([math.exp(-1) / math.factorial(k) for k in range(16)])
+POISSON1 = np.searchsorted(_CDF, (np.arange(65536) + 0.5) / 65536, side="right").astype(np.uint8)
+
+
+def chunks(path, size):
+    """The file in blocks of about size bytes, cut at line ends; a torn last line is left out."""
+    with open(path, "rb") as fh:
+        tail = b""
+        while data := fh.read(size):
+            data = tail + data
+            cut = data.rfind(b"\n") + 1
+            tail = data[cut:]
+            if cut:
+                yield data[:cut]
+
+
+class Block:
+    """One chunk of probe rows split into fields: start / end byte offsets per (row, column)."""
+
+    def __init__(self, data, cols):
+        self.cols = cols
+        b = np.frombuffer(data, np.uint8)
+        nl = np.flatnonzero(b == 10)
+        starts = np.r_[0, nl[:-1] + 1]
+        delim = (b == 44) | (b == 10)
+        pre = np.r_[0, np.cumsum(delim)]
+        lead = b[starts]
+        # rows start with the timestamp's digit; the re-written header and blank lines don't
+        ok = (pre[nl + 1] - pre[starts] == len(cols)) & (lead >= 48) & (lead <= 57)
+        self.n = int(ok.sum())
+        self.skipped = len(nl) - self.n
+        self.end = np.flatnonzero(delim)[pre[starts[ok]][:, None] + np.arange(len(cols))]
+        self.start = np.c_[starts[ok], self.end[:, :-1] + 1]
+        self.buf = np.r_[b, np.uint8(0)]  # short fields pad with this NUL, which S dtypes strip
+
+    def text(self, col, width=None):
+        """Column as a fixed-width bytes array (truncated to width)."""
+        j = self.cols.index(col)
+        s, e = self.start[:, j], self.end[:, j]
+        w = int((e - s).max(initial=0)) if width is None else width
+        if not self.n or not w:
+            return np.zeros(self.n, "S1")
+        idx = s[:, None] + np.arange(w)
+        return self.buf[np.where(idx < e[:, None], idx, len(self.buf) - 1)].view(f"S{w}").ravel()
+
+    def num(self, col, dtype):
+        """Column parsed as dtype; empty fields are NaN (floats) or NA[dtype] (ints)."""
+        t = self.text(col)
+        has = t != b""
+        dtype = np.dtype(dtype)
+        out = np.full(self.n, np.nan if dtype.kind == "f" else NA[dtype], dtype)
+        out[has] = t[has].astype(dtype)
+        return out
+
+
+class Categories:
+    """Open-ended categorical: bytes value -> stable int16 code in order of first appearance."""
+
+    def __init__(self, names=()):
+        self.index = {}
+        for name in names:
+            self.code(name)
+
+    def code(self, name):
+        return self.index.setdefault(name, len(self.index))
+
+    def codes(self, values):
+        uniq, inv = np.unique(values, return_inverse=True)
+        return np.array([self.code(u) for u in uniq.tolist()], dtype=np.int16)[inv.reshape(-1)]
+
+    def name(self, code):
+        return next(k for k, v in self.index.items() if v == code).decode()
+
+
+def tally(acc, keys, *weights):
+    """acc[key] += [rows, sum(w) for w in weights] per distinct key (a tuple when keys is 2-D)."""
+    if not len(keys):
+        return
+    uniq, inv = np.unique(keys, axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+    sums = np.column_stack([np.bincount(inv, minlength=len(uniq))]
+                           + [np.bincount(inv, weights=w, minlength=len(uniq)) for w in weights]).astype(np.float64)
+    for key, row in zip(uniq.tolist(), sums):
+        key = tuple(key) if isinstance(key, list) else key
+        if key in acc:
+            acc[key] += row
+        else:
+            acc[key] = row
+
+
+def add_counts(acc, key, values):
+    """acc[key] += bincount(values), growing the histogram as needed."""
+    c = np.bincount(values)
+    old = acc.get(key)
+    if old is not None:
+        if len(old) >= len(c):
+            old[:len(c)] += c
+            return
+        c[:len(old)] += old
+    acc[key] = c
+
+
+def count_stats(c):
+    """(n, mean, median) of a histogram; the median is statistics.median's (mean of the middle pair)."""
+    n = int(c.sum())
+    cum = np.cumsum(c)
+    lo, hi = (int(np.searchsorted(cum, i, side="right")) for i in ((n - 1) // 2, n // 2))
+    return n, float(np.dot(c, np.arange(len(c)))) / n, lo if n % 2 else (lo + hi) / 2
+
+
+def boot_sums(x, seed, reps):
+    """Poisson-bootstrap sums of one slice of rows: (sum w*x, sum w over non-NaN) per replicate x column."""
+    rng = np.random.default_rng(seed)
+    ok = ~np.isnan(x)
+    w = POISSON1[rng.integers(0, 65536, (reps, len(x)), dtype=np.uint16)].astype(np.float64)
+    return w @ np.where(ok, x, 0.0), w @ ok.astype(np.float64)
 
-# ---------- Stage 1 quick view ----------
-print("=" * 80)
-print("STAGE 1 — MatchSymmetryProbe summary")
-print("=" * 80)
-if matcher_groups:
-    hdr = f"{'group':<40} {'count':>8} {'mean':>10} {'median':>10}"
-    print(hdr); print("-" * len(hdr))
-    for k, vals in sorted(matcher_groups.items(), key=lambda kv: -len(kv[1])):
-        if not vals: continue
-        n = len(vals)
-        print(f"{'/'.join(k):<40} {n:>8} {statistics.mean(vals):>10.2f} {statistics.median(vals):>10.2f}")
-    m_buy = matcher_groups.get(("matcher","buy","fill_vs_limit"), [])
-    m_sell = matcher_groups.get(("matcher","sell","fill_vs_limit"), [])
-    if m_buy and m_sell:
-        ratio = len(m_sell)/len(m_buy) if len(m_buy) else float("nan")
-        print(f"\nMatcher fill count: sell={len(m_sell)} buy={len(m_buy)} sell/buy={ratio:.3f}x")
-else:
-    print("(no matcher probe data)")
-
-# ---------- block 1: decision-side buy/sell ratio ----------
-print()
-print("=" * 80)
-print("BLOCK 1 — Decision-side buy/sell ratio (probe self-consistency)")
-print("=" * 80)
-if plain_rows:
-    n_buy = sum(1 for r in plain_rows if r["is_buy"] == 1)
-    n_sell = sum(1 for r in plain_rows if r["is_buy"] == 0)
-    print(f"Decision rows: buy={n_buy} sell={n_sell} total={len(plain_rows)}")
-    if n_buy > 0:
-        ratio = n_sell / n_buy
-        print(f"Decision sell/buy = {ratio:.3f}x  (matcher Stage 1 was 1.27x)")
-        within_5pct = abs(ratio - 1.27) / 1.27 < 0.05 if ratio > 0 else False
-        print(f"  -> within 5% of 1.27 matcher signal? {within_5pct}")
-    # hourly bucket
-    by_hour = defaultdict(lambda: [0, 0])
-    for r in plain_rows:
-        try:
-            hr = datetime.fromisoformat(r["ts"].rstrip("Z")).strftime("%Y-%m-%d %H")
-            if r["is_buy"] == 1: by_hour[hr][0] += 1
-            elif r["is_buy"] == 0: by_hour[hr][1] += 1
-        except: pass
-    print(f"\nPer-hour buy/sell stability:")
-    print(f"  {'hour':<16} {'buy':>8} {'sell':>8} {'sell/buy':>10}")
-    for hr in sorted(by_hour.keys()):
-        b, s = by_hour[hr]
-        r = s/b if b > 0 else float("nan")
-        print(f"  {hr:<16} {b:>8} {s:>8} {r:>10.3f}")
-else:
-    print("(no plain-path probe rows)")
-
-# ---------- block 2: per-strategy x inventory bucket component decomposition ----------
-print()
-print("=" * 80)
-print("BLOCK 2 — Per-(strategy, inventory bucket) component decomposition")
-print("=" * 80)
-INV_THRESHOLD_PRC = 0.05
-if plain_rows:
-    def inv_bucket(r):
+
+class Bootstrap:
+    """Feeds fixed-size row slices of the component matrix to boot_sums, in a process pool if jobs > 1."""
+
+    def __init__(self, reps, rows, jobs):
+        self.reps, self.rows = reps, rows
+        self.pool = ProcessPoolExecutor(jobs) if jobs > 1 else None
+        self.window = 2 * jobs
+        self.pending, self.buffered, self.inflight = [], 0, deque()
+        self.slices = 0
+        self.sx = self.sw = None
+
+    def add(self, x):
+        self.pending.append(x)
+        self.buffered += len(x)
+        if self.buffered >= self.rows:
+            x = np.concatenate(self.pending)
+            cut = len(x) - len(x) % self.rows
+            for i in range(0, cut, self.rows):
+                self._submit(x[i:i + self.rows])
+            self.pending, self.buffered = [x[cut:]], len(x) - cut
+
+    def _submit(self, x):
+        args = (x, (SEED, self.slices), self.reps)
+        self.slices += 1
+        if self.pool is None:
+            self._fold(boot_sums(*args))
+            return
+        self.inflight.append(self.pool.submit(boot_sums, *args))
+        while len(self.inflight) > self.window:  # bounded: the reader can't run ahead of the pool
+            self._fold(self.inflight.popleft().result())
+
+    def _fold(self, sums):
+        sx, sw = sums
+        self.sx, self.sw = (sx, sw) if self.sx is None else (self.sx + sx, self.sw + sw)
+
+    def finish(self, alpha=0.05):
+        """Per column (lo, hi) percentile CI of the bootstrap means."""
+        if self.buffered:
+            self._submit(np.concatenate(self.pending))
+            self.pending, self.buffered = [], 0
+        while self.inflight:
+            self._fold(self.inflight.popleft().result())
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.sx is None:
+            return []
+        means = np.sort(np.divide(self.sx, self.sw, out=np.full_like(self.sx, np.nan), where=self.sw > 0), axis=0)
+        n = self.reps
+        return [(float(means[int(n * alpha / 2), j]), float(means[min(n - 1, int(n * (1 - alpha / 2))), j]))
+                for j in range(means.shape[1])]
+
+
+def read_matcher(path, chunk):
+    """Stage 1: {(surface, side, context): values} and Stage 2 depth histograms {side: (levels, depths)}."""
+    cats = Categories()
+    groups, levels, depths = defaultdict(list), {}, {}
+    rows = skipped = 0
+    for data in chunks(path, chunk):
+        blk = Block(data, MATCHER_COLS)
+        rows += blk.n
+        skipped += blk.skipped
+        keys = np.column_stack([cats.codes(blk.text(c)) for c in ("surface", "side", "context")])
+        val = blk.num("value", np.float64)
+        ok = ~np.isnan(val)
+        depth = keys[:, 2] == cats.code(b"depth_ctx")
+        for side in np.unique(keys[depth & ok, 1]):
+            packed = val[depth & ok & (keys[:, 1] == side)].astype(np.int64)
+            add_counts(levels, side, packed // 1_000_000)
+            add_counts(depths, side, packed % 1_000_000)
+        m = ~depth & ok
+        uniq, inv = np.unique(keys[m], axis=0, return_inverse=True)
+        inv = inv.reshape(-1)
+        parts = np.split(val[m][np.argsort(inv, kind="stable")], np.cumsum(np.bincount(inv))[:-1])
+        for key, part in zip(uniq.tolist(), parts):
+            groups[tuple(key)].append(part)
+    named = lambda key: tuple(cats.name(k) for k in key)
+    return ({named(k): np.concatenate(v) for k, v in groups.items()},
+            {cats.name(s): (levels[s], depths[s]) for s in levels}, rows, skipped)
+
+
+def read_bots(path, chunk, boot):
+    """Stage 2: every per-key accumulator the report blocks need, in one pass; CIs via boot."""
+    surfaces = Categories([b"plain", b"adv_intent", b"adv_result", b"mm"])
+    hours = Categories()
+    acc = {k: {} for k in ("hour", "group", "intent", "result", "mm", "mm_bot")}
+    rows = skipped = 0
+    for data in chunks(path, chunk):
+        blk = Block(data, BOT_COLS)
+        rows += blk.n
+        skipped += blk.skipped
+        surface = surfaces.codes(blk.text("surface"))
+        strategy = blk.num("strategy", np.int8)
+        is_buy = blk.num("is_buy", np.int32)
+
+        p = surface == 0
+        if p.any():
+            buy, sell = (is_buy[p] == 1).astype(np.float64), (is_buy[p] == 0).astype(np.float64)
+            tally(acc["hour"], hours.codes(blk.text("timestamp", 13)[p]), buy, sell)
+            inv = np.nan_to_num(blk.num("inv_notional", np.float64)[p])
+            bucket = np.where(inv > INV_HEAVY, 0, np.where(inv < -INV_HEAVY, 2, 1))
+            x = np.column_stack([blk.num(c, np.float64)[p] for c in ("buy_prob", *COMPONENTS)])
+            ok = ~np.isnan(x)
+            x0 = np.where(ok, x, 0.0)
+            tally(acc["group"], np.c_[strategy[p], bucket], *ok.T.astype(np.float64), *x0.T)
+            boot.add(x[:, 1:])
+
+        m = surface == 1
+        if m.any():
+            tally(acc["intent"], np.c_[blk.num("kind_pre", np.int32)[m], blk.num("bias", np.int32)[m],
+                                       blk.num("kind_post", np.int32)[m]])
+        m = surface == 2
+        if m.any():  # is_buy is the success flag on result rows
+            tally(acc["result"], blk.num("kind_post", np.int32)[m], (is_buy[m] == 1).astype(np.float64))
+        m = surface == 3
+        if m.any():
+            tally(acc["mm"], is_buy[m])
+            buys, sells = blk.num("mm_buys", np.int32)[m], blk.num("mm_sells", np.int32)[m]
+            ok = (buys != NA[buys.dtype]) & (sells != NA[sells.dtype])
+            ratio = (buys[ok] - sells[ok]) / np.maximum(1, buys[ok] + sells[ok])
+            tally(acc["mm_bot"], blk.num("bot_id", np.int32)[m][ok], ratio)
+    acc["hour"] = {hours.name(k).replace("T", " "): v for k, v in acc["hour"].items()}
+    return acc, rows, skipped
+
+
+def report(matcher, depth, bots, ci):
+    # ---------- Stage 1 quick view ----------
+    print("=" * 80)
+    print("STAGE 1 — MatchSymmetryProbe summary")
+    print("=" * 80)
+    if matcher:
+        hdr = f"{'group':<40} {'count':>8} {'mean':>10} {'median':>10}"
+        print(hdr); print("-" * len(hdr))
+        for k, vals in sorted(matcher.items(), key=lambda kv: (-len(kv[1]), kv[0])):
+            print(f"{'/'.join(k):<40} {len(vals):>8} {vals.mean():>10.2f} {np.median(vals):>10.2f}")
+        m_buy = len(matcher.get(("matcher", "buy", "fill_vs_limit"), ()))
+        m_sell = len(matcher.get(("matcher", "sell", "fill_vs_limit"), ()))
+        if m_buy and m_sell:
+            print(f"\nMatcher fill count: sell={m_sell} buy={m_buy} sell/buy={m_sell / m_buy:.3f}x")
+    else:
+        print("(no matcher probe data)")
+
+    # ---------- block 1: decision-side buy/sell ratio ----------
+    print()
+    print("=" * 80)
+    print("BLOCK 1 — Decision-side buy/sell ratio (probe self-consistency)")
+    print("=" * 80)
+    hours = bots["hour"]
+    if hours:
+        total, n_buy, n_sell = (int(v) for v in sum(hours.values()))
+        print(f"Decision rows: buy={n_buy} sell={n_sell} total={total}")
+        if n_buy > 0:
+            ratio = n_sell / n_buy
+            print(f"Decision sell/buy = {ratio:.3f}x  (matcher Stage 1 was 1.27x)")
+            within_5pct = abs(ratio - 1.27) / 1.27 < 0.05 if ratio > 0 else False
+            print(f"  -> within 5% of 1.27 matcher signal? {within_5pct}")
+        print(f"\nPer-hour buy/sell stability:")
+        print(f"  {'hour':<16} {'buy':>8} {'sell':>8} {'sell/buy':>10}")
+        for hr in sorted(hours):
+            _, b, s = (int(v) for v in hours[hr])
+            r = s / b if b > 0 else float("nan")
+            print(f"  {hr:<16} {b:>8} {s:>8} {r:>10.3f}")
+    else:
+        print("(no plain-path probe rows)")
+
+    # ---------- block 2: per-strategy x inventory bucket component decomposition ----------
+    print()
+    print("=" * 80)
+    print("BLOCK 2 — Per-(strategy, inventory bucket) component decomposition")
+    print("=" * 80)
+    groups = bots["group"]
+    if groups:
         # Without portfolio value we can't compute exact threshold. Use signed notional sign
         # as a proxy: very-positive = heavy-long, very-negative = heavy-short, near-zero = flat.
-        v = r["inv_notional"] or 0
-        if v > 1000: return "long_heavy"
-        if v < -1000: return "short_heavy"
-        return "flat"
-
-    by_group = defaultdict(list)
-    for r in plain_rows:
-        strat = STRAT_NAMES.get(r["strategy"], f"strat{r['strategy']}")
-        by_group[(strat, inv_bucket(r))].append(r)
-
-    total = len(plain_rows)
-    print(f"{'group':<35} {'n':>8} {'pct':>6} {'mean_buyP':>10} {'mean_homeo':>11} {'mean_dir':>10} {'mean_anch':>10} {'mean_herd':>10}")
-    print("-" * 110)
-    for key in sorted(by_group.keys()):
-        rs = by_group[key]
-        n = len(rs)
-        if n < 5: continue
-        bp = [r["buy_prob"] for r in rs if r["buy_prob"] is not None]
-        ho = [r["homeostatic"] for r in rs if r["homeostatic"] is not None]
-        di = [r["directional_eff"] for r in rs if r["directional_eff"] is not None]
-        an = [r["anchor"] for r in rs if r["anchor"] is not None]
-        he = [r["herd"] for r in rs if r["herd"] is not None]
-        print(f"{'/'.join(key):<35} {n:>8} {n/total*100:>5.1f}% "
-              f"{statistics.mean(bp):>10.3f} {statistics.mean(ho):>11.3f} "
-              f"{statistics.mean(di):>10.3f} {statistics.mean(an):>10.3f} {statistics.mean(he):>10.3f}")
-
-    # Overall component contributions to (buy_prob - 0.5)
-    print("\nOverall mean contribution to (buy_prob - 0.5):")
-    bp_all = [r["buy_prob"] - 0.5 for r in plain_rows if r["buy_prob"] is not None]
-    print(f"  mean(buy_prob - 0.5) = {statistics.mean(bp_all):.4f}")
-    for comp in ["homeostatic", "directional_eff", "anchor", "herd"]:
-        xs = [r[comp] for r in plain_rows if r[comp] is not None]
-        if xs:
-            mean = statistics.mean(xs)
-            lo, hi = bootstrap_ci(xs)
-            contrib_pct = abs(mean) / max(abs(statistics.mean(bp_all)), 1e-9) * 100
-            print(f"  {comp:<20} mean={mean:>8.4f}  95%CI=({lo:.4f},{hi:.4f})  contrib={contrib_pct:.1f}%")
-
-    # Fire criterion
-    print("\nStage 2 fire criterion (>=40% of |mean(buy_prob - 0.5)| with CI lower bound):")
-    target = abs(statistics.mean(bp_all))
-    fired = False
-    for comp in ["homeostatic", "directional_eff", "anchor", "herd"]:
-        xs = [r[comp] for r in plain_rows if r[comp] is not None]
-        if not xs: continue
-        lo, hi = bootstrap_ci(xs)
-        ci_lo_abs = min(abs(lo), abs(hi))
-        pct = ci_lo_abs / max(target, 1e-9) * 100
-        status = "FIRES" if pct >= 40 else "below"
-        print(f"  {comp:<20} ci_lower_abs={ci_lo_abs:.4f}  vs target={target:.4f}  ({pct:.1f}% — {status})")
-        if pct >= 40: fired = True
-    if not fired:
-        print("  No single surface fires the 40% gate -> asymmetry is DISTRIBUTED.")
-else:
-    print("(no plain-path probe rows)")
-
-# ---------- block 3: advanced cohort cross-tab ----------
-print()
-print("=" * 80)
-print("BLOCK 3 — Advanced cohort (kindPre, bias, kindPost) cross-tab")
-print("=" * 80)
-if adv_intent:
-    counts = Counter()
-    for s, kp, b, kpo in adv_intent:
-        counts[(KIND_NAMES.get(kp,"?"), b, KIND_NAMES.get(kpo,"?"))] += 1
-    print(f"{'kindPre':<15} {'bias':>6} {'kindPost':<15} {'count':>10} {'pct':>6}")
-    total = sum(counts.values())
-    for (kp, b, kpo), n in sorted(counts.items(), key=lambda kv: -kv[1]):
-        print(f"{kp:<15} {b:>6} {kpo:<15} {n:>10} {n/total*100:>5.1f}%")
-    flips = sum(n for (kp, b, kpo), n in counts.items() if kp != kpo)
-    print(f"\nInversions (kindPre != kindPost): {flips}/{total} = {flips/total*100:.1f}%")
-
-if adv_result:
-    by_kind_success = defaultdict(lambda: [0, 0])  # kindPost -> [success, total]
-    for s, kpo, q, fq, success in adv_result:
-        by_kind_success[KIND_NAMES.get(kpo,"?")][1] += 1
-        if success: by_kind_success[KIND_NAMES.get(kpo,"?")][0] += 1
-    print(f"\nBracket-build success rate by kindPost:")
-    for k, (succ, tot) in by_kind_success.items():
-        print(f"  {k:<15} {succ}/{tot} = {succ/tot*100:.1f}% success")
-else:
-    print("(no advanced result rows)")
-
-# ---------- block 4: MarketMaker quote ratio ----------
-print()
-print("=" * 80)
-print("BLOCK 4 — MarketMaker quote-side ratio")
-print("=" * 80)
-if mm_rows:
-    n_buy = sum(1 for r in mm_rows if r[3] == 1)
-    n_sell = sum(1 for r in mm_rows if r[3] == 0)
-    print(f"MM quote rows: choseBuy={n_buy} choseSell={n_sell} total={len(mm_rows)}")
-    if n_buy + n_sell > 0:
-        net = (n_buy - n_sell) / (n_buy + n_sell)
-        print(f"Net buy-quote bias: {net:+.3f}  (positive = MMs lean toward buy quote)")
-    # Bot-level mean ratio
-    per_bot = defaultdict(list)
-    for bid, buys, sells, choseBuy in mm_rows:
-        if buys is None or sells is None: continue
-        denom = max(1, buys + sells)
-        per_bot[bid].append((buys - sells) / denom)
-    bot_means = [statistics.mean(vs) for vs in per_bot.values() if vs]
-    if bot_means:
-        print(f"Per-bot mean (buys-sells)/(buys+sells): mean={statistics.mean(bot_means):+.4f} median={statistics.median(bot_means):+.4f}")
-else:
-    print("(no MM probe rows)")
-
-# ---------- block 5: depth context ----------
-print()
-print("=" * 80)
-print("BLOCK 5 — Matcher depth context")
-print("=" * 80)
-if depth_rows:
-    for side in ("buy", "sell"):
-        rs = depth_rows.get(side, [])
-        if not rs: continue
-        levels = [r[0] for r in rs]
-        depths = [r[1] for r in rs]
-        print(f"{side}-taker: n={len(rs)} mean_levelIdx={statistics.mean(levels):.2f} "
-              f"median_levelIdx={statistics.median(levels)} "
-              f"mean_oppositeWallDepth={statistics.mean(depths):.0f} "
-              f"median_oppositeWallDepth={statistics.median(depths)}")
-else:
-    print("(no depth_ctx rows — flag Bots:MatchSymmetryProbeDepthContext was off)")
+        buckets = ("long_heavy", "flat", "short_heavy")
+        k = 1 + len(COMPONENTS)
+        mean = lambda v: v[1 + k:] / np.where(v[1:1 + k] > 0, v[1:1 + k], np.nan)
+        named = {(STRATEGIES.get(s, f"strat{s}"), buckets[b]): v for (s, b), v in groups.items()}
+        total = sum(v[0] for v in groups.values())
+        print(f"{'group':<35} {'n':>8} {'pct':>6} {'mean_buyP':>10} {'mean_homeo':>11} {'mean_dir':>10} {'mean_anch':>10} {'mean_herd':>10}")
+        print("-" * 110)
+        for key in sorted(named):
+            v = named[key]
+            n = int(v[0])
+            if n < 5: continue
+            bp, ho, di, an, he = mean(v)
+            print(f"{'/'.join(key):<35} {n:>8} {n/total*100:>5.1f}% "
+                  f"{bp:>10.3f} {ho:>11.3f} {di:>10.3f} {an:>10.3f} {he:>10.3f}")
+
+        # Overall component contributions to (buy_prob - 0.5)
+        overall = sum(groups.values())
+        counts, means = overall[1:1 + k], mean(overall)
+        print("\nOverall mean contribution to (buy_prob - 0.5):")
+        bp_all = means[0] - 0.5
+        print(f"  mean(buy_prob - 0.5) = {bp_all:.4f}")
+        for j, comp in enumerate(COMPONENTS, 1):
+            if counts[j]:
+                lo, hi = ci[j - 1] if counts[j] >= 30 else (float("nan"), float("nan"))
+                contrib_pct = abs(means[j]) / max(abs(bp_all), 1e-9) * 100
+                print(f"  {comp:<20} mean={means[j]:>8.4f}  95%CI=({lo:.4f},{hi:.4f})  contrib={contrib_pct:.1f}%")
+
+        # Fire criterion
+        print("\nStage 2 fire criterion (>=40% of |mean(buy_prob - 0.5)| with CI lower bound):")
+        target = abs(bp_all)
+        fired = False
+        for j, comp in enumerate(COMPONENTS, 1):
+            if not counts[j]: continue
+            lo, hi = ci[j - 1] if counts[j] >= 30 else (float("nan"), float("nan"))
+            ci_lo_abs = min(abs(lo), abs(hi))
+            pct = ci_lo_abs / max(target, 1e-9) * 100
+            status = "FIRES" if pct >= 40 else "below"
+            print(f"  {comp:<20} ci_lower_abs={ci_lo_abs:.4f}  vs target={target:.4f}  ({pct:.1f}% — {status})")
+            if pct >= 40: fired = True
+        if not fired:
+            print("  No single surface fires the 40% gate -> asymmetry is DISTRIBUTED.")
+    else:
+        print("(no plain-path probe rows)")
+
+    # ---------- block 3: advanced cohort cross-tab ----------
+    print()
+    print("=" * 80)
+    print("BLOCK 3 — Advanced cohort (kindPre, bias, kindPost) cross-tab")
+    print("=" * 80)
+    if bots["intent"]:
+        counts = defaultdict(int)
+        for (kp, b, kpo), v in bots["intent"].items():
+            counts[(KIND_NAMES.get(kp, "?"), "" if b == NA[np.dtype(np.int32)] else b, KIND_NAMES.get(kpo, "?"))] += int(v[0])
+        print(f"{'kindPre':<15} {'bias':>6} {'kindPost':<15} {'count':>10} {'pct':>6}")
+        total = sum(counts.values())
+        for (kp, b, kpo), n in sorted(counts.items(), key=lambda kv: -kv[1]):
+            print(f"{kp:<15} {b:>6} {kpo:<15} {n:>10} {n/total*100:>5.1f}%")
+        flips = sum(n for (kp, b, kpo), n in counts.items() if kp != kpo)
+        print(f"\nInversions (kindPre != kindPost): {flips}/{total} = {flips/total*100:.1f}%")
+
+    if bots["result"]:
+        by_kind_success = defaultdict(lambda: [0, 0])  # kindPost -> [success, total]
+        for kpo, (tot, succ) in bots["result"].items():
+            by_kind_success[KIND_NAMES.get(kpo, "?")][0] += int(succ)
+            by_kind_success[KIND_NAMES.get(kpo, "?")][1] += int(tot)
+        print(f"\nBracket-build success rate by kindPost:")
+        for k, (succ, tot) in sorted(by_kind_success.items()):
+            print(f"  {k:<15} {succ}/{tot} = {succ/tot*100:.1f}% success")
+    else:
+        print("(no advanced result rows)")
+
+    # ---------- block 4: MarketMaker quote ratio ----------
+    print()
+    print("=" * 80)
+    print("BLOCK 4 — MarketMaker quote-side ratio")
+    print("=" * 80)
+    if bots["mm"]:
+        n_buy = int(bots["mm"].get(1, [0])[0])
+        n_sell = int(bots["mm"].get(0, [0])[0])
+        print(f"MM quote rows: choseBuy={n_buy} choseSell={n_sell} total={int(sum(v[0] for v in bots['mm'].values()))}")
+        if n_buy + n_sell > 0:
+            net = (n_buy - n_sell) / (n_buy + n_sell)
+            print(f"Net buy-quote bias: {net:+.3f}  (positive = MMs lean toward buy quote)")
+        # Bot-level mean ratio
+        bot_means = np.array([s / n for n, s in bots["mm_bot"].values()])
+        if len(bot_means):
+            print(f"Per-bot mean (buys-sells)/(buys+sells): mean={bot_means.mean():+.4f} median={np.median(bot_means):+.4f}")
+    else:
+        print("(no MM probe rows)")
+
+    # ---------- block 5: depth context ----------
+    print()
+    print("=" * 80)
+    print("BLOCK 5 — Matcher depth context")
+    print("=" * 80)
+    if depth:
+        for side in ("buy", "sell"):
+            if side not in depth: continue
+            n, mean_level, median_level = count_stats(depth[side][0])
+            _, mean_depth, median_depth = count_stats(depth[side][1])
+            print(f"{side}-taker: n={n} mean_levelIdx={mean_level:.2f} "
+                  f"median_levelIdx={median_level} "
+                  f"mean_oppositeWallDepth={mean_depth:.0f} "
+                  f"median_oppositeWallDepth={median_depth}")
+    else:
+        print("(no depth_ctx rows — flag Bots:MatchSymmetryProbeDepthContext was off)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logs", default=LOG_DIR, help="dir with match-symmetry-probe.csv / bot-decision-probe.csv")
+    ap.add_argument("--chunk-mb", type=float, default=64.0, help="read the probe files in blocks of this size")
+    ap.add_argument("--boot", type=int, default=1000, help="bootstrap replicates for the component CIs")
+    ap.add_argument("--boot-rows", type=int, default=65536, help="plain rows per bootstrap task")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="bootstrap worker processes")
+    args = ap.parse_args()
+
+    chunk = max(1 << 16, int(args.chunk_mb * (1 << 20)))
+    matcher_csv = os.path.join(args.logs, "match-symmetry-probe.csv")
+    bot_csv = os.path.join(args.logs, "bot-decision-probe.csv")
+    t0 = time.perf_counter()
+    matcher, depth = {}, {}
+    if os.path.exists(matcher_csv):
+        matcher, depth, rows, skipped = read_matcher(matcher_csv, chunk)
+        print(f"{matcher_csv}: {rows:,} rows ({skipped} skipped) in {time.perf_counter() - t0:.1f}s")
+    boot = Bootstrap(args.boot, args.boot_rows, args.jobs)
+    bots = {k: {} for k in ("hour", "group", "intent", "result", "mm", "mm_bot")}
+    if os.path.exists(bot_csv):
+        t1 = time.perf_counter()
+        bots, rows, skipped = read_bots(bot_csv, chunk, boot)
+        print(f"{bot_csv}: {rows:,} rows ({skipped} skipped) in {time.perf_counter() - t1:.1f}s")
+    ci = boot.finish()
+    print(f"{boot.slices} bootstrap slices x {args.boot} replicates on {args.jobs} jobs, "
+          f"total {time.perf_counter() - t0:.1f}s\n")
+    report(matcher, depth, bots, ci)
+
+
+if __name__ == "__main__":
+    main()
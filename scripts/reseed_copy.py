@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""Bulk COPY reseed: the generated bot fleet straight into a soak DB, no workbook and no server.
+
+Building a soak template went GenerateAIUsers.py -> AIUserData.xlsx -> a bots-off server whose
+ExcelSeedService inserts the population row by row (kse-balance-setup.ps1). This builds the same rows
+in Python and streams them in with binary COPY:
+
+  * fleet      - Tools/GenerateAIUsers.build_fleet() in memory (default, ~10 s of Faker), a columnar
+                 bundle saved earlier with --save-bundle (one gzipped column-major JSON per sheet, loads
+                 in well under a second), or an existing workbook (--xlsx).
+  * rows       - what ExcelSeedService writes: Stocks, StockListings and one StockPrices row per priced
+                 listing, Users (the seeder's shared "hallo123" hash), AIUsers (watchlists ride in
+                 WatchlistCsv; RoundtripBiasPrc keeps its 0.5 default because the seeder never reads
+                 that column), Funds (home currency, plus BalanceSecondary in the other one) and one
+                 Positions row per (user, stock). Identity ids are assigned in the seeder's insert order.
+  * load       - Orders / Transactions and the seeded tables are truncated, their indexes and primary
+                 keys dropped, each table COPY'd by its own psql (--jobs at once), then the indexes
+                 rebuilt in parallel and the tables VACUUM (FREEZE, ANALYZE)d. The index definitions are
+                 read back from the DB first, saved to data/reseed/<db>-indexes.sql and restored even
+                 when a COPY fails.
+  * sequences  - every identity is set past max(id) so the server's next INSERT doesn't collide.
+  * layout     - checked before the DB is touched: UserIds 1..N in order (the seeder's identity column
+                 renumbers anything else), admin at NUM_PEOPLE + 1, house at NUM_PEOPLE +
+                 HOUSE_USER_ID_OFFSET, then the arbitrage / market-maker / rotator / conviction cohorts
+                 at their Config sizes and strategy codes, the jump aggressor at NUM_PEOPLE +
+                 JUMP_AGGRESSOR_USER_ID_OFFSET and a Profile for exactly the bots. appsettings.json's
+                 Platform:HouseUserId / Bots:Jumps:AggressorUserId are compared too; a mismatch there is
+                 a warning with the env override to run the server with (--strict makes it fatal).
+
+--population-only leaves Stocks / StockListings / StockPrices alone (the reanchor.sql flow).
+--template NAME clones the loaded DB into a fresh template (db_pool.py then replaces its stale spares).
+The schema must already exist (dotnet ef database update). Without --db only the layout is checked.
+
+Usage: py scripts/reseed_copy.py --db kse_soak [--template kse_soak_seed] [--jobs 4]
+       [--bundle data/seed/fleet | --xlsx PATH] [--save-bundle data/seed/fleet] [--population-only]
+"""
+import argparse, base64, gzip, hashlib, json, os, struct, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS = os.path.join(ROOT, "Tools")
+sys.path.insert(0, TOOLS)
+import Config
+
+OUT_DIR = os.path.join(ROOT, "data", "reseed")
+APPSETTINGS = os.path.join(ROOT, "KieshStockExchange.Server", "appsettings.json")
+SHEETS = ("Stocks", "Listings", "Identity", "Profile", "Holding")
+PASSWORD_HASH = base64.b64encode(hashlib.sha256(b"hallo123").digest()).decode()  # SecurityHelper.HashPassword
+CURRENCIES = ("USD", "EUR", "GBP", "JPY", "CHF", "AUD")  # CurrencyType
+COHORTS = (("arbitrage", "ARBITRAGE_COHORT_SIZE", 5), ("market-maker", "MARKET_MAKER_COHORT_SIZE", 6),
+           ("rotator", "ROTATOR_COHORT_SIZE", 7), ("conviction", "CONVICTION_COHORT_SIZE", 8))
+
+# Profile columns by type (the two text ones, WatchlistCsv and HomeCurrency, are handled by name). Optional ones
+# default to 0 like ExcelSeedService's ReadProb / ReadIntCol; RoundtripBiasPrc is never read by the seeder.
+AI_INTS = ("Seed", "DecisionIntervalSeconds", "MaxOpenOrders", "Strategy", "MaxInventoryPerStock",
+           "ConversionCadenceSeconds")
+AI_REQUIRED = ("Seed", "DecisionIntervalSeconds", "MaxOpenOrders", "Strategy", "TradeProb", "UseMarketProb",
+               "UseSlippageMarketProb", "BuyBiasPrc", "MinTradeAmountPrc", "MaxTradeAmountPrc",
+               "PerPositionMaxPrc", "MinCashReservePrc", "MaxCashReservePrc", "SlippageTolerancePrc",
+               "MinLimitOffsetPrc", "MaxLimitOffsetPrc", "AggressivenessPrc", "ExtremeReactionRandomnessPrc",
+               "CashInjectionFrequencyPrc", "CashInjectionAmountPrc", "WatchlistCsv")
+AI_NUMERIC = ("TradeProb", "UseMarketProb", "UseSlippageMarketProb", "BuyBiasPrc", "MinTradeAmountPrc",
+              "MaxTradeAmountPrc", "PerPositionMaxPrc", "MinCashReservePrc", "MaxCashReservePrc",
+              "SlippageTolerancePrc", "MinLimitOffsetPrc", "MaxLimitOffsetPrc", "AggressivenessPrc",
+              "ExtremeReactionRandomnessPrc", "CashInjectionFrequencyPrc", "CashInjectionAmountPrc",
+              "StopProb", "TrailingProb", "ShortProb", "LongBracketProb", "ShortBracketProb",
+              "MidLimitMinPrc", "MidLimitMaxPrc", "FarLimitMinPrc", "FarLimitMaxPrc",
+              "StopDistanceMinPrc", "StopDistanceMaxPrc", "FarBudgetPrc", "TpOffsetMinPrc", "TpOffsetMaxPrc",
+              "Lateness", "MinArbitrageRatePrc")
+
+# table -> (identity column, ((column, type), ...)); i int4, t text, b bool, n numeric, ts timestamptz
+TABLES = {
+    "Stocks": ("StockId", (("StockId", "i"), ("Symbol", "t"), ("CompanyName", "t"), ("Sector", "t"),
+                           ("SharesOutstanding", "i"), ("CreatedAt", "ts"))),
+    "StockListings": ("ListingId", (("ListingId", "i"), ("StockId", "i"), ("Currency", "t"), ("IsPrimary", "b"),
+                                    ("SeedPrice", "n"), ("CreatedAt", "ts"))),
+    "StockPrices": ("PriceId", (("PriceId", "i"), ("StockId", "i"), ("Price", "n"), ("Currency", "t"),
+                                ("Timestamp", "ts"))),
+    "Users": ("UserId", (("UserId", "i"), ("Username", "t"), ("PasswordHash", "t"), ("Email", "t"),
+                         ("FullName", "t"), ("CreatedAt", "ts"), ("BirthDate", "ts"), ("IsAdmin", "b"))),
+    "AIUsers": ("AiUserId", (("AiUserId", "i"), ("UserId", "i"))
+                + tuple((c, "i") for c in AI_INTS)
+                + tuple((c, "n") for c in AI_NUMERIC)
+                + (("RoundtripBiasPrc", "n"), ("WatchlistCsv", "t"), ("HomeCurrency", "t"),
+                   ("CreatedAt", "ts"), ("UpdatedAt", "ts"))),
+    "Funds": ("FundId", (("FundId", "i"), ("UserId", "i"), ("TotalBalance", "n"), ("ReservedBalance", "n"),
+                         ("Currency", "t"), ("CreatedAt", "ts"), ("UpdatedAt", "ts"))),
+    "Positions": ("PositionId", (("PositionId", "i"), ("UserId", "i"), ("StockId", "i"), ("Quantity", "i"),
+                                 ("ReservedQuantity", "i"), ("ShortCollateral", "n"),
+                                 ("ShortCollateralCurrency", "t"), ("CreatedAt", "ts"), ("UpdatedAt", "ts"))),
+}
+
+INDEX_SQL = '''
+SELECT c.relname, i.relname, pg_get_indexdef(i.oid), COALESCE(con.conname, ''),
+       COALESCE(pg_get_constraintdef(con.oid), '')
+FROM pg_index x
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_class c ON c.oid = x.indrelid
+LEFT JOIN pg_constraint con ON con.conindid = i.oid AND con.contype IN ('p', 'u')
+WHERE c.relnamespace = 'public'::regnamespace AND c.relname = ANY(string_to_array(:'tables', ','))
+ORDER BY 1, 2;'''
+SEQ_SQL = ("SELECT setval(pg_get_serial_sequence('\"{t}\"', '{c}'), COALESCE(max(\"{c}\"), 0) + 1, false) "
+           "FROM \"{t}\";")
+
+
+# ─────────────────────────────── fleet sources ───────────────────────────────
+
+class Fleet:
+    """Sheet name -> (header, rows): the AIUserData.xlsx contents, however they were produced."""
+
+    def __init__(self, sheets, source):
+        self.sheets, self.source = sheets, source
+
+    def records(self, name):
+        head, rows = self.sheets[name]
+        return [dict(zip(head, r)) for r in rows]
+
+
+def generate():
+    try:
+        import GenerateAIUsers
+        from ExcelLayout import sheet_headers
+    except ImportError as ex:
+        sys.exit(f"{ex}; generating the fleet needs pip install -r Tools/requirements.txt (or pass --bundle)")
+    rows = GenerateAIUsers.build_fleet()
+    heads = sheet_headers([s["ticker"] for s in Config.STOCKS.values()])
+    return Fleet({n: (heads[n], rows[n]) for n in SHEETS}, "Tools/GenerateAIUsers.build_fleet()")
+
+
+def read_xlsx(path):
+    try:
+        import openpyxl
+    except ImportError:
+        sys.exit("openpyxl is required: pip install -r Tools/requirements.txt")
+    if not os.path.exists(path):
+        sys.exit(f"{path} not found - generate it with Tools/GenerateAIUsers.py")
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    sheets = {}
+    for name in SHEETS:
+        it = wb[name].iter_rows(values_only=True)
+        head = [str(h).strip() for h in next(it)]
+        sheets[name] = (head, [list(r) for r in it if r and r[0] is not None])
+    return Fleet(sheets, path)
+
+
+def save_bundle(fleet, path):
+    os.makedirs(path, exist_ok=True)
+    for name, (head, rows) in fleet.sheets.items():
+        cols = [list(c) for c in zip(*rows)] if rows else [[] for _ in head]
+        with gzip.open(os.path.join(path, f"{name}.json.gz"), "wt", encoding="utf-8", compresslevel=6) as fh:
+            json.dump({"columns": head, "data": cols}, fh, separators=(",", ":"), default=str)
+    meta = {"source": fleet.source, "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "rows": {n: len(r) for n, (_, r) in fleet.sheets.items()}}
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, indent=2)
+
+
+def read_bundle(path):
+    sheets = {}
+    for name in SHEETS:
+        f = os.path.join(path, f"{name}.json.gz")
+        if not os.path.exists(f):
+            sys.exit(f"{f} missing - write the bundle with --save-bundle {path}")
+        with gzip.open(f, "rt", encoding="utf-8") as fh:
+            d = json.load(fh)
+        sheets[name] = (d["columns"], [list(r) for r in zip(*d["data"])])
+    return Fleet(sheets, path)
+
+
+# ─────────────────────────────── UserId layout ───────────────────────────────
+
+def flag(v):
+    if isinstance(v, str):
+        v = v.strip().lower()
+        return v == "true" or (v.lstrip("-").isdigit() and int(v) != 0)
+    return bool(v)
+
+
+def appsettings():
+    try:
+        with open(APPSETTINGS, encoding="utf-8-sig") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def check_layout(fleet):
+    """-> (NUM_PEOPLE, problems, warnings) for the fleet against Tools/Config.py's id offsets and cohort sizes."""
+    ident = fleet.records("Identity")
+    ids = [int(r["UserId"]) for r in ident]
+    names = {int(r["UserId"]): str(r["Username"]) for r in ident}
+    strategy = {int(r["UserId"]): int(r["Strategy"]) for r in fleet.records("Profile")}
+    problems = []
+    if ids != list(range(1, len(ids) + 1)):
+        problems.append("Identity UserIds aren't 1..N in sheet order; the seeder's identity column would renumber them")
+    admins = [int(r["UserId"]) for r in ident if flag(r.get("IsAdmin"))]
+    if len(admins) != 1:
+        return 0, problems + [f"expected exactly one IsAdmin row, found {len(admins)}"], []
+    n = admins[0] - 1
+    house, jump = n + Config.HOUSE_USER_ID_OFFSET, n + Config.JUMP_AGGRESSOR_USER_ID_OFFSET
+    for uid, who in ((n + 1, "admin"), (house, "house"), (jump, "jumpdesk")):
+        if names.get(uid) != who:
+            problems.append(f"UserId {uid} should be '{who}', is {names.get(uid, 'missing')!r}")
+        if uid in strategy:
+            problems.append(f"UserId {uid} ('{who}') has a Profile row; it must never be a bot")
+    bots = set(range(1, n + 1))
+    start = house + 1
+    for label, attr, code in COHORTS:
+        size = getattr(Config, attr)
+        wrong = [u for u in range(start, start + size) if strategy.get(u) != code]
+        if wrong:
+            problems.append(f"{label} cohort {start}-{start + size - 1} ({attr}={size}) needs strategy {code}; "
+                            f"{len(wrong)} id(s) don't, first {wrong[0]}")
+        bots.update(range(start, start + size))
+        start += size
+    if start != jump:
+        problems.append(f"cohorts end at {start - 1} but JUMP_AGGRESSOR_USER_ID_OFFSET puts the aggressor at {jump}")
+    if ids and ids[-1] != jump:
+        problems.append(f"the jump aggressor must be the last UserId ({jump}), the last is {ids[-1]}")
+    missing, extra = sorted(bots - set(strategy)), sorted(set(strategy) - bots)
+    if missing:
+        problems.append(f"{len(missing)} bot(s) without a Profile row, first {missing[0]}")
+    if extra:
+        problems.append(f"{len(extra)} Profile row(s) outside the bot ranges, first {extra[0]}")
+    leaked = [u for u in range(1, n + 1) if strategy.get(u) in {c for _, _, c in COHORTS}]
+    if leaked:
+        problems.append(f"{len(leaked)} random-fleet bot(s) carry a cohort strategy code, first {leaked[0]}")
+    held = [int(r["UserId"]) for r in fleet.records("Holding")]
+    if sorted(held) != ids:
+        problems.append("Holding UserIds don't match Identity one-to-one")
+    cfg, warnings = appsettings(), []
+    for path, want in ((("Platform", "HouseUserId"), house), (("Bots", "Jumps", "AggressorUserId"), jump)):
+        v = cfg
+        for k in path:
+            v = v.get(k) if isinstance(v, dict) else None
+        if v is not None and int(v) != want:
+            warnings.append(f"appsettings.json {':'.join(path)} = {v} but the seed puts it at {want}; "
+                            f"run the server with {'__'.join(path)}={want}")
+    return n, problems, warnings
+
+
+# ─────────────────────────────── rows ───────────────────────────────
+
+def money(v, ccy):
+    """CurrencyHelper.RoundMoney: 2 places (JPY 0), midpoint away from zero."""
+    return Decimal(str(v or 0)).quantize(Decimal(1) if ccy == "JPY" else Decimal("0.01"), ROUND_HALF_UP)
+
+
+def dec(v):
+    return Decimal(str(v)) if v not in (None, "") else Decimal(0)
+
+
+def integer(v):
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return 0
+
+
+def currency(v, default="USD"):
+    v = str(v or "").strip().upper()
+    return v if v in CURRENCIES else default
+
+
+def birthdate(v):
+    if isinstance(v, datetime):
+        return v.replace(tzinfo=timezone.utc) if v.tzinfo is None else v
+    return datetime.strptime(str(v)[:10], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+def build(fleet, now, population_only):
+    """-> {table: rows} in TABLES column order, ids numbered in ExcelSeedService's insert order."""
+    out = {}
+    stock_count = len(fleet.sheets["Stocks"][1])
+    if not population_only:
+        out["Stocks"] = [(int(r["StockId"]), str(r["Ticker"]), str(r["CompanyName"]), str(r.get("Sector") or ""), 0, now)
+                         for r in fleet.records("Stocks")]
+        listings = []
+        for r in fleet.records("Listings"):
+            ccy = currency(r["Currency"])
+            price = money(r["SeedPrice"], ccy)
+            if price <= 0:
+                sys.exit(f"listing {r['StockId']}/{ccy} has no SeedPrice (the server would fall back to StockPrices)")
+            listings.append((len(listings) + 1, int(r["StockId"]), ccy, flag(r["IsPrimary"]), price, now))
+        out["StockListings"] = listings
+        out["StockPrices"] = [(i + 1, l[1], l[4], l[2], now) for i, l in enumerate(listings)]
+
+    out["Users"] = [(int(r["UserId"]), str(r["Username"]), PASSWORD_HASH, str(r["Email"]), str(r["FullName"]), now,
+                     birthdate(r["Birthdate"]), flag(r.get("IsAdmin"))) for r in fleet.records("Identity")]
+
+    ai, home = [], {}
+    for r in fleet.records("Profile"):
+        absent = [c for c in AI_REQUIRED if r.get(c) in (None, "")]
+        if absent:
+            sys.exit(f"Profile row for user {r.get('UserId')} lacks {', '.join(absent)}")
+        uid = int(r["UserId"])
+        home[uid] = currency(r.get("HomeCurrency"))
+        ai.append((len(ai) + 1, uid) + tuple(integer(r.get(c)) for c in AI_INTS)
+                  + tuple(dec(r.get(c)) for c in AI_NUMERIC)
+                  + (Decimal("0.5"), str(r["WatchlistCsv"]), home[uid], now, now))
+    out["AIUsers"] = ai
+
+    head, _ = fleet.sheets["Holding"]
+    funds, positions = [], []
+    for r in fleet.records("Holding"):
+        uid = int(r["UserId"])
+        ccy = home.get(uid, "USD")
+        qty = [integer(r.get(head[i + 2])) for i in range(stock_count)]  # row[i+2], as the server reads it
+        for c, bal in ((ccy, r["Balance"]), ("EUR" if ccy == "USD" else "USD", r.get("BalanceSecondary"))):
+            amount = money(bal, c)
+            if amount > 0:
+                funds.append((len(funds) + 1, uid, amount, Decimal(0), c, now, now))
+        for sid in range(1, stock_count + 1):
+            positions.append((len(positions) + 1, uid, sid, qty[sid - 1], 0, Decimal(0), "USD", now, now))
+    out["Funds"], out["Positions"] = funds, positions
+    return out
+
+
+# ─────────────────────────────── binary COPY ───────────────────────────────
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PG_EPOCH, MICROSECOND = datetime(2000, 1, 1, tzinfo=timezone.utc), timedelta(microseconds=1)
+TRUE, FALSE, NULL = struct.pack(">ib", 1, 1), struct.pack(">ib", 1, 0), struct.pack(">i", -1)
+
+
+def numeric(d):
+    """Decimal -> numeric send format: base-10000 digit groups, weight of the first, sign, display scale."""
+    sign, digits, exp = d.as_tuple()
+    s = "".join(map(str, digits))
+    if exp > 0:
+        s, exp = s + "0" * exp, 0
+    s = s.zfill(1 - exp)  # at least one whole digit, so 1.5E-5 splits as "0" . "000015"
+    whole, frac = s[:len(s) + exp], s[len(s) + exp:]
+    whole = whole.lstrip("0")
+    whole = "0" * (-len(whole) % 4) + whole
+    frac = frac + "0" * (-len(frac) % 4)
+    groups = [int(whole[i:i + 4]) for i in range(0, len(whole), 4)] + [int(frac[i:i + 4]) for i in range(0, len(frac), 4)]
+    weight = len(whole) // 4 - 1
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight, sign = 0, 0
+    body = struct.pack(f">hhHH{len(groups)}H", len(groups), weight, 0x4000 if sign else 0, max(-exp, 0), *groups)
+    return struct.pack(">i", len(body)) + body
+
+
+def field(t, v):
+    if t == "t":
+        b = v.encode()
+        return struct.pack(">i", len(b)) + b
+    if t == "b":
+        return TRUE if v else FALSE
+    if t == "n":
+        return numeric(v)
+    return struct.pack(">iq", 8, (v - PG_EPOCH) // MICROSECOND)
+
+
+def encode(types, rows):
+    """Rows -> one PGCOPY binary stream. Everything but int4 repeats a lot (zeros, currencies, the load
+    timestamp), so those fields are encoded once per distinct value."""
+    out = [PGCOPY_HEADER]
+    push, pack_int = out.append, struct.Struct(">ii").pack
+    nf = struct.pack(">h", len(types))
+    memo = {}
+    for row in rows:
+        push(nf)
+        for t, v in zip(types, row):
+            if t == "i":
+                push(pack_int(4, v))
+            elif v is None:
+                push(NULL)
+            else:
+                b = memo.get((t, v))
+                if b is None:
+                    b = memo[(t, v)] = field(t, v)
+                push(b)
+    push(struct.pack(">h", -1))
+    return b"".join(out)
+
+
+def load_table(db, table, rows):
+    cols = TABLES[table][1]
+    data = encode([t for _, t in cols], rows)
+    n = kse_db.copy_in(db, table, [c for c, _ in cols], data)
+    if n is not None and n != len(rows):
+        raise RuntimeError(f"{table}: COPY reported {n} rows, sent {len(rows)}")
+    return len(data)
+
+
+# ─────────────────────────────── DB steps ───────────────────────────────
+
+def q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def index_plan(db, tables):
+    """-> (drop SQL, {table: restore SQL}) for every index / PK / unique constraint on `tables`."""
+    drops, restore = [], {}
+    for table, index, indexdef, con, condef in kse_db.rows(db, INDEX_SQL, {"tables": ",".join(tables)}):
+        if con:
+            drops.append(f"ALTER TABLE {q(table)} DROP CONSTRAINT {q(con)};")
+            restore.setdefault(table, []).append(f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(con)} {condef};")
+        else:
+            drops.append(f"DROP INDEX {q(index)};")
+            restore.setdefault(table, []).append(indexdef + ";")
+    return "\n".join(drops), {t: "\n".join(s) for t, s in restore.items()}
+
+
+def parallel(jobs, fn, items):
+    """fn(item) for every item on `jobs` threads -> {item: result}; raises the first error after all finish."""
+    with ThreadPoolExecutor(max(1, jobs)) as ex:
+        futs = {it: ex.submit(fn, it) for it in items}
+    errors = [f.exception() for f in futs.values() if f.exception()]
+    if errors:
+        raise errors[0]
+    return {it: f.result() for it, f in futs.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="", help="soak DB to (re)seed; its schema must exist. Omit to only check the layout")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--bundle", default="", help="load the fleet from a --save-bundle directory")
+    src.add_argument("--xlsx", default="", help="load the fleet from an AIUserData.xlsx")
+    ap.add_argument("--save-bundle", default="", help="write the fleet as a columnar bundle to this directory")
+    ap.add_argument("--population-only", action="store_true",
+                    help="reseed Users/AIUsers/Funds/Positions only; keep Stocks, StockListings, StockPrices")
+    ap.add_argument("--jobs", type=int, default=4, help="tables COPY'd / indexed at once")
+    ap.add_argument("--strict", action="store_true", help="appsettings.json id mismatches are fatal too")
+    ap.add_argument("--template", default="", help="then clone the DB into this (re)created template")
+    args = ap.parse_args()
+    say = lambda msg: print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+    t0 = time.perf_counter()
+    fleet = read_bundle(args.bundle) if args.bundle else read_xlsx(args.xlsx) if args.xlsx else generate()
+    say(f"fleet from {fleet.source}: " + ", ".join(f"{n} {len(r):,}" for n, (_, r) in fleet.sheets.items())
+        + f" ({time.perf_counter() - t0:.1f}s)")
+    n, problems, warnings = check_layout(fleet)
+    for w in warnings:
+        say(f"WARNING {w}")
+    if args.strict:
+        problems += warnings
+    if problems:
+        sys.exit("UserId layout doesn't match Tools/Config.py:\n  " + "\n  ".join(problems))
+    say(f"UserId layout ok: NUM_PEOPLE={n}, house {n + Config.HOUSE_USER_ID_OFFSET}, "
+        f"jump aggressor {n + Config.JUMP_AGGRESSOR_USER_ID_OFFSET}")
+    if args.save_bundle:
+        save_bundle(fleet, args.save_bundle)
+        say(f"bundle -> {args.save_bundle}")
+    if not args.db:
+        return
+    db = args.db
+    if args.template and args.template == db:
+        sys.exit("--template must differ from --db")
+
+    t1 = time.perf_counter()
+    tables = build(fleet, datetime.now(timezone.utc), args.population_only)
+    say(f"{sum(map(len, tables.values())):,} rows built in {time.perf_counter() - t1:.1f}s")
+
+    try:
+        drops, restore = index_plan(db, list(tables))
+        os.makedirs(OUT_DIR, exist_ok=True)
+        saved = os.path.join(OUT_DIR, f"{db}-indexes.sql")
+        with open(saved, "w", encoding="utf-8") as fh:
+            fh.write("\n".join(restore.values()) + "\n")
+        truncate = ", ".join(q(t) for t in ("Orders", "Transactions", *tables))
+        kse_db._run(db, f"BEGIN;\nTRUNCATE {truncate} RESTART IDENTITY CASCADE;\n{drops}\nCOMMIT;")
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    say(f"truncated; {len(drops.splitlines())} index(es) deferred (definitions saved to {saved})")
+
+    t2 = time.perf_counter()
+    failed = None
+    try:
+        # biggest first so the long pole starts immediately
+        sizes = parallel(args.jobs, lambda t: load_table(db, t, tables[t]), sorted(tables, key=lambda t: -len(tables[t])))
+        say(f"COPY {sum(sizes.values()) / 2 ** 20:.1f} MB binary in {time.perf_counter() - t2:.1f}s: "
+            + ", ".join(f"{t} {len(tables[t]):,}" for t in tables))
+    except (kse_db.QueryError, RuntimeError) as ex:
+        failed = ex
+    finally:
+        t3 = time.perf_counter()
+        try:
+            parallel(args.jobs, lambda t: kse_db._run(db, f"SET maintenance_work_mem = '256MB';\n{restore[t]}"), list(restore))
+            say(f"indexes rebuilt in {time.perf_counter() - t3:.1f}s")
+        except kse_db.QueryError as ex:
+            sys.exit(f"{failed or ''}\nrebuilding indexes failed ({ex}); restore them from {saved}")
+    if failed:
+        sys.exit(f"load failed, {db} is half-seeded: {failed}")
+
+    try:
+        kse_db._run(db, "\n".join(SEQ_SQL.format(t=t, c=TABLES[t][0]) for t in tables))
+        kse_db._run(db, "\n".join(f"VACUUM (FREEZE, ANALYZE) {q(t)};" for t in tables))
+        if args.template:
+            import db_pool
+            db_pool.ident(args.template)
+            db_pool.drop(args.template)
+            db_pool.clone(db, args.template)
+            say(f"template {args.template} cloned from {db} (db_pool.py fill replaces its stale spares)")
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    say(f"{db} seeded in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Offline reconcile of a reservation-ledger export against Orders, Funds and Positions.
+
+ReservationAuditor checks the live cache every pass and only says how much is off ("... exceeds
+tolerance", the line phase_harvest.SIGNALS counts). This takes the ledger the server exports
+(api/admin/bots/reservation-ledger.csv, the BotDashboard download; run with TrackAll for the whole
+fleet) and finds, per (user, currency) fund, where the reserved balance went wrong:
+
+  break     a Fund row's ReservedBalance-before is not the previous Fund row's after: something
+            changed the reservation without a ledger row (an untracked writer, a lost row)
+  db        the ledger's last ReservedBalance is not Funds.ReservedBalance now
+  phantom / the DB reservation vs what backs it: the user's Open / Pending buys in that currency
+  under     (Orders) + Positions.ShortCollateral. A buy's reservation is its last ledger
+            CurrentBuyReservation; a buy with no ledger row under its id (its place-time reserve is
+            logged before the insert assigns one, with OrderId 0) gets ReservationMath's remaining
+            reservation from its Orders row: limit price x unfilled qty, or the BuyBudget of an
+            unfilled budget buy. Funds with a buy that has neither are not judged. A resting short's
+            place-time collateral isn't in the ledger, so an over-reservation with open sells in the
+            currency isn't called phantom
+
+Each divergent fund gets its first diverging event: the first break, or else the row from which the
+ledger's ReservedBalance stopped matching the DB value for good (row = data row number in the csv).
+
+The DB side is three small hash indexes - Funds by (user, currency), the Open / Pending orders by
+OrderId, short collateral by (user, currency) - loaded before the ledger is read. The ledger then
+streams through in --chunk-rows slices; per slice the Fund rows are grouped by fund with numpy and
+checked against the carried per-fund state, and Order rows only update the open orders' last
+reservation. Memory is bounded by funds + open orders, not by ledger length. Export the ledger after
+the bots stop (or pause them) so the DB side is at the same point.
+
+Writes data/reservations/<ledger name>/divergent.csv (one row per divergent fund).
+
+Usage: py scripts/reservation_reconcile.py LEDGER.csv [--db kse_soak] [--tol 0.01] [--chunk-rows 100000]
+       [--top 25]
+"""
+import argparse, csv, itertools, os, sys, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.path.join(ROOT, "data", "reservations")
+COLS = ("TimestampUtc", "Kind", "UserId", "SecondaryUserId", "OrderId", "StockId", "Currency", "Action",
+        "Amount", "Before1", "After1", "Before2", "After2", "Quantity", "Price", "Delta1", "Delta2")
+C = {c: i for i, c in enumerate(COLS)}
+USED = ("Kind", "UserId", "OrderId", "Currency", "Action", "Before1", "After1")  # as arrays; events read the rows
+FUNDS_SQL = 'SELECT "UserId", "Currency", "ReservedBalance", "TotalBalance" FROM "Funds";'
+# + ReservationMath.RemainingBuyReservation where the row alone determines it (RoundMoney: JPY 0 dp, else 2)
+OPEN_SQL = '''SELECT "OrderId", "UserId", "Currency", "Side",
+       CASE WHEN "Side" <> 'Buy' THEN NULL
+            WHEN "Entry" = 'Limit' THEN round("Price" * ("Quantity" - COALESCE("AmountFilled", 0)),
+                                              CASE WHEN "Currency" = 'JPY' THEN 0 ELSE 2 END)
+            WHEN "SlippagePercent" IS NULL AND COALESCE("AmountFilled", 0) = 0 THEN "BuyBudget" END
+FROM "Orders" WHERE "Status" IN ('Open', 'Pending');'''
+COLLATERAL_SQL = '''SELECT "UserId", "ShortCollateralCurrency", SUM("ShortCollateral") FROM "Positions"
+WHERE "ShortCollateral" > 0 GROUP BY 1, 2;'''
+FIELDS = ("user", "ccy", "reasons", "fund_rows", "ledger_reserved", "db_reserved", "expected", "db_minus_ledger",
+          "db_minus_expected", "open_buys", "open_buys_estimated", "open_buys_unseen", "open_sells", "breaks",
+          "break_sum", "first_row", "first_ts", "first_action", "first_order", "first_before", "first_after",
+          "first_note")
+
+
+class Fund:
+    """Carried ledger state of one (user, currency) fund."""
+    __slots__ = ("rows", "after", "breaks", "break_sum", "first_break", "since")
+
+    def __init__(self):
+        self.rows, self.after, self.breaks, self.break_sum = 0, np.nan, 0, 0.0
+        self.first_break = None  # (event, note) of the first break
+        self.since = None  # event from which After1 has not matched the DB value; None = it matches now
+
+
+class Ledger:
+    """Per-fund ledger state plus the last ledger reservation of each DB-open order."""
+
+    def __init__(self, funds, open_orders, tol):
+        self.funds, self.open_orders, self.tol = funds, open_orders, tol
+        self.state = {}   # (user, ccy) -> Fund
+        self.cbr = {}     # open OrderId -> last After1 (CurrentBuyReservation)
+        self.pair = {}    # user -> [fund moves - order moves, event from which it hasn't netted to 0]
+        self.rows = 0
+
+    def add(self, rowno, rows, cols):
+        """Fold one slice: its csv rows, their USED columns as arrays, and their data row numbers."""
+        kind = cols["Kind"]
+        self.rows += int((kind != "Kind").sum())  # concatenated exports repeat the header
+        self._orders(cols, kind == "Order")
+        self._pairing(rowno, rows, cols, kind)
+        f = np.flatnonzero(kind == "Fund")
+        if not len(f):
+            return
+        user = cols["UserId"][f].astype(np.int64)
+        ccy = cols["Currency"][f]
+        ccys, ccy_i = np.unique(ccy, return_inverse=True)
+        key = user * len(ccys) + ccy_i.reshape(-1)
+        order, starts, ends = groups(key)
+        f, key, user, ccy_i = f[order], key[order], user[order], ccy_i.reshape(-1)[order]
+        before, after = (num(cols[c][f]) for c in ("Before1", "After1"))
+        names = [(int(user[s]), str(ccys[ccy_i[s]])) for s in starts]
+        fund_of = np.repeat(np.arange(len(starts)), ends - starts)
+
+        carried = np.array([self.state[k].after if k in self.state else np.nan for k in names])
+        prev = np.r_[np.nan, after[:-1]]
+        prev[starts] = carried
+        gap = before - prev
+        brk = np.abs(gap) > self.tol  # NaN (first row of a fund) is no break
+        target = np.array([self.funds.get(k, (np.nan,))[0] for k in names])[fund_of]
+        last_match = last_true(np.abs(after - target) <= self.tol, starts)
+        first_brk = {}
+        for i in np.flatnonzero(brk)[::-1]:
+            first_brk[fund_of[i]] = i
+
+        for g, k in enumerate(names):
+            st = self.state.get(k) or self.state.setdefault(k, Fund())
+            s, e = starts[g], ends[g]
+            st.rows += int(e - s)
+            st.after = float(after[e - 1])
+            nb = int(brk[s:e].sum())
+            if nb:
+                st.breaks += nb
+                st.break_sum += float(gap[s:e][brk[s:e]].sum())
+                if st.first_break is None:
+                    i = first_brk[g]
+                    st.first_break = (event(rowno, rows, f[i]),
+                                      f"reserved {prev[i]:.2f} -> {before[i]:.2f} with no ledger row")
+            st.since = since(st.since, last_match[g], s, e, lambda i: event(rowno, rows, f[i]))
+
+    def _pairing(self, rowno, rows, cols, kind):
+        """Per user, Fund reserved moves minus Order buy-reservation moves: every reserve / release
+        logs both, so a run that doesn't net back to 0 starts at an unpaired move. Short-collateral
+        Fund rows have no Order counterpart and are left out."""
+        m = np.flatnonzero(((kind == "Fund") & (np.char.find(cols["Action"], "Collateral") < 0)) | (kind == "Order"))
+        if not len(m):
+            return
+        user = cols["UserId"][m].astype(np.int64)
+        order, starts, ends = groups(user)
+        m, user = m[order], user[order]
+        delta = num(cols["After1"][m]) - num(cols["Before1"][m])
+        delta[kind[m] == "Order"] *= -1
+        users = user[starts].tolist()
+        carried = np.array([self.pair[u][0] if u in self.pair else 0.0 for u in users])
+        cs = np.cumsum(delta)
+        net = cs - np.repeat(np.r_[0.0, cs][starts] - carried, ends - starts)
+        last_zero = last_true(np.abs(net) <= self.tol, starts)
+        for g, u in enumerate(users):
+            p = self.pair.setdefault(u, [0.0, None])
+            s, e = starts[g], ends[g]
+            p[0] = float(net[e - 1])
+            p[1] = since(p[1], last_zero[g], s, e, lambda i: event(rowno, rows, m[i]))
+
+    def _orders(self, cols, m):
+        """Last After1 of every Order row whose order is still open in the DB."""
+        if not m.any():
+            return
+        oid = num(cols["OrderId"][m], 0).astype(np.int64)
+        after = num(cols["After1"][m])
+        rev = oid[::-1]
+        uniq, last = np.unique(rev, return_index=True)  # first in reverse = last in the slice
+        for o, i in zip(uniq.tolist(), last):
+            if o in self.open_orders:
+                self.cbr[o] = float(after[::-1][i])
+
+
+def groups(key):
+    """(stable order sorting key, start and end of each equal-key run in that order)."""
+    order = np.argsort(key, kind="stable")
+    k = key[order]
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    return order, starts, np.r_[starts[1:], len(k)]
+
+
+def last_true(mask, starts):
+    """Per group, the last position where mask holds (-1 if none)."""
+    return np.maximum.reduceat(np.where(mask, np.arange(len(mask)), -1), starts)
+
+
+def since(prev, last, s, e, at):
+    """Start of a group's current mismatch run: None if its last row matches, else the row after its
+    last match, else (no match in this slice) the carried start or the slice's first row."""
+    if last == e - 1:
+        return None
+    if last >= s:
+        return at(last + 1)
+    return prev if prev is not None else at(s)
+
+
+def event(rowno, rows, i):
+    """(row, ts, action, order, before1, after1) of slice row i, kept as the csv had them."""
+    return (int(rowno[i]), *(rows[i][C[c]] for c in ("TimestampUtc", "Action", "OrderId", "Before1", "After1")))
+
+
+def num(a, empty=np.nan):
+    """Numeric csv column (a str array) -> float64, empty fields -> empty."""
+    out = np.full(len(a), empty, dtype=np.float64)
+    has = a != ""
+    out[has] = a[has].astype(np.float64)
+    return out
+
+
+def chunks(path, size):
+    """(data row numbers, rows, {USED column: str array}) per size-row slice of the ledger csv; short
+    rows are dropped."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        r = csv.reader(fh)
+        header = tuple(next(r, ()))
+        if header[:len(COLS)] != COLS:
+            sys.exit(f"{path}: not a reservation-ledger export (header {','.join(header[:4])}...)")
+        row0 = 1
+        while batch := list(itertools.islice(r, size)):
+            keep = [i for i, row in enumerate(batch) if len(row) >= len(COLS)]
+            if keep:
+                rows = batch if len(keep) == len(batch) else [batch[i] for i in keep]
+                yield row0 + np.array(keep), rows, {c: np.array([row[C[c]] for row in rows]) for c in USED}
+            row0 += len(batch)
+
+
+def load_db(db):
+    """(funds {(user, ccy): (reserved, total)}, open orders {OrderId: (user, ccy, side, reservation or None)},
+    short collateral {(user, ccy): amount})."""
+    res = kse_db.fan_out([db], {"funds": FUNDS_SQL, "open": OPEN_SQL, "coll": COLLATERAL_SQL}, size=3)[db]
+    funds = {(int(u), c): (float(r or 0), float(t or 0)) for u, c, r, t in res["funds"]}
+    open_orders = {int(o): (int(u), c, s, float(r) if r else None) for o, u, c, s, r in res["open"]}
+    collateral = {(int(u), c): float(a) for u, c, a in res["coll"]}
+    return funds, open_orders, collateral
+
+
+def verdicts(ledger, funds, open_orders, collateral, tol):
+    """One dict per divergent fund, worst first."""
+    backing = {}  # (user, ccy) -> [reservation, open buys, estimated, unseen, open sells]
+    for o, (u, c, side, placed) in open_orders.items():
+        b = backing.setdefault((u, c), [0.0, 0, 0, 0, 0])
+        if side != "Buy":
+            b[4] += 1
+            continue
+        b[1] += 1
+        if o in ledger.cbr:
+            b[0] += ledger.cbr[o]
+        elif placed is not None:
+            b[0] += placed
+            b[2] += 1
+        else:
+            b[3] += 1
+    out = []
+    for k, st in ledger.state.items():
+        db_res = funds.get(k, (np.nan,))[0]
+        held, buys, estimated, unseen, sells = backing.get(k, (0.0, 0, 0, 0, 0))
+        expected = held + collateral.get(k, 0.0)
+        reasons = []
+        if st.breaks:
+            reasons.append("break")
+        d_ledger = db_res - st.after
+        if not abs(d_ledger) <= tol:  # NaN: fund row gone from the DB
+            reasons.append("db")
+        d_exp = db_res - expected
+        if not unseen and d_exp > tol and not sells:
+            reasons.append("phantom")
+        elif not unseen and d_exp < -tol:
+            reasons.append("under")
+        if not reasons:
+            continue
+        if st.first_break is not None:
+            ev, note = st.first_break
+        elif st.since is not None:
+            ev, note = st.since, "reserved has not matched the DB value since"
+        elif ledger.pair.get(k[0], (0.0, None))[1] is not None:
+            ev, note = ledger.pair[k[0]][1], "user's fund and order reservation moves stop netting out here"
+        else:
+            ev, note = ("",) * 6, "ledger matches the DB; the order-side backing does not"
+        out.append({"user": k[0], "ccy": k[1], "reasons": "+".join(reasons), "fund_rows": st.rows,
+                    "ledger_reserved": st.after, "db_reserved": db_res, "expected": expected,
+                    "db_minus_ledger": d_ledger, "db_minus_expected": d_exp if not unseen else np.nan,
+                    "open_buys": buys, "open_buys_estimated": estimated, "open_buys_unseen": unseen,
+                    "open_sells": sells,
+                    "breaks": st.breaks, "break_sum": st.break_sum, "first_row": ev[0], "first_ts": ev[1],
+                    "first_action": ev[2], "first_order": ev[3], "first_before": ev[4], "first_after": ev[5],
+                    "first_note": note})
+    size = lambda r: max(abs(np.nan_to_num(r[c])) for c in ("db_minus_ledger", "db_minus_expected", "break_sum"))
+    return sorted(out, key=lambda r: (-size(r), r["user"], r["ccy"]))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("ledger", help="reservation-ledger csv export")
+    ap.add_argument("--db", default="kse_soak")
+    ap.add_argument("--tol", type=float, default=0.01, help="money tolerance per comparison")
+    ap.add_argument("--chunk-rows", type=int, default=100_000, help="ledger rows per slice")
+    ap.add_argument("--top", type=int, default=25, help="divergent funds to print")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    try:
+        funds, open_orders, collateral = load_db(args.db)
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    print(f"{args.db}: {len(funds):,} funds, {len(open_orders):,} open / pending orders, "
+          f"{len(collateral):,} short-collateral funds ({time.perf_counter() - t0:.1f}s)")
+
+    t1 = time.perf_counter()
+    ledger = Ledger(funds, open_orders, args.tol)
+    for rowno, rows, cols in chunks(args.ledger, max(1, args.chunk_rows)):
+        ledger.add(rowno, rows, cols)
+    out = verdicts(ledger, funds, open_orders, collateral, args.tol)
+    print(f"{args.ledger}: {ledger.rows:,} rows, {len(ledger.state):,} funds with Fund rows, "
+          f"{len(ledger.cbr):,} open orders seen ({time.perf_counter() - t1:.1f}s)")
+
+    name = os.path.splitext(os.path.basename(args.ledger))[0]
+    out_dir = os.path.join(OUT_DIR, name)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "divergent.csv")
+    fmt = lambda v: "" if isinstance(v, float) and v != v else (f"{v:.2f}" if isinstance(v, float) else v)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=FIELDS)
+        w.writeheader()
+        for r in out:
+            w.writerow({k: fmt(v) for k, v in r.items()})
+
+    counts = {}
+    for r in out:
+        for reason in r["reasons"].split("+"):
+            counts[reason] = counts.get(reason, 0) + 1
+    users = len({r["user"] for r in out})
+    print(f"\n{len(out)} divergent funds ({users} users): "
+          + (", ".join(f"{k}={v}" for k, v in sorted(counts.items())) or "none"))
+    if out:
+        print(f"{'user':>7} {'ccy':<4} {'reasons':<16} {'db-ledger':>12} {'db-expected':>12} {'breaks':>6}  first diverging event")
+        for r in out[:args.top]:
+            print(f"{r['user']:>7} {r['ccy']:<4} {r['reasons']:<16} {fmt(r['db_minus_ledger']):>12} "
+                  f"{fmt(r['db_minus_expected']) or '-':>12} {r['breaks']:>6}  "
+                  f"row {r['first_row'] or '-'} {r['first_ts']} {r['first_action']} {r['first_note']}")
+    print(f"-> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Indexed soak-results store (SQLite) and its query CLI — the replacement for SCORECARD.csv greps.
+
+soak_scorecard.py used to append to data/soaks/SCORECARD.csv and candle_export.py kept its run metadata
+(git commit, Bots__* overrides, session stats) only in '#' comment headers, so "every soak with
+Bots__Sentiment__MaxBias set" or "sigma_1m across the last 20 commits" meant grepping files. Both now
+record() into data/soaks/results.sqlite:
+
+    runs       one row per exporter run: source (scorecard | candle_export | ...), ts, db, git commit,
+               branch, label, note, artifact path        — indexed on db, commit, label, ts
+    overrides  (run, key, value) for every Bots__* override the run was made under — indexed (key, value)
+    metrics    (run, name, value) numeric metrics, text kept alongside       — indexed (name, value)
+
+    import results_store
+    results_store.record("scorecard", "kse_soak", {"sigma_1m": 0.0012, ...}, overrides, note=...)
+
+Query CLI (filters are shared by every command):
+    list     matching runs, newest first, with the chosen metrics
+    compare  group by commit | label | db | source | note | override:KEY and aggregate the metrics
+    keys     override keys and metric names in the store, with counts
+    import   backfill from the legacy SCORECARD.csv and candle CSV headers under data/soaks (idempotent)
+
+Filters: --source --db (glob) --commit (prefix) --label --note (substring) --since/--until (ISO date)
+         --set KEY[=VALUE] (override present / equal; KEY=- for "not set") --where 'metric>value'
+
+Usage: py scripts/results_store.py list [--db 'kse_q*'] [--set Bots__Sentiment__MaxBias] [--metrics sigma_1m,ret_acf_vwap]
+       py scripts/results_store.py compare --by override:Bots__Sentiment__MaxBias --source scorecard [--where 'trades>100000']
+       py scripts/results_store.py import [--dir data/soaks]
+"""
+import argparse, csv, glob, math, os, re, sqlite3, statistics, subprocess, sys
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE = os.path.join(ROOT, "data", "soaks", "results.sqlite")
+LEGACY_CSV = os.path.join(ROOT, "data", "soaks", "SCORECARD.csv")
+DEFAULT_METRICS = ("trades", "ret_acf_vwap", "sigma_1m", "kurtosis_1m", "sector_gap5", "sector_p5")
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY, source TEXT NOT NULL, ts TEXT NOT NULL, db TEXT, git_commit TEXT,
+    branch TEXT, label TEXT, note TEXT, path TEXT, UNIQUE (source, ts, db, note));
+CREATE INDEX IF NOT EXISTS runs_db ON runs (db);
+CREATE INDEX IF NOT EXISTS runs_commit ON runs (git_commit);
+CREATE INDEX IF NOT EXISTS runs_label ON runs (label);
+CREATE INDEX IF NOT EXISTS runs_ts ON runs (ts);
+CREATE TABLE IF NOT EXISTS overrides (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE, key TEXT NOT NULL COLLATE NOCASE,
+    value TEXT, PRIMARY KEY (run_id, key)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS overrides_kv ON overrides (key, value);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE, name TEXT NOT NULL,
+    value REAL, text TEXT, PRIMARY KEY (run_id, name)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS metrics_nv ON metrics (name, value);
+'''
+GROUPS = ("commit", "label", "db", "source", "note")
+OPS = {">=": ">=", "<=": "<=", "!=": "!=", ">": ">", "<": "<", "=": "="}
+
+
+def connect(path=STORE):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA foreign_keys = ON")
+    con.executescript(SCHEMA)
+    return con
+
+
+def git(*args):
+    try:
+        return subprocess.run(["git", "-C", ROOT, *args], capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def experiment_env(environ=None):
+    """The Bots__* overrides a run was made under. Soak scripts set $env:Bots__* before launching and the
+    exporters inherit them (Windows env names are case-insensitive; match loosely)."""
+    return {k: v for k, v in sorted((environ or os.environ).items()) if k.lower().startswith("bots__")}
+
+
+def number(v):
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+
+def record(source, db, metrics, overrides=None, label="", note="", path="", ts=None, commit=None,
+           branch=None, store=STORE):
+    """Insert one run -> its id (an identical (source, ts, db, note) run already stored is kept, -> None).
+    A live run's ts is to the microsecond, so only re-imports of the same legacy row are duplicates."""
+    ts = ts or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    commit = git("rev-parse", "--short", "HEAD") if commit is None else commit
+    branch = git("rev-parse", "--abbrev-ref", "HEAD") if branch is None else branch
+    con = connect(store)
+    try:
+        with con:
+            cur = con.execute("INSERT OR IGNORE INTO runs (source, ts, db, git_commit, branch, label, note, path) "
+                              "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (source, ts, db, commit, branch, label, note, str(path)))
+            if not cur.rowcount:
+                return None
+            rid = cur.lastrowid
+            con.executemany("INSERT INTO overrides VALUES (?, ?, ?)", [(rid, k, str(v)) for k, v in (overrides or {}).items()])
+            con.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?)",
+                            [(rid, k, number(v), None if number(v) is not None else str(v))
+                             for k, v in metrics.items() if v not in ("", None)])
+    finally:
+        con.close()
+    return rid
+
+
+# --- legacy import ---
+def import_legacy(store, soak_dir):
+    added = skipped = 0
+    scorecard = os.path.join(soak_dir, "SCORECARD.csv")
+    if os.path.exists(scorecard):
+        with open(scorecard, newline="", encoding="utf-8") as fh:
+            for row in csv.DictReader(fh):
+                ts = row.pop("ts", "") or "?"
+                db, note = row.pop("db", ""), row.pop("note", "")
+                got = record("scorecard", db, row, note=note, ts=ts, commit="", branch="", store=store, path=scorecard)
+                added, skipped = (added + 1, skipped) if got else (added, skipped + 1)
+    for path in sorted(glob.glob(os.path.join(soak_dir, "candles-*.csv"))):
+        head = candle_header(path)
+        if head is None:
+            continue
+        got = record("candle_export", head.pop("db", ""), head.pop("stats"), head.pop("overrides"),
+                     label=head.get("label", ""), note=head.get("note", ""), ts=head.get("exported_utc", "?"),
+                     commit=head.get("git_commit", ""), branch=head.get("git_branch", ""), store=store, path=path)
+        added, skipped = (added + 1, skipped) if got else (added, skipped + 1)
+    return added, skipped
+
+
+def candle_header(path):
+    """candle_export.py's '#' header -> {db, note, label, git_commit, ..., overrides: {}, stats: {}}."""
+    out = {"overrides": {}, "stats": {}}
+    stats = False
+    with open(path, encoding="utf-8") as fh:
+        for ln in fh:
+            if not ln.startswith("#"):
+                break
+            body = ln[1:].strip()
+            if body.startswith("==="):
+                continue
+            k, _, v = body.partition(":")
+            k, v = k.strip(), v.strip()
+            if body == "stats:":
+                stats = True
+            elif k.startswith("experiment_overrides"):
+                out["overrides"] = dict(p.strip().partition("=")[::2] for p in v.split(";") if "=" in p)
+            elif stats and ln.startswith("#   "):
+                out["stats"][k] = v
+            else:
+                out[k] = v
+    return out if "db" in out else None
+
+
+# --- queries ---
+def glob_like(s):
+    return s.replace("%", r"\%").replace("_", r"\_").replace("*", "%").replace("?", "_")
+
+
+def select(con, a):
+    """Run ids matching the filters, newest first."""
+    where, params = [], []
+    if a.source:
+        where.append("r.source = ?"); params.append(a.source)
+    if a.db:
+        where.append(r"r.db LIKE ? ESCAPE '\'"); params.append(glob_like(a.db))
+    if a.commit:
+        where.append("r.git_commit LIKE ?"); params.append(a.commit + "%")
+    if a.label:
+        where.append("r.label = ?"); params.append(a.label)
+    if a.note:
+        where.append("instr(r.note, ?) > 0"); params.append(a.note)
+    if a.since:
+        where.append("r.ts >= ?"); params.append(a.since)
+    if a.until:
+        where.append("r.ts < ?"); params.append(a.until)
+    for s in a.set:
+        k, eq, v = s.partition("=")
+        if eq and v == "-":
+            where.append("NOT EXISTS (SELECT 1 FROM overrides o WHERE o.run_id = r.id AND o.key = ?)")
+            params.append(k)
+        elif eq:
+            where.append("EXISTS (SELECT 1 FROM overrides o WHERE o.run_id = r.id AND o.key = ? AND o.value = ?)")
+            params += [k, v]
+        else:
+            where.append("EXISTS (SELECT 1 FROM overrides o WHERE o.run_id = r.id AND o.key = ?)")
+            params.append(k)
+    for w in a.where:
+        m = re.fullmatch(r"\s*([\w.]+)\s*(>=|<=|!=|>|<|=)\s*(\S+)\s*", w)
+        if not m or number(m.group(3)) is None:
+            sys.exit(f"bad --where {w!r}: use metric>value (ops {' '.join(OPS)})")
+        where.append(f"EXISTS (SELECT 1 FROM metrics m WHERE m.run_id = r.id AND m.name = ? AND m.value {OPS[m.group(2)]} ?)")
+        params += [m.group(1), float(m.group(3))]
+    sql = "SELECT r.id FROM runs r" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY r.ts DESC, r.id DESC"
+    return [i for (i,) in con.execute(sql, params)]
+
+
+def fetch(con, ids):
+    """{id: run dict with 'overrides' and 'metrics'} for the given ids."""
+    runs = {}
+    for chunk in (ids[i:i + 900] for i in range(0, len(ids), 900)):
+        q = ",".join("?" * len(chunk))
+        for rid, source, ts, db, commit, branch, label, note, path in con.execute(
+                f"SELECT id, source, ts, db, git_commit, branch, label, note, path FROM runs WHERE id IN ({q})", chunk):
+            runs[rid] = {"id": rid, "source": source, "ts": ts, "db": db, "commit": commit, "branch": branch,
+                         "label": label, "note": note, "path": path, "overrides": {}, "metrics": {}}
+        for rid, k, v in con.execute(f"SELECT run_id, key, value FROM overrides WHERE run_id IN ({q})", chunk):
+            runs[rid]["overrides"][k] = v
+        for rid, k, v, t in con.execute(f"SELECT run_id, name, value, text FROM metrics WHERE run_id IN ({q})", chunk):
+            runs[rid]["metrics"][k] = v if v is not None else t
+    return [runs[i] for i in ids]
+
+
+def metric_names(runs, asked):
+    if asked:
+        return asked.split(",")
+    have = {k for r in runs for k in r["metrics"]}
+    picked = [m for m in DEFAULT_METRICS if m in have]
+    return picked or sorted(have)[:6]
+
+
+def cell(v):
+    if v is None:
+        return "-"
+    if isinstance(v, float):
+        return f"{v:.6g}"
+    return str(v)
+
+
+def table(header, rows):
+    w = [max(len(str(x)) for x in col) for col in zip(header, *rows)] if rows else [len(h) for h in header]
+    for r in [header] + rows:
+        print("  ".join(str(x).ljust(n) for x, n in zip(r, w)).rstrip())
+
+
+def cmd_list(con, a):
+    runs = fetch(con, select(con, a)[:a.limit])
+    names = metric_names(runs, a.metrics)
+    rows = [[r["id"], r["ts"][:16], r["source"], r["db"], r["commit"] or "-", (r["label"] or r["note"] or "")[:32],
+             len(r["overrides"])] + [cell(r["metrics"].get(m)) for m in names] for r in runs]
+    table(["id", "ts", "source", "db", "commit", "label/note", "ovr"] + names, rows)
+    if a.show_overrides:
+        for r in runs:
+            if r["overrides"]:
+                print(f"  #{r['id']}: " + "; ".join(f"{k}={v}" for k, v in sorted(r["overrides"].items())))
+
+
+def group_key(run, by):
+    if by.startswith("override:"):
+        k = by.split(":", 1)[1].lower()
+        return next((v for kk, v in run["overrides"].items() if kk.lower() == k), "(unset)")
+    return run[by] or "-"
+
+
+def cmd_compare(con, a):
+    if a.by not in GROUPS and not a.by.startswith("override:"):
+        sys.exit(f"--by must be one of {', '.join(GROUPS)} or override:KEY")
+    runs = fetch(con, select(con, a))
+    names = metric_names(runs, a.metrics)
+    groups = {}
+    for r in runs:
+        groups.setdefault(group_key(r, a.by), []).append(r)
+    rows = []
+    for key, rs in sorted(groups.items(), key=lambda kv: max(r["ts"] for r in kv[1])):
+        row = [key, len(rs), max(r["ts"] for r in rs)[:16]]
+        for m in names:
+            xs = [r["metrics"][m] for r in rs if isinstance(r["metrics"].get(m), float)]
+            if not xs:
+                row.append("-")
+            elif len(xs) == 1:
+                row.append(f"{xs[0]:.4g}")
+            else:
+                row.append(f"{statistics.fmean(xs):.4g} ±{statistics.stdev(xs):.2g}")
+        rows.append(row)
+    table([a.by, "n", "latest"] + [f"{m} (mean ±sd)" for m in names], rows)
+
+
+def cmd_keys(con, a):
+    ids = select(con, a)
+    if not ids:
+        return print("no runs match")
+    con.execute("CREATE TEMP TABLE sel (id INTEGER PRIMARY KEY)")
+    con.executemany("INSERT INTO sel VALUES (?)", [(i,) for i in ids])
+    print(f"{len(ids)} runs")
+    table(["override key", "runs", "values"],
+          [[k, n, v] for k, n, v in con.execute(
+              "SELECT key, count(*), count(DISTINCT value) FROM overrides JOIN sel ON sel.id = run_id GROUP BY key ORDER BY 2 DESC, 1")])
+    print()
+    table(["metric", "runs", "min", "max"],
+          [[k, n, cell(lo), cell(hi)] for k, n, lo, hi in con.execute(
+              "SELECT name, count(*), min(value), max(value) FROM metrics JOIN sel ON sel.id = run_id GROUP BY name ORDER BY 1")])
+
+
+def main():
+    filt = argparse.ArgumentParser(add_help=False)
+    filt.add_argument("--source", default="")
+    filt.add_argument("--db", default="", help="glob, e.g. 'kse_q*'")
+    filt.add_argument("--commit", default="", help="prefix")
+    filt.add_argument("--label", default="")
+    filt.add_argument("--note", default="", help="substring")
+    filt.add_argument("--since", default="", help="ISO date/time (UTC)")
+    filt.add_argument("--until", default="")
+    filt.add_argument("--set", action="append", default=[], help="override KEY (present), KEY=VALUE, KEY=- (absent)")
+    filt.add_argument("--where", action="append", default=[], help="metric filter, e.g. 'trades>100000'")
+    filt.add_argument("--metrics", default="", help="comma list of metrics to show")
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--store", default=STORE)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("list", parents=[filt])
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--show-overrides", action="store_true")
+    p = sub.add_parser("compare", parents=[filt])
+    p.add_argument("--by", default="commit", help=f"{' | '.join(GROUPS)} | override:KEY")
+    sub.add_parser("keys", parents=[filt])
+    p = sub.add_parser("import")
+    p.add_argument("--dir", default=os.path.dirname(LEGACY_CSV))
+    a = ap.parse_args()
+
+    if a.cmd == "import":
+        added, skipped = import_legacy(a.store, a.dir)
+        return print(f"imported {added} runs ({skipped} already stored) -> {a.store}")
+    if not os.path.exists(a.store):
+        sys.exit(f"no results store at {a.store} (soak_scorecard.py / candle_export.py create it; "
+                 "`import` backfills legacy CSVs)")
+    con = connect(a.store)
+    {"list": cmd_list, "compare": cmd_compare, "keys": cmd_keys}[a.cmd](con, a)
+
+
+if __name__ == "__main__":
+    main()
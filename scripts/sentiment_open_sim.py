@@ -3,6 +3,7 @@
 #   ring_new = a*ring + sigma*sqrt(1-a^2)*noise,  a = exp(-dt/tau),  noise = U(-1,1)*sqrt3
 #   combined(stock) = sum(per-stock rings) + sum(global rings)   [shocks off]
 # Compares OLD reset (rings seeded at sigma*noise -> nonzero, biased open) vs NEW (rings = 0).
+# Many seeds, the shock processes and parameter grids at once: scripts/sentiment_sim.py (NumPy).
 import math, random
 
 GLOBAL_TAU = [600, 3600, 21600];      GLOBAL_SIG = [0.10, 0.08, 0.06]
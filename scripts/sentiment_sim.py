@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""Vectorized offline simulator of the bot signal processes, for screening settings before a soak.
+
+sentiment_open_sim.py checks BotSentimentService's OU rings with a scalar loop: one seed, 50 stocks,
+20 minutes. This advances many seeds x stocks at once with NumPy (one array op per ring per tick) and
+adds the other processes that feed the bots' directional signal:
+
+  BotSentimentService    global ring (3) + per-stock ring (5), U(-1,1)*sqrt3 noise, a = exp(-dt/tau),
+                         sigma x PerStockSigmaMult / GlobalSigmaMult, SlowRingDamp on tau >= 1000 s;
+                         per-stock NewsEvents shocks (per-tick arrival, power-law size, DecayPerTick,
+                         0.01 floor); Sentiment:GlobalShock; RegimeDrift (cubic soft-wall walk x Strength).
+  ExogenousShockService  RandomShockSource arrivals (p = 1 - exp(-dt/mean), sign, min + span*u^exp),
+                         BotMath.SoftWallStep to +-Cap, half-life decay and floor drop, GlobalFraction
+                         market-wide pulses (SectorCount/SectorFraction scope them to stockId % N), which
+                         is the global co-fire signal; Permanence (alpha, tau) draws with a residual floor.
+
+Not modelled: per-stock personality (SentimentAmplitudeMult and NewsFreqMult = 1), price reaction and
+momentum (need a price), MarketPulse, permanence aftershocks. Combined sentiment here is the
+GetSentiment sum without the price-fed terms.
+
+Per seed it records combined-sentiment statistics:
+  open_bias    |cross-stock mean combined| over the first 5 min (the neutral-open check)
+  disp         mean cross-stock std of combined
+  overflow     share of stock-seconds with |combined| > 1 (bots overflow into market orders)
+  acf_1m       lag-1 autocorrelation of 1-min combined changes (mean over stocks)
+  corr_1m      mean pairwise correlation of 1-min combined changes (the shared share)
+  exog_duty    share of stock-seconds with a live exogenous shock
+  exog_capped  share of stock-seconds pinned at +-Cap
+  pulses_h     global (co-fire) pulses per hour
+and prints p5 / p50 / p95 across seeds for every point of the --grid product. --reject drops settings
+whose median crosses a bound.
+
+Usage: py scripts/sentiment_sim.py [--prod] [--seeds 200] [--minutes 45] [--stocks 60]
+       [--set ExogCap=0.25 ...] [--grid PerStockSigmaMult=0.6,0.8,1 --grid GlobalSigmaMult=1,2,3]
+       [--reject overflow>0.15 --reject open_bias>0.1] [--out data/sim/sentiment.csv]
+"""
+import argparse, csv, itertools, math, os, sys, time
+from datetime import datetime, timezone
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQRT3 = math.sqrt(3.0)
+DT = 1.0  # bot loop ~1 Hz
+
+# BotSentimentService ring tables
+PS_TAU = np.array([20, 90, 360, 1800, 10800.0]);  PS_SIG = np.array([0.25, 0.25, 0.20, 0.12, 0.08])
+GLOBAL_TAU = np.array([600, 3600, 21600.0]);      GLOBAL_SIG = np.array([0.10, 0.08, 0.06])
+SLOW_RING_TAU = 1000.0
+SENT_SHOCK_FLOOR = 0.01
+
+# appsettings.json Bots:* values (the constructor defaults where the file doesn't set one)
+DEFAULTS = {
+    "PerStockSigmaMult": 1.0, "GlobalSigmaMult": 1.0, "SlowRingDamp": 1.0,
+    "NewsEvents": 1, "ShockMeanIntervalHours": 12.0, "ShockMinMagnitude": 0.05, "ShockMaxMagnitude": 0.2,
+    "ShockMagnitudeExponent": 3.0, "ShockDecayPerTick": 0.999,
+    "RegimeEnabled": 1, "RegimeStepSigma": 0.03, "RegimeCap": 0.5, "RegimeSoftWallK": 0.1, "RegimeStrength": 1.0,
+    "GlobalShockEnabled": 0, "GlobalShockMeanIntervalHours": 3.0, "GlobalShockMinMagnitude": 0.3,
+    "GlobalShockMaxMagnitude": 1.5, "GlobalShockMagnitudeExponent": 3.0, "GlobalShockDecayPerTick": 0.999,
+    "GlobalShockDownBias": 0.85,
+    "ExogEnabled": 0, "ExogMeanIntervalMinutes": 3.0, "ExogDecayHalfLifeSec": 300.0, "ExogMinMagnitude": 0.01,
+    "ExogMaxMagnitude": 0.06, "ExogMagnitudeExponent": 1.8, "ExogGlobalFraction": 0.0, "ExogCap": 0.06,
+    "ExogFloor": 0.001, "ExogSoftWallK": 0.1, "ExogSectorCount": 1, "ExogSectorFraction": 0.0,
+    "PermEnabled": 0, "PermAlphaMin": 0.30, "PermAlphaMax": 0.90, "PermAlphaSpread": 0.40,
+    "PermTauMedianSec": 1500.0, "PermTauSpread": 0.40, "PermTauMinSec": 300.0, "PermTauMaxSec": 2400.0,
+    "PermCoupling": 0.6, "PermResidualHalfLifeSec": 10800.0,
+}
+# prod-soak.ps1's market-character overlay
+PROD = {
+    "RegimeStrength": 0.5,
+    "ExogEnabled": 1, "ExogMeanIntervalMinutes": 60, "ExogDecayHalfLifeSec": 600, "ExogMinMagnitude": 0.01,
+    "ExogMaxMagnitude": 0.12, "ExogMagnitudeExponent": 2.5, "ExogCap": 0.25, "ExogGlobalFraction": 0.25,
+    "PermEnabled": 1,
+}
+# NewsPermanenceOptions tier AlphaShift / TauMult
+TIER_INDIVIDUAL, TIER_SECTOR, TIER_GLOBAL = (0.00, 1.0), (-0.10, 1.6), (-0.22, 2.4)
+STATS = ("open_bias", "disp", "overflow", "acf_1m", "corr_1m", "exog_duty", "exog_capped", "pulses_h")
+
+
+def unit(rng, shape):
+    return (rng.random(shape) * 2.0 - 1.0) * SQRT3
+
+
+def soft_wall(prev, step, cap, k):
+    """BotMath.SoftWallStep, elementwise."""
+    if cap <= 0:
+        return np.zeros_like(prev)
+    return np.clip(prev + step - k * prev ** 3 / (cap * cap), -cap, cap)
+
+
+def normal_cdf(x):
+    """BotMath.NormalCdf (Abramowitz-Stegun 7.1.26)."""
+    ax = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * ax)
+    y = 1.0 - (((((1.061405429 * t - 1.453152027) * t) + 1.421413741) * t - 0.284496736) * t + 0.254829592) \
+        * t * np.exp(-ax * ax)
+    return 0.5 * (1.0 + np.sign(x) * y)
+
+
+def alpha_tau(rng, shape, p, tier):
+    """RandomShockSource.ComputeAlphaTau for a batch of events."""
+    shift, tmult = tier
+    z, n1, n2 = rng.standard_normal(shape), rng.standard_normal(shape), rng.standard_normal(shape)
+    a = p["PermAlphaMin"] + (p["PermAlphaMax"] - p["PermAlphaMin"]) * normal_cdf(z + p["PermAlphaSpread"] * n1)
+    a = np.clip(a + shift, p["PermAlphaMin"], p["PermAlphaMax"])
+    tau = np.clip(p["PermTauMedianSec"] * np.exp(-p["PermCoupling"] * z + p["PermTauSpread"] * n2) * tmult,
+                  p["PermTauMinSec"], p["PermTauMaxSec"])
+    return a, tau
+
+
+class Exog:
+    """ExogenousShockService state for (seeds, stocks): transient, residual, per-event half-life."""
+
+    def __init__(self, p, S, N):
+        self.p = p
+        self.tr = np.zeros((S, N)); self.res = np.zeros((S, N))
+        self.tau = np.full((S, N), float(p["ExogDecayHalfLifeSec"]))
+        self.sector = np.arange(1, N + 1) % max(1, int(p["ExogSectorCount"]))
+
+    def decay(self):
+        p = self.p
+        self.tr *= 0.5 ** (DT / self.tau)
+        self.res *= 0.5 ** (DT / p["PermResidualHalfLifeSec"])
+        rest = (np.abs(self.tr) < p["ExogFloor"]) & (np.abs(self.res) < p["ExogFloor"])
+        self.tr[rest] = 0.0; self.res[rest] = 0.0
+
+    def apply(self, rng, hit, signed, tier):
+        """Impulses `signed` on the stocks where `hit`; same soft-wall/permanence split as Tick step 2."""
+        p = self.p
+        prev = self.tr + self.res
+        nxt = soft_wall(prev, signed, p["ExogCap"], p["ExogSoftWallK"])
+        hit = hit & (np.abs(nxt) >= p["ExogFloor"])
+        if not hit.any():
+            return
+        if not p["PermEnabled"]:
+            self.tr = np.where(hit, nxt, self.tr)
+            self.tau[hit] = p["ExogDecayHalfLifeSec"]
+            return
+        a, tau = alpha_tau(rng, hit.shape, p, tier)
+        step = nxt - prev
+        self.res = np.where(hit, self.res + a * step, self.res)
+        self.tr = np.where(hit, self.tr + (1.0 - a) * step, self.tr)
+        self.tau = np.where(hit, tau, self.tau)
+
+    def draw_mag(self, rng, shape):
+        p = self.p
+        return p["ExogMinMagnitude"] + (p["ExogMaxMagnitude"] - p["ExogMinMagnitude"]) \
+            * rng.random(shape) ** max(1.0, p["ExogMagnitudeExponent"])
+
+
+def simulate(p, seeds, stocks, minutes, seed):
+    """{stat: array over seeds} for one parameter set."""
+    S, N, T = seeds, stocks, int(minutes * 60)
+    rng = np.random.default_rng(seed)
+    ps_sig = PS_SIG * p["PerStockSigmaMult"] * np.where(PS_TAU >= SLOW_RING_TAU, p["SlowRingDamp"], 1.0)
+    g_sig = GLOBAL_SIG * p["GlobalSigmaMult"]
+    ps_a, g_a = np.exp(-DT / PS_TAU), np.exp(-DT / GLOBAL_TAU)
+    ps_noise, g_noise = ps_sig * np.sqrt(1 - ps_a ** 2), g_sig * np.sqrt(1 - g_a ** 2)
+
+    ring = np.zeros((S, N, len(PS_TAU)))  # neutral open: Reset zeroes every ring
+    glob = np.zeros((S, len(GLOBAL_TAU)))
+    news = np.zeros((S, N))
+    gshock = np.zeros(S)
+    regime = np.zeros((S, N))
+    exog = Exog(p, S, N)
+    p_news = 1.0 / (max(1e-4, p["ShockMeanIntervalHours"]) * 3600.0)
+    p_gshock = 1.0 / (max(1e-4, p["GlobalShockMeanIntervalHours"]) * 3600.0)
+    p_exog = 1.0 - math.exp(-DT / (max(0.01, p["ExogMeanIntervalMinutes"]) * 60.0))
+    n_sec = max(1, int(p["ExogSectorCount"]))
+
+    snaps = np.empty((T // 60 + 1, S, N))
+    open_bias = np.zeros(S); disp = np.zeros(S); over = np.zeros(S)
+    duty = np.zeros(S); capped = np.zeros(S); pulses = np.zeros(S)
+    open_n = min(T, 300)
+    for t in range(T + 1):
+        comb = glob.sum(axis=1)[:, None] + gshock[:, None] + ring.sum(axis=2) + news \
+            + p["RegimeStrength"] * regime
+        if t % 60 == 0:
+            snaps[t // 60] = comb
+        if t < open_n:
+            open_bias += np.abs(comb.mean(axis=1))
+        disp += comb.std(axis=1)
+        over += (np.abs(comb) > 1.0).mean(axis=1)
+        if p["ExogEnabled"]:
+            tot = exog.tr + exog.res
+            duty += (tot != 0.0).mean(axis=1)
+            capped += (np.abs(tot) >= p["ExogCap"] * 0.999).mean(axis=1)
+        if t == T:
+            break
+
+        # BotSentimentService.Tick
+        glob = g_a * glob + g_noise * unit(rng, glob.shape)
+        if p["NewsEvents"]:
+            news *= p["ShockDecayPerTick"]
+            news[np.abs(news) < SENT_SHOCK_FLOOR] = 0.0
+            hit = rng.random((S, N)) < p_news
+            sign = np.where(rng.random((S, N)) < 0.5, -1.0, 1.0)
+            mag = p["ShockMinMagnitude"] + (p["ShockMaxMagnitude"] - p["ShockMinMagnitude"]) \
+                * rng.random((S, N)) ** p["ShockMagnitudeExponent"]
+            news += np.where(hit, sign * mag, 0.0)
+        if p["GlobalShockEnabled"]:
+            gshock = np.where(np.abs(gshock) < SENT_SHOCK_FLOOR, 0.0, gshock * p["GlobalShockDecayPerTick"])
+            hit = rng.random(S) < p_gshock
+            sign = np.where(rng.random(S) < p["GlobalShockDownBias"], -1.0, 1.0)
+            mag = p["GlobalShockMinMagnitude"] + max(0.0, p["GlobalShockMaxMagnitude"] - p["GlobalShockMinMagnitude"]) \
+                * rng.random(S) ** max(1.0, p["GlobalShockMagnitudeExponent"])
+            gshock += np.where(hit, sign * mag, 0.0)
+        ring = ps_a * ring + ps_noise * unit(rng, ring.shape)
+        if p["RegimeEnabled"] and p["RegimeCap"] > 0:
+            step = unit(rng, (S, N)) * p["RegimeStepSigma"] * math.sqrt(DT)
+            regime = soft_wall(regime, step, p["RegimeCap"], p["RegimeSoftWallK"])
+
+        # ExogenousShockService.Tick
+        if p["ExogEnabled"]:
+            exog.decay()
+            hit = rng.random((S, N)) < p_exog
+            sign = np.where(rng.random((S, N)) < 0.5, -1.0, 1.0)
+            exog.apply(rng, hit, sign * exog.draw_mag(rng, (S, N)), TIER_INDIVIDUAL)
+            if p["ExogGlobalFraction"] > 0:
+                fire = rng.random(S) < p_exog * p["ExogGlobalFraction"]
+                if fire.any():
+                    pulses += fire
+                    sign = np.where(rng.random(S) < 0.5, -1.0, 1.0)
+                    signed = (sign * exog.draw_mag(rng, S))[:, None]
+                    scoped = (n_sec > 1) & (rng.random(S) < p["ExogSectorFraction"])
+                    sector = np.where(scoped, rng.integers(0, n_sec, S), -1)
+                    target = fire[:, None] & ((sector[:, None] < 0) | (exog.sector[None, :] == sector[:, None]))
+                    for tier, sel in ((TIER_GLOBAL, ~scoped), (TIER_SECTOR, scoped)):
+                        exog.apply(rng, target & sel[:, None], np.broadcast_to(signed, (S, N)), tier)
+
+    steps = T + 1
+    d = np.diff(snaps, axis=0)  # (minutes, S, N) 1-min changes
+    dm = d - d.mean(axis=0)
+    var = (dm ** 2).sum(axis=0)
+    acf = np.where(var > 0, (dm[1:] * dm[:-1]).sum(axis=0) / np.where(var > 0, var, 1), np.nan)
+    # mean pairwise correlation from the variance of the cross-sectional mean of standardized changes
+    z = dm / np.sqrt(np.where(var > 0, var / len(d), np.nan))
+    zbar_var = np.nanmean(z, axis=2).var(axis=0)
+    corr = (zbar_var * N - 1.0) / (N - 1)
+    return {
+        "open_bias": open_bias / open_n, "disp": disp / steps, "overflow": over / steps,
+        "acf_1m": np.nanmean(acf, axis=1), "corr_1m": corr,
+        "exog_duty": duty / steps, "exog_capped": capped / steps, "pulses_h": pulses / (T / 3600.0),
+    }
+
+
+def parse_kv(items, what):
+    out = {}
+    for item in items:
+        k, _, v = item.partition("=")
+        if k not in DEFAULTS:
+            sys.exit(f"unknown {what} key {k!r}; keys: {', '.join(DEFAULTS)}")
+        out[k] = v
+    return out
+
+
+def parse_reject(items):
+    rules = []
+    for r in items:
+        op = ">" if ">" in r else "<"
+        k, _, v = r.partition(op)
+        if k not in STATS:
+            sys.exit(f"unknown --reject stat {k!r}; stats: {', '.join(STATS)}")
+        rules.append((k, op, float(v)))
+    return rules
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--prod", action="store_true", help="start from prod-soak.ps1's overlay instead of appsettings")
+    ap.add_argument("--seeds", type=int, default=200)
+    ap.add_argument("--stocks", type=int, default=60)
+    ap.add_argument("--minutes", type=float, default=45.0)
+    ap.add_argument("--seed", type=int, default=43)
+    ap.add_argument("--set", action="append", default=[], help="Key=value fixed override")
+    ap.add_argument("--grid", action="append", default=[], help="Key=v1,v2,... swept (cartesian product)")
+    ap.add_argument("--reject", action="append", default=[], help="stat>value or stat<value on the median")
+    ap.add_argument("--out", default="", help="CSV path (default data/sim/sentiment-<ts>.csv)")
+    args = ap.parse_args()
+
+    base = dict(DEFAULTS)
+    if args.prod:
+        base.update(PROD)
+    base.update({k: float(v) for k, v in parse_kv(args.set, "--set").items()})
+    grid = {k: [float(x) for x in v.split(",")] for k, v in parse_kv(args.grid, "--grid").items()}
+    rules = parse_reject(args.reject)
+    keys = list(grid)
+    points = list(itertools.product(*grid.values())) or [()]
+
+    print(f"{len(points)} setting(s) x {args.seeds} seeds x {args.stocks} stocks x {args.minutes:g} min"
+          + (" (prod overlay)" if args.prod else ""))
+    head = "".join(f"{k[:14]:>15}" for k in keys) + "".join(f"{s:>20}" for s in STATS) + "  verdict"
+    print(head)
+    rows = []
+    t0 = time.perf_counter()
+    for pt in points:
+        p = dict(base, **dict(zip(keys, pt)))
+        res = simulate(p, args.seeds, args.stocks, args.minutes, args.seed)
+        q = {s: np.nanpercentile(res[s], [5, 50, 95]) for s in STATS}
+        bad = [f"{k}{op}{v:g}" for k, op, v in rules if (q[k][1] > v if op == ">" else q[k][1] < v)]
+        verdict = "reject " + ",".join(bad) if bad else "ok"
+        print("".join(f"{v:>15g}" for v in pt)
+              + "".join(f"{q[s][1]:>9.3g} [{q[s][0]:.2g},{q[s][2]:.2g}]".rjust(20) for s in STATS)
+              + f"  {verdict}", flush=True)
+        for s in STATS:
+            rows.append([*pt, s, *(round(float(x), 6) for x in q[s]), round(float(np.nanmean(res[s])), 6), verdict])
+    print(f"\n{time.perf_counter() - t0:.1f}s")
+
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    out = args.out or os.path.join(ROOT, "data", "sim", f"sentiment-{ts}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(keys + ["stat", "p5", "p50", "p95", "mean", "verdict"])
+        w.writerows(rows)
+    print(f"-> {out}")
+
+
+if __name__ == "__main__":
+    main()
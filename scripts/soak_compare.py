@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Side-by-side scorecard for several soak arms, fetched and scored in parallel.
+
+Comparing arms (kse_wk_base vs kse_wk_cash22 ...) used to mean running soak_scorecard.py once per DB,
+each issuing its queries serially. This submits soak_scorecard's full metric query set for EVERY arm
+at once through one bounded kse_db.Pool (--pool psql processes in flight), then scores the arms in a
+process pool (the sector-gap placebo is the CPU-heavy part), so an N-arm comparison takes roughly as
+long as the slowest single arm. The result is one aligned frame: a row per metric, a column per arm,
+plus deltas vs the first (baseline) arm.
+
+Usage: py scripts/soak_compare.py --dbs kse_wk_base,kse_wk_cash22[,...] [--labels base,cash22]
+       [--pool 8] [--out data/soaks/compare.csv] [--conviction-lo 19701 --conviction-hi 20000]
+"""
+import argparse, csv, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import soak_scorecard as sc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fetch_all(dbs, lo, hi, pool):
+    """{db: {query name: rows}} for every arm, all queries in flight together."""
+    return kse_db.fan_out(dbs, sc.queries(lo, hi), size=pool)
+
+
+def score_all(fetched, lo, hi, jobs):
+    dbs = list(fetched)
+    if jobs <= 1 or len(dbs) == 1:
+        return {db: sc.score(fetched[db], lo, hi) for db in dbs}
+    with ProcessPoolExecutor(max_workers=min(jobs, len(dbs))) as ex:
+        futs = {db: ex.submit(sc.score, fetched[db], lo, hi) for db in dbs}
+        return {db: f.result() for db, f in futs.items()}
+
+
+def aligned(scores, labels):
+    """(metric names, [(metric, {label: value})]) — every arm on the same metric axis."""
+    metrics = []
+    for s in scores.values():
+        metrics.extend(m for m in s if m not in metrics)
+    return metrics, [(m, {labels[db]: scores[db].get(m, "") for db in scores}) for m in metrics]
+
+
+def delta(v, b):
+    try:
+        return float(v) - float(b)
+    except (TypeError, ValueError):
+        return None
+
+
+def print_frame(frame, names):
+    """Metric x arm table, plus a delta column per arm vs names[0]."""
+    base = names[0]
+    w = max(12, *(len(n) for n in names))
+    print(f"{'metric':<14}" + "".join(f"{n:>{w + 2}}" for n in names)
+          + "".join(f"{'d_' + n:>{w + 2}}" for n in names[1:]))
+    for m, vals in frame:
+        line = f"{m:<14}" + "".join(f"{str(vals.get(n, '')):>{w + 2}}" for n in names)
+        for n in names[1:]:
+            d = delta(vals.get(n), vals.get(base))
+            line += f"{('%+.4g' % d) if d is not None else '':>{w + 2}}"
+        print(line)
+
+
+def write_frame(path, frame, names):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        wri = csv.writer(fh)
+        wri.writerow(["metric"] + names)
+        for m, vals in frame:
+            wri.writerow([m] + [vals.get(n, "") for n in names])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dbs", required=True, help="comma-separated soak DBs; the first is the baseline")
+    ap.add_argument("--labels", default="", help="comma-separated column labels (default: db names)")
+    ap.add_argument("--pool", type=int, default=8, help="max concurrent psql queries across all arms")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 2, help="scoring worker processes")
+    ap.add_argument("--conviction-lo", type=int, default=19701)
+    ap.add_argument("--conviction-hi", type=int, default=20000)
+    ap.add_argument("--out", default="", help="CSV path (default data/soaks/compare-<ts>.csv)")
+    args = ap.parse_args()
+
+    dbs = [d for d in args.dbs.split(",") if d]
+    names = args.labels.split(",") if args.labels else dbs
+    if len(names) != len(dbs):
+        sys.exit("--labels must have one entry per --dbs entry")
+    labels = dict(zip(dbs, names))
+
+    t0 = time.perf_counter()
+    try:
+        fetched = fetch_all(dbs, args.conviction_lo, args.conviction_hi, args.pool)
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    t1 = time.perf_counter()
+    scores = score_all(fetched, args.conviction_lo, args.conviction_hi, args.jobs)
+    t2 = time.perf_counter()
+
+    _, frame = aligned(scores, labels)
+    print(f"{len(dbs)} arms  fetch {t1 - t0:.1f}s (pool {args.pool})  score {t2 - t1:.1f}s (jobs {args.jobs})")
+    print_frame(frame, names)
+
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    out = args.out or os.path.join(ROOT, "data", "soaks", f"compare-{ts}.csv")
+    write_frame(out, frame, names)
+    print(f"\nframe -> {out}")
+
+
+if __name__ == "__main__":
+    main()
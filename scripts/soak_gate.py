@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""Sequential A/B gatekeeper: decide a treatment arm against its concurrent control while both soak.
+
+FINE_TUNING_TARGETS.md's soak gate-set are REGRESSION bounds ("don't get worse"), and
+METHOD_ab_soak_and_gates.md says to compare arms that ran concurrently. Until now both were checked
+once, after the full 45 min. This evaluates them continuously and stops as soon as the evidence
+decides:
+
+  * observations - wall-clock blocks of --block-min minutes, paired across the two arms. Each closed
+                   block yields, per stock, the treatment-minus-control difference of that block's
+                   1-min VWAP ret_acf, log sigma ratio and excess kurtosis (soak_scorecard's series),
+                   plus one sector_gap difference per block (intra- minus inter-sector correlation of
+                   cross-sectionally demeaned 1-min returns, over the minutes every stock traded in).
+                   Returns stay keyed by minute, so the ACF never pairs across a silent minute. Data comes from each arm's tape_cache.Tape
+                   (incremental) through online tape_cache.Bars.
+  * inference    - per gate an asymptotic confidence sequence (Waudby-Smith et al., time-uniform CLT,
+                   normal-mixture boundary tuned for --t-opt observations) on the mean difference. It is
+                   valid at every look, so peeking each minute doesn't inflate the error rate; --alpha is
+                   split Bonferroni-style across the gates.
+  * decision     - oriented so positive = better, with a non-inferiority margin per gate:
+                   FAIL when the whole sequence is below -margin, PASS when it is above -margin
+                   (sigma_1m is two-sided: PASS inside +-margin, FAIL outside). CK is the hard gate: any
+                   CK hit in the treatment's log is an immediate FAIL (in the control's: INVALID).
+                   Overall: FAIL if any gate fails, PASS once all pass, otherwise INCONCLUSIVE.
+
+Stocks within a block share the market factor, so per-stock differences aren't fully independent;
+keep --alpha conservative and read ret_acf/sigma verdicts with that in mind.
+
+Two modes:
+  watch - --dbs control,treatment [--logs control.log,treatment.log]: follow two soaks someone else
+          launched (e.g. two prod-soak.ps1 windows); exits 0 PASS / 1 FAIL / 2 INCONCLUSIVE / 3 INVALID.
+  run   - --arm base --arm cand:Key=Val ... (soak_queue arms; first = control): launches them through
+          soak_queue and stops each treatment the moment it is decided, and the control once all are.
+
+Usage: py scripts/soak_gate.py --dbs kse_wk_base,kse_wk_cash22 --logs logs/a.log,logs/b.log [--max-min 45]
+       py scripts/soak_gate.py --prod --arm base --arm cash22:Bots__CashInjection__IntervalMinutes=22 [soak_queue options]
+       [--block-min 10] [--alpha 0.05] [--t-opt 200] [--min-obs 30] [--margin ret_acf_vwap=0.03 ...]
+"""
+import argparse, json, math, os, sys, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import kse_db
+import soak_queue
+import tape_cache
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# gate -> (mode, default margin). higher: treatment may not be lower by > margin.
+# equiv: |difference| must stay within margin (sigma_1m, as a log ratio: 0.2 ~ +-20%).
+GATES = {
+    "ret_acf_vwap": ("higher", 0.03),
+    "sigma_1m": ("equiv", 0.20),
+    "kurtosis_1m": ("higher", 1.0),
+    "sector_gap": ("higher", 0.02),
+}
+USD_LISTINGS_SQL = 'SELECT "StockId" FROM "StockListings" WHERE "Currency"=\'USD\';'
+
+
+def conf_seq(xs, alpha, t_opt):
+    """(mean, lo, hi) — asymptotic two-sided confidence sequence for the mean of xs."""
+    t = len(xs)
+    mu = sum(xs) / t
+    var = sum((x - mu) ** 2 for x in xs) / t
+    rho2 = (-2 * math.log(alpha) + math.log(-2 * math.log(alpha) + 1)) / t_opt
+    w = math.sqrt(2 * (t * var * rho2 + 1) / (t * t * rho2) * math.log(math.sqrt(t * var * rho2 + 1) / alpha))
+    return mu, mu - w, mu + w
+
+
+def decide(mode, margin, lo, hi):
+    if mode == "equiv":
+        if -margin < lo and hi < margin:
+            return "PASS"
+        return "FAIL" if lo > margin or hi < -margin else "?"
+    if lo > -margin:
+        return "PASS"
+    return "FAIL" if hi < -margin else "?"
+
+
+def block_returns(bars, sids, k, block_min):
+    """{sid: {minute: 1-min VWAP log return into that minute}} inside block k, anchored on the last close
+    before the block; a minute without a close on either side has no return."""
+    out = {}
+    lo = k * block_min
+    for sid in sids:
+        v = bars.vwaps(sid)
+        rets = {}
+        for m in range(lo, lo + block_min):
+            a, b = v.get(m - 1), v.get(m)
+            if a and b and a > 0 and b > 0:
+                rets[m] = math.log(b / a)
+        if len(rets) >= max(4, block_min // 2):
+            out[sid] = rets
+    return out
+
+
+def acf1(rets):
+    """soak_scorecard.acf1 over {minute: return}: lag-1 products only between consecutive minutes, not across gaps."""
+    xs = list(rets.values())
+    n = len(xs)
+    if n < 3:
+        return None
+    m = sum(xs) / n
+    den = sum((x - m) ** 2 for x in xs)
+    pairs = [(x, rets[t + 1]) for t, x in rets.items() if t + 1 in rets]
+    if den <= 0 or not pairs:
+        return None
+    return sum((x - m) * (y - m) for x, y in pairs) / den
+
+
+def stock_stats(rets):
+    xs = list(rets.values())
+    n = len(xs)
+    mu = sum(xs) / n
+    var = sum((x - mu) ** 2 for x in xs) / n
+    if var <= 0:
+        return None
+    return {"ret_acf_vwap": acf1(rets), "sigma_1m": math.log(math.sqrt(var)),
+            "kurtosis_1m": sum((x - mu) ** 4 for x in xs) / (n * var * var) - 3.0}
+
+
+def sector_gap(rets, smap):
+    """Intra minus inter mean pairwise correlation of cross-sectionally demeaned returns, over the minutes
+    every stock has a return for."""
+    if len(rets) < 6:
+        return None
+    sids = sorted(rets)
+    minutes = sorted(set.intersection(*(set(rets[s]) for s in sids)))
+    n = len(minutes)
+    if n < 4:
+        return None
+    dm = {s: [rets[s][t] for t in minutes] for s in sids}
+    for i in range(n):
+        m = sum(dm[s][i] for s in sids) / len(sids)
+        for s in sids:
+            dm[s][i] -= m
+    intra, inter = [], []
+    for a in range(len(sids)):
+        for b in range(a + 1, len(sids)):
+            xs, ys = dm[sids[a]], dm[sids[b]]
+            mx, my = sum(xs) / n, sum(ys) / n
+            sxx = sum((x - mx) ** 2 for x in xs); syy = sum((y - my) ** 2 for y in ys)
+            if sxx <= 0 or syy <= 0:
+                continue
+            r = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / math.sqrt(sxx * syy)
+            (intra if smap.get(sids[a]) == smap.get(sids[b]) else inter).append(r)
+    if not intra or not inter:
+        return None
+    return sum(intra) / len(intra) - sum(inter) / len(inter)
+
+
+def sector_map():
+    sys.path.insert(0, str(ROOT / "Tools"))
+    import Config
+    return {sid: s.get("sector", "?") for sid, s in Config.STOCKS.items()}
+
+
+class Monitor:
+    """Paired control/treatment evidence, one closed block at a time."""
+
+    def __init__(self, args, smap):
+        self.args = args
+        self.smap = smap
+        self.margins = dict((g, m) for g, (_, m) in GATES.items())
+        self.margins.update(args.margin_map)
+        self.obs = {g: [] for g in GATES}
+        self.next_block = None
+        self.state = {}
+        self.verdict = "INCONCLUSIVE"
+        self.history = []
+
+    def feed(self, bars_a, bars_b, end_ts):
+        """Consume every block that has closed in both arms (end_ts: min of the two tapes' newest trade)."""
+        B = self.args.block_min
+        last_closed = int(end_ts // 60) // B - 1  # the block containing end_ts may still fill
+        if self.next_block is None:
+            self.next_block = int(max(bars_a.since, bars_b.since) // 60) // B + 1  # first FULL block
+        added = 0
+        while self.next_block <= last_closed:
+            k = self.next_block
+            self.next_block += 1
+            sids = set(bars_a.b) & set(bars_b.b)
+            ra, rb = block_returns(bars_a, sids, k, B), block_returns(bars_b, sids, k, B)
+            for sid in set(ra) & set(rb):
+                sa, sb = stock_stats(ra[sid]), stock_stats(rb[sid])
+                if not sa or not sb:
+                    continue
+                for g in ("ret_acf_vwap", "sigma_1m", "kurtosis_1m"):
+                    if sa[g] is not None and sb[g] is not None:
+                        self.obs[g].append(sb[g] - sa[g])
+            ga, gb = sector_gap(ra, self.smap), sector_gap(rb, self.smap)
+            if ga is not None and gb is not None:
+                self.obs["sector_gap"].append(gb - ga)
+            added += 1
+        return added
+
+    def evaluate(self, ck_a, ck_b):
+        a = self.args
+        alpha = a.alpha / len(GATES)
+        st = {}
+        for g, (mode, _) in GATES.items():
+            xs = self.obs[g]
+            # sector_gap gets one observation per block, so it can't wait for --min-obs
+            need = a.min_obs if g != "sector_gap" else max(3, a.min_obs // 10)
+            if len(xs) < need:
+                st[g] = {"n": len(xs), "mean": None, "lo": None, "hi": None, "decision": "?"}
+                continue
+            mu, lo, hi = conf_seq(xs, alpha, a.t_opt if g != "sector_gap" else max(5, a.t_opt // 20))
+            st[g] = {"n": len(xs), "mean": mu, "lo": lo, "hi": hi, "decision": decide(mode, self.margins[g], lo, hi)}
+        st["CK"] = {"n": ck_b, "decision": "FAIL" if ck_b > 0 else "PASS"}
+        self.state = st
+        if ck_a > 0:
+            self.verdict = "INVALID"
+        elif any(s["decision"] == "FAIL" for s in st.values()):
+            self.verdict = "FAIL"
+        elif all(s["decision"] == "PASS" for s in st.values()):
+            self.verdict = "PASS"
+        else:
+            self.verdict = "INCONCLUSIVE"
+        self.history.append({"t": time.time(), "verdict": self.verdict,
+                             "gates": {g: {k: v for k, v in s.items()} for g, s in st.items()}})
+        return self.verdict
+
+    @property
+    def decided(self):
+        return self.verdict in ("PASS", "FAIL", "INVALID")
+
+    def table(self):
+        lines = [f"  {'gate':<14}{'n':>6}{'mean':>11}{'cs_lo':>11}{'cs_hi':>11}{'margin':>9}  decision"]
+        for g, s in self.state.items():
+            if g == "CK":
+                lines.append(f"  {'CK':<14}{s['n']:>6}{'':>42}  {s['decision']}")
+                continue
+            f = (lambda v: f"{v:>+11.4f}" if v is not None else f"{'-':>11}")
+            lines.append(f"  {g:<14}{s['n']:>6}{f(s['mean'])}{f(s['lo'])}{f(s['hi'])}{self.margins[g]:>9.3g}  {s['decision']}")
+        return "\n".join(lines)
+
+
+def count_ck(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8", errors="replace") as fh:
+        return len(soak_queue.COUNTERS["CK"].findall(fh.read()))
+
+
+def new_bars(db, since, listing_sids):
+    return tape_cache.Bars(60, since=since, listings={(sid, 0) for sid in listing_sids})
+
+
+def write_log(args, mon, label):
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    out = ROOT / "data" / "soaks" / f"gate-{label}-{ts}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"verdict": mon.verdict, "params": {k: v for k, v in vars(args).items() if k != "arm"},
+                               "obs": {g: len(x) for g, x in mon.obs.items()}, "history": mon.history},
+                              indent=1, default=str), encoding="utf-8")
+    return out
+
+
+def watch(args):
+    dbs = args.dbs.split(",")
+    logs = (args.logs.split(",") + ["", ""])[:2] if args.logs else ["", ""]
+    if len(dbs) != 2:
+        sys.exit("--dbs wants exactly control,treatment")
+    try:
+        tapes = [tape_cache.Tape(db, guard_sec=args.guard_sec) for db in dbs]
+        for t in tapes:
+            if args.since_epoch <= 0:  # default: judge only what happens from now on
+                t.start_at(kse_db.rows(t.db, tape_cache.MAX_TID_SQL)[0][0])
+        sids = [{int(r[0]) for r in kse_db.rows(db, USD_LISTINGS_SQL)} for db in dbs]
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    since = args.since_epoch if args.since_epoch > 0 else time.time()
+    bars = [new_bars(db, since, s) for db, s in zip(dbs, sids)]
+    mon = Monitor(args, sector_map())
+    t0 = time.time()
+    print(f"gate {dbs[1]} vs control {dbs[0]}: blocks of {args.block_min} min, alpha {args.alpha}, "
+          f"up to {args.max_min:g} min")
+    while True:
+        try:
+            for t, b in zip(tapes, bars):
+                t.sync()
+                b.update(t)
+        except kse_db.QueryError as ex:
+            print(f"sync failed: {ex}")
+        ends = [t.cols["ts"][-1] if t.n else 0.0 for t in tapes]
+        if mon.feed(bars[0], bars[1], min(ends)):
+            mon.evaluate(count_ck(logs[0]), count_ck(logs[1]))
+            print(f"[{datetime.now():%H:%M:%S}] t={(time.time() - t0) / 60:.0f}m  {mon.verdict}")
+            print(mon.table(), flush=True)
+        elif count_ck(logs[1]) or count_ck(logs[0]):
+            mon.evaluate(count_ck(logs[0]), count_ck(logs[1]))
+        if mon.decided or time.time() - t0 > args.max_min * 60:
+            break
+        time.sleep(args.poll_sec)
+    print(f"\nverdict: {mon.verdict}" + ("" if mon.decided else " (time limit reached)"))
+    print(f"log -> {write_log(args, mon, dbs[1])}")
+    sys.exit({"PASS": 0, "FAIL": 1, "INCONCLUSIVE": 2, "INVALID": 3}[mon.verdict])
+
+
+class GatedQueue(soak_queue.Queue):
+    """soak_queue with every treatment gated against the first (control) arm and stopped once decided."""
+
+    def __init__(self, args, arms):
+        super().__init__(args, arms)
+        self.control = self.arms[0]
+        self.smap = sector_map()
+        self.monitors = {x.tag: Monitor(args, self.smap) for x in self.arms[1:]}
+        for x in self.arms:
+            x.tape = x.bars = None
+
+    def next_arm(self):
+        # Pairing needs overlap: a treatment may only start while the control is still up.
+        if not self.pending:
+            return None
+        if self.pending[0] is self.control:
+            return self.pending.popleft()
+        if self.control.state in ("cloning", "warming", "soaking"):
+            return self.pending.popleft()
+        while self.pending:
+            x = self.pending.popleft()
+            x.state, x.error = "failed", "control finished before a slot freed up (raise --max-parallel or lower --arm-cores)"
+        return None
+
+    async def on_ready(self, arm):
+        arm.tape = tape_cache.Tape(arm.db, guard_sec=self.args.guard_sec)
+        arm.tape.start_at((await self.pool.rows(arm.db, tape_cache.MAX_TID_SQL))[0][0])
+        sids = {int(r[0]) for r in await self.pool.rows(arm.db, USD_LISTINGS_SQL)}
+        arm.bars = new_bars(arm.db, arm.ready, sids)
+
+    async def checkpoint(self, arm, elapsed_min):
+        try:
+            await arm.tape.sync_async(self.pool)
+            arm.bars.update(arm.tape)
+        except kse_db.QueryError as ex:
+            self.say(arm, f"tape sync failed: {ex}")
+        c = self.control
+        if c.bars is None:
+            return True
+        for tag, mon in self.monitors.items():
+            x = next(a for a in self.arms if a.tag == tag)
+            if mon.decided or x.bars is None or x.state not in ("soaking",):
+                continue
+            end = min(t.cols["ts"][-1] if t.n else 0.0 for t in (c.tape, x.tape))
+            if mon.feed(c.bars, x.bars, end) or x.counts["CK"] or c.counts["CK"]:
+                mon.evaluate(c.counts["CK"], x.counts["CK"])
+                x.interim.append({"min": round(elapsed_min, 1), "verdict": mon.verdict,
+                                  "obs": {g: len(v) for g, v in mon.obs.items()}})
+                self.say(x, f"gate {mon.verdict}\n{mon.table()}")
+                if mon.decided:
+                    x.note = f"gate {mon.verdict} at {(time.time() - x.ready) / 60:.0f}m"
+        if arm is c:
+            if all(m.decided for m in self.monitors.values()):
+                c.note = "every treatment decided"
+                return False
+            return True
+        return not self.monitors[arm.tag].decided
+
+    def frame_rows(self):
+        rows = [("gate", {x.tag: self.monitors[x.tag].verdict if x.tag in self.monitors else "control"
+                          for x in self.arms})]
+        return rows + super().frame_rows()
+
+    def report(self, wall):
+        super().report(wall)
+        for tag, mon in self.monitors.items():
+            print(f"  {tag}: {mon.verdict}  -> {write_log(self.args, mon, tag)}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dbs", default="", help="watch mode: control,treatment DBs")
+    ap.add_argument("--logs", default="", help="watch mode: control,treatment server logs (for CK)")
+    ap.add_argument("--since-epoch", type=float, default=0.0, help="watch mode: judge trades from here (default: now)")
+    ap.add_argument("--max-min", type=float, default=45.0, help="watch mode: give up after this long")
+    ap.add_argument("--arm", action="append", default=[], help="run mode: soak_queue arms, first = control")
+    ap.add_argument("--arms", default="")
+    ap.add_argument("--block-min", type=int, default=10)
+    ap.add_argument("--alpha", type=float, default=0.05)
+    ap.add_argument("--t-opt", type=float, default=200.0, help="observation count the boundary is tightest at")
+    ap.add_argument("--min-obs", type=int, default=30)
+    ap.add_argument("--margin", action="append", default=[], help="gate=value non-inferiority margin override")
+    ap.add_argument("--guard-sec", type=float, default=5.0)
+    soak_queue.queue_args(ap)
+    ap.set_defaults(db_prefix="kse_g", sample_sec=60.0, poll_sec=5.0)
+    args = ap.parse_args()
+    args.margin_map = {}
+    for m in args.margin:
+        g, _, v = m.partition("=")
+        if g not in GATES:
+            sys.exit(f"unknown gate {g!r}; gates: {', '.join(GATES)}")
+        args.margin_map[g] = float(v)
+
+    if args.dbs:
+        watch(args)
+        return
+    arms = soak_queue.load_arms(args)
+    if len(arms) < 2:
+        sys.exit("run mode needs a control and at least one treatment --arm")
+    if not (args.no_build or args.server):
+        soak_queue.build()
+    q = GatedQueue(args, arms)
+    print(f"[{soak_queue.stamp()}] gating {len(arms) - 1} treatment(s) against {arms[0]['tag']}: "
+          f"blocks of {args.block_min} min, alpha {args.alpha}, up to {args.minutes:.0f} min")
+    soak_queue.drive(q)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""Concurrent soak orchestrator — N A/B arms as one job queue (replaces r4_experiment.ps1 / prod-soak.ps1 loops).
+
+r4_experiment.ps1 edits appsettings.json in place and rebuilds per arm; prod-soak.ps1 sets the prod env
+and hands off to kse-balance-soak-p.ps1; both run one arm at a time ("run SOLO or with a >=4-min
+stagger"). Here every arm gets its own port, its own DB cloned from the template, and its Bots__*
+overrides as environment variables on its own server process (ASP.NET config binds env over
+appsettings.json), started in its own working directory data/soaks/queue-<ts>/<tag> (telemetry
+ndjson, logs/, probe CSVs; the content root stays the server project), so nothing shared is mutated
+and arms can overlap:
+
+  * databases  - each arm's DB is claimed from db_pool.py (a pre-cloned spare renamed into place, else a
+                 clone of --tmpl); the previous run's DB of that name is tape-cached and dropped in the
+                 background, and --spares keeps clones ready for the arms still pending.
+  * admission  - the next arm starts only when the host has measured headroom for it: idle cores and
+                 available RAM (psutil) against the per-arm cost, which is learned from the running
+                 servers' CPU/RSS once they're up. Without psutil: cpu_count // --arm-cores.
+  * stagger    - instead of a fixed 4 min, the next launch waits until the previous arm is READY
+                 ("starting bot loop") plus --settle-sec, so warm-up seeding never overlaps.
+  * sampling   - drift/depth (balance-drift.sql / balance-depth.sql) + ERR/CK/CONS/shortfall log
+                 counts every --sample-sec, as kse-balance-soak-p.ps1 does.
+  * scoring    - as each arm finishes: candle_export.py, soak_scorecard.py (results-store runs tagged with
+                 the arm's Bots__* overrides) and r4_realism_score.py (composite), while the other arms
+                 keep soaking.
+  * comparison - one metric x arm table (soak_compare layout, deltas vs the first arm) written to
+                 data/soaks/queue-<ts>/compare.csv alongside per-arm samples, summary.json and the
+                 arms' working directories.
+
+Arms: repeat --arm "tag:Key=Val,Key=Val" (the first arm is the baseline) or --arms FILE with JSON
+[{"tag": "cash22", "overrides": {"Bots__CashInjection__IntervalMinutes": "22"}}, ...]. Keys may be
+env-style (Bots__A__B), config-style (Bots:A:B) or r4_apply_override-style dotted paths under Bots
+(A.B). --prod applies prod-soak.ps1's prod market-character env under every arm.
+
+Usage: py scripts/soak_queue.py --prod --minutes 45 --arm base --arm cash22:Bots__CashInjection__IntervalMinutes=22
+       [--arms arms.json] [--tmpl kse_soak_seed] [--db-prefix kse_q] [--base-port 5081] [--max-parallel 4]
+       [--arm-cores 2 --arm-mem-gb 1.5] [--settle-sec 60] [--sample-sec 300] [--window-min 50] [--no-build]
+"""
+import argparse, asyncio, json, os, re, shlex, socket, sys, time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import db_pool
+import kse_db
+import soak_compare
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVER_DIR = ROOT / "KieshStockExchange.Server"
+BIN_DIR = SERVER_DIR / "bin" / "Debug" / "net9.0"
+GB = 1024 ** 3
+
+# Prod market-character env — keep in step with prod-soak.ps1 (docker-compose.prod.yml server block).
+PROD_ENV = {
+    "Bots__Mood__Enabled": "true",
+    "Bots__Mood__TakerCoupling": "true",
+    "Bots__Mood__ConvictionFearBid": "true",
+    "Bots__Mood__PerStrategy": "true",
+    "Bots__Mood__MMWiden": "true",
+    "Bots__RecentAnchor__Strength": "0.05",
+    "Bots__Sentiment__RegimeDrift__Strength": "0.5",
+    "Bots__MarketProbMult": "1.35",
+    "Bots__ExogShock__Enabled": "true",
+    "Bots__ExogShock__MeanIntervalMinutes": "60",
+    "Bots__ExogShock__DecayHalfLifeSec": "600",
+    "Bots__ExogShock__MinMagnitude": "0.01",
+    "Bots__ExogShock__MaxMagnitude": "0.12",
+    "Bots__ExogShock__MagnitudeExponent": "2.5",
+    "Bots__ExogShock__Cap": "0.25",
+    "Bots__ExogShock__AnchorTracksShock": "true",
+    "Bots__ExogShock__ChaserFraction": "0.10",
+    "Bots__ExogShock__ChaserNotionalFrac": "0.06",
+    "Bots__ExogShock__ChaserMaxNotionalFrac": "0.10",
+    "Bots__ExogShock__ChaserMinIntervalSec": "120",
+    "Bots__ExogShock__GlobalFraction": "0.25",
+    "Bots__ExogShock__GlobalCoFire": "true",
+    "Bots__ExogShock__GlobalCoFireFraction": "0.15",
+    "Bots__ExogShock__GlobalCoFireNotionalFrac": "0.1",
+    "Bots__ExogShock__Permanence__Enabled": "true",
+}
+
+READY = "starting bot loop"
+COUNTERS = {  # same patterns kse-balance-soak-p.ps1 counts
+    "ERR": re.compile(r"\[ERR\]"),
+    "CK": re.compile(r"check constraint|CK_Positions|CK_Funds"),
+    "CONS": re.compile(r"Conservation"),
+    "shortfall": re.compile(r"Short-close collateral shortfall"),
+}
+COMPOSITE = re.compile(r"Composite realism score:\s+([\d.]+)")
+
+
+def env_key(key):
+    """Bots__A__B / Bots:A:B / A.B (r4_apply_override, relative to Bots) -> Bots__A__B."""
+    if "__" in key:
+        return key
+    if ":" in key:
+        return key.replace(":", "__")
+    return "Bots__" + key.replace(".", "__")
+
+
+def parse_arm(spec):
+    tag, _, rest = spec.partition(":")
+    ov = {}
+    for kv in filter(None, rest.split(",")):
+        k, _, v = kv.partition("=")
+        if not k or not _:
+            sys.exit(f"bad override {kv!r} in --arm {spec!r}")
+        ov[env_key(k.strip())] = v.strip()
+    return {"tag": tag.strip(), "overrides": ov}
+
+
+def load_arms(args):
+    arms = []
+    if args.arms:
+        doc = json.loads(Path(args.arms).read_text(encoding="utf-8"))
+        if isinstance(doc, dict):
+            doc = [{"tag": t, "overrides": o} for t, o in doc.items()]
+        arms += [{"tag": a["tag"], "overrides": {env_key(k): str(v) for k, v in a.get("overrides", {}).items()}}
+                 for a in doc]
+    arms += [parse_arm(s) for s in args.arm]
+    tags = [a["tag"] for a in arms]
+    if not arms:
+        sys.exit("no arms: pass --arm and/or --arms")
+    if len(set(tags)) != len(tags) or not all(re.fullmatch(r"[A-Za-z0-9_]+", t) for t in tags):
+        sys.exit(f"arm tags must be unique [A-Za-z0-9_]: {tags}")
+    return arms
+
+
+class Arm:
+    def __init__(self, spec, args):
+        self.tag = spec["tag"]
+        self.overrides = spec["overrides"]
+        self.db = f"{args.db_prefix}_{self.tag}".lower()
+        self.port = 0
+        self.state = "queued"
+        self.proc = None
+        self.dir = self.log = None  # working directory of its server, and the server's stdout there
+        self.launched = self.ready = self.done = None
+        self.error = ""
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.samples = []
+        self.metrics = {}
+        self.interim = []  # checkpoint results, filled by subclasses (soak_sweep)
+        self.note = ""
+        self._off = 0
+        self._ready_seen = False
+
+    def poll_log(self):
+        """Scan the log from where we left off; update counters and the READY flag."""
+        try:
+            with open(self.log, "rb") as fh:
+                fh.seek(self._off)
+                chunk = fh.read()
+        except FileNotFoundError:
+            return
+        cut = chunk.rfind(b"\n") + 1  # only whole lines; the rest is re-read next time
+        self._off += cut
+        text = chunk[:cut].decode("utf-8", errors="replace")
+        for name, pat in COUNTERS.items():
+            self.counts[name] += len(pat.findall(text))
+        if READY in text:
+            self._ready_seen = True
+
+
+class Headroom:
+    """Admission control: does the host have room for one more arm right now?"""
+
+    def __init__(self, args):
+        self.args = args
+        self.cores = os.cpu_count() or 2
+        if psutil is None:
+            print(f"note: psutil not installed — static cap of {self.static_cap()} arm(s) "
+                  f"(cpu_count // --arm-cores); pip install psutil for measured headroom")
+        else:
+            psutil.cpu_percent(None)  # prime the interval counter
+        # pid -> psutil.Process kept across polls: a fresh one's first cpu_percent(None) is always 0.0
+        self.procs = {}
+
+    def static_cap(self):
+        return max(1, self.cores // max(1, self.args.arm_cores))
+
+    def per_arm(self, running):
+        """(cores, bytes) one arm costs: the configured floor, raised to what running servers actually use."""
+        cores, mem = float(self.args.arm_cores), self.args.arm_mem_gb * GB
+        seen = {}
+        for a in running:
+            if a.state != "soaking":
+                continue
+            try:
+                p = self.procs.get(a.proc.pid) or psutil.Process(a.proc.pid)
+                procs = [p] + [self.procs.get(q.pid, q) for q in p.children(recursive=True)]
+                seen.update((q.pid, q) for q in procs)
+                mem = max(mem, sum(q.memory_info().rss for q in procs))
+                cores = max(cores, sum(q.cpu_percent(None) for q in procs) / 100.0)
+            except psutil.Error:
+                pass
+        self.procs = seen  # exited arms and children drop out
+        return cores, mem
+
+    def fits(self, running):
+        n = len(running)
+        if n >= self.args.max_parallel:
+            return False
+        if psutil is None:
+            return n < self.static_cap()
+        if n == 0:
+            return True
+        cores, mem = self.per_arm(running)
+        idle = self.cores * (1.0 - psutil.cpu_percent(None) / 100.0) - self.args.reserve_cores
+        avail = psutil.virtual_memory().available - self.args.reserve_mem_gb * GB
+        return idle >= cores and avail >= mem
+
+
+def port_free(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind(("127.0.0.1", port))
+            return True
+        except OSError:
+            return False
+
+
+def server_cmd():
+    for exe in (BIN_DIR / "KieshStockExchange.Server.exe", BIN_DIR / "KieshStockExchange.Server"):
+        if exe.exists():
+            return [str(exe)]
+    dll = BIN_DIR / "KieshStockExchange.Server.dll"
+    if dll.exists():
+        return ["dotnet", str(dll)]
+    sys.exit(f"no server build under {BIN_DIR} (drop --no-build)")
+
+
+def stamp():
+    return datetime.now().strftime("%H:%M:%S")
+
+
+async def run_py(*argv, env=None):
+    p = await asyncio.create_subprocess_exec(sys.executable, *argv, cwd=str(ROOT),
+                                             stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                                             env=dict(os.environ, PYTHONIOENCODING="utf-8", **(env or {})))
+    out, _ = await p.communicate()
+    return p.returncode, out.decode("utf-8", errors="replace")
+
+
+class Queue:
+    def __init__(self, args, arms):
+        self.args = args
+        self.arms = [Arm(a, args) for a in arms]
+        self.pending = deque(self.arms)
+        self.pool = kse_db.Pool(args.pool)
+        self.clone_lock = asyncio.Lock()
+        self.recycle_lock = asyncio.Lock()
+        self.background = []
+        self.score_lock = asyncio.Lock()
+        self.headroom = Headroom(args)
+        self.ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        self.out_dir = ROOT / "data" / "soaks" / f"queue-{self.ts}"
+        self.drift_sql = (ROOT / "scripts" / "balance-drift.sql").read_text(encoding="utf-8")
+        self.depth_sql = (ROOT / "scripts" / "balance-depth.sql").read_text(encoding="utf-8")
+        self.cmd = shlex.split(args.server) if args.server else server_cmd()
+
+    def say(self, arm, msg):
+        print(f"[{stamp()}] [{arm.tag}] {msg}", flush=True)
+
+    def next_port(self):
+        used = {a.port for a in self.arms if a.state in ("cloning", "warming", "soaking")}
+        p = self.args.base_port
+        while p in used or not port_free(p):
+            p += 1
+        return p
+
+    async def clone(self, arm):
+        # A ready db_pool spare is a rename; otherwise the synchronous clone. CREATE DATABASE ... TEMPLATE
+        # fails if anything else touches the template, so claims (and --spares refills) go one at a time.
+        async with self.clone_lock:
+            how = await asyncio.to_thread(db_pool.claim, self.args.tmpl, arm.db)
+        self.say(arm, f"{arm.db} <- {how}")
+        self.background.append(asyncio.create_task(self.refill()))
+
+    async def refill(self):
+        """Background: cache + drop the DBs claims retired, then top the spares back up."""
+        say = lambda m: print(f"[{stamp()}] [pool] {m}", flush=True)
+        try:
+            async with self.recycle_lock:  # not the clone lock: caching a long tape mustn't hold up claims
+                await asyncio.to_thread(db_pool.recycle, self.args.tmpl, True, say)
+            if self.args.spares > 0 and not self.exhausted():
+                async with self.clone_lock:
+                    await asyncio.to_thread(db_pool.fill, self.args.tmpl, self.args.spares, "", say)
+        except kse_db.QueryError as ex:
+            say(f"refill failed: {ex}")
+
+    async def launch(self, arm):
+        env = dict(os.environ)
+        if self.args.prod:
+            env.update(PROD_ENV)
+        env.update(arm.overrides)
+        env.update({
+            "KSE_DB_CONNECTION_STRING": f"Host=localhost;Port=5432;Database={arm.db};Username=kse;Password=kse-dev",
+            "ASPNETCORE_ENVIRONMENT": "Development",
+            "ASPNETCORE_URLS": f"http://localhost:{arm.port}",
+        })
+        # The server writes data/telemetry/*.ndjson, logs/ and the probe CSVs relative to its working
+        # directory, so each arm runs in its own; appsettings*.json and Resources/ come from the content root.
+        env["ASPNETCORE_CONTENTROOT"] = str(SERVER_DIR)
+        arm.dir = self.out_dir / arm.tag
+        arm.dir.mkdir(parents=True, exist_ok=True)
+        arm.log = arm.dir / f"soakQ-{arm.db}.log"
+        with open(arm.log, "wb") as out, open(f"{arm.log}.err", "wb") as err:
+            return await asyncio.create_subprocess_exec(*self.cmd, cwd=str(arm.dir), env=env, stdout=out, stderr=err)
+
+    async def sample(self, arm, elapsed_min):
+        async def one(sql):
+            try:
+                r = await self.pool.rows(arm.db, sql)
+                return r[0][0] if r and r[0] else ""
+            except kse_db.QueryError:
+                return ""
+        drift, depth = await asyncio.gather(one(self.drift_sql), one(self.depth_sql))
+        arm.poll_log()
+        row = {"t": stamp(), "elapsedMin": elapsed_min, "drift": drift, "depth": depth, **arm.counts}
+        arm.samples.append(row)
+        self.say(arm, f"t={elapsed_min}m drift={drift} // depth={depth} // "
+                      + " ".join(f"{k}={v}" for k, v in arm.counts.items()))
+
+    async def stop(self, arm):
+        if arm.proc and arm.proc.returncode is None:
+            arm.proc.terminate()
+            try:
+                await asyncio.wait_for(arm.proc.wait(), 15)
+            except asyncio.TimeoutError:
+                arm.proc.kill()
+                await arm.proc.wait()
+
+    async def score(self, arm):
+        note = f"queue {self.ts} {arm.tag}"
+        env = dict(PROD_ENV) if self.args.prod else {}  # the arm's server env, so the exporters record it
+        env.update(arm.overrides)
+        code, out = await run_py("scripts/candle_export.py", "--db", arm.db, "--note", note, env=env)
+        if code != 0:
+            self.say(arm, "candle export skipped: " + (out.strip().splitlines() or [""])[-1])
+        async with self.score_lock:  # one scorecard at a time
+            code, out = await run_py("scripts/soak_scorecard.py", "--db", arm.db, "--note", note, env=env)
+        if code == 0:
+            for ln in out.splitlines():  # "  metric         value" rows after the header line
+                k, _, v = ln.strip().partition(" ")
+                if ln.startswith("  ") and k not in ("ts", "db", "note"):
+                    arm.metrics[k] = v.strip()
+        else:
+            self.say(arm, "scorecard failed: " + out.strip()[-300:])
+        code, out = await run_py("scripts/r4_realism_score.py", "--db", arm.db,
+                                 "--window-min", str(self.args.window_min), "--label", arm.tag)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        (self.out_dir / f"r4-{arm.tag}.txt").write_text(out, encoding="utf-8")
+        m = COMPOSITE.search(out)
+        arm.metrics["composite"] = m.group(1) if m else "?"
+
+    # --- scheduling hooks (soak_sweep.Sweep overrides these) ---
+    def next_arm(self):
+        """The next arm to launch, or None if there's nothing to start right now."""
+        return self.pending.popleft() if self.pending else None
+
+    def exhausted(self):
+        """True once no further arms will ever be offered."""
+        return not self.pending
+
+    async def on_ready(self, arm):
+        """Called once the arm's bot loop is up, before the first sample."""
+
+    async def checkpoint(self, arm, elapsed_min):
+        """Called after every sample; return False to stop the arm early (it is then not scored)."""
+        return True
+
+    async def run_arm(self, arm):
+        a = self.args
+        try:
+            arm.state = "cloning"
+            self.say(arm, f"claiming {arm.db} from {a.tmpl}")
+            await self.clone(arm)
+            arm.state = "warming"
+            arm.proc = await self.launch(arm)
+            arm.launched = time.time()
+            self.say(arm, f"server pid {arm.proc.pid} on port {arm.port} -> {arm.log}"
+                          + (f"  overrides {arm.overrides}" if arm.overrides else ""))
+            while not arm._ready_seen:
+                if arm.proc.returncode is not None:
+                    raise RuntimeError(f"server exited during warm-up (see {arm.log}.err)")
+                if time.time() - arm.launched > a.ready_timeout:
+                    raise RuntimeError("server never reached bot loop")
+                await asyncio.sleep(3)
+                arm.poll_log()
+            arm.ready = time.time()
+            arm.state = "soaking"
+            self.say(arm, f"READY after {arm.ready - arm.launched:.0f}s - soaking {a.minutes} min")
+            await self.on_ready(arm)
+            deadline = arm.ready + a.minutes * 60
+            while time.time() < deadline:
+                await asyncio.sleep(min(a.sample_sec, max(0.0, deadline - time.time())))
+                if arm.proc.returncode is not None:
+                    raise RuntimeError(f"server exited mid-soak (code {arm.proc.returncode})")
+                await self.sample(arm, int((time.time() - arm.ready) / 60))
+                if not await self.checkpoint(arm, (time.time() - arm.ready) / 60):
+                    arm.state = "killed"
+                    break
+        except (RuntimeError, kse_db.QueryError, OSError) as ex:
+            arm.error = str(ex)
+            self.say(arm, f"FAILED: {ex}")
+        except Exception as ex:  # a bug in a hook must not leave the arm "running" and wedge the queue
+            arm.error = f"{type(ex).__name__}: {ex}"
+            self.say(arm, f"FAILED: {arm.error}")
+        finally:
+            await self.stop(arm)
+        if arm.error:
+            arm.state = "failed"
+            return
+        if arm.state == "killed":
+            arm.done = time.time()
+            self.say(arm, f"stopped early: {arm.note}")
+            return
+        arm.state = "scoring"
+        self.say(arm, "server stopped - scoring")
+        await self.score(arm)
+        arm.state = "done"
+        arm.done = time.time()
+        self.say(arm, f"done: composite {arm.metrics.get('composite')}  ret_acf_vwap {arm.metrics.get('ret_acf_vwap', '?')}")
+
+    def stagger_ok(self, last):
+        if last is None or last.state == "failed":
+            return True
+        return last.ready is not None and time.time() - last.ready >= self.args.settle_sec
+
+    async def run(self):
+        tasks, last = [], None
+        try:
+            while not self.exhausted() or any(not t.done() for t in tasks):
+                running = [x for x in self.arms if x.state in ("cloning", "warming", "soaking")]
+                if self.stagger_ok(last) and self.headroom.fits(running):
+                    arm = self.next_arm()
+                    if arm is not None:
+                        arm.port = self.next_port()
+                        arm.state = "cloning"
+                        tasks.append(asyncio.create_task(self.run_arm(arm)))
+                        last = arm
+                await asyncio.sleep(self.args.poll_sec)
+        finally:
+            for arm in self.arms:
+                await self.stop(arm)
+            await asyncio.gather(*self.background, return_exceptions=True)
+
+    def frame_rows(self):
+        """[(metric, {tag: value})] for the comparison table."""
+        metrics = []
+        for x in self.arms:
+            metrics.extend(m for m in x.metrics if m not in metrics)
+        frame = [(m, {x.tag: x.metrics.get(m, "") for x in self.arms}) for m in metrics]
+        for k in COUNTERS:
+            frame.append((k, {x.tag: x.counts[k] for x in self.arms}))
+        # balance-drift.sql: stocks,avg_pct,stddev_pct,medianAbs_pct,min_pct,max_pct,beyond50,beyond100,trades
+        last = {x.tag: (x.samples[-1]["drift"].split(",") if x.samples else []) for x in self.arms}
+        frame.append(("drift_medabs", {t: d[3] if len(d) > 3 else "" for t, d in last.items()}))
+        frame.append(("drift_beyond50", {t: d[6] if len(d) > 6 else "" for t, d in last.items()}))
+        frame.append(("warmup_s", {x.tag: round(x.ready - x.launched) if x.ready else "" for x in self.arms}))
+        return frame
+
+    def report(self, wall):
+        a = self.args
+        names = [x.tag for x in self.arms]
+        frame = self.frame_rows()
+        serial = sum((x.ready - x.launched if x.ready else 0) + a.minutes * 60 for x in self.arms if not x.error)
+        print(f"\n{len(self.arms)} arms in {wall / 60:.1f} min wall (back-to-back: ~{serial / 60:.0f} min)")
+        for x in self.arms:
+            if x.error:
+                print(f"  {x.tag}: FAILED - {x.error}")
+            elif x.state == "killed":
+                print(f"  {x.tag}: stopped early - {x.note}")
+        soak_compare.print_frame(frame, names)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        soak_compare.write_frame(str(self.out_dir / "compare.csv"), frame, names)
+        summary = {"ts": self.ts, "wall_s": wall, "params": {k: v for k, v in vars(a).items() if k not in ("arm",)},
+                   "arms": [{"tag": x.tag, "db": x.db, "port": x.port, "overrides": x.overrides, "log": str(x.log),
+                             "state": x.state, "error": x.error, "note": x.note, "metrics": x.metrics, "counts": x.counts,
+                             "samples": x.samples, "interim": x.interim}
+                            for x in self.arms]}
+        (self.out_dir / "summary.json").write_text(json.dumps(summary, indent=1), encoding="utf-8")
+        print(f"\nqueue -> {self.out_dir}")
+
+
+def build():
+    print(f"[{stamp()}] building server once for all arms")
+    r = os.system(f'dotnet build "{SERVER_DIR / "KieshStockExchange.Server.csproj"}" -v q')
+    if r != 0:
+        sys.exit("build failed")
+
+
+def queue_args(ap):
+    """The scheduling/host options shared with soak_sweep.py."""
+    ap.add_argument("--prod", action="store_true", help="prod market-character env under every arm (prod-soak.ps1)")
+    ap.add_argument("--minutes", type=float, default=45.0)
+    ap.add_argument("--tmpl", default="kse_soak_seed")
+    ap.add_argument("--spares", type=int, default=0,
+                    help="keep this many db_pool spares of --tmpl cloned ahead while arms are pending")
+    ap.add_argument("--db-prefix", default="kse_q")
+    ap.add_argument("--base-port", type=int, default=5081)
+    ap.add_argument("--max-parallel", type=int, default=4)
+    ap.add_argument("--arm-cores", type=int, default=2, help="per-arm CPU floor for admission")
+    ap.add_argument("--arm-mem-gb", type=float, default=1.5, help="per-arm RAM floor for admission")
+    ap.add_argument("--reserve-cores", type=float, default=1.0, help="cores kept free for Postgres/OS")
+    ap.add_argument("--reserve-mem-gb", type=float, default=2.0)
+    ap.add_argument("--settle-sec", type=float, default=60.0, help="wait after the previous arm's READY")
+    ap.add_argument("--ready-timeout", type=float, default=600.0)
+    ap.add_argument("--sample-sec", type=float, default=300.0)
+    ap.add_argument("--poll-sec", type=float, default=5.0)
+    ap.add_argument("--window-min", type=float, default=50.0, help="r4_realism_score window")
+    ap.add_argument("--pool", type=int, default=4, help="max concurrent psql samples")
+    ap.add_argument("--server", default="", help="server command line (default: the Debug build under bin/)")
+    ap.add_argument("--no-build", action="store_true")
+
+
+def drive(q):
+    """Run a Queue to completion (Ctrl-C stops every server) and print/write its report."""
+    t0 = time.time()
+    try:
+        asyncio.run(q.run())
+    except KeyboardInterrupt:
+        print("interrupted - servers stopped")
+    q.report(time.time() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--arm", action="append", default=[], help='"tag:Key=Val,Key=Val" (repeatable; first = baseline)')
+    ap.add_argument("--arms", default="", help="JSON file of arms")
+    queue_args(ap)
+    args = ap.parse_args()
+
+    arms = load_arms(args)
+    if not (args.no_build or args.server):
+        build()
+    q = Queue(args, arms)
+    print(f"[{stamp()}] {len(arms)} arms, {args.minutes:.0f} min each, max {args.max_parallel} in parallel"
+          + (" (prod env)" if args.prod else ""))
+    drive(q)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,47 @@
 #!/usr/bin/env python3
 """One durable scorecard row per soak — the preferred-stats panel in a single command.
 
-Reads the soak DB directly (Transactions) and appends one CSV row to data/soaks/SCORECARD.csv:
+Reads the soak DB directly (Transactions) and records one run in the results store (results_store.py,
+data/soaks/results.sqlite, with the Bots__* overrides in the environment):
 ret_acf on last/mid/vwap 1-min closes (VWAP = the OFFICIAL scoring series; last/mid reported for
 honesty), demeaned intra-vs-inter sector gap @5/10min (+ placebo p), 1-min sigma + excess kurtosis,
 Conviction cohort realized W/L (avg-cost), and trade totals. Pure Python + docker psql, ASCII.
+The metric queries run concurrently through kse_db; queries()/score() are reused by soak_compare.py.
+
+--out appends the same row to a CSV as well (the old SCORECARD.csv format).
 
 Usage: py scripts/soak_scorecard.py --db kse_bundle2 [--note "..."] [--conviction-lo 19701 --conviction-hi 20000]
+       [--store data/soaks/results.sqlite] [--out data/soaks/SCORECARD.csv]
 """
-import argparse, csv, math, os, subprocess, sys
+import argparse, csv, math, os, sys
 from collections import defaultdict
 from datetime import datetime, timezone
 
-PG = "kieshstockexchange-postgres-1"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import results_store
+
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-OUT = os.path.join(ROOT, "data", "soaks", "SCORECARD.csv")
 
+TRADES_SQL = 'SELECT count(*) FROM "Transactions";'
+MINUTE_SQL = '''
+SELECT "StockId", floor(EXTRACT(EPOCH FROM "Timestamp")/60)::bigint AS m,
+       (array_agg("Price" ORDER BY "Timestamp" DESC, "TransactionId" DESC))[1],
+       (array_agg(COALESCE("MidPrice","Price") ORDER BY "Timestamp" DESC, "TransactionId" DESC))[1],
+       sum("Price"*"Quantity")/NULLIF(sum("Quantity"),0)
+FROM "Transactions" WHERE "Currency"='USD' GROUP BY 1,2 ORDER BY 1,2;'''
+
+
+def conviction_sql(lo, hi):
+    return f'''
+SELECT "BuyerId","SellerId","StockId","Quantity","Price" FROM "Transactions"
+WHERE ("BuyerId" BETWEEN {lo} AND {hi}) OR ("SellerId" BETWEEN {lo} AND {hi})
+ORDER BY "Timestamp","TransactionId";'''
 
-def psql(db, sql):
-    r = subprocess.run(["docker", "exec", "-i", PG, "psql", "-U", "kse", "-d", db, "--csv", "-c", sql],
-                       capture_output=True, text=True)
-    if r.returncode != 0:
-        sys.exit("psql failed: " + r.stderr.strip())
-    return r.stdout.strip().splitlines()
+
+def queries(lo, hi):
+    """The full metric query set, name -> sql (independent, so they can run concurrently)."""
+    return {"trades": TRADES_SQL, "minutes": MINUTE_SQL, "conviction": conviction_sql(lo, hi)}
 
 
 def acf1(xs):
@@ -53,17 +72,12 @@ def median(vals):
     return vals[n // 2] if n % 2 else (vals[n // 2 - 1] + vals[n // 2]) / 2
 
 
-def minute_series(db):
-    """Per-stock per-minute last/mid/vwap closes (USD book)."""
-    rows = psql(db, '''
-SELECT "StockId", floor(EXTRACT(EPOCH FROM "Timestamp")/60)::bigint AS m,
-       (array_agg("Price" ORDER BY "Timestamp" DESC, "TransactionId" DESC))[1],
-       (array_agg(COALESCE("MidPrice","Price") ORDER BY "Timestamp" DESC, "TransactionId" DESC))[1],
-       sum("Price"*"Quantity")/NULLIF(sum("Quantity"),0)
-FROM "Transactions" WHERE "Currency"='USD' GROUP BY 1,2 ORDER BY 1,2;''')[1:]
+def minute_series(rows):
+    """Per-stock per-minute last/mid/vwap closes (USD book) from MINUTE_SQL rows."""
     per = defaultdict(lambda: ([], [], [], []))  # sid -> (minutes, last, mid, vwap)
-    for ln in rows:
-        sid, m, last, mid, vwap = ln.split(",")
+    for sid, m, last, mid, vwap in rows:
+        if not vwap:
+            continue
         s = per[sid]
         s[0].append(int(m)); s[1].append(float(last)); s[2].append(float(mid)); s[3].append(float(vwap))
     return per
@@ -146,16 +160,11 @@ def sector_gap(per, horizon):
     return obs, ge / B
 
 
-def conviction_wl(db, lo, hi):
+def conviction_wl(rows, lo, hi):
     """Realized W/L on costed round-trips (avg-cost, long side) for the Conviction id range."""
-    rows = psql(db, f'''
-SELECT "BuyerId","SellerId","StockId","Quantity","Price" FROM "Transactions"
-WHERE ("BuyerId" BETWEEN {lo} AND {hi}) OR ("SellerId" BETWEEN {lo} AND {hi})
-ORDER BY "Timestamp","TransactionId";''')[1:]
     pos = defaultdict(lambda: [0.0, 0.0])
     w = l = 0; tot = 0.0
-    for ln in rows:
-        b, s, stk, q, p = ln.split(",")
+    for b, s, stk, q, p in rows:
         b, s, stk, q, p = int(b), int(s), int(stk), float(q), float(p)
         if lo <= b <= hi:
             st = pos[(b, stk)]
@@ -173,44 +182,62 @@ ORDER BY "Timestamp","TransactionId";''')[1:]
     return w, l, tot
 
 
+def fmt(v, nd):
+    return round(v, nd) if v is not None else ""
+
+
+def score(fetched, lo, hi):
+    """Metric dict from the queries() result set of one DB (CPU-only; safe to run in a worker process)."""
+    per = minute_series(fetched["minutes"])
+    a_last, a_mid, a_vwap, sigma, kurt = ret_stats(per)
+    gap5, p5 = sector_gap(per, 5)
+    gap10, p10 = sector_gap(per, 10)
+    w, l, pnl = conviction_wl(fetched["conviction"], lo, hi)
+    return {
+        "trades": fetched["trades"][0][0],
+        "ret_acf_vwap": fmt(a_vwap, 3),
+        "ret_acf_mid": fmt(a_mid, 3),
+        "ret_acf_last": fmt(a_last, 3),
+        "sigma_1m": fmt(sigma, 5),
+        "kurtosis_1m": fmt(kurt, 2),
+        "sector_gap5": fmt(gap5, 4),
+        "sector_p5": fmt(p5, 3),
+        "sector_gap10": fmt(gap10, 4),
+        "sector_p10": fmt(p10, 3),
+        "cnv_w": w, "cnv_l": l, "cnv_pnl": round(pnl, 0),
+    }
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--db", required=True)
     ap.add_argument("--note", default="")
     ap.add_argument("--conviction-lo", type=int, default=19701)
     ap.add_argument("--conviction-hi", type=int, default=20000)
+    ap.add_argument("--store", default=results_store.STORE, help="results store to record the run in")
+    ap.add_argument("--out", default="", help="also append the row to this CSV")
     args = ap.parse_args()
 
-    trades = psql(args.db, 'SELECT count(*) FROM "Transactions";')[1]
-    per = minute_series(args.db)
-    a_last, a_mid, a_vwap, sigma, kurt = ret_stats(per)
-    gap5, p5 = sector_gap(per, 5)
-    gap10, p10 = sector_gap(per, 10)
-    w, l, pnl = conviction_wl(args.db, args.conviction_lo, args.conviction_hi)
-
-    row = {
-        "ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%MZ"),
-        "db": args.db, "trades": trades,
-        "ret_acf_vwap": round(a_vwap, 3) if a_vwap is not None else "",
-        "ret_acf_mid": round(a_mid, 3) if a_mid is not None else "",
-        "ret_acf_last": round(a_last, 3) if a_last is not None else "",
-        "sigma_1m": round(sigma, 5) if sigma is not None else "",
-        "kurtosis_1m": round(kurt, 2) if kurt is not None else "",
-        "sector_gap5": round(gap5, 4) if gap5 is not None else "",
-        "sector_p5": round(p5, 3) if p5 is not None else "",
-        "sector_gap10": round(gap10, 4) if gap10 is not None else "",
-        "sector_p10": round(p10, 3) if p10 is not None else "",
-        "cnv_w": w, "cnv_l": l, "cnv_pnl": round(pnl, 0),
-        "note": args.note,
-    }
-    exists = os.path.exists(OUT)
-    os.makedirs(os.path.dirname(OUT), exist_ok=True)
-    with open(OUT, "a", newline="", encoding="utf-8") as fh:
-        wri = csv.DictWriter(fh, fieldnames=list(row.keys()))
-        if not exists:
-            wri.writeheader()
-        wri.writerow(row)
-    print("scorecard row appended -> " + OUT)
+    try:
+        fetched = kse_db.fan_out([args.db], queries(args.conviction_lo, args.conviction_hi))[args.db]
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    row = {"ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%MZ"), "db": args.db}
+    row.update(score(fetched, args.conviction_lo, args.conviction_hi))
+    row["note"] = args.note
+    metrics = {k: v for k, v in row.items() if k not in ("ts", "db", "note")}
+    rid = results_store.record("scorecard", args.db, metrics, results_store.experiment_env(), note=args.note,
+                               store=args.store)
+    print(f"scorecard run #{rid} recorded -> {args.store}")
+    if args.out:
+        exists = os.path.exists(args.out)
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "a", newline="", encoding="utf-8") as fh:
+            wri = csv.DictWriter(fh, fieldnames=list(row.keys()))
+            if not exists:
+                wri.writeheader()
+            wri.writerow(row)
+        print("scorecard row appended -> " + args.out)
     for k, v in row.items():
         print("  %-14s %s" % (k, v))
 
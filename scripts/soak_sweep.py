@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Adaptive Bots__* lever sweep: asynchronous successive halving with early kills and local re-sampling.
+
+Manual lever tuning burns a full 45-min soak per arm even when an arm is visibly losing after 10.
+This drives soak_queue.Queue (isolated port/DB/env per arm, headroom admission, auto stagger) over a
+parameter space instead of a fixed arm list:
+
+  * interim score - every --sample-sec each live arm's new trades are pulled into its tape_cache.Tape
+                    (incremental: only rows past the watermark) and folded into online tape_cache.Bars;
+                    r4_realism_score.stock_metrics/composite_score then give the composite on the soak
+                    so far, with a 90% bootstrap interval over the measured stocks. Interim bars are
+                    --interim-bucket-sec wide (default 20s) so there are >=30 of them by the first rung;
+                    the absolute level differs from the 1-min composite, but every arm is judged on the
+                    same bucket at the same rung.
+  * rungs         - at --rung-min * eta^k soak minutes (ASHA): an arm continues only if it ranks in the
+                    top 1/eta of all arms that reached that rung so far, and is not dominated (its
+                    interval's upper end below another arm's lower end at that rung).
+  * gates         - any CK (check-constraint) or CONS (conservation) log hit kills the arm at once.
+  * reallocation  - a freed slot gets a new trial: uniform in the space for the first --seed-random
+                    trials and with probability --explore afterwards, otherwise a Gaussian perturbation
+                    (in unit-scaled space, shrinking as the sweep proceeds) of a top-ranked arm.
+
+Survivors run the full --minutes and get the normal soak_queue scoring (candle_export, a results-store
+scorecard run, r4_realism_score composite). An unmodified "base" arm runs first and is never killed, so
+the final table's deltas are vs the current defaults.
+
+Space: repeat --param "Bots__Key=lo:hi[:log][:int]" or --param "Bots__Key=a|b|c", or --space FILE with
+{"Bots__Key": {"lo": 0.1, "hi": 0.5, "log": false, "int": false} | {"choices": ["a", "b"]}}. Keys take the
+same forms as soak_queue --arm (Bots__A__B, Bots:A:B, A.B).
+
+Usage: py scripts/soak_sweep.py --prod --trials 16 --max-parallel 4 --minutes 45
+       --param "Bots__MarketProbMult=1.0:1.8" --param "Bots__RecentAnchor__Strength=0.01:0.2:log"
+       [--rung-min 10 --eta 2] [--sample-sec 300] [--explore 0.25] [--seed 1] [soak_queue options]
+"""
+import argparse, json, math, random, sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import kse_db
+import r4_realism_score as r4
+import soak_queue
+import tape_cache
+
+
+class Param:
+    def __init__(self, key, lo=None, hi=None, log=False, integer=False, choices=None):
+        self.key = soak_queue.env_key(key)
+        self.lo, self.hi, self.log, self.int, self.choices = lo, hi, log, integer, choices
+        if choices is None and (lo is None or hi is None or hi <= lo or (log and lo <= 0)):
+            sys.exit(f"bad range for {key}: {lo}..{hi}{' (log needs lo > 0)' if log else ''}")
+
+    @classmethod
+    def parse(cls, spec):
+        key, _, rng = spec.partition("=")
+        if "|" in rng:
+            return cls(key, choices=rng.split("|"))
+        parts = rng.split(":")
+        try:
+            lo, hi = float(parts[0]), float(parts[1])
+        except (IndexError, ValueError):
+            sys.exit(f"bad --param {spec!r}: want Key=lo:hi[:log][:int] or Key=a|b|c")
+        return cls(key, lo, hi, "log" in parts[2:], "int" in parts[2:])
+
+    def value(self, u):
+        """Unit coordinate -> override string."""
+        if self.choices:
+            return self.choices[min(int(u * len(self.choices)), len(self.choices) - 1)]
+        if self.log:
+            v = math.exp(math.log(self.lo) + u * (math.log(self.hi) - math.log(self.lo)))
+        else:
+            v = self.lo + u * (self.hi - self.lo)
+        return str(int(round(v))) if self.int else f"{v:.6g}"
+
+
+def load_space(args):
+    space = []
+    if args.space:
+        for key, d in json.loads(Path(args.space).read_text(encoding="utf-8")).items():
+            space.append(Param(key, d.get("lo"), d.get("hi"), d.get("log", False), d.get("int", False),
+                               d.get("choices")))
+    space += [Param.parse(s) for s in args.param]
+    if not space:
+        sys.exit("empty space: pass --param and/or --space")
+    return space
+
+
+def interim_score(bars, per_class, boot, rng):
+    """(composite, lo, hi, stocks) on the bars so far, or None when too few stocks have 30 bars.
+
+    Same stock choice as r4_realism_score.main (most active per class) and the same mean-across-stocks
+    aggregate; the interval resamples those stocks."""
+    series = bars.series()
+    by_class = {}
+    for sid, cs in series.items():
+        if len(cs) >= 30:
+            by_class.setdefault(r4.stock_class(sid), []).append((len(cs), sid))
+    sids = [sid for cls in ("Calm", "Normal", "Volatile", "Meme")
+            for _, sid in sorted(by_class.get(cls, []), reverse=True)[:per_class]]
+    ms = [m for m in (r4.stock_metrics(series[sid]) for sid in sids) if m]
+    if len(ms) < 2:
+        return None
+
+    def composite(sample):
+        agg = {}
+        for k in r4.TARGETS:
+            vals = [m[k] for m in sample if m[k] is not None]
+            agg[k] = sum(vals) / len(vals) if vals else None
+        return r4.composite_score(agg)[1]
+
+    draws = sorted(composite([rng.choice(ms) for _ in ms]) for _ in range(boot))
+    return composite(ms), draws[int(0.05 * boot)], draws[int(0.95 * boot) - 1], len(ms)
+
+
+class Sweep(soak_queue.Queue):
+    def __init__(self, args, space):
+        super().__init__(args, [{"tag": "base", "overrides": {}}] if not args.no_baseline else [])
+        self.space = space
+        self.rng = random.Random(args.seed)
+        self.rungs = []
+        r = args.rung_min
+        while r < args.minutes:
+            self.rungs.append(r)
+            r *= args.eta
+        self.at_rung = [{} for _ in self.rungs]  # rung index -> {tag: (composite, lo, hi)}
+        self.trials = 0
+        for arm in self.arms:
+            self._prep(arm, None, "baseline")
+
+    def _prep(self, arm, u, kind):
+        arm.u, arm.kind, arm.rung = u, kind, -1
+        arm.tape = arm.bars = None
+
+    # --- proposals ---
+    def ranked(self):
+        """Trials with an interim score, best first: deepest rung reached, then that rung's composite."""
+        scored = [x for x in self.arms if x.u is not None and x.interim and x.state != "failed"]
+        return sorted(scored, key=lambda x: (x.rung, x.interim[-1]["composite"]), reverse=True)
+
+    def propose(self):
+        a = self.args
+        top = self.ranked()[:a.max_parallel]
+        if self.trials < a.seed_random or not top or self.rng.random() < a.explore:
+            return [self.rng.random() for _ in self.space], "random"
+        parent = top[min(int(self.rng.expovariate(1.0)), len(top) - 1)]  # bias toward the leader
+        sigma = a.sigma * (a.shrink ** max(0, self.trials - a.seed_random))
+        u = [min(1.0, max(0.0, x + self.rng.gauss(0.0, sigma))) for x in parent.u]
+        return u, f"near {parent.tag}"
+
+    def next_arm(self):
+        if self.pending:
+            return self.pending.popleft()
+        if self.trials >= self.args.trials:
+            return None
+        self.trials += 1
+        u, kind = self.propose()
+        arm = soak_queue.Arm({"tag": f"t{self.trials:02d}",
+                              "overrides": {p.key: p.value(x) for p, x in zip(self.space, u)}}, self.args)
+        self._prep(arm, u, kind)
+        self.arms.append(arm)
+        return arm
+
+    def exhausted(self):
+        return not self.pending and self.trials >= self.args.trials
+
+    # --- interim scoring ---
+    async def on_ready(self, arm):
+        # Fresh clone: score only this soak's trades, not whatever history the template carries.
+        arm.tape = tape_cache.Tape(arm.db, guard_sec=5.0)
+        arm.tape.start_at((await self.pool.rows(arm.db, tape_cache.MAX_TID_SQL))[0][0])
+        listings = await self.pool.rows(arm.db, 'SELECT "StockId","Currency" FROM "StockListings" WHERE "IsPrimary";')
+        ccy = {c: i for i, c in enumerate(tape_cache.CCY)}
+        arm.bars = tape_cache.Bars(self.args.interim_bucket_sec, since=arm.ready,
+                                   listings={(int(s), ccy.get(c, -1)) for s, c in listings})
+
+    async def checkpoint(self, arm, elapsed_min):
+        gate = [f"{k}={arm.counts[k]}" for k in ("CK", "CONS") if arm.counts[k] > 0]
+        if gate and arm.u is not None:
+            arm.note = "gate " + " ".join(gate)
+            return False
+        try:
+            await arm.tape.sync_async(self.pool)
+        except kse_db.QueryError as ex:
+            self.say(arm, f"tape sync failed: {ex}")
+            return True
+        arm.bars.update(arm.tape)
+        res = interim_score(arm.bars, self.args.per_class, self.args.boot, self.rng)
+        if res is None:
+            return True
+        comp, lo, hi, n = res
+        arm.interim.append({"min": round(elapsed_min, 1), "composite": round(comp, 2),
+                            "lo": round(lo, 2), "hi": round(hi, 2), "stocks": n, "trades": arm.tape.n})
+        self.say(arm, f"interim composite {comp:.1f} [{lo:.1f}, {hi:.1f}] over {n} stocks")
+        keep = True
+        while arm.rung + 1 < len(self.rungs) and elapsed_min >= self.rungs[arm.rung + 1]:
+            arm.rung += 1
+            keep = self.judge(arm, arm.rung, comp, lo, hi) and keep
+        return keep or arm.u is None  # the baseline always runs to the end
+
+    def judge(self, arm, k, comp, lo, hi):
+        board = self.at_rung[k]
+        board[arm.tag] = (comp, lo, hi)
+        for tag, (_, olo, _) in board.items():
+            if tag != arm.tag and olo > hi:
+                arm.note = f"dominated by {tag} at rung {self.rungs[k]:g}m ({hi:.1f} < {olo:.1f})"
+                return False
+        rank = sorted((v[0] for v in board.values()), reverse=True).index(comp)
+        keep_n = math.ceil(len(board) / self.args.eta)
+        if rank >= keep_n:
+            arm.note = f"halved at rung {self.rungs[k]:g}m (rank {rank + 1}/{len(board)})"
+            return False
+        return True
+
+    # --- report ---
+    def frame_rows(self):
+        rows = []
+        for p in self.space:
+            rows.append((p.key.replace("Bots__", ""), {x.tag: x.overrides.get(p.key, "default") for x in self.arms}))
+        rows.append(("kind", {x.tag: x.kind for x in self.arms}))
+        rows.append(("state", {x.tag: x.state for x in self.arms}))
+        rows.append(("rung_min", {x.tag: self.rungs[x.rung] if x.rung >= 0 else "" for x in self.arms}))
+        rows.append(("interim_comp", {x.tag: x.interim[-1]["composite"] if x.interim else "" for x in self.arms}))
+        return rows + super().frame_rows()
+
+    def report(self, wall):
+        super().report(wall)
+        best = self.ranked()[:5]
+        if best:
+            print("\nleaders (deepest rung, then interim composite):")
+            for x in best:
+                ov = " ".join(f"{k.replace('Bots__', '')}={v}" for k, v in x.overrides.items())
+                print(f"  {x.tag:<5} {x.state:<7} comp={x.interim[-1]['composite']:<6} final={x.metrics.get('composite', '-'):<6} {ov}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--param", action="append", default=[], help='"Key=lo:hi[:log][:int]" or "Key=a|b|c"')
+    ap.add_argument("--space", default="", help="JSON parameter space file")
+    ap.add_argument("--trials", type=int, default=16, help="trials to launch (baseline not counted)")
+    ap.add_argument("--rung-min", type=float, default=10.0, help="first halving rung, soak minutes")
+    ap.add_argument("--eta", type=float, default=2.0, help="halving rate: keep the top 1/eta at each rung")
+    ap.add_argument("--seed-random", type=int, default=4, help="uniform trials before local proposals start")
+    ap.add_argument("--explore", type=float, default=0.25, help="chance a later trial is uniform anyway")
+    ap.add_argument("--sigma", type=float, default=0.2, help="initial perturbation, unit-space stddev")
+    ap.add_argument("--shrink", type=float, default=0.9, help="sigma decay per local trial")
+    ap.add_argument("--interim-bucket-sec", type=int, default=20)
+    ap.add_argument("--per-class", type=int, default=4)
+    ap.add_argument("--boot", type=int, default=200, help="bootstrap resamples for the interim interval")
+    ap.add_argument("--no-baseline", action="store_true")
+    ap.add_argument("--seed", type=int, default=1)
+    soak_queue.queue_args(ap)
+    ap.set_defaults(db_prefix="kse_s")
+    args = ap.parse_args()
+
+    space = load_space(args)
+    if not (args.no_build or args.server):
+        soak_queue.build()
+    sweep = Sweep(args, space)
+    print(f"[{soak_queue.stamp()}] sweep: {args.trials} trials over {len(space)} params, rungs at "
+          f"{', '.join(f'{r:g}' for r in sweep.rungs) or 'none'} min, max {args.max_parallel} in parallel"
+          + (" (prod env)" if args.prod else ""))
+    soak_queue.drive(sweep)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Per-strategy order flow over time and per book, and who trades against whom, from the cached tape.
+
+strategy_volume.py joins Transactions to AIUsers in SQL (over ssh to prod, or locally) and prints one
+whole-window total per strategy. This reads the local tape cache and pnl_attribution's cached
+UserId -> strategy / cohort map, so once the tape is synced nothing touches the soak DB, and splits
+the flow (--by strategy or cohort) over --res buckets and per book:
+
+  notional       USD value of the fills the group was a side of (other listings at
+                 Config.FX_BASE_RATES), bought + sold
+  participation  the group's share of all fill sides (its notional / 2 x market notional)
+  net flow       bought - sold, USD and shares: which way the group pushes
+  aggressor      share of the group's notional where it was the taker. The tape has no order ids, so
+                 the taker is the side the trade printed away from the MidPrice on (the touch mid at
+                 the taker's arrival), the tick rule where that can't tell (microstructure.signs)
+
+and a matrix of aggressor group x passive group: how much of each group's aggressive flow each group
+absorbed, and in which direction (net = the aggressor's buys - sells against that group).
+
+Writes data/flow/<name>/flow-<res>.csv (bucket x group), books.csv (book x group, whole window) and
+matrix.csv.
+
+Usage: py scripts/strategy_flow.py [--db kse_soak] [--tape NAME] [--by strategy|cohort] [--res 5m]
+       [--window-min 0] [--live]
+"""
+import argparse, csv, os, sys, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import tape_cache
+from depth_replay import parse_res
+from microstructure import load, signs
+from pnl_attribution import accounts, usd_rates
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.path.join(ROOT, "data", "flow")
+
+
+def group_codes(users, meta, special, by):
+    """UserId -> group index lookup array over 0..max(users), and the group names."""
+    col = 0 if by == "strategy" else 1
+    names = sorted({m[col] for m in meta.values()} | set(special.values()) | {"other"})
+    idx = {n: i for i, n in enumerate(names)}
+    codes = np.full(int(users.max()) + 1, idx["other"], dtype=np.int64)
+    for uid, m in meta.items():
+        if uid < len(codes):
+            codes[uid] = idx[m[col]]
+    for uid, label in special.items():
+        if uid < len(codes):
+            codes[uid] = idx[label]
+    return codes, names
+
+
+def flow(cell, ncell, g_buy, g_sell, buyer_aggr, notional, qty, ngroups):
+    """Per (cell, group) sums -> dict of (ncell, ngroups) arrays; cell = bucket or book index per trade."""
+    size = ncell * ngroups
+    kb, ks = cell * ngroups + g_buy, cell * ngroups + g_sell
+    sums = lambda k, w: np.bincount(k, weights=w, minlength=size).reshape(ncell, ngroups)
+    bought, sold = sums(kb, notional), sums(ks, notional)
+    aggr = sums(np.where(buyer_aggr, kb, ks), notional)
+    return {"bought": bought, "sold": sold, "aggr": aggr,
+            "qty_net": sums(kb, qty) - sums(ks, qty), "sides": sums(kb, None) + sums(ks, None)}
+
+
+def rows_of(f, labels, names):
+    """Flatten flow() output into csv rows, skipping empty (cell, group) pairs."""
+    market = f["bought"].sum(axis=1)  # each trade's notional once
+    out = []
+    for i, label in enumerate(labels):
+        for g, name in enumerate(names):
+            notional = f["bought"][i, g] + f["sold"][i, g]
+            if not notional:
+                continue
+            out.append([*label, name, int(f["sides"][i, g]), f"{notional:.2f}",
+                        f"{notional / (2 * market[i]):.6f}" if market[i] else "",
+                        f"{f['bought'][i, g] - f['sold'][i, g]:.2f}", int(f["qty_net"][i, g]),
+                        f"{f['aggr'][i, g] / notional:.6f}"])
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="kse_soak")
+    ap.add_argument("--tape", default="", help="read this tape_cache as-is instead of syncing --db")
+    ap.add_argument("--by", choices=["strategy", "cohort"], default="strategy")
+    ap.add_argument("--res", default="5m", help="time bucket")
+    ap.add_argument("--window-min", type=float, default=0.0, help="only the tape's last N minutes (0 = all)")
+    ap.add_argument("--live", action="store_true", help="soak still running: leave the newest trades for later")
+    args = ap.parse_args()
+
+    res = parse_res(args.res)
+    name = args.tape or args.db
+    t0 = time.perf_counter()
+    tape = tape_cache.Tape(name)
+    try:
+        if not args.tape:
+            added = tape.sync(final=not args.live)
+            print(f"tape {name}: {tape.n:,} trades ({added:,} new)")
+        meta, special = accounts(args.db, tape.meta.get("oid") if name == args.db else None, quiet=bool(args.tape))
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    if not tape.n:
+        sys.exit(f"tape {name} is empty")
+
+    c = load(tape, args.window_min)
+    t1 = time.perf_counter()
+    buyer_aggr = signs(c) > 0
+    notional = c["px"] * c["qty"] * usd_rates()[c["ccy"]]
+    qty = c["qty"].astype(np.float64)
+    codes, names = group_codes(np.r_[c["buyer"], c["seller"], 0], meta, special, args.by)
+    ng = len(names)
+    g_buy, g_sell = codes[c["buyer"]], codes[c["seller"]]
+
+    start = np.floor(c["ts"].min() / res) * res
+    bucket = ((c["ts"] - start) // res).astype(np.int64)
+    nb = int(bucket.max()) + 1
+    by_time = flow(bucket, nb, g_buy, g_sell, buyer_aggr, notional, qty, ng)
+    books, book_i = np.unique(c["book"], return_inverse=True)
+    by_book = flow(book_i, len(books), g_buy, g_sell, buyer_aggr, notional, qty, ng)
+    total = flow(np.zeros(len(qty), dtype=np.int64), 1, g_buy, g_sell, buyer_aggr, notional, qty, ng)
+    g_aggr, g_pass = np.where(buyer_aggr, g_buy, g_sell), np.where(buyer_aggr, g_sell, g_buy)
+    pair = g_aggr * ng + g_pass
+    matrix = np.bincount(pair, weights=notional, minlength=ng * ng).reshape(ng, ng)
+    net = np.bincount(pair, weights=np.where(buyer_aggr, notional, -notional), minlength=ng * ng).reshape(ng, ng)
+    compute = time.perf_counter() - t1
+
+    out_dir = os.path.join(OUT_DIR, name)
+    os.makedirs(out_dir, exist_ok=True)
+    head = ["group", "fills", "notional_usd", "participation", "net_usd", "net_qty", "aggressor_share"]
+    path = os.path.join(out_dir, f"flow-{args.res}.csv")
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["bucket_start", *head])
+        w.writerows(rows_of(by_time, [(f"{start + i * res:.0f}",) for i in range(nb)], names))
+    with open(os.path.join(out_dir, "books.csv"), "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["stock", "ccy", *head])
+        labels = [(int(b) // 8, tape_cache.CCY[int(b) % 8 - 1] if 0 < int(b) % 8 <= len(tape_cache.CCY) else "?")
+                  for b in books]
+        w.writerows(rows_of(by_book, labels, names))
+    with open(os.path.join(out_dir, "matrix.csv"), "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["aggressor", "passive", "notional_usd", "share_of_aggressor", "net_usd"])
+        for a in range(ng):
+            row_tot = matrix[a].sum()
+            for p in range(ng):
+                if matrix[a, p]:
+                    w.writerow([names[a], names[p], f"{matrix[a, p]:.2f}", f"{matrix[a, p] / row_tot:.6f}",
+                                f"{net[a, p]:.2f}"])
+
+    print(f"{len(qty):,} trades, {len(books)} books, {nb} x {args.res} buckets, {ng} groups by {args.by} "
+          f"in {compute:.2f}s (total {time.perf_counter() - t0:.1f}s)")
+    market = total["bought"].sum()
+    active = [g for g in range(ng) if total["sides"][0, g]]
+    print(f"\n{args.by:<18} {'fills':>10} {'notional $':>16} {'part%':>6} {'aggr%':>6} {'net $':>14} {'net qty':>10}")
+    for g in active:
+        n = total["bought"][0, g] + total["sold"][0, g]
+        print(f"{names[g]:<18} {int(total['sides'][0, g]):>10,} {n:>16,.0f} {n / (2 * market) * 100:>6.1f} "
+              f"{total['aggr'][0, g] / n * 100:>6.1f} {total['bought'][0, g] - total['sold'][0, g]:>14,.0f} "
+              f"{int(total['qty_net'][0, g]):>10,}")
+    width = max(8, *(len(names[g]) for g in active))
+    print("\naggressive flow absorbed by (% of the aggressor's notional; rows = aggressor)")
+    print(f"{'':<18}" + "".join(f"{names[g][:width]:>{width + 1}}" for g in active))
+    for a in active:
+        tot = matrix[a].sum()
+        if tot:
+            print(f"{names[a]:<18}" + "".join(f"{matrix[a, p] / tot * 100:>{width + 1}.1f}" for p in active))
+    print(f"-> {path}")
+
+
+if __name__ == "__main__":
+    main()
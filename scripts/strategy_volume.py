@@ -11,6 +11,7 @@ fills it was a party to; its notional = sum of Quantity*Price over those fills.
 
 Data source: runs psql inside the Postgres container. Defaults to PROD (over ssh) because
 the Rotator/BankEstimate cohort is only enabled there; use --local for a local soak DB.
+strategy_flow.py splits the same flow over time buckets and books from the local tape cache.
 
 Examples:
   py scripts/strategy_volume.py --minutes 20                 # prod, last 20 min
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""Synthetic Transactions tape with planted stylized facts: a fixture and scale benchmark for the scorers.
+
+r4_realism_score, candle_realism, soak_scorecard and cross_stock_diag could only be exercised against a
+docker Postgres filled by a real soak, so nobody knew whether a score moved because the market changed
+or because the scorer did, and nothing ever ran them at 10-100x a soak's size. This writes a tape whose
+true properties are known (NumPy, chunked, ~1M trades/s to the tape cache):
+
+  * efficient price - per stock, 1-min log returns = beta_mkt * market + beta_sec * sector + idio; each
+                      factor is its own GARCH(1,1) (GARCH_ALPHA/GARCH_BETA) driven by unit-variance
+                      Student-t innovations (T_DF, 0 = Gaussian). MARKET_SHARE / SECTOR_SHARE are the
+                      variance shares, SIGMA_1M the total per-minute vol. Sectors are Config.STOCKS'.
+  * trades          - Poisson per (listing, minute), intensity x (h / h_bar)^VOLUME_ELASTICITY so volume
+                      follows volatility; times uniform in the minute, the mid at each trade on an exact
+                      Brownian bridge between the minute closes.
+  * bounce          - Price = mid * (1 +- HALF_SPREAD) rounded to TICK, MidPrice = mid; trade signs are a
+                      Markov chain per listing (SIGN_PERSIST = P(keep the previous sign's run)).
+  * listings        - Config.CROSS_LISTED_STOCK_IDS trade USD and EUR (EUR_SHARE of the flow), EUR mid =
+                      USD mid / EUR/USD (a FX_SIGMA_1M walk around FX_BASE_RATES) x exp(OU basis,
+                      BASIS_SIGMA / BASIS_TAU_MIN); EUR_ONLY_STOCK_IDS trade EUR only, the rest USD only.
+  * thin books      - single-listed stocks get THIN_WEIGHT of the flow and go silent (no trades at all)
+                      for SILENCE_FRAC of their minutes, in runs averaging SILENCE_MIN minutes.
+
+--stocks beyond Config's 50 tiles the universe with new ids (USD-only, same sectors/prices) for
+book-count scaling. The tape ends at now on a minute boundary, so 60 s buckets line up with the planted
+minutes. Sinks (at least one):
+  --tape NAME   tape_cache columns written straight from the arrays (data/cache/tape/NAME)
+  --db NAME     COPY'd into that DB's "Transactions" (--replace truncates it first); Stocks /
+                StockListings rows missing for the universe (tiled ids) are inserted, the first
+                listing of each stock primary
+data/sim/synth-<ts>/truth.json records the knobs and the planted minute-grid statistics to check the
+scorers' readings against.
+
+Usage: py scripts/synth_tape.py --trades 1e6 [--minutes 240] [--stocks 50] [--seed 1]
+       [--set T_DF=3 --set HALF_SPREAD=0.001 ...] [--tape NAME] [--db NAME --replace]
+"""
+import argparse, json, math, os, sys, time
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import tape_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Tools"))
+import Config
+
+KNOBS = {
+    "SIGMA_1M": 0.0015,          # total per-minute log-return vol of the efficient price
+    "MARKET_SHARE": 0.20,        # variance share of the market factor
+    "SECTOR_SHARE": 0.15,        # variance share of the stock's sector factor
+    "GARCH_ALPHA": 0.08,         # h' = w + a * e^2 + b * h, per factor
+    "GARCH_BETA": 0.90,
+    "T_DF": 4.0,                 # Student-t innovation dof (0 = Gaussian)
+    "VOLUME_ELASTICITY": 0.5,    # trade intensity ~ (h / h_bar)^this
+    "HALF_SPREAD": 0.0005,       # bounce: Price = mid * (1 +- this)
+    "TICK": 0.01,
+    "SIGN_PERSIST": 0.5,         # P(next trade continues the sign run) per listing
+    "EUR_SHARE": 0.4,            # share of a dual-listed stock's trades on the EUR book
+    "FX_SIGMA_1M": 0.0001,
+    "BASIS_SIGMA": 0.0005,       # stationary sd of the EUR-vs-USD log basis
+    "BASIS_TAU_MIN": 5.0,
+    "THIN_WEIGHT": 0.3,          # flow multiplier of single-listed books
+    "SILENCE_FRAC": 0.10,        # share of a thin book's minutes with no trades
+    "SILENCE_MIN": 4.0,          # mean silent run length
+    "QTY_MEDIAN": 20.0,          # lognormal trade size
+    "QTY_SIGMA": 1.0,
+    "USERS": 20000.0,            # BuyerId / SellerId drawn from 1..USERS
+}
+USD, EUR = tape_cache.CCY.index("USD"), tape_cache.CCY.index("EUR")
+BLOCK = 2_000_000  # target trades per generated chunk
+DTYPES = {name: np.dtype(code) for name, code in tape_cache.COLUMNS}
+
+
+def universe(n_stocks):
+    """[(sid, sector index, usd price)] plus the dual-listed and EUR-only id sets."""
+    base = sorted(Config.STOCKS)
+    stocks = []
+    for i in range(n_stocks):
+        src = Config.STOCKS[base[i % len(base)]]
+        sid = base[i] if i < len(base) else base[-1] + 1 + i - len(base)
+        stocks.append((sid, Config.SECTORS.index(src["sector"]), float(src["price"])))
+    dual, eur_only = set(Config.CROSS_LISTED_STOCK_IDS), set(Config.EUR_ONLY_STOCK_IDS)
+    return stocks, dual, eur_only
+
+
+def garch(rng, k, m, p):
+    """k independent GARCH(1,1) series of m unit-variance-on-average returns -> (returns, variances)."""
+    a, b = p["GARCH_ALPHA"], p["GARCH_BETA"]
+    w = max(1.0 - a - b, 1e-6)
+    z = innovations(rng, (m, k), p["T_DF"])
+    r, h = np.empty((m, k)), np.empty((m, k))
+    ht = np.ones(k)
+    for t in range(m):
+        h[t] = ht
+        r[t] = np.sqrt(ht) * z[t]
+        ht = w + a * r[t] ** 2 + b * ht
+    return r, h
+
+
+def innovations(rng, shape, df):
+    if df <= 2:
+        return rng.standard_normal(shape)
+    return rng.standard_t(df, shape) * math.sqrt((df - 2) / df)
+
+
+def ou(rng, m, sigma, tau):
+    phi = math.exp(-1.0 / tau)
+    e = rng.standard_normal(m) * sigma * math.sqrt(1 - phi * phi)
+    x = np.empty(m)
+    v = 0.0
+    for t in range(m):
+        v = phi * v + e[t]
+        x[t] = v
+    return x
+
+
+def silences(rng, m, frac, run):
+    """Two-state minute Markov chain -> bool mask of silent minutes (stationary share = frac)."""
+    if frac <= 0:
+        return np.zeros(m, bool)
+    leave = 1.0 / max(run, 1.0)
+    enter = min(frac * leave / max(1 - frac, 1e-9), 1.0)
+    u = rng.random(m)
+    out = np.empty(m, bool)
+    s = rng.random() < frac
+    for t in range(m):
+        s = (u[t] >= leave) if s else (u[t] < enter)
+        out[t] = s
+    return out
+
+
+class Synth:
+    def __init__(self, p, n_stocks, minutes, trades, seed):
+        self.p = p
+        self.m = m = int(minutes)
+        self.rng = rng = np.random.default_rng(seed)
+        stocks, dual, eur_only = universe(n_stocks)
+        self.stocks = stocks
+        n = len(stocks)
+        nsec = len(Config.SECTORS)
+
+        # efficient USD log price at every minute boundary, shape (m + 1, n)
+        mkt, h_mkt = garch(rng, 1, m, p)
+        sec, h_sec = garch(rng, nsec, m, p)
+        idi, h_idi = garch(rng, n, m, p)
+        si = np.array([s[1] for s in stocks])
+        sig = p["SIGMA_1M"]
+        bm, bs = sig * math.sqrt(p["MARKET_SHARE"]), sig * math.sqrt(p["SECTOR_SHARE"])
+        bi = sig * math.sqrt(max(1 - p["MARKET_SHARE"] - p["SECTOR_SHARE"], 0.0))
+        ret = bm * mkt + bs * sec[:, si] + bi * idi
+        var = (bm ** 2 * h_mkt + bs ** 2 * h_sec[:, si] + bi ** 2 * h_idi) / sig ** 2  # relative to h_bar
+        self.ret = ret
+        lp = np.vstack([np.zeros(n), np.cumsum(ret, axis=0)]) + np.log([s[2] for s in stocks])
+
+        fx_lp = math.log(Config.FX_BASE_RATES["EUR/USD"]) + np.concatenate(
+            [[0.0], np.cumsum(rng.standard_normal(m) * p["FX_SIGMA_1M"])])
+
+        # listings: (sid, ccy, log-mid path (m + 1,), intensity (m,), stock index)
+        self.listings = []
+        for j, (sid, _, _) in enumerate(stocks):
+            intensity = np.maximum(var[:, j], 1e-9) ** p["VOLUME_ELASTICITY"]
+            if sid in dual:
+                basis = np.concatenate([[0.0], ou(rng, m, p["BASIS_SIGMA"], p["BASIS_TAU_MIN"])])
+                self.listings.append((sid, USD, lp[:, j], intensity * (1 - p["EUR_SHARE"]), j))
+                self.listings.append((sid, EUR, lp[:, j] - fx_lp + basis, intensity * p["EUR_SHARE"], j))
+                continue
+            quiet = silences(rng, m, p["SILENCE_FRAC"], p["SILENCE_MIN"])
+            ccy, path = (EUR, lp[:, j] - fx_lp) if sid in eur_only else (USD, lp[:, j])
+            self.listings.append((sid, ccy, path, np.where(quiet, 0.0, intensity * p["THIN_WEIGHT"]), j))
+
+        lam = np.array([x[3] for x in self.listings]).T  # (m, L)
+        lam *= trades / lam.sum()
+        self.counts = rng.poisson(lam)                    # (m, L)
+        self.paths = np.array([x[2] for x in self.listings]).T  # (m + 1, L)
+        self.vol = sig * np.sqrt(np.maximum(var[:, [x[4] for x in self.listings]], 1e-12))  # (m, L)
+        self.sid = np.array([x[0] for x in self.listings], np.int32)
+        self.ccy = np.array([x[1] for x in self.listings], np.int8)
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def blocks(self):
+        """Yield (minute lo, minute hi) ranges of ~BLOCK trades."""
+        per = self.counts.sum(axis=1)
+        lo, acc = 0, 0
+        for t in range(self.m):
+            acc += per[t]
+            if acc >= BLOCK or t == self.m - 1:
+                yield lo, t + 1
+                lo, acc = t + 1, 0
+
+    def block(self, lo, hi, tid0):
+        """Trades of minutes [lo, hi) as column arrays in time order (tape_cache.COLUMNS names, ts relative)."""
+        p, rng = self.p, self.rng
+        c = self.counts[lo:hi].ravel()                    # cells in (minute, listing) order
+        nl = self.counts.shape[1]
+        cells = np.repeat(np.arange(c.size), c)
+        k = cells.size
+        minute = lo + cells // nl
+        li = cells % nl
+        u = rng.random(k)
+        order = np.lexsort((u, cells))                    # within each cell by time
+        u, minute, li, cells = u[order], minute[order], li[order], cells[order]
+
+        # exact Brownian bridge between the minute-boundary log mids
+        starts = np.concatenate([[0], np.cumsum(c)[:-1]])[c > 0]
+        first = np.zeros(k, bool); first[starts] = True
+        prev = np.where(first, 0.0, np.concatenate([[0.0], u[:-1]]))
+        s = self.vol[minute, li]
+        inc = s * np.sqrt(u - prev) * rng.standard_normal(k)
+        cs = np.cumsum(inc)
+        w = cs - np.repeat(cs[starts] - inc[starts], c[c > 0])
+        last = np.concatenate([starts[1:] - 1, [k - 1]])
+        w1 = w[last] + s[last] * np.sqrt(1 - u[last]) * rng.standard_normal(last.size)
+        a, b = self.paths[minute, li], self.paths[minute + 1, li]
+        mid = np.exp(a + u * (b - a) + w - u * np.repeat(w1, c[c > 0]))
+
+        # trade signs: Markov runs along each listing's own trade sequence
+        by_l = np.lexsort((minute, li))
+        fresh = rng.random(k) >= p["SIGN_PERSIST"]
+        fresh[0] = True
+        ls = li[by_l]
+        fresh[1:] |= ls[1:] != ls[:-1]
+        run_sign = rng.choice(np.array([-1.0, 1.0]), int(fresh.sum()))
+        side = np.empty(k)
+        side[by_l] = run_sign[np.cumsum(fresh) - 1]
+        tick = p["TICK"]
+        px = mid * (1 + side * p["HALF_SPREAD"])
+        if tick > 0:
+            px = np.maximum(np.round(px / tick) * tick, tick)
+
+        qty = np.maximum(1, np.round(p["QTY_MEDIAN"] * np.exp(p["QTY_SIGMA"] * rng.standard_normal(k))))
+        users = int(p["USERS"])
+        buyer = rng.integers(1, users + 1, k)
+        seller = (buyer + rng.integers(0, users - 1, k)) % users + 1  # never the buyer
+        ts = (minute + u) * 60.0
+        t = np.argsort(ts, kind="stable")
+        return {
+            "tid": np.arange(tid0, tid0 + k, dtype=np.int64), "sid": self.sid[li][t], "ccy": self.ccy[li][t],
+            "ts": ts[t], "px": px[t], "mid": mid[t], "qty": qty[t].astype(np.int32),
+            "buyer": buyer[t].astype(np.int32), "seller": seller[t].astype(np.int32),
+        }
+
+    def truth(self):
+        """Planted minute-grid statistics of the efficient price (what bucket-60 mids should show)."""
+        r = self.ret
+        z = (r - r.mean(0)) / r.std(0)
+        kurt = float(np.mean((z ** 4).mean(0) - 3))
+        a = np.abs(r) - np.abs(r).mean(0)
+        acf_abs = float(np.mean((a[1:] * a[:-1]).mean(0) / a.var(0)))
+        acf = float(np.mean((z[1:] * z[:-1]).mean(0)))
+        cor = np.corrcoef(r.T)
+        sec = np.array([s[1] for s in self.stocks])
+        same = sec[:, None] == sec[None, :]
+        off = ~np.eye(len(sec), dtype=bool)
+        intra = float(cor[same & off].mean()) if (same & off).any() else None
+        inter = float(cor[~same].mean()) if (~same).any() else None
+        return {"excess_kurtosis_1m": kurt, "ret_acf_1m": acf, "abs_ret_acf_1m": acf_abs,
+                "corr_intra_sector": intra, "corr_inter_sector": inter,
+                "sigma_1m": float(r.std(0).mean())}
+
+
+class TapeSink:
+    """Columns straight into tape_cache's files; meta last per block so a crash loses only the tail."""
+
+    def __init__(self, name):
+        self.tape = tape_cache.Tape(name)
+        self.tape.reset()
+        self.tape.dir.mkdir(parents=True, exist_ok=True)
+        self.meta = {"n": 0, "last_tid": 0, "oid": 0, "has_mid": True}
+
+    def write(self, cols, t0):
+        for name, _ in tape_cache.COLUMNS:
+            a = cols[name] + t0 if name == "ts" else cols[name]
+            with open(self.tape.dir / f"{name}.bin", "ab") as fh:
+                a.astype(DTYPES[name], copy=False).tofile(fh)
+        self.meta["n"] += len(cols["tid"])
+        self.meta["last_tid"] = int(cols["tid"][-1])
+        tmp = self.tape.dir / "meta.json.tmp"
+        tmp.write_text(json.dumps(self.meta), encoding="utf-8")
+        os.replace(tmp, self.tape.dir / "meta.json")
+
+
+LISTINGS_SQL = '''
+INSERT INTO "Stocks" ("StockId","Symbol","CompanyName","Sector","SharesOutstanding","CreatedAt")
+SELECT DISTINCT v.sid, 'SYN' || v.sid, 'Synthetic ' || v.sid, v.sector, 1000000, now()
+FROM (VALUES {values}) v(sid, ccy, prim, seed, sector)
+WHERE NOT EXISTS (SELECT 1 FROM "Stocks" s WHERE s."StockId" = v.sid);
+INSERT INTO "StockListings" ("StockId","Currency","IsPrimary","SeedPrice","CreatedAt")
+SELECT v.sid, v.ccy, v.prim, v.seed, now()
+FROM (VALUES {values}) v(sid, ccy, prim, seed, sector)
+WHERE NOT EXISTS (SELECT 1 FROM "StockListings" l WHERE l."StockId" = v.sid AND l."Currency" = v.ccy);'''
+
+
+class DbSink:
+    """COPY each block into "Transactions"; the identity column numbers rows in time order."""
+
+    def __init__(self, db, replace, syn):
+        self.db = db
+        if replace:
+            kse_db._run(db, 'TRUNCATE "Transactions";')
+        # tiled ids (--stocks > 50) have no seed rows; give them Stocks/StockListings so the
+        # scorers' primary-listing joins see them (existing rows are left alone)
+        sector = {sid: Config.SECTORS[si] for sid, si, _ in syn.stocks}
+        values, seen = [], set()
+        for j, (sid, ccy) in enumerate(zip(syn.sid.tolist(), syn.ccy.tolist())):
+            values.append(f"({sid}, '{tape_cache.CCY[ccy]}', {str(sid not in seen).lower()}, "
+                          f"{math.exp(syn.paths[0, j]):.4f}, '{sector[sid]}')")
+            seen.add(sid)
+        kse_db._run(db, LISTINGS_SQL.format(values=", ".join(values)))
+
+    def write(self, cols, t0):
+        ccy = tape_cache.CCY
+        sec = cols["ts"] % 60
+        prefix = {}
+        lines = []
+        for tid, m_, s_, sid, c_, px, mid, q, b, sl in zip(
+                cols["tid"].tolist(), (cols["ts"] // 60).astype(np.int64).tolist(), sec.tolist(),
+                cols["sid"].tolist(), cols["ccy"].tolist(), cols["px"].tolist(), cols["mid"].tolist(),
+                cols["qty"].tolist(), cols["buyer"].tolist(), cols["seller"].tolist()):
+            pre = prefix.get(m_)
+            if pre is None:
+                pre = prefix[m_] = datetime.fromtimestamp(t0 + m_ * 60, timezone.utc).strftime("%Y-%m-%d %H:%M:")
+            # no Orders behind a synthetic trade: the NOT NULL order ids are a per-trade pair
+            lines.append(f"{sid},{ccy[c_]},{px:.4f},{mid:.6f},{q},{b},{sl},{2 * tid - 1},{2 * tid},"
+                         f"{pre}{s_:09.6f}+00")
+        kse_db._run(self.db, 'COPY "Transactions" ("StockId","Currency","Price","MidPrice","Quantity",'
+                             '"BuyerId","SellerId","BuyOrderId","SellOrderId","Timestamp") '
+                             'FROM STDIN WITH (FORMAT csv);\n'
+                    + "\n".join(lines) + "\n\\.\n")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trades", type=float, default=1e6, help="expected trade count (Poisson)")
+    ap.add_argument("--minutes", type=int, default=240)
+    ap.add_argument("--stocks", type=int, default=len(Config.STOCKS), help="beyond Config's, ids are tiled")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--set", action="append", default=[], help=f"KNOB=value; knobs: {', '.join(KNOBS)}")
+    ap.add_argument("--tape", default="", help="write the tape_cache under this name")
+    ap.add_argument("--db", default="", help="COPY the trades into this DB's Transactions")
+    ap.add_argument("--replace", action="store_true", help="with --db: TRUNCATE Transactions first")
+    ap.add_argument("--out", default="", help="truth.json dir (default data/sim/synth-<ts>)")
+    args = ap.parse_args()
+    if not (args.tape or args.db):
+        sys.exit("nothing to write: pass --tape NAME and/or --db NAME")
+    p = dict(KNOBS)
+    for s in args.set:
+        k, _, v = s.partition("=")
+        if k not in KNOBS:
+            sys.exit(f"unknown knob {k!r}; knobs: {', '.join(KNOBS)}")
+        p[k] = float(v)
+
+    t_start = time.perf_counter()
+    syn = Synth(p, args.stocks, args.minutes, args.trades, args.seed)
+    t0 = (int(time.time()) // 60 - args.minutes) * 60
+    print(f"{len(syn.stocks)} stocks, {len(syn.listings)} books, {args.minutes} min, {syn.n:,} trades "
+          f"(paths in {time.perf_counter() - t_start:.1f}s)")
+    try:
+        sinks = ([TapeSink(args.tape)] if args.tape else []) + ([DbSink(args.db, args.replace, syn)] if args.db else [])
+        tid, gen, put = 1, 0.0, {type(s).__name__: 0.0 for s in sinks}
+        for lo, hi in syn.blocks():
+            t1 = time.perf_counter()
+            cols = syn.block(lo, hi, tid)
+            gen += time.perf_counter() - t1
+            for s in sinks:
+                t1 = time.perf_counter()
+                s.write(cols, t0)
+                put[type(s).__name__] += time.perf_counter() - t1
+            tid += len(cols["tid"])
+            print(f"  minute {hi}/{args.minutes}  {tid - 1:,} trades", end="\r", flush=True)
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    wall = time.perf_counter() - t_start
+    print(f"\n{tid - 1:,} trades in {wall:.1f}s ({(tid - 1) / max(wall, 1e-9):,.0f}/s)  generate {gen:.1f}s  "
+          + "  ".join(f"{k} {v:.1f}s" for k, v in put.items()))
+
+    truth = syn.truth()
+    for k, v in truth.items():
+        print(f"  planted {k:<20} {'-' if v is None else f'{v:+.4f}'}")
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    out = args.out or os.path.join(ROOT, "data", "sim", f"synth-{ts}")
+    os.makedirs(out, exist_ok=True)
+    with open(os.path.join(out, "truth.json"), "w", encoding="utf-8") as fh:
+        json.dump({"knobs": p, "seed": args.seed, "trades": tid - 1, "start": t0, "end": t0 + args.minutes * 60,
+                   "books": [[int(s), tape_cache.CCY[c]] for s, c in zip(syn.sid, syn.ccy)],
+                   "tape": args.tape or None, "db": args.db or None, "planted": truth}, fh, indent=1)
+    print(f"-> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Incremental, columnar on-disk cache of a soak DB's Transactions tape, plus online bucket stats.
+
+Interim scoring of a live soak (soak_sweep.py) and repeated whole-tape analyses kept re-reading the
+full Transactions table. A Tape mirrors it under data/cache/tape/<db>/ as one flat binary file per
+column (array-module typed, appendable, directly loadable by numpy.fromfile when available) and a
+meta.json holding the row count and the TransactionId watermark. sync() fetches only rows past the
+watermark, so each refresh costs just the new trades.
+
+    tape = tape_cache.Tape("kse_soak"); tape.sync(final=True)
+    tape.cols["px"][i], tape.cols["sid"][i], ...          # parallel columns, TransactionId order
+
+Rows newer than `guard_sec` are left for the next sync while the soak is live: TransactionIds are
+allocated before commit, so the newest ids can become visible out of order. final=True (a stopped
+soak) takes everything. A DB recreated under the same name (new clone from the template) is detected
+by its pg_database oid and the cache is rebuilt.
+
+Bars is the online half: per-stock time buckets updated from the tape's new rows only, emitting
+candles in r4_realism_score's (o, h, l, c, vol, trades, c_last) layout, close = COALESCE(mid, last),
+plus per-bucket VWAP (soak_scorecard's official ret_acf basis).
+"""
+import json, math, os
+from array import array
+from pathlib import Path
+
+import kse_db
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "cache" / "tape"
+CCY = ("USD", "EUR", "GBP", "JPY", "CHF")  # CurrencyType order; ccy column holds the index
+COLUMNS = (  # name, array typecode
+    ("tid", "q"), ("sid", "i"), ("ccy", "b"), ("ts", "d"), ("px", "d"),
+    ("mid", "d"), ("qty", "i"), ("buyer", "i"), ("seller", "i"),
+)
+BATCH = 500_000
+
+MAX_TID_SQL = 'SELECT COALESCE(max("TransactionId"), 0) FROM "Transactions";'
+OID_SQL = "SELECT oid FROM pg_database WHERE datname = current_database();"
+MID_SQL = ("SELECT 1 FROM information_schema.columns "
+           "WHERE table_name='Transactions' AND column_name='MidPrice' LIMIT 1;")
+FETCH_SQL = '''
+SELECT "TransactionId", "StockId", "Currency", extract(epoch from "Timestamp"), "Price", {mid},
+       "Quantity", COALESCE("BuyerId", 0), COALESCE("SellerId", 0)
+FROM "Transactions"
+WHERE "TransactionId" > :last AND (:final OR "Timestamp" < now() - make_interval(secs => :guard))
+ORDER BY "TransactionId" LIMIT :batch;'''
+
+
+class Tape:
+    def __init__(self, db, root=CACHE_DIR, guard_sec=10.0):
+        self.db = db
+        self.dir = Path(root) / db
+        self.guard_sec = guard_sec
+        self.meta = {"n": 0, "last_tid": 0, "oid": None, "has_mid": None}
+        self.cols = {name: array(code) for name, code in COLUMNS}
+        self._checked = False
+        self._load()
+
+    @property
+    def n(self):
+        return self.meta["n"]
+
+    def _load(self):
+        mp = self.dir / "meta.json"
+        if not mp.exists():
+            return
+        meta = json.loads(mp.read_text(encoding="utf-8"))
+        n = meta["n"]
+        for name, code in COLUMNS:
+            a = array(code)
+            f = self.dir / f"{name}.bin"
+            with open(f, "rb") as fh:
+                a.fromfile(fh, min(n, f.stat().st_size // a.itemsize))
+            if len(a) < n:  # torn write — start over rather than guess
+                return self.reset()
+            self.cols[name] = a
+            if f.stat().st_size > n * a.itemsize:  # appended past the last committed meta
+                os.truncate(f, n * a.itemsize)
+        self.meta = meta
+
+    def reset(self):
+        self.meta = {"n": 0, "last_tid": 0, "oid": None, "has_mid": None}
+        self.cols = {name: array(code) for name, code in COLUMNS}
+        for name, _ in COLUMNS:
+            (self.dir / f"{name}.bin").unlink(missing_ok=True)
+        (self.dir / "meta.json").unlink(missing_ok=True)
+
+    def start_at(self, last_tid):
+        """Drop the cache and begin at this watermark, e.g. to skip a fresh clone's template history."""
+        self.reset()
+        self.meta["last_tid"] = int(last_tid)
+
+    # --- sync ---
+    def _identity(self, oid, has_mid):
+        """Adopt (oid, has_mid) from the DB; reset when the DB is a different one than we cached."""
+        oid = int(oid)
+        if self.meta["oid"] is not None and self.meta["oid"] != oid:
+            self.reset()
+        self.meta["oid"], self.meta["has_mid"] = oid, bool(has_mid)
+        self._checked = True
+
+    def _fetch(self, final):
+        mid = '"MidPrice"' if self.meta["has_mid"] else "NULL"
+        return FETCH_SQL.format(mid=mid), {"last": self.meta["last_tid"], "final": str(bool(final)).lower(),
+                                           "guard": self.guard_sec, "batch": BATCH}
+
+    def sync(self, final=False):
+        """Pull rows past the watermark -> number of new rows."""
+        if not self._checked:
+            self._identity(kse_db.rows(self.db, OID_SQL)[0][0], kse_db.rows(self.db, MID_SQL))
+        added = 0
+        while True:
+            sql, params = self._fetch(final)
+            got = self.ingest(kse_db.rows(self.db, sql, params))
+            added += got
+            if got < BATCH:
+                return added
+
+    async def sync_async(self, pool, final=False):
+        """sync() through a kse_db.Pool, for callers already inside an event loop."""
+        if not self._checked:
+            oid = await pool.rows(self.db, OID_SQL)
+            self._identity(oid[0][0], await pool.rows(self.db, MID_SQL))
+        added = 0
+        while True:
+            sql, params = self._fetch(final)
+            got = self.ingest(await pool.rows(self.db, sql, params))
+            added += got
+            if got < BATCH:
+                return added
+
+    def ingest(self, rows):
+        """Append csv rows from FETCH_SQL; columns are written before meta so a crash loses only the tail."""
+        if not rows:
+            return 0
+        new = {name: array(code) for name, code in COLUMNS}
+        ccy = {c: i for i, c in enumerate(CCY)}
+        for tid, sid, cur, ts, px, mid, qty, buyer, seller in rows:
+            new["tid"].append(int(tid))
+            new["sid"].append(int(sid))
+            new["ccy"].append(ccy.get(cur, -1))
+            new["ts"].append(float(ts))
+            new["px"].append(float(px))
+            new["mid"].append(float(mid) if mid else math.nan)
+            new["qty"].append(int(qty))
+            new["buyer"].append(int(buyer))
+            new["seller"].append(int(seller))
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for name, _ in COLUMNS:
+            with open(self.dir / f"{name}.bin", "ab") as fh:
+                new[name].tofile(fh)
+            self.cols[name].extend(new[name])
+        self.meta["n"] += len(rows)
+        self.meta["last_tid"] = new["tid"][-1]
+        tmp = self.dir / "meta.json.tmp"
+        tmp.write_text(json.dumps(self.meta), encoding="utf-8")
+        os.replace(tmp, self.dir / "meta.json")
+        return len(rows)
+
+
+def primary_listings(db):
+    """{(StockId, ccy index)} of primary listings — the candle population r4_realism_score scores."""
+    ccy = {c: i for i, c in enumerate(CCY)}
+    return {(int(s), ccy.get(c, -1)) for s, c in
+            kse_db.rows(db, 'SELECT "StockId","Currency" FROM "StockListings" WHERE "IsPrimary"=true;')}
+
+
+class Bars:
+    """Online per-stock bucket aggregates over a Tape; update() only touches rows added since last time."""
+
+    def __init__(self, bucket_sec=60, since=0.0, listings=None):
+        self.bucket = bucket_sec
+        self.since = since
+        self.listings = listings
+        self.pos = 0
+        self.b = {}  # sid -> {bucket: [o, h, l, c, vol, trades, c_last, t_first, t_last, notional]}
+
+    def update(self, tape):
+        c = tape.cols
+        for i in range(self.pos, tape.n):
+            ts = c["ts"][i]
+            if ts < self.since:
+                continue
+            sid = c["sid"][i]
+            if self.listings is not None and (sid, c["ccy"][i]) not in self.listings:
+                continue
+            px, mid, qty = c["px"][i], c["mid"][i], c["qty"][i]
+            ref = px if mid != mid else mid  # NaN check: COALESCE(MidPrice, Price)
+            k = int(ts // self.bucket)
+            per = self.b.setdefault(sid, {})
+            bar = per.get(k)
+            if bar is None:
+                per[k] = [px, px, px, ref, qty, 1, px, ts, ts, px * qty]
+                continue
+            if px > bar[1]: bar[1] = px
+            if px < bar[2]: bar[2] = px
+            bar[4] += qty
+            bar[5] += 1
+            bar[9] += px * qty
+            if ts < bar[7]:
+                bar[0], bar[7] = px, ts
+            if ts >= bar[8]:
+                bar[3], bar[6], bar[8] = ref, px, ts
+        self.pos = tape.n
+
+    def candles(self, sid):
+        per = self.b.get(sid, {})
+        return [tuple(per[k][:7]) for k in sorted(per)]
+
+    def vwaps(self, sid):
+        """{bucket index: VWAP} for one stock."""
+        return {k: bar[9] / bar[4] for k, bar in self.b.get(sid, {}).items() if bar[4] > 0}
+
+    def series(self):
+        return {sid: self.candles(sid) for sid in self.b}
@@ -5,10 +5,12 @@
 #   acf_lag5  : SIGNED return autocorr at lag 5 (multi-min trend persistence; >0 = trending, ~0 = no drift).
 # Averaged across active stocks. A working contrarian feedback should LOWER r2 + net_move (+ pull acf_lag5
 # toward 0) WITHOUT dragging ret_acf_lag1 more negative (check bounce_diag.py alongside).
-import argparse, subprocess, sys
+# Window ends at the tape's last trade; the query is memoized per DB watermark (kse_db.cached_rows).
+import argparse, os, sys
 from collections import defaultdict
 
-PG = "kieshstockexchange-postgres-1"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
 
 def linfit_r2(ys):
     n = len(ys)
@@ -37,18 +39,20 @@ def main():
     args = ap.parse_args()
 
     sql = ('SELECT t."StockId", '
-           f'floor(extract(epoch from t."Timestamp")/{args.bucket_sec}) AS b, '
+           'floor(extract(epoch from t."Timestamp")/:bucket) AS b, '
            '(array_agg(t."Price" ORDER BY t."Timestamp" DESC))[1] AS close '
            'FROM "Transactions" t '
-           f'WHERE extract(epoch from t."Timestamp") >= extract(epoch from now()) - {args.window_min*60:.0f} '
+           'WHERE t."Timestamp" >= to_timestamp(:since) '
            'GROUP BY t."StockId", b ORDER BY t."StockId", b;')
-    out = subprocess.run(["docker","exec","-i",PG,"psql","-U","kse","-d",args.db,"--csv","-c",sql],
-                         capture_output=True, text=True)
-    if out.returncode != 0: sys.exit(f"psql failed: {out.stderr.strip()}")
+    try:
+        wm = kse_db.watermark(args.db)
+        out = kse_db.cached_rows(args.db, sql, {"bucket": args.bucket_sec,
+                                                "since": f"{wm.tape_end - args.window_min*60:.0f}"}, wm)
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
 
     closes = defaultdict(list)
-    for ln in out.stdout.splitlines()[1:]:
-        p = ln.split(",")
+    for p in out:
         if len(p) < 3 or not p[2]: continue
         closes[int(p[0])].append(float(p[2]))
 
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Volatility signature plot: realized variance and lag-1 return ACF across a ladder of bucket sizes.
+
+bounce_diag.py (1-min close vs VWAP, SQL), bounce_test.py (1-min last / mid / VWAP, from a CSV) and
+q2_bounce_chart.py (1-min last vs mid, a picture) each look at one bucket size. Microstructure noise
+is a function of the sampling interval, so this runs every book of the cached tape through a whole
+--ladder (default 5s .. 30m) at once and reports, per bucket size and close sampling:
+
+  last   the bucket's last trade price              (bounces between bid and ask)
+  mid    the last trade's MidPrice, else its price  (tape_cache.Bars' close; this is the micro-price
+                                                     when the soak ran Bots:BounceReference=micro)
+  vwap   the bucket's qty-weighted mean price
+
+  vol      sqrt(realized variance per hour): the sum of squared log returns between a book's
+           consecutive non-empty buckets over its span, median over books. Flat across the ladder =
+           no noise; rising toward small buckets = bounce still in the returns.
+  acf1     lag-1 ACF of those returns per book (>= --min-rets of them), median and mean over books,
+           the same per-series statistic bounce_diag / bounce_test compute
+
+The tape is sorted once by (book, time) and aggregated at the finest rung; every coarser rung that
+is a multiple of it is built from those aggregates, not from the trades, so extra rungs are cheap.
+Writes data/signature/<name>/signature.csv (+ per-book rows in signature-books.csv) and, with
+matplotlib installed, signature.png.
+
+Usage: py scripts/vol_signature.py [--db kse_soak] [--tape NAME] [--ladder 5s,15s,1m,5m,30m]
+       [--window-min 0] [--primary] [--live]
+"""
+import argparse, csv, os, sys, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import tape_cache
+from depth_replay import parse_res
+from microstructure import load
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.path.join(ROOT, "data", "signature")
+LADDER = "5s,10s,15s,30s,1m,2m,5m,10m,15m,30m"
+SAMPLINGS = ("last", "mid", "vwap")
+
+
+def runs(book, bucket):
+    """Start index of every contiguous (book, bucket) run of an array sorted by both."""
+    return np.flatnonzero(np.r_[True, (book[1:] != book[:-1]) | (bucket[1:] != bucket[:-1])])
+
+
+def aggregate(book, bucket, last_px, last_ref, pq, q):
+    """Merge consecutive rows of the same (book, bucket) -> one row each, same columns."""
+    st = runs(book, bucket)
+    en = np.r_[st[1:], len(book)] - 1
+    return (book[st], bucket[st], last_px[en], last_ref[en],
+            np.add.reduceat(pq, st), np.add.reduceat(q, st))
+
+
+def signature(book, bucket, closes, res, min_rets):
+    """Per-book (vol per sqrt hour, acf1) of the close series; rows sorted by (book, bucket)."""
+    same = book[1:] == book[:-1]
+    ok = same & (closes[1:] > 0) & (closes[:-1] > 0)
+    r = np.log(closes[1:][ok] / closes[:-1][ok])
+    rb = np.unique(book, return_inverse=True)[1][1:][ok]
+    nb = int(rb.max()) + 1 if len(rb) else 0
+    n = np.bincount(rb, minlength=nb).astype(np.float64)
+    first = np.full(nb, np.inf)
+    last = np.full(nb, -np.inf)
+    np.minimum.at(first, rb, bucket[:-1][ok])
+    np.maximum.at(last, rb, bucket[1:][ok])
+    span_h = (last - first) * res / 3600
+    ss = np.bincount(rb, weights=r * r, minlength=nb)
+    vol = np.sqrt(np.divide(ss, span_h, out=np.full(nb, np.nan), where=span_h > 0))
+    mean = np.divide(np.bincount(rb, weights=r, minlength=nb), n, out=np.zeros(nb), where=n > 0)
+    dev = r - mean[rb]
+    den = np.bincount(rb, weights=dev * dev, minlength=nb)
+    pair = rb[1:] == rb[:-1]
+    num = np.bincount(rb[1:][pair], weights=dev[1:][pair] * dev[:-1][pair], minlength=nb)
+    acf = np.divide(num, den, out=np.full(nb, np.nan), where=(den > 0) & (n >= min_rets))
+    vol[n < min_rets] = np.nan
+    return vol, acf, n
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="kse_soak")
+    ap.add_argument("--tape", default="", help="read this tape_cache as-is instead of syncing --db")
+    ap.add_argument("--ladder", default=LADDER, help="bucket sizes, finest first")
+    ap.add_argument("--window-min", type=float, default=0.0, help="only the tape's last N minutes (0 = all)")
+    ap.add_argument("--min-rets", type=int, default=8, help="books with fewer returns at a rung are skipped there")
+    ap.add_argument("--primary", action="store_true", help="primary listings only (r4_realism_score's population)")
+    ap.add_argument("--live", action="store_true", help="soak still running: leave the newest trades for later")
+    ap.add_argument("--no-plot", action="store_true")
+    args = ap.parse_args()
+
+    ladder = sorted((parse_res(x), x) for x in args.ladder.split(",") if x)
+    name = args.tape or args.db
+    t0 = time.perf_counter()
+    tape = tape_cache.Tape(name)
+    try:
+        if not args.tape:
+            added = tape.sync(final=not args.live)
+            print(f"tape {name}: {tape.n:,} trades ({added:,} new)")
+        listings = tape_cache.primary_listings(args.db) if args.primary else None
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    if not tape.n:
+        sys.exit(f"tape {name} is empty")
+
+    c = load(tape, args.window_min)
+    if listings is not None:
+        keep = np.isin(c["book"], np.array([s * 8 + ci + 1 for s, ci in listings], dtype=np.int64))
+        c = {k: v[keep] for k, v in c.items()}
+    t1 = time.perf_counter()
+    px, q = c["px"], c["qty"].astype(np.float64)
+    ref = np.where(np.isnan(c["mid"]), px, c["mid"])
+    has_mid = bool((~np.isnan(c["mid"])).any())
+    base_res = ladder[0][0]
+    base = aggregate(c["book"], np.floor(c["ts"] / base_res).astype(np.int64), px, ref, px * q, q)
+
+    rows, book_rows = [], []
+    books = np.unique(base[0])
+    for res, label in ladder:
+        k = res / base_res
+        if abs(k - round(k)) < 1e-9:  # from the base aggregates
+            agg = aggregate(base[0], base[1] // int(round(k)), *base[2:])
+        else:
+            agg = aggregate(c["book"], np.floor(c["ts"] / res).astype(np.int64), px, ref, px * q, q)
+        bk, bucket, last_px, last_ref, pq, qq = agg
+        vwap = np.divide(pq, qq, out=last_px.copy(), where=qq > 0)
+        for s, closes in (("last", last_px), ("mid", last_ref), ("vwap", vwap)):
+            if s == "mid" and not has_mid:
+                continue
+            vol, acf, n = signature(bk, bucket, closes, res, args.min_rets)
+            m = ~np.isnan(acf)
+            rows.append({"res_sec": res, "res": label, "sampling": s, "books": int(m.sum()),
+                         "vol_med": float(np.nanmedian(vol)) if (~np.isnan(vol)).any() else None,
+                         "acf1_med": float(np.median(acf[m])) if m.any() else None,
+                         "acf1_mean": float(acf[m].mean()) if m.any() else None,
+                         "buckets": len(bk)})
+            for i in np.flatnonzero(m):
+                sid, ci = divmod(int(books[i]), 8)
+                book_rows.append((res, s, sid, tape_cache.CCY[ci - 1] if 0 < ci <= len(tape_cache.CCY) else "?",
+                                  int(n[i]), vol[i], acf[i]))
+    compute = time.perf_counter() - t1
+
+    out_dir = os.path.join(OUT_DIR, name)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "signature.csv")
+    fmt = lambda v: "" if v is None or v != v else (f"{v:.6g}" if isinstance(v, float) else v)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=list(rows[0]))
+        w.writeheader()
+        for r in rows:
+            w.writerow({k: fmt(v) for k, v in r.items()})
+    with open(os.path.join(out_dir, "signature-books.csv"), "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["res_sec", "sampling", "stock", "ccy", "rets", "vol", "acf1"])
+        for r in book_rows:
+            w.writerow([fmt(float(r[0])), *r[1:5], fmt(float(r[5])), fmt(float(r[6]))])
+
+    print(f"{len(c['ts']):,} trades, {len(books)} books, {len(ladder)} rungs in {compute:.2f}s "
+          f"(total {time.perf_counter() - t0:.1f}s)" + ("" if has_mid else "; no MidPrice on this tape, mid skipped"))
+    # normalise to the coarsest rung that has a vol: a short soak has < --min-rets returns at 30m
+    top, top_res = {}, {}
+    for r in rows:  # ladder order, finest first
+        if r["vol_med"]:
+            top[r["sampling"]], top_res[r["sampling"]] = r["vol_med"], r["res"]
+    ref = set(top_res.values())
+    ref = ref.pop() if len(ref) == 1 else "coarsest"
+    f = lambda v, s: "-".rjust(len(format(0.0, s))) if v is None else format(v, s)
+    print(f"{'res':>6} {'sampling':<8} {'books':>5} {'vol/sqrt(h)':>11} {'vs ' + ref:>8} {'acf1 med':>9} {'acf1 mean':>9}")
+    for r in rows:
+        rel = r["vol_med"] / top[r["sampling"]] if r["vol_med"] and top.get(r["sampling"]) else None
+        print(f"{r['res']:>6} {r['sampling']:<8} {r['books']:>5} {f(r['vol_med'], '11.5f')} {f(rel, '8.2f')} "
+              f"{f(r['acf1_med'], '+9.3f')} {f(r['acf1_mean'], '+9.3f')}")
+    print(f"-> {path}")
+
+    if args.no_plot:
+        return
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib not installed; no signature.png")
+        return
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
+    for s, color in zip(SAMPLINGS, ("#d62728", "#1f77b4", "#2ca02c")):
+        mine = [r for r in rows if r["sampling"] == s and r["vol_med"]]
+        if not mine:
+            continue
+        x = [r["res_sec"] for r in mine]
+        ax1.plot(x, [r["vol_med"] / top[s] for r in mine], "o-", color=color, label=s)
+        ax2.plot(x, [r["acf1_med"] for r in mine], "o-", color=color, label=s)
+    ax1.axhline(1.0, color="grey", lw=0.8)
+    ax2.axhline(0.0, color="grey", lw=0.8)
+    ax1.set_ylabel(f"vol / vol at {ref} (median over books)")
+    ax2.set_ylabel("lag-1 return ACF (median over books)")
+    ax2.set_xscale("log")
+    ax2.set_xticks([r for r, _ in ladder])
+    ax2.set_xticklabels([l for _, l in ladder])
+    ax2.set_xlabel("bucket size")
+    for ax in (ax1, ax2):
+        ax.grid(alpha=0.25)
+        ax.legend(fontsize=8)
+    fig.suptitle(f"Volatility signature - {name} ({len(books)} books, {len(c['ts']):,} trades)")
+    fig.tight_layout()
+    png = os.path.join(out_dir, "signature.png")
+    fig.savefig(png, dpi=110)
+    print(f"-> {png}")
+
+
+if __name__ == "__main__":
+    main()
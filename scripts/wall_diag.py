@@ -4,10 +4,12 @@
 #   hhi             : Herfindahl over price levels (sum of squared shares; higher = more concentrated)
 #   round_share     : qty sitting exactly on the round-number snap grid / total  (the wall source)
 # Lower on all three = volume spread naturally across levels instead of stacked into walls.
-import argparse, subprocess, sys
+# The book query is memoized per DB watermark (kse_db.cached_rows), so re-runs on a stopped soak are free.
+import argparse, os, sys
 from collections import defaultdict
 
-PG = "kieshstockexchange-postgres-1"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
 
 def snap_unit(price):
     if price >= 500: return 5.0
@@ -24,16 +26,15 @@ def main():
     sql = ('SELECT "StockId","Side","Price",sum("Quantity"-"AmountFilled") '
            'FROM "Orders" WHERE "Status"=\'Open\' AND "Entry"=\'Limit\' '
            'GROUP BY "StockId","Side","Price";')
-    out = subprocess.run(["docker", "exec", "-i", PG, "psql", "-U", "kse", "-d", args.db, "--csv", "-c", sql],
-                         capture_output=True, text=True)
-    if out.returncode != 0:
-        sys.exit(f"psql failed: {out.stderr.strip()}")
+    try:
+        out = kse_db.cached_rows(args.db, sql)
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
 
     # (stock,side) -> list of (price, qty)
     books = defaultdict(list)
     norders = defaultdict(int)
-    for ln in out.stdout.splitlines()[1:]:
-        p = ln.split(",")
+    for p in out:
         if len(p) < 4 or not p[3]:
             continue
         books[(int(p[0]), p[1])].append((float(p[2]), float(p[3])))
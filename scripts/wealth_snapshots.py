@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""Wealth-distribution snapshots of Funds and Positions over a soak, stored as per-row deltas.
+
+CashHomeostasisTests and BotCashInjector shape bot cash, but nothing watched how the fleet's wealth
+spreads out while a soak runs. `record` snapshots Funds and Positions every --interval seconds into
+data/wealth/<name>/frames.bin:
+
+  delta      each snapshot runs in one REPEATABLE READ transaction and fetches only the rows whose
+             xmin is at or past the previous snapshot's xmin horizon (every transaction older than it
+             had finished, so nothing is missed; re-fetched unchanged rows are dropped). A DELETE (the
+             admin endpoint, UserPortfolioService's duplicate cleanup) leaves no xmin behind: when the
+             row counts disagree with the replayed state the snapshot diffs the full tables instead.
+  frame      a 33-byte header (kind, epoch ts, xmin horizon, fund / position / price record counts,
+             payload length) then zlib'd columns: (user, currency) and (user, stock) keys delta-coded,
+             balance / collateral / quantity changes in integer cents and shares, a removed flag, and
+             the last trade price of every stock (USD at Config.FX_BASE_RATES). An idle bot costs
+             nothing, so 48 h at the default interval stays in the tens of MB.
+  seed       --seed DB (the reseed template, reseed_copy.py --template) stores that DB's tables as the
+             baseline frame; without it the first snapshot is the baseline.
+
+A killed recorder leaves at most a torn frame at the end; the next run truncates it and resumes from
+the replayed state.
+
+`report` replays the frames and, per snapshot, for the bots (AIUsers, pnl_attribution's cached map;
+house / jump-aggressor / other accounts left out) overall and per strategy:
+
+  wealth     cash (all currencies) + long value - short value, last trade prices
+  gini       of wealth (negative wealth counted as 0), plus the top 1% / 10% shares
+  cash frac  cash / (cash + long value): p10 / p50 / p90
+  short      short value / wealth, and the share of bots holding any short
+  drift      sum |qty - seeded qty| x price / seeded wealth (p50 / p90), and vs_hold: wealth over
+             what the seeded portfolio would be worth at today's prices, - 1 (p50)
+
+Writes data/wealth/<name>/metrics.csv.
+
+Usage: py scripts/wealth_snapshots.py record [--db kse_soak] [--name kse_soak] [--interval 300]
+       [--seed kse_soak_seed] [--duration 0] [--once]
+       py scripts/wealth_snapshots.py report --name kse_soak [--db kse_soak] [--step 0]
+"""
+import argparse, csv, json, os, struct, sys, time, zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kse_db
+import tape_cache
+from pnl_attribution import accounts, usd_rates
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.path.join(ROOT, "data", "wealth")
+HEADER = struct.Struct("<BdIIIIQ")  # kind, ts, horizon, funds, positions, prices, payload length
+SNAPSHOT, SEED = 0, 1
+SID_BITS = 16
+CCY = tape_cache.CCY
+# one transaction: every COPY sees the same snapshot, and its xmin horizon bounds the next delta
+SNAP_SQL = r'''\set QUIET on
+BEGIN ISOLATION LEVEL REPEATABLE READ;
+COPY (SELECT 'h', extract(epoch from now()), pg_snapshot_xmin(pg_current_snapshot())::text::bigint % 4294967296,
+             (SELECT count(*) FROM "Funds"), (SELECT count(*) FROM "Positions"),
+             (SELECT oid FROM pg_database WHERE datname = current_database())) TO STDOUT (FORMAT csv);
+COPY (SELECT 'f', "UserId", "Currency", "TotalBalance", "ReservedBalance" FROM "Funds"
+      WHERE xmin::text::bigint >= :lo) TO STDOUT (FORMAT csv);
+COPY (SELECT 'p', "UserId", "StockId", "Quantity", "ShortCollateral" FROM "Positions"
+      WHERE xmin::text::bigint >= :lo) TO STDOUT (FORMAT csv);
+COPY (SELECT 's', "StockId", "Currency", "SeedPrice" FROM "StockListings" WHERE "IsPrimary") TO STDOUT (FORMAT csv);
+COPY (SELECT DISTINCT ON ("StockId") 'x', "StockId", "Currency", "Price" FROM "Transactions"
+      WHERE "TransactionId" > (SELECT COALESCE(max("TransactionId"), 0) - :recent FROM "Transactions")
+      ORDER BY "StockId", "TransactionId" DESC) TO STDOUT (FORMAT csv);
+COMMIT;'''
+
+
+def cents(v):
+    return int(round(float(v) * 100))
+
+
+class Table:
+    """Sorted int64 keys with parallel int64 value columns."""
+
+    def __init__(self, ncols):
+        self.key = np.zeros(0, dtype=np.int64)
+        self.vals = [np.zeros(0, dtype=np.int64) for _ in range(ncols)]
+
+    def diff(self, key, vals, full):
+        """Fetched rows -> (keys, value deltas, removed flags) of what changed; `full` = the whole table."""
+        order = np.argsort(key)
+        key, vals = key[order], [v[order] for v in vals]
+        i = np.searchsorted(self.key, key)
+        hit = (i < len(self.key)) & (self.key[np.minimum(i, len(self.key) - 1)] == key) if len(self.key) \
+            else np.zeros(len(key), dtype=bool)
+        old = [np.where(hit, v[np.minimum(i, len(v) - 1)], 0) if len(v) else np.zeros(len(key), dtype=np.int64)
+               for v in self.vals]
+        changed = ~hit
+        for o, v in zip(old, vals):
+            changed |= o != v
+        dkey = key[changed]
+        dvals = [(v - o)[changed] for o, v in zip(old, vals)]
+        gone = np.zeros(len(dkey), dtype=np.uint8)
+        if full:
+            miss = ~np.isin(self.key, key)
+            dkey = np.concatenate([dkey, self.key[miss]])
+            dvals = [np.concatenate([d, -v[miss]]) for d, v in zip(dvals, self.vals)]
+            gone = np.concatenate([gone, np.ones(int(miss.sum()), dtype=np.uint8)])
+            order = np.argsort(dkey)
+            dkey, dvals, gone = dkey[order], [d[order] for d in dvals], gone[order]
+        return dkey, dvals, gone
+
+    def apply(self, dkey, dvals, gone):
+        i = np.searchsorted(self.key, dkey)
+        hit = (i < len(self.key)) & (self.key[np.minimum(i, len(self.key) - 1)] == dkey) if len(self.key) \
+            else np.zeros(len(dkey), dtype=bool)
+        for v, d in zip(self.vals, dvals):
+            v[i[hit]] += d[hit]
+        keep = np.ones(len(self.key), dtype=bool)
+        keep[i[hit & (gone == 1)]] = False
+        new = ~hit & (gone == 0)
+        key = np.concatenate([self.key[keep], dkey[new]])
+        order = np.argsort(key, kind="stable")
+        self.key = key[order]
+        self.vals = [np.concatenate([v[keep], d[new]])[order] for v, d in zip(self.vals, dvals)]
+
+
+class State:
+    """Funds (user, ccy) -> total, reserved cents; Positions (user, stock) -> qty, collateral cents; prices."""
+
+    def __init__(self):
+        self.funds = Table(2)
+        self.pos = Table(2)
+        self.px = {}  # stock -> USD price
+        self.horizon = None
+        self.ts = 0.0
+
+    def apply(self, frame):
+        kind, ts, horizon, f, p, px = frame
+        self.funds.apply(*f)
+        self.pos.apply(*p)
+        self.px.update(px)
+        self.ts = ts
+        self.horizon = None if kind == SEED else horizon  # the live DB's first snapshot diffs in full
+
+
+def encode(f, p, px):
+    fk, (ft, fr), fg = f
+    pk, (pq, pc), pg = p
+    sids = np.array(sorted(px), dtype=np.int32)
+    prices = np.array([px[s] for s in sids.tolist()], dtype=np.float64)
+    cols = [np.diff(fk, prepend=0), ft, fr, fg, np.diff(pk, prepend=0), pq, pc, pg, sids, prices]
+    return zlib.compress(b"".join(c.tobytes() for c in cols), 6), len(fk), len(pk), len(sids)
+
+
+def decode(payload, nf, np_, nx):
+    buf = zlib.decompress(payload)
+    at = 0
+
+    def take(n, dt):
+        nonlocal at
+        a = np.frombuffer(buf, dtype=dt, count=n, offset=at)
+        at += n * np.dtype(dt).itemsize
+        return a.copy()
+    fk = np.cumsum(take(nf, np.int64))
+    ft, fr, fg = take(nf, np.int64), take(nf, np.int64), take(nf, np.uint8)
+    pk = np.cumsum(take(np_, np.int64))
+    pq, pc, pg = take(np_, np.int64), take(np_, np.int64), take(np_, np.uint8)
+    sids, prices = take(nx, np.int32), take(nx, np.float64)
+    return (fk, [ft, fr], fg), (pk, [pq, pc], pg), dict(zip(sids.tolist(), prices.tolist()))
+
+
+class Frames:
+    """Iterate (kind, ts, horizon, funds delta, positions delta, prices) per complete frame of a
+    recording; afterwards .end is the offset past the last complete one (a torn tail is skipped)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.end = 0
+
+    def __iter__(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as fh:
+            while True:
+                head = fh.read(HEADER.size)
+                if len(head) < HEADER.size:
+                    return
+                kind, ts, horizon, nf, np_, nx, length = HEADER.unpack(head)
+                payload = fh.read(length)
+                if len(payload) < length:
+                    return
+                try:
+                    f, p, px = decode(payload, nf, np_, nx)
+                except (zlib.error, ValueError):
+                    return
+                self.end = fh.tell()
+                yield kind, ts, horizon, f, p, px
+
+
+def fetch(db, lo, recent):
+    """One snapshot -> (header dict, fund rows, position rows, prices)."""
+    head, fund, pos, seed_px, last_px = None, [], [], {}, {}
+    rates = usd_rates()
+    for r in kse_db.stream(db, SNAP_SQL, {"lo": lo, "recent": recent}):
+        tag = r[0]
+        if tag == "p":
+            pos.append(r)
+        elif tag == "f":
+            fund.append(r)
+        elif tag == "h":
+            head = {"ts": float(r[1]), "horizon": int(r[2]), "funds": int(r[3]), "positions": int(r[4]), "oid": int(r[5])}
+        elif tag in ("s", "x"):
+            ccy = CCY.index(r[2]) if r[2] in CCY else 0
+            (seed_px if tag == "s" else last_px)[int(r[1])] = float(r[3]) * rates[ccy]
+    fk = np.array([int(r[1]) * 8 + (CCY.index(r[2]) if r[2] in CCY else 7) for r in fund], dtype=np.int64)
+    fv = [np.array([cents(r[3]) for r in fund], dtype=np.int64), np.array([cents(r[4]) for r in fund], dtype=np.int64)]
+    pk = np.array([(int(r[1]) << SID_BITS) + int(r[2]) for r in pos], dtype=np.int64)
+    pv = [np.array([int(r[3]) for r in pos], dtype=np.int64), np.array([cents(r[4]) for r in pos], dtype=np.int64)]
+    return head, (fk, fv), (pk, pv), seed_px, last_px
+
+
+class Recorder:
+    def __init__(self, name):
+        self.dir = os.path.join(OUT_DIR, name)
+        self.path = os.path.join(self.dir, "frames.bin")
+        self.state = State()
+        self.baseline = False
+        self.n = 0
+        os.makedirs(self.dir, exist_ok=True)
+        log = Frames(self.path)
+        for fr in log:
+            self.state.apply(fr)
+            self.baseline = True
+            self.n += 1
+        if os.path.exists(self.path) and os.path.getsize(self.path) > log.end:
+            print(f"truncating a torn frame at {log.end:,} bytes")
+            with open(self.path, "r+b") as fh:
+                fh.truncate(log.end)
+
+    def snapshot(self, db, kind=SNAPSHOT, recent=200_000):
+        """Fetch and append one frame -> (header, fund changes, position changes)."""
+        st = self.state
+        lo = st.horizon if st.horizon is not None and kind == SNAPSHOT else 0
+        head, (fk, fv), (pk, pv), seed_px, last_px = fetch(db, lo, recent)
+        if head is None:
+            raise kse_db.QueryError(db, "no snapshot header")
+        full = lo == 0 or head["horizon"] < lo  # first frame, or the xid counter wrapped
+        if lo and full:
+            head, (fk, fv), (pk, pv), seed_px, last_px = fetch(db, 0, recent)  # the xmin >= lo rows aren't all
+        f, p = st.funds.diff(fk, fv, full), st.pos.diff(pk, pv, full)
+        if not full:
+            grown_f = int(np.sum(~np.isin(f[0], st.funds.key)))
+            grown_p = int(np.sum(~np.isin(p[0], st.pos.key)))
+            if len(st.funds.key) + grown_f != head["funds"] or len(st.pos.key) + grown_p != head["positions"]:
+                head, (fk, fv), (pk, pv), seed_px, last_px = fetch(db, 0, recent)  # rows were deleted
+                f, p = st.funds.diff(fk, fv, True), st.pos.diff(pk, pv, True)
+        px = {s: v for s, v in seed_px.items() if s not in st.px}
+        px.update(last_px)
+        payload, nf, np_, nx = encode(f, p, px)
+        with open(self.path, "ab") as fh:
+            fh.write(HEADER.pack(kind, head["ts"], head["horizon"], nf, np_, nx, len(payload)) + payload)
+        st.apply((kind, head["ts"], head["horizon"], f, p, px))
+        self.n += 1
+        self.baseline = True
+        meta_path = os.path.join(self.dir, "meta.json")
+        meta = json.load(open(meta_path, encoding="utf-8")) if os.path.exists(meta_path) else {}
+        meta.update({"db" if kind == SNAPSHOT else "seed_db": db, "oid" if kind == SNAPSHOT else "seed_oid": head["oid"]})
+        with open(meta_path, "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, indent=1)
+        return head, nf, np_, len(payload)
+
+
+def quantiles(x, qs):
+    return np.quantile(x, qs) if len(x) else np.full(len(qs), np.nan)
+
+
+def gini(w):
+    w = np.sort(np.maximum(w, 0.0))
+    n, s = len(w), w.sum()
+    if n == 0 or s <= 0:
+        return float("nan")
+    return float((2 * np.arange(1, n + 1) - n - 1) @ w / (n * s))
+
+
+def valuation(state, rates, nusers):
+    """Per-user (cash, long value, short value, qty by stock lookup) in USD."""
+    fk = state.funds.key
+    user_f, ccy = fk // 8, fk % 8
+    r = np.where(ccy < len(rates), rates[np.minimum(ccy, len(rates) - 1)], 1.0)
+    cash = np.bincount(user_f, weights=state.funds.vals[0] / 100 * r, minlength=nusers)[:nusers]
+    pk = state.pos.key
+    user_p, sid = pk >> SID_BITS, pk & ((1 << SID_BITS) - 1)
+    px = np.array([state.px.get(int(s), np.nan) for s in range(int(sid.max()) + 1 if len(sid) else 0)])
+    val = state.pos.vals[0] * np.nan_to_num(px[sid]) if len(sid) else np.zeros(0)
+    long_ = np.bincount(user_p, weights=np.maximum(val, 0), minlength=nusers)[:nusers]
+    short = np.bincount(user_p, weights=np.maximum(-val, 0), minlength=nusers)[:nusers]
+    return cash, long_, short
+
+
+def metrics(state, seed, rates, groups, names, nusers):
+    """Rows of per-group metrics at this state (groups: user -> group index, -1 = not a bot)."""
+    cash, long_, short = valuation(state, rates, nusers)
+    wealth = cash + long_ - short
+    s_cash, s_long, s_short = valuation(seed, rates, nusers)
+    # seeded holdings at today's prices, and the share turnover away from them
+    today = State()
+    today.funds, today.pos, today.px = seed.funds, seed.pos, state.px
+    h_cash, h_long, h_short = valuation(today, rates, nusers)
+    hold = h_cash + h_long - h_short
+    seed_wealth = s_cash + s_long - s_short
+    keys = np.union1d(state.pos.key, seed.pos.key)
+    q_now = np.zeros(len(keys))
+    q_now[np.searchsorted(keys, state.pos.key)] = state.pos.vals[0]
+    q_seed = np.zeros(len(keys))
+    q_seed[np.searchsorted(keys, seed.pos.key)] = seed.pos.vals[0]
+    sid = keys & ((1 << SID_BITS) - 1)
+    px = np.array([state.px.get(int(s), np.nan) for s in range(int(sid.max()) + 1 if len(sid) else 0)])
+    moved = np.bincount(keys >> SID_BITS, weights=np.abs(q_now - q_seed) * np.nan_to_num(px[sid]) if len(sid) else None,
+                        minlength=nusers)[:nusers]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cash_frac = cash / (cash + long_)
+        drift = moved / seed_wealth
+        vs_hold = wealth / hold - 1
+        short_frac = short / wealth
+    out = []
+    for gi, name in [(-2, "all")] + list(enumerate(names)):
+        m = groups >= 0 if gi == -2 else groups == gi
+        if not m.any():
+            continue
+        w = wealth[m]
+        top = np.sort(w)[::-1]
+        tot = w.sum()
+        cf = quantiles(cash_frac[m][np.isfinite(cash_frac[m])], (0.1, 0.5, 0.9))
+        dr = quantiles(drift[m][np.isfinite(drift[m])], (0.5, 0.9))
+        vh = quantiles(vs_hold[m][np.isfinite(vs_hold[m])], (0.5,))
+        out.append({"ts": state.ts, "group": name, "bots": int(m.sum()), "wealth_usd": tot,
+                    "cash_usd": cash[m].sum(), "long_usd": long_[m].sum(), "short_usd": short[m].sum(),
+                    "gini": gini(w), "top1": top[:max(1, len(w) // 100)].sum() / tot if tot > 0 else None,
+                    "top10": top[:max(1, len(w) // 10)].sum() / tot if tot > 0 else None,
+                    "cash_p10": cf[0], "cash_p50": cf[1], "cash_p90": cf[2],
+                    "short_of_wealth": short[m].sum() / tot if tot > 0 else None,
+                    "short_bots": float((short[m] > 0).mean()),
+                    "short_p90": quantiles(short_frac[m][np.isfinite(short_frac[m])], (0.9,))[0],
+                    "drift_p50": dr[0], "drift_p90": dr[1], "vs_hold_p50": vh[0]})
+    return out
+
+
+def replay_states(path, step):
+    """Yield (seed state, state) after every frame (thinned to one per `step` seconds)."""
+    st, seed, last = State(), None, None
+    for fr in Frames(path):
+        st.apply(fr)
+        if seed is None or fr[0] == SEED:
+            seed = State()
+            seed.funds.key, seed.funds.vals = st.funds.key.copy(), [v.copy() for v in st.funds.vals]
+            seed.pos.key, seed.pos.vals = st.pos.key.copy(), [v.copy() for v in st.pos.vals]
+            seed.px, seed.ts = dict(st.px), st.ts
+            if fr[0] == SEED:
+                continue
+        if last is not None and step and st.ts - last < step:
+            continue
+        last = st.ts
+        yield seed, st
+
+
+def cmd_record(args):
+    rec = Recorder(args.name)
+    try:
+        if args.seed and not rec.baseline:
+            head, nf, np_, size = rec.snapshot(args.seed, kind=SEED)
+            print(f"seed {args.seed}: {nf:,} funds, {np_:,} positions ({size / 1024:,.0f} KiB)")
+        deadline = time.time() + args.duration if args.duration else None
+        while True:
+            t = time.perf_counter()
+            head, nf, np_, size = rec.snapshot(args.db)
+            stamp = datetime.fromtimestamp(head["ts"], timezone.utc).strftime("%H:%M:%S")
+            print(f"{stamp} frame {rec.n}: {nf:,} fund / {np_:,} position changes, {size / 1024:,.1f} KiB, "
+                  f"{os.path.getsize(rec.path) / 2 ** 20:,.1f} MiB total ({time.perf_counter() - t:.1f}s)", flush=True)
+            if args.once or (deadline and time.time() >= deadline):
+                return
+            time.sleep(max(0.0, args.interval - (time.perf_counter() - t)))
+    except kse_db.QueryError as ex:
+        sys.exit(str(ex))
+    except KeyboardInterrupt:
+        print(f"stopped after {rec.n} frames")
+
+
+def cmd_report(args):
+    out_dir = os.path.join(OUT_DIR, args.name)
+    path = os.path.join(out_dir, "frames.bin")
+    if not os.path.exists(path):
+        sys.exit(f"no recording at {path}")
+    meta_path = os.path.join(out_dir, "meta.json")
+    meta = json.load(open(meta_path, encoding="utf-8")) if os.path.exists(meta_path) else {}
+    db = args.db or meta.get("db", args.name)
+    bots, _ = accounts(db, meta.get("oid"), quiet=True)
+    names = sorted({b[0] for b in bots.values()})
+    nusers = max(bots, default=0) + 1
+    groups = np.full(nusers, -1, dtype=np.int64)
+    for uid, b in bots.items():
+        groups[uid] = names.index(b[0])
+    rates = usd_rates()
+    rows = []
+    t0 = time.perf_counter()
+    for seed, st in replay_states(path, args.step):
+        rows.extend(metrics(st, seed, rates, groups, names, nusers))
+    if not rows:
+        sys.exit("no bot rows (no AIUsers map for this recording?)")
+    out = os.path.join(out_dir, "metrics.csv")
+    fmt = lambda v: "" if v is None or v != v else (f"{v:.6g}" if isinstance(v, float) else v)
+    with open(out, "w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=list(rows[0]))
+        w.writeheader()
+        for r in rows:
+            w.writerow({k: fmt(float(v) if isinstance(v, (np.floating, float)) else v) for k, v in r.items()})
+
+    snaps = sorted({r["ts"] for r in rows})
+    print(f"{len(snaps)} snapshots over {(snaps[-1] - snaps[0]) / 3600:.1f} h, {len(names)} strategies, "
+          f"replayed in {time.perf_counter() - t0:.1f}s ({os.path.getsize(path) / 2 ** 20:,.1f} MiB recorded)")
+    f = lambda v, s: "-".rjust(len(format(0.0, s))) if v is None or v != v else format(v, s)
+    picks = sorted({snaps[0], snaps[len(snaps) // 2], snaps[-1]})
+    print(f"\n{'all bots':<10} {'gini':>6} {'top1%':>6} {'top10%':>6} {'cash p50':>8} {'short':>6} {'drift p50':>9} {'vs hold':>8}")
+    for ts in picks:
+        r = next(r for r in rows if r["ts"] == ts and r["group"] == "all")
+        print(f"{datetime.fromtimestamp(ts, timezone.utc):%d %H:%M} {f(r['gini'], '6.3f')} {f(r['top1'], '6.3f')} "
+              f"{f(r['top10'], '6.3f')} {f(r['cash_p50'], '8.3f')} {f(r['short_of_wealth'], '6.3f')} "
+              f"{f(r['drift_p50'], '9.3f')} {f(r['vs_hold_p50'], '+8.3f')}")
+    print(f"\nlast snapshot{'':<5} {'bots':>6} {'wealth $':>15} {'gini':>6} {'cash p10/p50/p90':>18} "
+          f"{'short%':>6} {'shorting':>8} {'drift p50':>9} {'vs hold':>8}")
+    for r in (r for r in rows if r["ts"] == snaps[-1]):
+        cf = "/".join(f(r[k], ".2f") for k in ("cash_p10", "cash_p50", "cash_p90"))
+        print(f"{r['group']:<18} {r['bots']:>6} {r['wealth_usd']:>15,.0f} {f(r['gini'], '6.3f')} {cf:>18} "
+              f"{f(None if r['short_of_wealth'] is None else r['short_of_wealth'] * 100, '6.2f')} "
+              f"{f(r['short_bots'] * 100, '7.1f')}% {f(r['drift_p50'], '9.3f')} {f(r['vs_hold_p50'], '+8.3f')}")
+    print(f"-> {out}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("record")
+    r.add_argument("--db", default="kse_soak")
+    r.add_argument("--name", default="", help="recording name (default: --db)")
+    r.add_argument("--interval", type=float, default=300.0, help="seconds between snapshots")
+    r.add_argument("--seed", default="", help="template DB holding the seeded state, stored as the baseline")
+    r.add_argument("--duration", type=float, default=0.0, help="stop after this many seconds (0 = until killed)")
+    r.add_argument("--once", action="store_true", help="one snapshot, then exit (e.g. from a scheduler)")
+    p = sub.add_parser("report")
+    p.add_argument("--name", default="kse_soak")
+    p.add_argument("--db", default="", help="DB for the AIUsers map (default: the recorded one)")
+    p.add_argument("--step", type=float, default=0.0, help="one snapshot per step seconds (0 = all)")
+    args = ap.parse_args()
+    if args.cmd == "record":
+        args.name = args.name or args.db
+        cmd_record(args)
+    else:
+        cmd_report(args)
+
+
+if __name__ == "__main__":
+    main()